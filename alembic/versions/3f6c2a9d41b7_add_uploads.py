@@ -0,0 +1,51 @@
+"""Add uploads
+
+Revision ID: 3f6c2a9d41b7
+Revises: 1d92ed56460f
+Create Date: 2026-10-18 09:12:44.120391
+
+"""
+import sqlalchemy as sa
+from fastapi_users_db_sqlalchemy.generics import GUID
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3f6c2a9d41b7"
+down_revision = "1d92ed56460f"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "uploads",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column(
+            "creator_id",
+            GUID(),
+            sa.ForeignKey("user.id", ondelete="cascade"),
+            nullable=False,
+        ),
+        sa.Column("filename", sa.String(), nullable=False),
+        sa.Column("name", sa.String(), nullable=True),
+        sa.Column("location", sa.String(), nullable=False),
+        sa.Column("offset", sa.BigInteger(), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=True),
+        sa.Column(
+            "create_ts",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+        ),
+        sa.Column(
+            "update_ts",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("uploads")
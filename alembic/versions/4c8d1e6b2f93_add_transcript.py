@@ -0,0 +1,74 @@
+"""Add transcript
+
+Revision ID: 4c8d1e6b2f93
+Revises: f2a9c4d70b36
+Create Date: 2026-10-18 23:12:40.527391
+
+"""
+import json
+
+import sqlalchemy as sa
+from fastapi.encoders import jsonable_encoder
+
+from alembic import op
+from openthot.models.transcript import TranscriptorSource
+from openthot.models.transcript.utils import raw2ott
+from openthot.models.transcript.whisper import WhisperTranscript
+from openthot.models.transcript.whisperx import WhisperXTranscript
+from openthot.models.transcript.wordcab import WordcabTranscript
+
+# revision identifiers, used by Alembic.
+revision = "4c8d1e6b2f93"
+down_revision = "f2a9c4d70b36"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 100
+RAW_MODELS = {
+    TranscriptorSource.whisper: WhisperTranscript,
+    TranscriptorSource.whisperx: WhisperXTranscript,
+    TranscriptorSource.wordcab: WordcabTranscript,
+}
+
+interviews = sa.table(
+    "interviews",
+    sa.column("id", sa.Integer),
+    sa.column("transcript_source", sa.String),
+    sa.column("transcript_raw", sa.Text),
+    sa.column("transcript", sa.Text),
+)
+
+
+def upgrade() -> None:
+    op.add_column("interviews", sa.Column("transcript", sa.Text(), nullable=True))
+
+    # Normalize the transcripts already stored, a batch at a time so that
+    # long transcripts do not all sit in memory at once
+    connection = op.get_bind()
+    last_id = 0
+    while rows := connection.execute(
+        sa.select(
+            interviews.c.id,
+            interviews.c.transcript_source,
+            interviews.c.transcript_raw,
+        )
+        .where(interviews.c.id > last_id)
+        .where(interviews.c.transcript_raw.is_not(None))
+        .order_by(interviews.c.id)
+        .limit(BATCH_SIZE)
+    ).all():
+        for id_, source, raw in rows:
+            last_id = id_
+            raw_model = RAW_MODELS.get(source)
+            if raw_model is None or (raw_obj := json.loads(raw)) is None:
+                continue
+            transcript = raw2ott(raw_model.parse_obj(raw_obj))
+            connection.execute(
+                interviews.update()
+                .where(interviews.c.id == id_)
+                .values(transcript=json.dumps(jsonable_encoder(transcript)))
+            )
+
+
+def downgrade() -> None:
+    op.drop_column("interviews", "transcript")
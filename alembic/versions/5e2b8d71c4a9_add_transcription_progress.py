@@ -0,0 +1,35 @@
+"""Add transcription_progress
+
+Revision ID: 5e2b8d71c4a9
+Revises: c81e0f5b7a2d
+Create Date: 2026-10-18 17:32:08.274913
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5e2b8d71c4a9"
+down_revision = "c81e0f5b7a2d"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "transcription_progress",
+        sa.Column(
+            "interview_id",
+            sa.Integer(),
+            sa.ForeignKey("interviews.id", ondelete="cascade"),
+            primary_key=True,
+        ),
+        sa.Column("fraction", sa.Float(), nullable=False),
+        sa.Column("start_ts", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("update_ts", sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("transcription_progress")
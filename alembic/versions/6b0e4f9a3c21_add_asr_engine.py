@@ -0,0 +1,27 @@
+"""Add asr_engine
+
+Revision ID: 6b0e4f9a3c21
+Revises: d3f6a2c85e17
+Create Date: 2026-10-18 21:04:51.203117
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "6b0e4f9a3c21"
+down_revision = "d3f6a2c85e17"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing interviews and uploads request no engine, i.e. are routed
+    op.add_column("interviews", sa.Column("asr_engine", sa.String(), nullable=True))
+    op.add_column("uploads", sa.Column("asr_engine", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("uploads", "asr_engine")
+    op.drop_column("interviews", "asr_engine")
@@ -0,0 +1,40 @@
+"""Add partial_segments
+
+Revision ID: a47c3e9f2d18
+Revises: 5e2b8d71c4a9
+Create Date: 2026-10-18 18:05:41.902377
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "a47c3e9f2d18"
+down_revision = "5e2b8d71c4a9"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "partial_segments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "interview_id",
+            sa.Integer(),
+            sa.ForeignKey("interviews.id", ondelete="cascade"),
+            nullable=False,
+        ),
+        sa.Column("start", sa.Float(), nullable=False),
+        sa.Column("end", sa.Float(), nullable=False),
+        sa.Column("text", sa.Text(), nullable=False),
+    )
+    op.create_index(
+        "ix_partial_segments_interview_id", "partial_segments", ["interview_id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_partial_segments_interview_id", "partial_segments")
+    op.drop_table("partial_segments")
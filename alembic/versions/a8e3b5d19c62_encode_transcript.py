@@ -0,0 +1,75 @@
+"""Encode transcript
+
+Revision ID: a8e3b5d19c62
+Revises: 4c8d1e6b2f93
+Create Date: 2026-10-18 23:58:16.204733
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+from openthot.config import get_settings
+from openthot.models.transcript.encoding import decode_transcript, encode_transcript
+from openthot.models.transcript.openthot import OpenthotTranscript
+
+# revision identifiers, used by Alembic.
+revision = "a8e3b5d19c62"
+down_revision = "4c8d1e6b2f93"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 100
+
+
+def _convert(from_type, to_type, convert) -> None:
+    """
+    Convert `transcript` into a column of `to_type`, a batch at a time so that
+    long transcripts do not all sit in memory at once.
+    """
+    op.add_column("interviews", sa.Column("transcript_converted", to_type))
+    interviews = sa.table(
+        "interviews",
+        sa.column("id", sa.Integer),
+        sa.column("transcript", from_type),
+        sa.column("transcript_converted", to_type),
+    )
+    connection = op.get_bind()
+    last_id = 0
+    while rows := connection.execute(
+        sa.select(interviews.c.id, interviews.c.transcript)
+        .where(interviews.c.id > last_id)
+        .where(interviews.c.transcript.is_not(None))
+        .order_by(interviews.c.id)
+        .limit(BATCH_SIZE)
+    ).all():
+        for id_, transcript in rows:
+            last_id = id_
+            connection.execute(
+                interviews.update()
+                .where(interviews.c.id == id_)
+                .values(transcript_converted=convert(transcript))
+            )
+    op.drop_column("interviews", "transcript")
+    op.alter_column("interviews", "transcript_converted", new_column_name="transcript")
+
+
+def upgrade() -> None:
+    # As set for this deployment
+    storage_settings = get_settings().transcript_storage
+    _convert(
+        sa.Text(),
+        sa.LargeBinary(),
+        lambda transcript: encode_transcript(
+            OpenthotTranscript.parse_raw(transcript),
+            storage_settings.encoding,
+            storage_settings.compression,
+        ),
+    )
+
+
+def downgrade() -> None:
+    _convert(
+        sa.LargeBinary(),
+        sa.Text(),
+        lambda transcript: decode_transcript(transcript).to_ott().json(),
+    )
@@ -0,0 +1,45 @@
+"""Add transcription_leases
+
+Revision ID: b5f17c3e9a40
+Revises: a8e3b5d19c62
+Create Date: 2026-10-19 10:41:05.318274
+
+"""
+import sqlalchemy as sa
+from fastapi_users_db_sqlalchemy.generics import GUID
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b5f17c3e9a40"
+down_revision = "a8e3b5d19c62"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "transcription_leases",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "interview_id",
+            sa.Integer(),
+            sa.ForeignKey("interviews.id", ondelete="cascade"),
+            nullable=False,
+        ),
+        sa.Column(
+            "user_id",
+            GUID(),
+            sa.ForeignKey("user.id", ondelete="cascade"),
+            nullable=False,
+        ),
+        sa.Column("expires_ts", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index(
+        "ix_transcription_leases_user_id", "transcription_leases", ["user_id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_transcription_leases_user_id", "transcription_leases")
+    op.drop_table("transcription_leases")
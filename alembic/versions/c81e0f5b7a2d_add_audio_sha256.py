@@ -0,0 +1,57 @@
+"""Add audio_sha256 and transcript_model
+
+Revision ID: c81e0f5b7a2d
+Revises: 3f6c2a9d41b7
+Create Date: 2026-10-18 11:02:37.518204
+
+"""
+import hashlib
+import os
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c81e0f5b7a2d"
+down_revision = "3f6c2a9d41b7"
+branch_labels = None
+depends_on = None
+
+
+def _sha256(path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def upgrade() -> None:
+    op.add_column("interviews", sa.Column("audio_sha256", sa.String(), nullable=True))
+    op.create_index("ix_interviews_audio_sha256", "interviews", ["audio_sha256"])
+    op.add_column(
+        "interviews", sa.Column("transcript_model", sa.String(), nullable=True)
+    )
+
+    # Existing audio files keep their location, but get a hash so that
+    # their transcript can be reused by later uploads of the same audio.
+    # `transcript_model` is left empty as we do not know which model was used.
+    bind = op.get_bind()
+    select_statement = sa.sql.text("SELECT id, audio_location FROM interviews")
+    updated = [
+        {"id": itw_id, "audio_sha256": _sha256(audio_location)}
+        for itw_id, audio_location in bind.execute(select_statement)
+        if os.path.exists(audio_location)
+    ]
+    if updated:
+        upd_statement = sa.sql.text(
+            "UPDATE interviews SET audio_sha256 = :audio_sha256 WHERE id=:id"
+        )
+        bind.execute(upd_statement, updated)
+
+
+def downgrade() -> None:
+    op.drop_column("interviews", "transcript_model")
+    op.drop_index("ix_interviews_audio_sha256", "interviews")
+    op.drop_column("interviews", "audio_sha256")
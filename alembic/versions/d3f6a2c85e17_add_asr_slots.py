@@ -0,0 +1,30 @@
+"""Add asr_slots
+
+Revision ID: d3f6a2c85e17
+Revises: a47c3e9f2d18
+Create Date: 2026-10-18 19:12:27.530841
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d3f6a2c85e17"
+down_revision = "a47c3e9f2d18"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "asr_slots",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("host", sa.String(), nullable=False),
+        sa.Column("weight", sa.Integer(), nullable=False),
+        sa.Column("expires_ts", sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("asr_slots")
@@ -0,0 +1,37 @@
+"""Add audio_files
+
+Revision ID: e4a7c2d9b813
+Revises: b5f17c3e9a40
+Create Date: 2026-10-19 15:12:48.604517
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e4a7c2d9b813"
+down_revision = "b5f17c3e9a40"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "audio_files",
+        sa.Column("location", sa.String(), primary_key=True),
+        sa.Column("sha256", sa.String(), nullable=True),
+        sa.Column("reference_count", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_audio_files_sha256", "audio_files", ["sha256"])
+    # Existing audio files are referenced by their interviews
+    op.execute(
+        "INSERT INTO audio_files (location, sha256, reference_count)"
+        " SELECT audio_location, MAX(audio_sha256), COUNT(*) FROM interviews"
+        " GROUP BY audio_location"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_audio_files_sha256", "audio_files")
+    op.drop_table("audio_files")
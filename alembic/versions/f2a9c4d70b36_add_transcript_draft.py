@@ -0,0 +1,29 @@
+"""Add transcript_draft
+
+Revision ID: f2a9c4d70b36
+Revises: 6b0e4f9a3c21
+Create Date: 2026-10-18 22:37:09.418255
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f2a9c4d70b36"
+down_revision = "6b0e4f9a3c21"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "interviews",
+        sa.Column(
+            "transcript_draft", sa.Boolean(), nullable=False, server_default=sa.false()
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("interviews", "transcript_draft")
@@ -0,0 +1,64 @@
+"""
+Compare `openthot.audio.probe` with `librosa.get_duration`,
+on the audio fixtures of the tests and on generated files.
+
+    python -m benchmarks.probe
+"""
+import tempfile
+import timeit
+from pathlib import Path
+
+import librosa
+import numpy as np
+import soundfile
+
+from openthot.audio.probe import probe_audio_decoding, probe_audio_header
+
+FIXTURES = sorted(Path("tests").glob("*.mp3"))
+GENERATED = (  # format, subtype, extension
+    ("WAV", "PCM_16", "wav"),
+    ("FLAC", "PCM_16", "flac"),
+    ("OGG", "VORBIS", "ogg"),
+    ("MP3", "MPEG_LAYER_III", "mp3"),
+)
+SAMPLE_RATE = 16000
+DURATION_S = 600
+
+
+def bench(path: Path, number: int = 20):
+    def per_call(f) -> float:
+        return min(timeit.repeat(f, number=number, repeat=3)) / number * 1000
+
+    librosa_duration = librosa.get_duration(path=path)
+    header_info = probe_audio_header(path)
+    results = {
+        "librosa": per_call(lambda: librosa.get_duration(path=path)),
+        "header": per_call(lambda: probe_audio_header(path)),
+        "decoding": per_call(lambda: probe_audio_decoding(path)),
+    }
+    print(
+        f"{path.name:<24} {path.stat().st_size / 1e6:>8.1f} MB"
+        + "".join(f" {name:>9}: {ms:>8.3f} ms" for name, ms in results.items())
+        + f"  | duration: librosa={librosa_duration:.3f}s"
+        + f" header={header_info.duration if header_info else float('nan'):.3f}s"
+    )
+
+
+def main():
+    for path in FIXTURES:
+        bench(path)
+    samples = np.random.default_rng(0).standard_normal(SAMPLE_RATE * DURATION_S) * 0.1
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for format, subtype, extension in GENERATED:
+            path = Path(tmp_dir, f"generated_{DURATION_S}s.{extension}")
+            with soundfile.SoundFile(
+                path, "w", SAMPLE_RATE, 1, format=format, subtype=subtype
+            ) as f:
+                # large single writes are known to crash libsndfile's vorbis encoder
+                for block in np.array_split(samples, DURATION_S):
+                    f.write(block)
+            bench(path, number=5)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Compare the encodings of `openthot.models.transcript.encoding` with the JSON
+transcripts were stored as before, in size and speed, on the JSON fixtures of
+the tests and on a long transcript made of them.
+
+    python -m benchmarks.transcript_encoding
+"""
+import importlib.util
+import timeit
+from pathlib import Path
+from typing import Callable
+
+from openthot.models.transcript.encoding import (
+    TranscriptCompression,
+    TranscriptEncoding,
+    decode_transcript,
+    encode_transcript,
+)
+from openthot.models.transcript.openthot import OpenthotTranscript
+from openthot.models.transcript.utils import wt2ott, wtx2ott
+from openthot.models.transcript.whisper import WhisperTranscript
+from openthot.models.transcript.whisperx import WhisperXTranscript
+
+FIXTURES = {
+    "whisper.output.example1.json": WhisperTranscript,
+    "whisperx.output.example2.json": WhisperXTranscript,
+}
+LONG_WORDS = 20000
+
+
+def load_fixtures() -> dict[str, OpenthotTranscript]:
+    transcripts = {}
+    for name, model in FIXTURES.items():
+        raw = model.parse_file(Path("tests", name))
+        transcripts[name] = (
+            wt2ott(raw) if isinstance(raw, WhisperTranscript) else wtx2ott(raw)
+        )
+    return transcripts
+
+
+def lengthen(ott: OpenthotTranscript, words: int) -> OpenthotTranscript:
+    """`ott` repeated until it has at least `words` words."""
+    segments = []
+    offset = 0.0
+    while sum(len(s.words) for s in segments) < words:
+        for segment in ott.segments:
+            segments.append(
+                segment.copy(
+                    update={
+                        "id": len(segments),
+                        "start": segment.start + offset,
+                        "end": segment.end + offset,
+                    }
+                )
+            )
+        offset += ott.segments[-1].end
+    return ott.copy(update={"segments": segments})
+
+
+def per_call(f: Callable, number: int) -> float:
+    return min(timeit.repeat(f, number=number, repeat=3)) / number * 1000
+
+
+def bench(name: str, ott: OpenthotTranscript, number: int) -> None:
+    words = sum(len(s.words) for s in ott.segments)
+    print(f"{name} ({words} words)")
+    # As stored before, and parsed by every read
+    stored = ott.json()
+    results = {
+        "json text (before)": (
+            len(stored.encode()),
+            per_call(lambda: ott.json(), number),
+            per_call(lambda: OpenthotTranscript.parse_raw(stored), number),
+            None,
+        )
+    }
+    compressions = [
+        c
+        for c in TranscriptCompression
+        if c != TranscriptCompression.zstd or importlib.util.find_spec("zstandard")
+    ]
+    for encoding in TranscriptEncoding:
+        for compression in compressions:
+            data = encode_transcript(ott, encoding, compression)
+            results[f"{encoding.value}+{compression.value}"] = (
+                len(data),
+                per_call(lambda: encode_transcript(ott, encoding, compression), number),
+                per_call(lambda: decode_transcript(data).to_ott(), number),
+                per_call(lambda: decode_transcript(data), number),
+            )
+    print(f"  {'':<20} {'size':>10} {'encode':>11} {'decode':>11} {'columns only':>13}")
+    for label, (size, encode_ms, decode_ms, columns_ms) in results.items():
+        print(
+            f"  {label:<20} {size / 1e3:>7.1f} kB {encode_ms:>8.3f} ms"
+            f" {decode_ms:>8.3f} ms"
+            + (f" {columns_ms:>10.3f} ms" if columns_ms is not None else "")
+        )
+
+
+def main():
+    fixtures = load_fixtures()
+    for name, ott in fixtures.items():
+        bench(name, ott, number=200)
+    longest = max(fixtures.values(), key=lambda ott: len(ott.segments))
+    bench("long transcript", lengthen(longest, LONG_WORDS), number=5)
+
+
+if __name__ == "__main__":
+    main()
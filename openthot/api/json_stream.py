@@ -0,0 +1,100 @@
+"""
+Streaming of interviews as JSON, their transcript a few segments at a time.
+
+Rather than building the whole response (the model, then its `jsonable_encoder`
+version, then its JSON), the envelope of the interview is written first, then
+segments are encoded straight from the columns of the transcript as they are sent.
+Memory then stays flat whatever the length of the transcript, and the first bytes
+are sent sooner.
+"""
+import json
+import math
+from typing import Any, Iterator
+
+from fastapi.encoders import jsonable_encoder
+
+from openthot.models.interview import APIOutputInterview
+from openthot.models.transcript.columnar import ColumnarTranscript
+
+try:
+    import orjson
+except ImportError:  # i.e. optional, faster
+    orjson = None  # type: ignore
+
+# Segments encoded and sent at once
+BATCH_SIZE = 64
+
+_json_encoder = json.JSONEncoder(
+    ensure_ascii=False, allow_nan=False, separators=(",", ":")
+)
+
+
+def _finite(obj: Any) -> Any:
+    """`obj` with its NaN and infinite floats as `None`, as orjson encodes them."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(value) for value in obj]
+    return obj
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    try:
+        return _json_encoder.encode(obj).encode()
+    except ValueError:
+        # i.e. NaN or infinite floats, which must not fail once the response started
+        return _json_encoder.encode(_finite(obj)).encode()
+
+
+def segment_dict(ct: ColumnarTranscript, index: int) -> dict:
+    """Segment of `ct`, as `OpenthotSegment` would be encoded."""
+    word_starts = ct.word_starts
+    word_probabilities = ct.word_probabilities
+    word_ends = ct.word_ends
+    segment = {
+        "id": ct.segment_ids[index],
+        "start": ct.segment_starts[index],
+        "end": ct.segment_ends[index],
+        "words": [
+            {
+                "word": ct.word(i),
+                "start": word_starts[i],
+                "probability": word_probabilities[i],
+                "end": word_ends[i],
+            }
+            for i in range(
+                ct.segment_word_offsets[index], ct.segment_word_offsets[index + 1]
+            )
+        ],
+        "speaker": ct.segment_speaker(index),
+    }
+    if (text := ct.segment_texts[index]) is not None:
+        segment["text"] = text
+    return segment
+
+
+def stream_interview(
+    interview: APIOutputInterview, transcript: ColumnarTranscript
+) -> Iterator[bytes]:
+    """JSON of `interview` with `transcript`, the latter a batch of segments at a time."""
+    envelope = dumps(jsonable_encoder(interview, exclude={"transcript"}))
+    header = {
+        "language": transcript.language,
+        "text": transcript.text,
+        "speakers": sorted(transcript.listed_speakers),
+    }
+    # i.e. `{...envelope, "transcript": {...header, "segments": [`
+    yield envelope[:-1] + b',"transcript":' + dumps(header)[:-1] + b',"segments":['
+    for batch_start in range(0, transcript.segment_count, BATCH_SIZE):
+        batch = [
+            segment_dict(transcript, i)
+            for i in range(
+                batch_start, min(batch_start + BATCH_SIZE, transcript.segment_count)
+            )
+        ]
+        yield (b"," if batch_start else b"") + dumps(batch)[1:-1]
+    yield b"]}}"
@@ -0,0 +1,122 @@
+"""
+HTTP range and conditional requests (RFC 9110, sections 13 and 14),
+so that clients can fetch only parts of large objects (e.g. to seek
+within an audio file) and avoid downloading what they already have.
+"""
+import re
+import secrets
+from typing import AsyncIterator, Callable
+
+# Beyond this number of (coalesced) ranges, the whole object is sent instead
+MAX_RANGES = 16
+
+ByteRange = tuple[int, int]  # [start, end)
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range_header(header: str, size: int) -> list[ByteRange] | None:
+    """
+    Byte ranges requested by a `Range` header, sorted and coalesced.
+
+    Returns:
+        list[ByteRange] | None: The ranges to send, or `None` if the header is to be ignored,
+            i.e. the whole object is to be sent (other unit, invalid syntax, too many ranges).
+
+    Raises:
+        RangeNotSatisfiable: if none of the ranges overlaps the object.
+    """
+    unit, _, specs = header.partition("=")
+    if unit.strip().lower() != "bytes":
+        return None
+    ranges = []
+    for spec in specs.split(","):
+        if not (match := re.fullmatch(r"(\d*)-(\d*)", spec.strip(), re.ASCII)):
+            return None
+        first, last = match.groups()
+        if not first and not last:
+            return None
+        if not first:  # suffix range, i.e. the last bytes
+            if int(last) > 0 and size > 0:
+                ranges.append((max(size - int(last), 0), size))
+            continue
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        if start < size:
+            ranges.append((start, min(int(last) + 1 if last else size, size)))
+    if not ranges:
+        raise RangeNotSatisfiable
+    ranges.sort()
+    coalesced = [ranges[0]]
+    for start, end in ranges[1:]:
+        if start <= coalesced[-1][1]:
+            coalesced[-1] = (coalesced[-1][0], max(end, coalesced[-1][1]))
+        else:
+            coalesced.append((start, end))
+    if len(coalesced) > MAX_RANGES:
+        return None
+    return coalesced
+
+
+def etag_matches(header: str, etag: str, weak: bool = True) -> bool:
+    """
+    Whether an `If-None-Match` (`weak`) or `If-Range` (not `weak`) header
+    designates the representation whose strong ETag is `etag`.
+    """
+    if weak and header.strip() == "*":
+        return True
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if weak:
+            candidate = candidate.removeprefix("W/")
+        if candidate == etag:
+            return True
+    return False
+
+
+def content_range(byte_range: ByteRange, size: int) -> str:
+    return f"bytes {byte_range[0]}-{byte_range[1] - 1}/{size}"
+
+
+def multipart_byteranges(
+    read: Callable[[int, int], AsyncIterator[bytes]],
+    ranges: list[ByteRange],
+    size: int,
+    media_type: str,
+) -> tuple[str, int, AsyncIterator[bytes]]:
+    """
+    Body of a `multipart/byteranges` response, streamed range by range.
+
+    Args:
+        read: Streams the bytes of the object within `[start, end)`.
+
+    Returns:
+        tuple[str, int, AsyncIterator[bytes]]: Content type, length and content of the body.
+    """
+    boundary = secrets.token_hex(16)
+    part_headers = [
+        (
+            f"--{boundary}\r\n"
+            f"Content-Type: {media_type}\r\n"
+            f"Content-Range: {content_range(byte_range, size)}\r\n\r\n"
+        ).encode()
+        for byte_range in ranges
+    ]
+    closing = f"--{boundary}--\r\n".encode()
+    length = len(closing) + sum(
+        len(headers) + (end - start) + 2
+        for headers, (start, end) in zip(part_headers, ranges)
+    )
+
+    async def content() -> AsyncIterator[bytes]:
+        for headers, (start, end) in zip(part_headers, ranges):
+            yield headers
+            async for chunk in read(start, end):
+                yield chunk
+            yield b"\r\n"
+        yield closing
+
+    return f"multipart/byteranges; boundary={boundary}", length, content()
@@ -1,28 +1,71 @@
+import hashlib
+import mimetypes
 import os
+import secrets
+from functools import partial
 from pathlib import Path
 
-import librosa
 import structlog
-from fastapi import APIRouter, Depends, File, UploadFile
+from fastapi import APIRouter, Depends, File, Query, Request, UploadFile
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import FileResponse
+from fastapi.responses import Response, StreamingResponse
+from pydantic import confloat, conint
 
+from openthot import object_storage
+from openthot.api import json_stream
+from openthot.api.ranges import (
+    RangeNotSatisfiable,
+    content_range,
+    etag_matches,
+    multipart_byteranges,
+    parse_range_header,
+)
 from openthot.api.utils import error_responses_for_openapi
 from openthot.api.v1.routers import auth
 from openthot.asr.process import process_audio
+from openthot.audio.probe import probe_audio
+from openthot.audio.waveform import MAX_PEAKS_PER_SECOND, read_waveform_level
 from openthot.config import get_settings
 from openthot.db import rw
 from openthot.db.database import SqlaUserBase, get_db
-from openthot.exceptions import APIAudiofileMalformed, APIInterviewNotFound
+from openthot.exceptions import (
+    APIAsrEngineNotFound,
+    APIAudiofileMalformed,
+    APIInterviewNotFound,
+    APIRangeNotSatisfiable,
+    APITranscriptNotFound,
+    APIUploadBusy,
+    APIUploadIncomplete,
+    APIUploadNotFound,
+    APIUploadOffsetMismatch,
+    APIWaveformNotFound,
+    AudioFileBusy,
+    ExceptionModel,
+    RichHTTPException,
+    UnsupportedAudioFile,
+)
 from openthot.models.interview import (
     APIInputInterviewCreate,
     APIInputInterviewUpdate,
     APIOutputInterview,
+    APIOutputTranscriptPage,
     DBInputInterviewCreate,
     DBInputInterviewUpdate,
+    DBOutputInterview,
     InterviewId,
+    InterviewStatus,
+)
+from openthot.models.transcript.columnar import ColumnarTranscript
+from openthot.models.transcript.encoding import decode_transcript
+from openthot.models.transcript.openthot import PartialSegment
+from openthot.models.transcript.utils import partial2ott, raw2ct
+from openthot.models.upload import (
+    APIInputUploadCreate,
+    APIOutputUpload,
+    DBInputUploadCreate,
+    UploadId,
 )
-from openthot.object_storage import save_audio_file
+from openthot.object_storage import StagedAudioFile, StoredAudioFile
 from openthot.tasks.tasks import process_audio_task
 
 logger = structlog.get_logger(__file__)
@@ -47,36 +90,90 @@ async def list_interviews(
     return list(await rw.get_interviews(db, current_user))
 
 
-@router.post(
-    "/",
-    response_model=APIOutputInterview,
-    responses=error_responses_for_openapi((APIAudiofileMalformed,)),
-    response_model_exclude_none=True,
-)
-async def create_interview(
-    interview: APIInputInterviewCreate = Depends(),
-    audio_file: UploadFile = File(description="The audio file of the interview."),
-    db=Depends(get_db),
-    current_user: SqlaUserBase = Depends(auth.current_active_user),
-):
-    """Create a new interview to be transcripted."""
-    audio_file_name: str = audio_file.filename or "interview"
+def _check_asr_engine(asr_engine: str | None) -> None:
+    if asr_engine is not None and asr_engine not in get_settings().named_asr_engines():
+        raise APIAsrEngineNotFound
 
-    persistent_location = await save_audio_file(audio_file)
-    await logger.adebug("Just wrote audio file.")
+
+async def _probe_audio_duration(staged_audio_file: StagedAudioFile) -> float:
+    """
+    Duration of a staged audio file, read while it is still local
+    (i.e. rather than downloaded back from the object storage).
+    """
     try:
-        audio_duration = librosa.get_duration(path=persistent_location)
+        return (await probe_audio(staged_audio_file.path)).duration
     except Exception as e:
         await logger.aexception(
-            "Could not load audio file", persistent_location=persistent_location
+            "Could not load audio file", staged_location=str(staged_audio_file.path)
         )
-        os.remove(persistent_location)
         raise APIAudiofileMalformed from e
+
+
+async def _store_audio_file(db, staged_audio_file: StagedAudioFile) -> StoredAudioFile:
+    """
+    Store a staged audio file under its content address, once referenced so that
+    it is not removed meanwhile by the deletion of an interview with the same audio.
+    The reference is to be released by `_register_interview`.
+    """
+    await rw.reference_audio_file(
+        db, staged_audio_file.location, staged_audio_file.sha256
+    )
+    try:
+        return await object_storage.store_staged_audio_file(staged_audio_file)
+    except BaseException:
+        await rw.release_audio_file(
+            db, staged_audio_file.location, staged_audio_file.sha256
+        )
+        raise
+
+
+async def _register_interview(
+    db,
+    current_user: SqlaUserBase,
+    name: str | None,
+    audio_file_name: str,
+    stored_audio_file: StoredAudioFile,
+    audio_duration: float,
+    asr_engine: str | None = None,
+):
+    """
+    Turn an audio file already written to the object storage (see `_store_audio_file`)
+    into an interview, and launch its processing.
+    The reference to the audio file is then released: the audio file is removed if
+    anything went wrong.
+    """
+    persistent_location = stored_audio_file.location
+    try:
+        return await _create_interview(
+            db,
+            current_user,
+            name,
+            audio_file_name,
+            stored_audio_file,
+            audio_duration,
+            asr_engine,
+        )
+    finally:
+        # i.e. the interview, if any, took its own reference
+        await rw.release_audio_file(db, persistent_location, stored_audio_file.sha256)
+
+
+async def _create_interview(
+    db,
+    current_user: SqlaUserBase,
+    name: str | None,
+    audio_file_name: str,
+    stored_audio_file: StoredAudioFile,
+    audio_duration: float,
+    asr_engine: str | None,
+):
     interview_create = DBInputInterviewCreate(
-        name=interview.name or str(Path(audio_file_name).with_suffix("")),
+        name=name or str(Path(audio_file_name).with_suffix("")),
         audio_filename=audio_file_name,
-        audio_location=persistent_location,
+        audio_location=stored_audio_file.location,
         audio_duration=audio_duration,
+        audio_sha256=stored_audio_file.sha256,
+        asr_engine=asr_engine,
     )
     new_interview = await rw.create_interview(
         db,
@@ -96,17 +193,263 @@ async def create_interview(
                 user_id=current_user.id,
                 interview_id=new_interview.id,
                 audio_location=new_interview.audio_location,
+                audio_duration=new_interview.audio_duration,
             )
     except Exception:
         await logger.aexception("Could not launch task of processing audio.")
         await rw.delete_interview(
             db, user=current_user, interview_id=jsonable_encoder(new_interview)["id"]
         )
-        os.remove(persistent_location)
         raise
     return new_interview
 
 
+@router.post(
+    "/",
+    response_model=APIOutputInterview,
+    responses=error_responses_for_openapi(
+        (APIAsrEngineNotFound, APIAudiofileMalformed)
+    ),
+    response_model_exclude_none=True,
+)
+async def create_interview(
+    interview: APIInputInterviewCreate = Depends(),
+    audio_file: UploadFile = File(description="The audio file of the interview."),
+    db=Depends(get_db),
+    current_user: SqlaUserBase = Depends(auth.current_active_user),
+):
+    """
+    Create a new interview to be transcripted, by the ASR engine it requests
+    if any, otherwise by the one the routing policy chooses.
+    """
+    _check_asr_engine(interview.asr_engine)
+    audio_file_name: str = audio_file.filename or "interview"
+
+    try:
+        staged_audio_file = await object_storage.stage_audio_file(audio_file)
+    except UnsupportedAudioFile as e:
+        await logger.awarning("Rejected audio file", audio_file_name=audio_file_name)
+        raise APIAudiofileMalformed from e
+    try:
+        audio_duration = await _probe_audio_duration(staged_audio_file)
+    except APIAudiofileMalformed:
+        os.remove(staged_audio_file.path)
+        raise
+    stored_audio_file = await _store_audio_file(db, staged_audio_file)
+    await logger.adebug(
+        "Just wrote audio file.",
+        size=stored_audio_file.size,
+        sha256=stored_audio_file.sha256,
+    )
+    return await _register_interview(
+        db,
+        current_user,
+        name=interview.name,
+        audio_file_name=audio_file_name,
+        stored_audio_file=stored_audio_file,
+        audio_duration=audio_duration,
+        asr_engine=interview.asr_engine,
+    )
+
+
+#
+# Resumable uploads
+#
+# For large audio files, an interview can also be created through a resumable upload:
+#   1. POST   /uploads                      starts the upload
+#   2. PUT    /uploads/{upload_id}?offset=  sends raw bytes, to be appended at `offset`
+#   3. GET    /uploads/{upload_id}          tells the current offset, e.g. after a failure
+#   4. POST   /uploads/{upload_id}/finalize creates the interview
+#
+@router.post(
+    "/uploads",
+    response_model=APIOutputUpload,
+    responses=error_responses_for_openapi((APIAsrEngineNotFound,)),
+    response_model_exclude_none=True,
+)
+async def create_upload(
+    upload: APIInputUploadCreate,
+    db=Depends(get_db),
+    current_user: SqlaUserBase = Depends(auth.current_active_user),
+):
+    """Start a resumable upload of an interview audio file."""
+    _check_asr_engine(upload.asr_engine)
+    persistent_location = await object_storage.create_audio_file(upload.filename)
+    return await rw.create_upload(
+        db,
+        user=current_user,
+        upload=DBInputUploadCreate(
+            id=secrets.token_urlsafe(24),
+            location=persistent_location,
+            **upload.dict(),
+        ),
+    )
+
+
+async def _sync_upload_offset(db, upload):
+    """
+    Store the offset of an upload as its file actually is, i.e. including chunks
+    written by requests that failed midway (e.g. the client disconnected).
+    """
+    offset = object_storage.get_audio_file_size(upload.location)
+    if offset == upload.offset:
+        return upload
+    return await rw.update_upload_offset(db, upload_db=upload, offset=offset)
+
+
+@router.get(
+    "/uploads/{upload_id}",
+    response_model=APIOutputUpload,
+    responses=error_responses_for_openapi((APIUploadNotFound,)),
+    response_model_exclude_none=True,
+)
+async def get_upload(
+    upload_id: UploadId,
+    db=Depends(get_db),
+    current_user: SqlaUserBase = Depends(auth.current_active_user),
+):
+    """Get a resumable upload, especially its current offset."""
+    upload = await rw.get_upload(db, current_user, upload_id)
+    if upload is None:
+        raise APIUploadNotFound
+    try:
+        return await _sync_upload_offset(db, upload)
+    except FileNotFoundError as e:  # i.e. finalized or deleted meanwhile
+        raise APIUploadNotFound from e
+
+
+@router.put(
+    "/uploads/{upload_id}",
+    response_model=APIOutputUpload,
+    responses=error_responses_for_openapi(
+        (
+            APIAudiofileMalformed,
+            APIUploadBusy,
+            APIUploadNotFound,
+            APIUploadOffsetMismatch,
+        )
+    ),
+    response_model_exclude_none=True,
+)
+async def append_upload_chunk(
+    upload_id: UploadId,
+    request: Request,
+    offset: conint(ge=0) = Query(  # type: ignore
+        description="Where the chunk starts in the audio file. Must be the current offset of the upload."
+    ),
+    db=Depends(get_db),
+    current_user: SqlaUserBase = Depends(auth.current_active_user),
+):
+    """
+    Append a chunk of the audio file to a resumable upload.
+    The chunk is the raw request body, and is written as it is received.
+    Only one chunk at a time is appended to an upload.
+    """
+    upload = await rw.get_upload(db, current_user, upload_id)
+    if upload is None:
+        raise APIUploadNotFound
+    try:
+        with object_storage.locked_audio_file(upload.location):
+            if offset != object_storage.get_audio_file_size(upload.location):
+                raise APIUploadOffsetMismatch
+            try:
+                await object_storage.append_audio_chunks(
+                    upload.location, request.stream()
+                )
+            except UnsupportedAudioFile as e:
+                await logger.awarning(
+                    "Rejected audio file", audio_file_name=upload.filename
+                )
+                raise APIAudiofileMalformed from e
+            finally:
+                upload = await _sync_upload_offset(db, upload)
+    except AudioFileBusy as e:
+        raise APIUploadBusy from e
+    except FileNotFoundError as e:  # i.e. finalized or deleted meanwhile
+        raise APIUploadNotFound from e
+    return upload
+
+
+@router.post(
+    "/uploads/{upload_id}/finalize",
+    response_model=APIOutputInterview,
+    responses=error_responses_for_openapi(
+        (APIAudiofileMalformed, APIUploadBusy, APIUploadNotFound, APIUploadIncomplete)
+    ),
+    response_model_exclude_none=True,
+)
+async def finalize_upload(
+    upload_id: UploadId,
+    db=Depends(get_db),
+    current_user: SqlaUserBase = Depends(auth.current_active_user),
+):
+    """Turn a complete resumable upload into a new interview to be transcripted."""
+    upload = await rw.get_upload(db, current_user, upload_id)
+    if upload is None:
+        raise APIUploadNotFound
+    try:
+        # i.e. not while a chunk is being appended
+        with object_storage.locked_audio_file(upload.location):
+            offset = object_storage.get_audio_file_size(upload.location)
+            if offset == 0 or (upload.size is not None and offset != upload.size):
+                raise APIUploadIncomplete
+            try:
+                staged_audio_file = await object_storage.hash_staged_audio_file(
+                    upload.location
+                )
+            except UnsupportedAudioFile as e:
+                await logger.awarning(
+                    "Rejected audio file", audio_file_name=upload.filename
+                )
+                raise APIAudiofileMalformed from e
+            audio_duration = await _probe_audio_duration(staged_audio_file)
+            stored_audio_file = await _store_audio_file(db, staged_audio_file)
+    except AudioFileBusy as e:
+        raise APIUploadBusy from e
+    except FileNotFoundError as e:  # i.e. finalized or deleted meanwhile
+        raise APIUploadNotFound from e
+    await logger.adebug(
+        "Finalizing upload.",
+        size=stored_audio_file.size,
+        sha256=stored_audio_file.sha256,
+    )
+    audio_file_name, name, asr_engine = upload.filename, upload.name, upload.asr_engine
+    await rw.delete_upload(db, upload_db=upload)
+    return await _register_interview(
+        db,
+        current_user,
+        name=name,
+        audio_file_name=audio_file_name,
+        stored_audio_file=stored_audio_file,
+        audio_duration=audio_duration,
+        asr_engine=asr_engine,
+    )
+
+
+@router.delete(
+    "/uploads/{upload_id}",
+    responses=error_responses_for_openapi((APIUploadBusy, APIUploadNotFound)),
+)
+async def delete_upload(
+    upload_id: UploadId,
+    db=Depends(get_db),
+    current_user: SqlaUserBase = Depends(auth.current_active_user),
+):
+    """Abort a resumable upload."""
+    upload = await rw.get_upload(db, current_user, upload_id)
+    if upload is None:
+        raise APIUploadNotFound
+    if os.path.exists(upload.location):
+        try:
+            with object_storage.locked_audio_file(upload.location):
+                os.remove(upload.location)
+        except AudioFileBusy as e:
+            raise APIUploadBusy from e
+        except FileNotFoundError as e:  # i.e. finalized or deleted meanwhile
+            raise APIUploadNotFound from e
+    await rw.delete_upload(db, upload_db=upload)
+
+
 @router.delete(
     "/{interview_id}",
     responses=error_responses_for_openapi((APIInterviewNotFound,)),
@@ -131,39 +474,240 @@ async def get_interview(
     db=Depends(get_db),
     current_user: SqlaUserBase = Depends(auth.current_active_user),
 ):
-    """Get a specific interview."""
-    interview = await rw.get_interview(db, current_user, interview_id)
-    if interview:
-        return interview
-    raise APIInterviewNotFound
+    """
+    Get a specific interview.
+    While it is being transcribed, `transcript` is what has been transcribed so far
+    (see `transcript_partial`).
+    """
+    interview = await rw.get_interview(db, current_user, interview_id, with_raw=False)
+    if not interview:
+        raise APIInterviewNotFound
+    if interview.transcript is not None:
+        # Sent as it is encoded, rather than encoded as a whole before being sent
+        transcript = decode_transcript(interview.transcript)
+        return StreamingResponse(
+            json_stream.stream_interview(
+                APIOutputInterview.envelope_from_orm(interview, transcript),
+                transcript,
+            ),
+            media_type="application/json",
+        )
+    await db.refresh(interview, ["transcript_raw"])
+    if interview.status == InterviewStatus.processing and not interview.transcript_raw:
+        segments = await rw.get_partial_segments(db, interview.id)  # type: ignore
+        return APIOutputInterview.from_orm(
+            interview, [PartialSegment.from_orm(s) for s in segments]
+        )
+    return interview
+
+
+@router.get(
+    "/{interview_id}/transcript",
+    response_model=APIOutputTranscriptPage,
+    responses=error_responses_for_openapi(
+        (APIInterviewNotFound, APITranscriptNotFound)
+    ),
+)
+async def get_interview_transcript(
+    interview_id: InterviewId,
+    request: Request,
+    response: Response,
+    start: confloat(ge=0.0)
+    | None = Query(  # type: ignore
+        None, description="Time (s) of the audio from which segments are returned."
+    ),
+    end: confloat(ge=0.0)
+    | None = Query(  # type: ignore
+        None, description="Time (s) of the audio until which segments are returned."
+    ),
+    cursor: conint(ge=0, lt=pow(2, 31)) = Query(  # type: ignore
+        0, description="Where the page starts, i.e. `next_cursor` of the previous one."
+    ),
+    limit: conint(ge=1, le=1000) = Query(  # type: ignore
+        100, description="Maximum number of segments of the page."
+    ),
+    db=Depends(get_db),
+    current_user: SqlaUserBase = Depends(auth.current_active_user),
+):
+    """
+    Get the segments of the transcript of a given interview overlapping from `start`
+    to `end` of its audio, a page at a time: e.g. those around the playhead, or all
+    of them by following `next_cursor`, rather than the whole transcript at once.
+    Supports conditional requests (`If-None-Match`).
+    """
+    row = await rw.get_interview_transcript(db, current_user, interview_id)
+    if row is None:
+        raise APIInterviewNotFound
+    status, stored_transcript, transcript_draft, transcript_ts = row
+    if stored_transcript is None and status == InterviewStatus.processing:
+        # Not cached, as it grows while being transcribed
+        response.headers["Cache-Control"] = "no-store"
+        segments = await rw.get_partial_segments(db, interview_id)
+        transcript = ColumnarTranscript.from_ott(
+            partial2ott([PartialSegment.from_orm(s) for s in segments])
+        )
+        return APIOutputTranscriptPage.from_columnar(
+            transcript, start, end, cursor, limit, transcript_partial=True
+        )
+    if stored_transcript is None and status != InterviewStatus.transcripted:
+        raise APITranscriptNotFound
+
+    # A transcript is replaced as a whole, e.g. once refined, along with its timestamp
+    etag_value = hashlib.sha256(f"{interview_id}:{transcript_ts}".encode()).hexdigest()
+    headers = {"Cache-Control": "private, no-cache", "ETag": f'"{etag_value}"'}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    if stored_transcript is None:
+        # Stored before being normalized
+        interview = await rw.get_interview(db, current_user, interview_id)
+        raw = DBOutputInterview.from_orm(interview).transcript_raw
+        transcript = raw2ct(raw) if raw else ColumnarTranscript()
+    else:
+        transcript = decode_transcript(stored_transcript)
+    return APIOutputTranscriptPage.from_columnar(
+        transcript, start, end, cursor, limit, transcript_draft=transcript_draft
+    )
 
 
 @router.get(
     "/{interview_id}/audio",
-    responses=error_responses_for_openapi((APIInterviewNotFound,)),
+    responses=error_responses_for_openapi(
+        (APIInterviewNotFound, APIRangeNotSatisfiable)
+    ),
 )
 async def get_interview_audio(
     interview_id: InterviewId,
+    request: Request,
     db=Depends(get_db),
     current_user: SqlaUserBase = Depends(auth.current_active_user),
 ):
-    """Stream audio file of a given interview."""
-    interview = await rw.get_interview(db, current_user, interview_id)
-    if interview:
-        headers = {"Cache-Control": "private, max-age=99999999, immutable"}
-        if os.path.exists(interview.audio_location):
-            await logger.adebug(
-                "Streaming audio_file", audio_location=interview.audio_location
-            )
-            return FileResponse(interview.audio_location, headers=headers)
-        elif interview.audio_location.startswith(("http",)):  # "s3:", "ftp:", ...
-            raise NotImplementedError
-        else:
-            await logger.aerror(
-                "Could not provide audio_file", audio_location=interview.audio_location
+    """
+    Stream audio file of a given interview.
+    Supports range requests (`Range`, `If-Range`), e.g. to seek within the audio
+    without downloading all of it, and conditional requests (`If-None-Match`).
+    """
+    audio = await rw.get_interview_audio(db, current_user, interview_id)
+    if audio is None:
+        raise APIInterviewNotFound
+    audio_location, audio_sha256 = audio
+    audio_stat = await object_storage.stat_audio_file(audio_location)
+    if audio_stat is None:
+        await logger.aerror(
+            "Could not provide audio_file", audio_location=audio_location
+        )
+        raise Exception
+    size = audio_stat.size
+    # Stored audio files are immutable, so their content hash makes a strong ETag.
+    # Legacy ones (without hash) are identified by where they are and their size.
+    etag_value = (
+        audio_sha256 or hashlib.sha256(f"{audio_location}:{size}".encode()).hexdigest()
+    )
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, max-age=99999999, immutable",
+        "ETag": f'"{etag_value}"',
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    ranges = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # With `If-Range`, the range only applies if the client has the same version of the file
+    if range_header and (
+        if_range is None or etag_matches(if_range, headers["ETag"], weak=False)
+    ):
+        try:
+            ranges = parse_range_header(range_header, size)
+        except RangeNotSatisfiable:
+            raise RichHTTPException(
+                status_code=APIRangeNotSatisfiable.status_code,
+                model=ExceptionModel(**APIRangeNotSatisfiable.detail),  # type: ignore
+                headers=headers | {"Content-Range": f"bytes */{size}"},
             )
-            raise Exception
-    raise APIInterviewNotFound
+
+    media_type = mimetypes.guess_type(audio_location)[0] or "application/octet-stream"
+    await logger.adebug(
+        "Streaming audio_file", audio_location=audio_location, ranges=ranges
+    )
+    if ranges is None:
+        return StreamingResponse(
+            object_storage.read_audio_file(audio_location),
+            media_type=media_type,
+            headers=headers | {"Content-Length": str(size)},
+        )
+    if len(ranges) == 1:
+        ((start, end),) = ranges
+        return StreamingResponse(
+            object_storage.read_audio_file(audio_location, start, end),
+            status_code=206,
+            media_type=media_type,
+            headers=headers
+            | {
+                "Content-Length": str(end - start),
+                "Content-Range": content_range((start, end), size),
+            },
+        )
+    content_type, length, content = multipart_byteranges(
+        partial(object_storage.read_audio_file, audio_location),
+        ranges,
+        size,
+        media_type,
+    )
+    return StreamingResponse(
+        content,
+        status_code=206,
+        media_type=content_type,
+        headers=headers | {"Content-Length": str(length)},
+    )
+
+
+@router.get(
+    "/{interview_id}/waveform",
+    response_class=Response,
+    responses={
+        200: {
+            "content": {"application/octet-stream": {}},
+            "description": "Peaks, encoded as described in `openthot.audio.waveform`.",
+        }
+    }
+    | error_responses_for_openapi((APIInterviewNotFound, APIWaveformNotFound)),
+)
+async def get_interview_waveform(
+    interview_id: InterviewId,
+    resolution: conint(ge=1, lt=pow(2, 31)) = Query(  # type: ignore
+        1,
+        description="Wanted number of peaks per second of audio. "
+        + f"The closest resolution at or above it is returned, up to {MAX_PEAKS_PER_SECOND}.",
+    ),
+    db=Depends(get_db),
+    current_user: SqlaUserBase = Depends(auth.current_active_user),
+):
+    """
+    Get the waveform peaks of the audio file of a given interview,
+    i.e. a few kilobytes to draw it instead of the whole audio file.
+    """
+    audio = await rw.get_interview_audio(db, current_user, interview_id)
+    if audio is None:
+        raise APIInterviewNotFound
+    _, audio_sha256 = audio
+    level = (
+        await read_waveform_level(audio_sha256, resolution) if audio_sha256 else None
+    )
+    if level is None:
+        raise APIWaveformNotFound
+    length, content = level
+    return StreamingResponse(
+        content,
+        media_type="application/octet-stream",
+        headers={
+            "Cache-Control": "private, max-age=99999999, immutable",
+            "Content-Length": str(length),
+        },
+    )
 
 
 # @router.websocket("/{interview_id}/status")
@@ -182,7 +726,7 @@ async def get_interview_audio(
 @router.patch(
     "/{interview_id}",
     response_model=APIOutputInterview,
-    responses=error_responses_for_openapi((APIInterviewNotFound,)),
+    responses=error_responses_for_openapi((APIAsrEngineNotFound, APIInterviewNotFound)),
 )
 async def update_interview(
     interview_id: InterviewId,
@@ -190,7 +734,11 @@ async def update_interview(
     db=Depends(get_db),
     current_user: SqlaUserBase = Depends(auth.current_active_user),
 ):
-    """Update a specific interview."""
+    """
+    Update a specific interview.
+    Its `asr_engine` is only used by transcriptions that have not started yet.
+    """
+    _check_asr_engine(interview.asr_engine)
     interview_upd = DBInputInterviewUpdate(**interview.dict(exclude_unset=True))
     interview_db = await rw.get_interview(db, current_user, interview_id)
     if not interview_db:
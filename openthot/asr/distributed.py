@@ -0,0 +1,150 @@
+"""
+Transcription of a long audio file distributed across worker nodes.
+
+The audio is split into chunks (see `openthot.audio.chunking`), which are stored in
+the object storage and transcribed by as many Celery tasks. Each transcript is stored
+next to its chunk, so that a failed chunk is retried alone, and a chunk transcribed
+twice (e.g. redelivered task) is not run again. Once all of them are, a final task
+stitches their transcripts together. If any of them fails for good, the interview is
+left to be transcribed again, and the chunks are removed.
+"""
+import asyncio
+from pathlib import Path
+from typing import Type
+
+import structlog
+from pydantic import BaseModel
+
+from openthot import object_storage
+from openthot.asr.progress import SegmentsCallback
+from openthot.asr.registry import AsrEngine
+from openthot.asr.slots import transcription_slots
+from openthot.asr.stitching import stitch_transcripts
+from openthot.audio.chunking import split_audio
+from openthot.config import DEFAULT_ASR_ENGINE
+from openthot.exceptions import ChunkTranscriptionError
+from openthot.models.interview import InterviewId
+from openthot.models.transcript import TranscriptorSource
+from openthot.models.transcript.utils import partial_segments
+from openthot.models.transcript.whisper import WhisperTranscript
+from openthot.models.transcript.whisperx import WhisperXTranscript
+
+logger = structlog.get_logger(__file__)
+
+CHUNKS_DIR = "chunks"
+CHUNK_SUFFIX = ".flac"
+TRANSCRIPT_SUFFIX = ".json"
+
+transcript_classes: dict[
+    TranscriptorSource, Type[WhisperTranscript] | Type[WhisperXTranscript]
+] = {
+    TranscriptorSource.whisper: WhisperTranscript,
+    TranscriptorSource.whisperx: WhisperXTranscript,
+}
+
+
+class StoredChunk(BaseModel):
+    interview_id: InterviewId
+    index: int
+    offset: float  # where it starts in the whole audio file (s)
+    overlap: float = 0.0  # how long its start is also in the previous chunk (s)
+    location: str
+    transcript_key: str
+    transcript_location: str
+    # Name of the engine transcribing it (see `openthot.asr.registry`)
+    asr_engine: str = DEFAULT_ASR_ENGINE
+
+
+def _chunk_key(interview_id: InterviewId, index: int, suffix: str) -> str:
+    return f"{CHUNKS_DIR}/{interview_id}/{index:05d}{suffix}"
+
+
+async def store_chunks(
+    interview_id: InterviewId,
+    audio_file_path: Path,
+    chunk_duration_s: float,
+    asr_engine: str = DEFAULT_ASR_ENGINE,
+) -> list[StoredChunk] | None:
+    """
+    Split an audio file into chunks, and store them in the object storage.
+
+    Returns:
+        list[StoredChunk] | None: The stored chunks, or `None` if the audio
+            is short enough to be transcribed at once.
+    """
+    backend = object_storage.get_storage_backend()
+    with object_storage.scratch_directory() as chunks_dir:
+        chunks = await asyncio.get_running_loop().run_in_executor(
+            None, split_audio, audio_file_path, chunks_dir, chunk_duration_s
+        )
+        if len(chunks) == 1:
+            return None
+        stored = []
+        for chunk in chunks:
+            transcript_key = _chunk_key(interview_id, chunk.index, TRANSCRIPT_SUFFIX)
+            stored.append(
+                StoredChunk(
+                    interview_id=interview_id,
+                    index=chunk.index,
+                    offset=chunk.offset,
+                    overlap=chunk.overlap,
+                    location=await backend.put_file(
+                        _chunk_key(interview_id, chunk.index, CHUNK_SUFFIX), chunk.path
+                    ),
+                    transcript_key=transcript_key,
+                    transcript_location=backend.location(transcript_key),
+                    asr_engine=asr_engine,
+                )
+            )
+    return stored
+
+
+async def transcribe_stored_chunk(
+    chunk: StoredChunk,
+    engine: AsrEngine,
+    on_segments: SegmentsCallback | None = None,
+) -> None:
+    """
+    Transcribe a stored chunk with `engine` and store its transcript, unless it already is.
+    Its segments are then handed to `on_segments`, e.g. to show a partial transcript.
+
+    Raises:
+        ChunkTranscriptionError: If the transcriptor failed.
+    """
+    if await object_storage.stat_audio_file(chunk.transcript_location) is not None:
+        await logger.ainfo("Chunk already transcribed", location=chunk.location)
+        return
+    async with object_storage.local_audio_file(chunk.location) as audio_file_path:
+        tscr = engine.transcriptor(audio_file_path=audio_file_path)
+        async with transcription_slots(engine.weight):
+            await tscr.run_transcription()
+    if not tscr.success:
+        raise ChunkTranscriptionError(chunk.location)
+    await object_storage.get_storage_backend(chunk.transcript_location).put_bytes(
+        chunk.transcript_key, tscr.transcript.json().encode()
+    )
+    if on_segments:
+        await on_segments(
+            partial_segments(tscr.transcript, chunk.offset, chunk.overlap)
+        )
+
+
+async def merge_stored_chunks(
+    chunks: list[StoredChunk], transcriptor_source: TranscriptorSource
+) -> WhisperTranscript | WhisperXTranscript:
+    """Stitch the stored transcripts of all the chunks of an audio file."""
+    transcript_class = transcript_classes[transcriptor_source]
+    parts = []
+    for chunk in sorted(chunks, key=lambda c: c.index):
+        content = b"".join(
+            [c async for c in object_storage.read_audio_file(chunk.transcript_location)]
+        )
+        parts.append((chunk.offset, chunk.overlap, transcript_class.parse_raw(content)))
+    return stitch_transcripts(parts)  # type: ignore
+
+
+async def delete_stored_chunks(chunks: list[StoredChunk]) -> None:
+    for chunk in chunks:
+        await object_storage.delete_audio_file(chunk.location)
+        if await object_storage.stat_audio_file(chunk.transcript_location) is not None:
+            await object_storage.delete_audio_file(chunk.transcript_location)
@@ -0,0 +1,138 @@
+"""
+Balancing of requests across several servers of a remote ASR engine (e.g. Wordcab).
+
+Each request goes to the least loaded available server, i.e. with the fewest
+requests in flight (from this worker), then the lowest probed latency. Servers that
+fail a request or a health probe are left out for a while (ejected), and retries
+of a failed request go to another server whenever there is one.
+Health probes are run lazily, as requests come: event loops of Celery workers only
+run during tasks, so background probes would not be more frequent anyway. They are
+sent through connections of their own, so that requests in flight do not delay them,
+and a probe that could not be sent at all says nothing about the server.
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+import httpx
+import structlog
+
+logger = structlog.get_logger(__file__)
+
+# Weight of the last probe in the latency of a server
+LATENCY_SMOOTHING = 0.3
+
+
+class Endpoint:
+    url: str
+    in_flight: int
+    latency_s: float | None
+    ejected_until: float
+
+    def __init__(self, url: str) -> None:
+        self.url = url.rstrip("/")
+        self.in_flight = 0
+        self.latency_s = None
+        self.ejected_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.ejected_until
+
+    def record_latency(self, latency_s: float) -> None:
+        self.latency_s = (
+            latency_s
+            if self.latency_s is None
+            else LATENCY_SMOOTHING * latency_s
+            + (1 - LATENCY_SMOOTHING) * self.latency_s
+        )
+
+
+class EndpointPool:
+    def __init__(
+        self,
+        urls: Iterable[str],
+        health_path: str,
+        health_check_interval_s: float,
+        ejection_s: float,
+        probe_timeout_s: float,
+    ) -> None:
+        """
+        Args:
+            urls (Iterable[str]): Base URLs of the servers.
+            health_path (str): Path probed on each server, from its root if it starts
+                with `/` (e.g. `/healthz`), from its base URL otherwise.
+            health_check_interval_s (float): Minimum time between probes.
+            ejection_s (float): How long a failing server is left out.
+            probe_timeout_s (float): How long a probe may take.
+        """
+        self.endpoints = [Endpoint(url) for url in urls]
+        self._health_path = health_path
+        self._interval_s = health_check_interval_s
+        self._ejection_s = ejection_s
+        self._probe_timeout_s = probe_timeout_s
+        self._probed_at: float | None = None
+
+    def choose(self, exclude: Iterable[Endpoint] = ()) -> Endpoint:
+        """
+        The least loaded available server, not among `exclude` if possible.
+        When all of them are ejected, the one to be back the soonest is still chosen
+        rather than failing right away.
+        """
+        excluded = set(map(id, exclude))
+        candidates = [e for e in self.endpoints if id(e) not in excluded]
+        available = [e for e in candidates or self.endpoints if e.available]
+        if not available:
+            return min(self.endpoints, key=lambda e: e.ejected_until)
+        return min(
+            available,
+            key=lambda e: (
+                e.in_flight,
+                e.latency_s if e.latency_s is not None else float("inf"),
+            ),
+        )
+
+    @contextmanager
+    def using(self, endpoint: Endpoint) -> Iterator[Endpoint]:
+        """Count a request in flight to `endpoint`."""
+        endpoint.in_flight += 1
+        try:
+            yield endpoint
+        finally:
+            endpoint.in_flight -= 1
+
+    def eject(self, endpoint: Endpoint) -> None:
+        endpoint.ejected_until = time.monotonic() + self._ejection_s
+        logger.warning("Server ejected", url=endpoint.url, ejection_s=self._ejection_s)
+
+    async def _probe(self, client: httpx.AsyncClient, endpoint: Endpoint) -> None:
+        start_time = time.perf_counter()
+        try:
+            r = await client.get(
+                httpx.URL(endpoint.url + "/").join(self._health_path),
+                timeout=self._probe_timeout_s,
+            )
+            r.raise_for_status()
+        except httpx.PoolTimeout as e:
+            # i.e. no connection was free to probe with here, whatever the server
+            await logger.awarning(
+                "Health probe not sent", url=endpoint.url, exception=repr(e)
+            )
+            return
+        except httpx.HTTPError as e:
+            await logger.awarning(
+                "Health probe failed", url=endpoint.url, exception=repr(e)
+            )
+            self.eject(endpoint)
+            return
+        endpoint.record_latency(time.perf_counter() - start_time)
+
+    async def check_health(self, client: httpx.AsyncClient) -> None:
+        """Probe all the servers, unless they were less than an interval ago."""
+        now = time.monotonic()
+        if self._probed_at is not None and now - self._probed_at < self._interval_s:
+            return
+        # Set beforehand so that concurrent requests do not probe too
+        self._probed_at = now
+        await asyncio.gather(*(self._probe(client, e) for e in self.endpoints))
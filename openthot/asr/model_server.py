@@ -0,0 +1,277 @@
+"""
+ASR models kept warm in the worker process (`in_process` engine mode).
+
+Running the engine's CLI for each transcription loads the model weights again,
+which takes tens of seconds (and gigabytes of RAM) for large models before any
+audio is processed. Instead, each worker process loads the configured models once,
+when it starts (see `openthot.tasks.tasks`), and transcribes in-process: outputs
+are returned as Python objects rather than through JSON files on disk.
+The models of several engines (see `openthot.asr.registry`) are kept side by side,
+in every worker process: they take memory even while no slot (see
+`openthot.asr.slots`) lets them run.
+
+Engines are optional dependencies: when the configured one cannot be imported,
+transcriptors fall back to its CLI (`subprocess` mode).
+
+Segments are reported while an engine transcribes, as with its CLI (see
+`openthot.asr.progress`): Whisper prints them, from the transcribing thread, as it
+transcribes. WhisperX only does in recent versions, otherwise its segments are
+reported once transcribed, before they are aligned and diarized.
+"""
+import asyncio
+import concurrent.futures
+import contextlib
+import inspect
+import io
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, TextIO
+
+import structlog
+
+from openthot.asr.progress import parse_segment_line
+from openthot.audio.normalize import load_normalized_samples
+from openthot.config import (
+    AsrEngineMode,
+    AsrEngineSettings,
+    WhisperSettings,
+    WhisperXSettings,
+)
+from openthot.models.transcript import TranscriptorSource
+from openthot.models.transcript.openthot import PartialSegment
+
+logger = structlog.get_logger(__file__)
+
+LANGUAGE = "fr"
+# How long a worker process may take to start, models loading included
+LOADING_TIMEOUT_S = 600.0
+
+# Models are not meant to run several transcriptions at once: one at a time per process
+_lock = threading.Lock()
+# Models of each engine (see `model_key`), by name
+_models: dict[tuple[str, ...], dict[str, Any]] = {}
+# Engines that cannot be imported
+_unavailable: set[TranscriptorSource] = set()
+
+# Called from the transcribing thread with each segment, as soon as it is transcribed
+_SegmentSink = Callable[[PartialSegment], None]
+
+
+class _SegmentLines(io.TextIOBase):
+    """
+    Standard output while an engine transcribes: what it prints from the transcribing
+    thread is parsed for segments, and everything is still written to `stream`.
+    """
+
+    def __init__(self, stream: TextIO, on_segment: _SegmentSink) -> None:
+        self._stream = stream
+        self._on_segment = on_segment
+        self._thread = threading.get_ident()
+        self._line = ""
+
+    def write(self, s: str) -> int:
+        if threading.get_ident() == self._thread:
+            *lines, self._line = (self._line + s).split("\n")
+            for line in lines:
+                if segment := parse_segment_line(line):
+                    self._on_segment(segment)
+        return self._stream.write(s)
+
+    def flush(self) -> None:
+        self._stream.flush()
+
+
+def in_process_enabled(asr_settings: AsrEngineSettings) -> bool:
+    return (
+        isinstance(asr_settings, (WhisperSettings, WhisperXSettings))
+        and asr_settings.mode == AsrEngineMode.in_process
+    )
+
+
+def model_key(asr_settings: WhisperSettings | WhisperXSettings) -> tuple[str, ...]:
+    """What the models of an engine depend on: engines sharing it share them."""
+    if isinstance(asr_settings, WhisperXSettings):
+        return (
+            asr_settings.engine,
+            asr_settings.model_size.value,
+            asr_settings.compute_type.value,
+            asr_settings.hf_token,
+        )
+    return (asr_settings.engine, asr_settings.model_size.value)
+
+
+def _device() -> str:
+    import torch
+
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def _load_whisper(settings: WhisperSettings) -> dict[str, Any]:
+    import whisper
+
+    return {"whisper": whisper.load_model(settings.model_size.value)}
+
+
+def _load_whisperx(settings: WhisperXSettings) -> dict[str, Any]:
+    import whisperx
+
+    device = _device()
+    return {
+        "device": device,
+        "whisperx": whisperx.load_model(
+            settings.model_size.value,
+            device,
+            compute_type=settings.compute_type.value,
+            language=LANGUAGE,
+        ),
+        "align": whisperx.load_align_model(language_code=LANGUAGE, device=device),
+        "diarize": whisperx.DiarizationPipeline(
+            use_auth_token=settings.hf_token, device=device
+        ),
+    }
+
+
+def load_models(asr_settings: AsrEngineSettings) -> bool:
+    """
+    Load the models of an engine, unless they already are. Blocking.
+
+    Returns:
+        bool: Whether models are available in-process.
+    """
+    if not isinstance(asr_settings, (WhisperSettings, WhisperXSettings)):
+        return False
+    key = model_key(asr_settings)
+    with _lock:
+        if key in _models:
+            return True
+        if asr_settings.engine in _unavailable:
+            return False
+        start_time = time.perf_counter()
+        try:
+            _models[key] = (
+                _load_whisper(asr_settings)
+                if isinstance(asr_settings, WhisperSettings)
+                else _load_whisperx(asr_settings)
+            )
+        except ImportError as e:
+            logger.warning(
+                "ASR engine not importable, falling back to its CLI", error=str(e)
+            )
+            _unavailable.add(asr_settings.engine)
+            return False
+        logger.info(
+            "ASR models loaded",
+            engine=asr_settings.engine,
+            model_size=asr_settings.model_size,
+            duration=time.perf_counter() - start_time,
+        )
+        return True
+
+
+def _transcribe_whisper(
+    models: dict[str, Any], samples: Any, on_segment: _SegmentSink | None
+) -> dict:
+    return models["whisper"].transcribe(
+        samples,
+        language=LANGUAGE,
+        word_timestamps=True,
+        # i.e. print segments, rather than nothing
+        verbose=True if on_segment else None,
+    )
+
+
+def _transcribe_whisperx(
+    models: dict[str, Any], samples: Any, on_segment: _SegmentSink | None
+) -> dict:
+    import whisperx
+
+    device = models["device"]
+    model = models["whisperx"]
+    verbose = on_segment is not None and (
+        "verbose" in inspect.signature(model.transcribe).parameters
+    )
+    result = model.transcribe(
+        samples, language=LANGUAGE, **({"verbose": True} if verbose else {})
+    )
+    if on_segment and not verbose:
+        for segment in result["segments"]:
+            on_segment(
+                PartialSegment(
+                    start=segment["start"], end=segment["end"], text=segment["text"]
+                )
+            )
+    align_model, align_metadata = models["align"]
+    aligned = whisperx.align(
+        result["segments"],
+        align_model,
+        align_metadata,
+        samples,
+        device,
+        return_char_alignments=False,
+    )
+    return whisperx.assign_word_speakers(models["diarize"](samples), aligned)
+
+
+def transcribe(
+    audio_file_path: str | Path,
+    asr_settings: WhisperSettings | WhisperXSettings,
+    on_segment: _SegmentSink | None = None,
+) -> dict:
+    """
+    Transcribe an audio file with the loaded models of an engine, handing its
+    segments to `on_segment` as they are transcribed. CPU (or GPU) bound, and blocking.
+
+    Returns:
+        dict: The output of the engine, as its CLI would have written it in JSON.
+    """
+    samples = load_normalized_samples(audio_file_path)
+    with _lock, (
+        contextlib.redirect_stdout(_SegmentLines(sys.stdout, on_segment))
+        if on_segment
+        else contextlib.nullcontext()
+    ):
+        models = _models[model_key(asr_settings)]
+        if isinstance(asr_settings, WhisperSettings):
+            return _transcribe_whisper(models, samples, on_segment)
+        return _transcribe_whisperx(models, samples, on_segment)
+
+
+async def run_transcription(
+    audio_file_path: str | Path,
+    asr_settings: AsrEngineSettings,
+    on_segment: Callable[[PartialSegment], Awaitable[None]] | None = None,
+) -> tuple[dict, float] | None:
+    """
+    Transcribe an audio file in-process, loading models first if needed
+    (e.g. with a solo pool, where worker processes are not initialized).
+    Segments are handed to `on_segment` as they are transcribed, all of them
+    before returning.
+
+    Returns:
+        tuple[dict, float] | None: The engine's output, and how long it took,
+            or `None` if models cannot be used in-process.
+    """
+    loop = asyncio.get_running_loop()
+    if not await loop.run_in_executor(None, load_models, asr_settings):
+        return None
+    assert isinstance(asr_settings, (WhisperSettings, WhisperXSettings))
+    reported: list[concurrent.futures.Future] = []
+
+    def report(segment: PartialSegment) -> None:
+        assert on_segment is not None
+        reported.append(asyncio.run_coroutine_threadsafe(on_segment(segment), loop))
+
+    start_time = time.perf_counter()
+    try:
+        output = await loop.run_in_executor(
+            None,
+            transcribe,
+            audio_file_path,
+            asr_settings,
+            report if on_segment else None,
+        )
+    finally:
+        await asyncio.gather(*map(asyncio.wrap_future, reported))
+    return output, time.perf_counter() - start_time
@@ -1,23 +1,34 @@
+import asyncio
+import contextlib
+import time
 from datetime import datetime
-from typing import Type
+from typing import Callable
 
 import structlog
 from celery import Celery
-from pydantic import FilePath
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from openthot.asr.transcriptors import Transcriptor
-from openthot.asr.transcriptors.whisper import Whisper
-from openthot.asr.transcriptors.whisperx import WhisperX
-from openthot.asr.transcriptors.wordcab import Wordcab
+from openthot import object_storage
+from openthot.asr import distributed, registry
+from openthot.asr.distributed import StoredChunk
+from openthot.asr.progress import ProgressReporter
+from openthot.asr.registry import AsrEngine
+from openthot.asr.slots import transcription_slots
+from openthot.asr.transcriptors.chunked import ChunkedTranscriptor
+from openthot.audio.ingest import ingest_audio
 from openthot.config import get_settings
 from openthot.db import rw
+from openthot.db.schemas import SqlaInterview
 from openthot.models.interview import (
     DBInputInterviewUpdate,
+    DBOutputInterview,
     InterviewId,
     InterviewStatus,
-    TranscriptorSource,
 )
+from openthot.models.transcript.utils import raw2ct
+from openthot.models.transcript.whisper import WhisperTranscript
+from openthot.models.transcript.whisperx import WhisperXTranscript
+from openthot.models.transcript.wordcab import WordcabTranscript
 from openthot.models.users import UserId
 
 logger = structlog.get_logger(__file__)
@@ -25,24 +36,140 @@ logger = structlog.get_logger(__file__)
 celery = Celery()
 celery.conf.update(**get_settings().celery.dict())
 
-transcriptors: dict[TranscriptorSource, Type[Transcriptor]] = {
-    TranscriptorSource.whisper: Whisper,
-    TranscriptorSource.whisperx: WhisperX,
-    TranscriptorSource.wordcab: Wordcab,
-}
+chunking_settings = get_settings().asr_chunking
+batching_settings = get_settings().asr_batching
+scheduling_settings = get_settings().asr_scheduling
+two_pass_settings = get_settings().asr_two_pass
+# Only for local engines
+chunked_transcription = chunking_settings.enabled
+BATCH_POLL_INTERVAL_S = 0.5
 
-transcriptor_source = get_settings().asr.engine
-transcriptor_class = transcriptors[transcriptor_source]
+
+def _chunked(engine: AsrEngine) -> bool:
+    return chunked_transcription and engine.local
+
+
+def _transcription_weight(engine: AsrEngine) -> int:
+    # Chunks take the slots of their model while transcribed (see `ChunkedTranscriptor`)
+    return 0 if _chunked(engine) else engine.weight
+
+
+def _draft_engine(interview: SqlaInterview, engine: AsrEngine) -> AsrEngine | None:
+    """The engine of the draft of an interview, if it is worth one before `engine`."""
+    if two_pass_settings.draft_engine is None:
+        return None
+    if interview.transcript_draft or (
+        interview.audio_duration < two_pass_settings.min_duration_s
+    ):
+        return None
+    draft_engine = registry.get_engine(two_pass_settings.draft_engine)
+    if (draft_engine.source, draft_engine.model) == (engine.source, engine.model):
+        return None
+    return draft_engine
+
+
+async def _save_transcript(
+    session: AsyncSession,
+    interview: SqlaInterview,
+    transcript: WhisperTranscript | WhisperXTranscript | WordcabTranscript,
+    transcript_duration: float,
+    engine: AsrEngine,
+    draft: bool = False,
+):
+    # The whole transcript supersedes the partial one. Whether it is a draft or
+    # replaces one, columns are updated at once, leaving `speakers` as they are.
+    await rw.clear_partial_segments(session, interview.id)  # type: ignore
+    await rw.update_interview(
+        session=session,
+        interview_db=interview,
+        interview_upd=DBInputInterviewUpdate(
+            status=InterviewStatus.transcripted,
+            transcript_duration_s=int(transcript_duration) + 1,  # ⇔ ceil
+            transcript_ts=datetime.utcnow(),
+            transcript_raw=transcript,
+            transcript=raw2ct(transcript),
+            transcript_source=engine.source,
+            transcript_model=engine.model,
+            transcript_draft=draft,
+        ),
+    )
+
+
+async def _prepare_transcription(
+    session: AsyncSession,
+    interview: SqlaInterview,
+    audio_location: str,
+    engine: AsrEngine,
+) -> str | None:
+    """
+    Ingest the audio of an interview, or reuse the transcript of the same audio
+    by the same `engine`.
+
+    Returns:
+        str | None: Location of the audio to transcribe, or `None` if a transcript
+            was reused.
+    """
+    transcribed_location = audio_location
+    if interview.audio_sha256:
+        try:
+            transcribed_location = await ingest_audio(
+                audio_location, interview.audio_sha256
+            )
+        except Exception:
+            # ASR engines can decode the original file by themselves
+            await logger.aexception(
+                "Could not ingest audio, transcribing original file",
+                interview_id=interview.id,
+                audio_file_path=audio_location,
+            )
+    if reusable := await rw.get_reusable_transcript_interview(
+        session,
+        interview=interview,
+        transcript_source=engine.source,
+        transcript_model=engine.model,
+    ):
+        # Same audio already transcripted by the same engine: no need to run it again
+        await logger.ainfo(
+            "Reusing transcript",
+            user_id=interview.creator_id,
+            interview_id=interview.id,
+            reused_interview_id=reusable.id,
+        )
+        reused = DBOutputInterview.from_orm(reusable)
+        await rw.update_interview(
+            session=session,
+            interview_db=interview,
+            interview_upd=DBInputInterviewUpdate(
+                status=InterviewStatus.transcripted,
+                transcript_duration_s=reused.transcript_duration_s,
+                transcript_ts=datetime.utcnow(),
+                transcript_raw=reused.transcript_raw,
+                transcript=reused.transcript or raw2ct(reused.transcript_raw),
+                transcript_source=reused.transcript_source,
+                transcript_model=reused.transcript_model,
+                transcript_draft=False,
+            ),
+        )
+        return None
+    return transcribed_location
 
 
 async def process_audio(
     session: AsyncSession,
     user_id: UserId,
     interview_id: InterviewId,
-    audio_location: FilePath,
+    audio_location: str,
+    fan_out: Callable[[list[StoredChunk]], None] | None = None,
+    refine: Callable[[SqlaInterview], None] | None = None,
 ):
     """Function to actually process the audio and
     perform transcription.
+    With distributed chunking, long audio files are split into stored chunks, that
+    `fan_out` hands over to other tasks: the interview is then updated once they
+    are all transcribed (see `finish_chunked_transcription`).
+    With two-pass transcription, a draft is first transcribed by a fast engine and
+    saved, then `refine` hands the interview over to another task, which processes
+    it again with its own engine, showing the draft meanwhile.
     """
 
     interview = await rw.get_interview(
@@ -57,32 +184,93 @@ async def process_audio(
             audio_file_path=audio_location,
         )
         raise Exception  # TODO : raise appropriate exception
-    await rw.update_interview(
-        session=session,
-        interview_db=interview,
-        interview_upd=DBInputInterviewUpdate(status=InterviewStatus.processing),
+    engine = registry.choose_engine(interview.asr_engine, interview.audio_duration)
+    refining = interview.transcript_draft
+    transcribed_location = await _prepare_transcription(
+        session, interview, audio_location, engine
     )
+    if transcribed_location is None:
+        return
+    draft_engine = _draft_engine(interview, engine) if refine else None
+    run_engine = draft_engine or engine
+
+    if not refining:
+        await rw.update_interview(
+            session=session,
+            interview_db=interview,
+            interview_upd=DBInputInterviewUpdate(status=InterviewStatus.processing),
+        )
     await logger.ainfo(
         "Calling transcriptor",
         user_id=user_id,
         interview_id=interview_id,
-        audio_file_path=audio_location,
+        audio_file_path=transcribed_location,
+        engine=run_engine.name,
+        draft=draft_engine is not None,
+        refining=refining,
     )
-    tscr = transcriptor_class(audio_file_path=audio_location)
-    await tscr.run_transcription()
+    async with object_storage.local_audio_file(transcribed_location) as audio_file_path:
+        if (
+            fan_out
+            and draft_engine is None
+            and _chunked(engine)
+            and chunking_settings.distributed
+        ):
+            if chunks := await distributed.store_chunks(
+                interview_id,
+                audio_file_path,
+                chunking_settings.chunk_duration_s,
+                engine.name,
+            ):
+                await logger.ainfo(
+                    "Distributing transcription",
+                    user_id=user_id,
+                    interview_id=interview_id,
+                    chunks=len(chunks),
+                )
+                # Eager tasks would otherwise run in this very event loop
+                await asyncio.get_running_loop().run_in_executor(None, fan_out, chunks)
+                return
+        on_progress, on_segments = None, None
+        if not refining:  # otherwise the draft is shown meanwhile
+            progress = ProgressReporter(session, interview_id, interview.audio_duration)
+            await progress.start()
+            on_progress, on_segments = progress, progress.add_segments
+        tscr = (
+            ChunkedTranscriptor(
+                audio_file_path,
+                run_engine.transcriptor_class,
+                on_progress,
+                on_segments,
+                run_engine.settings,
+            )
+            if _chunked(run_engine)
+            else run_engine.transcriptor(
+                audio_file_path=audio_file_path,
+                on_progress=on_progress,
+                on_segments=on_segments,
+            )
+        )
+        async with transcription_slots(_transcription_weight(run_engine)):
+            await tscr.run_transcription()
 
     if tscr.success:
-        await rw.update_interview(
-            session=session,
-            interview_db=interview,
-            interview_upd=DBInputInterviewUpdate(
-                status=InterviewStatus.transcripted,
-                transcript_duration_s=int(tscr.transcript_duration) + 1,  # ⇔ ceil
-                transcript_ts=datetime.utcnow(),
-                transcript_raw=tscr.transcript,
-                transcript_source=transcriptor_source,
-            ),
+        await _save_transcript(
+            session,
+            interview,
+            tscr.transcript,
+            tscr.transcript_duration,
+            run_engine,
+            draft=draft_engine is not None,
         )
+        if draft_engine is not None and refine:
+            await logger.ainfo(
+                "Draft transcript saved, to be refined",
+                user_id=user_id,
+                interview_id=interview_id,
+                engine=engine.name,
+            )
+            await asyncio.get_running_loop().run_in_executor(None, refine, interview)
     else:
         await logger.aexception(
             "Could not process transcription",
@@ -92,3 +280,199 @@ async def process_audio(
             audio_file_path=audio_location,
         )
         raise Exception  # TODO : raise appropriate exception
+
+
+async def finish_chunked_transcription(
+    session: AsyncSession,
+    user_id: UserId,
+    interview_id: InterviewId,
+    chunks: list[StoredChunk],
+    transcript_duration: float,
+):
+    """Update an interview with the stitched transcripts of its (all transcribed) chunks."""
+    interview = await rw.get_interview(
+        session=session, user=user_id, interview_id=interview_id
+    )
+    if interview is None:
+        await logger.aexception(
+            f"No interview {interview_id} for user {user_id}",
+            user_id=user_id,
+            interview_id=interview_id,
+        )
+        raise Exception  # TODO : raise appropriate exception
+    engine = registry.get_engine(chunks[0].asr_engine)
+    transcript = await distributed.merge_stored_chunks(chunks, engine.source)
+    await _save_transcript(session, interview, transcript, transcript_duration, engine)
+    await distributed.delete_stored_chunks(chunks)
+
+
+async def fail_chunked_transcription(
+    session: AsyncSession, interview_id: InterviewId, chunks: list[StoredChunk]
+):
+    """
+    Give up on an interview some chunks of which could not be transcribed: it is left
+    to be transcribed again (as uploaded), without its partial transcript, and its
+    stored chunks are removed.
+    """
+    if (interview := await rw.get_interview_by_id(session, interview_id)) is not None:
+        await rw.clear_partial_segments(session, interview_id)
+        if interview.status == InterviewStatus.processing:
+            await rw.update_interview(
+                session=session,
+                interview_db=interview,
+                interview_upd=DBInputInterviewUpdate(status=InterviewStatus.uploaded),
+            )
+    await distributed.delete_stored_chunks(chunks)
+
+
+async def process_audio_batch(
+    session: AsyncSession,
+    interview_id: InterviewId,
+    requeue: Callable[[SqlaInterview], None],
+):
+    """
+    Transcribe a short interview along with other pending ones (of any user),
+    in a single run of the ASR engine: up to `batching_settings.max_size` of them.
+    Pending interviews are claimed at once. Only while others keep being queued
+    (e.g. a burst of uploads) does the batch wait for more, for at most
+    `batching_settings.max_wait_s`, so that a lone interview is not delayed.
+    Only interviews requesting the same engine (or none) are batched together.
+    Interviews already taken by another batch are left to it, and those
+    the batch failed on are `requeue`d to be transcribed alone.
+    """
+    if (interview := await rw.claim_interview(session, interview_id)) is None:
+        await logger.ainfo(
+            "Interview to batch not found, or already being transcribed",
+            interview_id=interview_id,
+        )
+        return
+    batch = [interview]
+    # i.e. transcribed, reused or requeued: the others are released on failure
+    handled: set[InterviewId] = set()
+    try:
+        await _run_batch(session, batch, handled, requeue)
+    except BaseException:
+        await logger.aexception(
+            "Batch failed, releasing its interviews",
+            interview_ids=[i.id for i in batch if i.id not in handled],
+        )
+        await _release_batch(session, interview_id, batch, handled, requeue)
+        raise
+
+
+async def _run_batch(
+    session: AsyncSession,
+    batch: list[SqlaInterview],
+    handled: set[InterviewId],
+    requeue: Callable[[SqlaInterview], None],
+) -> None:
+    """Gather a batch around its claimed first interview, and transcribe it."""
+    first = batch[0]
+    requested_engine = first.asr_engine
+    deadline = time.monotonic() + batching_settings.max_wait_s
+    while True:
+        others = await rw.get_pending_interview_ids(
+            session,
+            scheduling_settings.short_max_duration_s,
+            batching_settings.max_size - len(batch),
+            exclude=first.id,  # type: ignore
+            asr_engine=requested_engine,
+        )
+        for other_id in others:
+            if other := await rw.claim_interview(session, other_id):
+                batch.append(other)
+        if len(batch) >= batching_settings.max_size or not others:
+            break
+        if time.monotonic() >= deadline:
+            break
+        await asyncio.sleep(min(BATCH_POLL_INTERVAL_S, batching_settings.max_wait_s))
+
+    # i.e. the engine of the longest one, which all of them are short enough for
+    engine = registry.choose_engine(
+        requested_engine, max(interview.audio_duration for interview in batch)
+    )
+    to_transcribe: list[tuple[SqlaInterview, str]] = []
+    for interview in batch:
+        location = await _prepare_transcription(
+            session, interview, interview.audio_location, engine
+        )
+        if location is None:
+            handled.add(interview.id)  # type: ignore
+        else:
+            to_transcribe.append((interview, location))
+    if not to_transcribe:
+        return
+    await logger.ainfo(
+        "Calling transcriptor on a batch",
+        interview_ids=[interview.id for interview, _ in to_transcribe],
+        engine=engine.name,
+    )
+    async with contextlib.AsyncExitStack() as stack:
+        # The command lines of engines write their outputs next to their inputs
+        batch_dir = stack.enter_context(object_storage.scratch_directory())
+        audio_file_paths = []
+        for interview, location in to_transcribe:
+            path = await stack.enter_async_context(
+                object_storage.local_audio_file(location)
+            )
+            audio_file_path = batch_dir / f"{interview.id}{path.suffix}"
+            audio_file_path.symlink_to(path.resolve())
+            audio_file_paths.append(audio_file_path)
+        async with transcription_slots(engine.weight):
+            transcriptors = await engine.transcriptor_class.run_batch(
+                audio_file_paths, engine.settings
+            )
+
+    for (interview, _), tscr in zip(to_transcribe, transcriptors):
+        if tscr.success:
+            await _save_transcript(
+                session, interview, tscr.transcript, tscr.transcript_duration, engine
+            )
+            handled.add(interview.id)  # type: ignore
+            continue
+        await logger.aerror(
+            "Could not transcribe interview within batch", interview_id=interview.id
+        )
+        await rw.update_interview(
+            session=session,
+            interview_db=interview,
+            interview_upd=DBInputInterviewUpdate(status=InterviewStatus.uploaded),
+        )
+        await asyncio.get_running_loop().run_in_executor(None, requeue, interview)
+        handled.add(interview.id)  # type: ignore
+
+
+async def _release_batch(
+    session: AsyncSession,
+    interview_id: InterviewId,
+    batch: list[SqlaInterview],
+    handled: set[InterviewId],
+    requeue: Callable[[SqlaInterview], None],
+) -> None:
+    """
+    Put the interviews of a failed batch back to uploaded, so that they are not
+    left processing. The task of the batch is retried for its first interview, the
+    others (whose tasks may be done) are `requeue`d to be transcribed alone.
+    """
+    unhandled = [interview.id for interview in batch if interview.id not in handled]
+    if not session.is_active:
+        # i.e. the database failed in the middle of a transaction
+        await session.rollback()
+    for unhandled_id in unhandled:
+        try:
+            interview = await rw.get_interview_by_id(session, unhandled_id)  # type: ignore
+            if interview is None or interview.status != InterviewStatus.processing:
+                continue
+            await rw.update_interview(
+                session=session,
+                interview_db=interview,
+                interview_upd=DBInputInterviewUpdate(status=InterviewStatus.uploaded),
+            )
+            if unhandled_id != interview_id:
+                await asyncio.get_running_loop().run_in_executor(
+                    None, requeue, interview
+                )
+        except Exception:
+            await logger.aexception(
+                "Could not release interview of batch", interview_id=unhandled_id
+            )
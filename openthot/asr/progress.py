@@ -0,0 +1,103 @@
+"""
+Progress of running transcriptions.
+
+ASR engines print segments as they transcribe them, e.g. `[01:02.500 --> 01:04.000]  Bonjour`
+(Whisper) or `Transcript: [62.5 --> 64.0]  Bonjour` (WhisperX): the end of the last one
+tells how far in the audio they are. That progress, along with the segments
+themselves (i.e. a partial transcript), is written to the database at most every
+PROGRESS_WRITE_INTERVAL_S, whatever the rate of segments.
+"""
+import asyncio
+import re
+import time
+from typing import Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from openthot.db import rw
+from openthot.models.interview import InterviewId
+from openthot.models.transcript.openthot import PartialSegment
+
+PROGRESS_WRITE_INTERVAL_S = 5.0
+SEGMENT_LINE = re.compile(r"\[\s*([\d:.]+)\s*-->\s*([\d:.]+)\s*\]\s*(.*)")
+
+# Called with how far a transcription is in the audio (s)
+ProgressCallback = Callable[[float], Awaitable[None]]
+# Called with segments of a transcription, as soon as they are available
+SegmentsCallback = Callable[[list[PartialSegment]], Awaitable[None]]
+
+
+def parse_timestamp(timestamp: str) -> float:
+    """Seconds in `[[hh:]mm:]ss[.fff]`."""
+    seconds = 0.0
+    for part in timestamp.split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def parse_segment_line(line: str) -> PartialSegment | None:
+    """The segment printed on an output line of an ASR engine, if any."""
+    if match := SEGMENT_LINE.search(line):
+        try:
+            start, end = parse_timestamp(match.group(1)), parse_timestamp(
+                match.group(2)
+            )
+        except ValueError:
+            return None
+        return PartialSegment(start=start, end=end, text=match.group(3))
+    return None
+
+
+class ProgressReporter:
+    """
+    Rate-limited writes of the progress of the transcription of an interview,
+    and of its segments.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        interview_id: InterviewId,
+        audio_duration: float,
+        interval_s: float = PROGRESS_WRITE_INTERVAL_S,
+    ) -> None:
+        self._session = session
+        self._interview_id = interview_id
+        self._audio_duration = audio_duration
+        self._interval_s = interval_s
+        self._fraction = 0.0
+        self._segments: list[PartialSegment] = []
+        self._written_fraction = 0.0
+        self._written_at = 0.0
+        # Outputs are read (and chunks transcribed) concurrently, the session is shared
+        self._lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        async with self._lock:
+            await rw.start_transcription_progress(self._session, self._interview_id)
+            self._fraction = self._written_fraction = 0.0
+            self._segments = []
+            self._written_at = time.monotonic()
+
+    async def _write_if_due(self) -> None:
+        if time.monotonic() - self._written_at < self._interval_s:
+            return
+        if self._fraction == self._written_fraction and not self._segments:
+            return
+        await rw.update_transcription_progress(
+            self._session, self._interview_id, self._fraction, self._segments
+        )
+        self._segments = []
+        self._written_fraction = self._fraction
+        self._written_at = time.monotonic()
+
+    async def __call__(self, position_s: float) -> None:
+        fraction = min(1.0, max(0.0, position_s / self._audio_duration))
+        async with self._lock:
+            self._fraction = max(self._fraction, fraction)
+            await self._write_if_due()
+
+    async def add_segments(self, segments: list[PartialSegment]) -> None:
+        async with self._lock:
+            self._segments.extend(segments)
+            await self._write_if_due()
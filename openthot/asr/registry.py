@@ -0,0 +1,132 @@
+"""
+Registry of the ASR engines a worker can transcribe with, and policy choosing
+the engine of each interview.
+
+Besides the default engine (`asr` settings), others can be configured by name
+(`asr_engines`), e.g. a small model for short clips, a large one for long
+recordings, and a remote server for when local workers are busy. An interview
+either requests one of them, or is routed along `asr_routing`. Models of the
+engines running in-process are kept warm side by side (see `model_server`).
+"""
+from typing import Type
+
+import structlog
+
+from openthot.asr import model_server
+from openthot.asr.slots import host_slots_free, model_weight
+from openthot.asr.transcriptors import Transcriptor
+from openthot.asr.transcriptors.whisper import Whisper
+from openthot.asr.transcriptors.whisperx import WhisperX
+from openthot.asr.transcriptors.wordcab import Wordcab
+from openthot.config import (
+    DEFAULT_ASR_ENGINE,
+    AsrEngineSettings,
+    WhisperSettings,
+    WhisperXSettings,
+    get_settings,
+)
+from openthot.models.transcript import TranscriptorSource
+from openthot.tasks.scheduling import QueueClass, queue_class
+
+logger = structlog.get_logger(__file__)
+asr_settings = get_settings().asr
+engine_settings = get_settings().asr_engines
+routing_settings = get_settings().asr_routing
+
+transcriptor_classes: dict[TranscriptorSource, Type[Transcriptor]] = {
+    TranscriptorSource.whisper: Whisper,
+    TranscriptorSource.whisperx: WhisperX,
+    TranscriptorSource.wordcab: Wordcab,
+}
+
+
+class AsrEngine:
+    """A named engine, i.e. a transcriptor class along with its settings."""
+
+    name: str
+    settings: AsrEngineSettings
+    transcriptor_class: Type[Transcriptor]
+
+    def __init__(
+        self,
+        name: str,
+        settings: AsrEngineSettings,
+        transcriptor_class: Type[Transcriptor] | None = None,
+    ) -> None:
+        self.name = name
+        self.settings = settings
+        self.transcriptor_class = (
+            transcriptor_class or transcriptor_classes[settings.engine]
+        )
+
+    @property
+    def source(self) -> TranscriptorSource:
+        return self.settings.engine
+
+    @property
+    def model(self) -> str | None:
+        # e.g. `wordcab` does not let us know which model it runs
+        if isinstance(self.settings, (WhisperSettings, WhisperXSettings)):
+            return self.settings.model_size.value
+        return None
+
+    @property
+    def local(self) -> bool:
+        """Whether it transcribes on this host, rather than on remote servers."""
+        return isinstance(self.settings, (WhisperSettings, WhisperXSettings))
+
+    @property
+    def weight(self) -> int:
+        return model_weight(self.settings)
+
+    def transcriptor(self, **kwargs) -> Transcriptor:
+        return self.transcriptor_class(asr_settings=self.settings, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"AsrEngine({self.name!r}, {self.source.value}, {self.model})"
+
+
+def get_engines() -> dict[str, AsrEngine]:
+    return {
+        DEFAULT_ASR_ENGINE: AsrEngine(DEFAULT_ASR_ENGINE, asr_settings),
+        **{name: AsrEngine(name, s) for name, s in engine_settings.items()},
+    }
+
+
+def get_engine(name: str | None) -> AsrEngine:
+    """An engine by name, or the default one if there is none (anymore)."""
+    engines = get_engines()
+    if name is not None and name not in engines:
+        # e.g. requested by an interview before being removed from the settings
+        logger.warning("Unknown ASR engine, using the default one", engine=name)
+    return engines.get(name or DEFAULT_ASR_ENGINE) or engines[DEFAULT_ASR_ENGINE]
+
+
+def choose_engine(requested: str | None, audio_duration: float | None) -> AsrEngine:
+    """
+    The engine to transcribe an interview with: the one it requested if any,
+    otherwise the one of its duration, unless that one would wait for the slots
+    of this host and there is an overflow engine.
+    """
+    if requested is not None:
+        return get_engine(requested)
+    engines = get_engines()
+    name = {
+        QueueClass.short: routing_settings.short_engine,
+        QueueClass.long: routing_settings.long_engine,
+    }.get(queue_class(audio_duration))
+    engine = engines[name or DEFAULT_ASR_ENGINE]
+    overflow = routing_settings.overflow_engine
+    if overflow and overflow != engine.name and not host_slots_free(engine.weight):
+        logger.info("Host saturated, overflowing", engine=engine.name, to=overflow)
+        engine = engines[overflow]
+    return engine
+
+
+def warm_engines() -> list[AsrEngine]:
+    """Engines whose models are to be loaded by each worker process."""
+    return [
+        engine
+        for engine in get_engines().values()
+        if model_server.in_process_enabled(engine.settings)
+    ]
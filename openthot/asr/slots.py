@@ -0,0 +1,165 @@
+"""
+Admission control of transcriptions, so that the workers of a host (or of the whole
+cluster) do not run more of them at once than their CPUs and memory allow.
+
+A transcription takes as many slots as its model weighs, and waits until they are
+free. Slots of a host are file locks in a directory shared by its workers, which
+the OS releases even if a worker dies. Slots of the cluster are leases in the
+database, renewed while the transcription runs, and freed once expired otherwise.
+
+Slots bound the transcriptions running at once, i.e. compute, not memory: in the
+`in_process` mode, each worker process loads the models of all the engines when it
+starts, whether or not it gets slots to run them (see `openthot.asr.model_server`).
+The memory of a host is then its worker processes times the weights of the engines,
+which is to be bounded by the concurrency of its workers (or by the `subprocess` mode).
+"""
+import asyncio
+import fcntl
+import math
+import os
+import socket
+from contextlib import asynccontextmanager, nullcontext
+from pathlib import Path
+from typing import AsyncIterator
+
+import structlog
+
+from openthot.config import (
+    AsrComputeType,
+    AsrModelSize,
+    WhisperSettings,
+    WhisperXSettings,
+    WordcabSettings,
+    get_settings,
+)
+from openthot.db import rw
+from openthot.db.database import async_session
+
+logger = structlog.get_logger(__file__)
+slots_settings = get_settings().asr_slots
+
+# Roughly the memory (GB) a model takes in float32
+MODEL_WEIGHTS = {
+    AsrModelSize.tiny: 1,
+    AsrModelSize.small: 2,
+    AsrModelSize.medium: 5,
+    AsrModelSize.large: 10,
+}
+COMPUTE_TYPE_FACTORS = {
+    AsrComputeType.float32: 1.0,
+    AsrComputeType.float16: 0.5,
+    AsrComputeType.int8: 0.25,
+}
+
+
+def model_weight(
+    asr_settings: WhisperSettings | WhisperXSettings | WordcabSettings,
+) -> int:
+    """Slots taken by a transcription, none for remote engines."""
+    if isinstance(asr_settings, WordcabSettings):
+        return 0
+    factor = (
+        COMPUTE_TYPE_FACTORS[asr_settings.compute_type]
+        if isinstance(asr_settings, WhisperXSettings)
+        else 1.0  # i.e. Whisper runs float32 on CPUs
+    )
+    return max(1, math.ceil(MODEL_WEIGHTS[asr_settings.model_size] * factor))
+
+
+def _try_lock_host_slots(lock_dir: Path, weight: int, capacity: int) -> list[int]:
+    """File descriptors of `weight` slots locked, or none if fewer are free."""
+    lock_dir.mkdir(parents=True, exist_ok=True)
+    fds: list[int] = []
+    for i in range(capacity):
+        if len(fds) == weight:
+            break
+        fd = os.open(lock_dir / f"slot-{i:03d}", os.O_CREAT | os.O_RDWR, 0o666)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            continue
+        fds.append(fd)
+    if len(fds) < weight:
+        # Not holding some while waiting for others, which could deadlock
+        _unlock_host_slots(fds)
+        return []
+    return fds
+
+
+def _unlock_host_slots(fds: list[int]) -> None:
+    for fd in fds:
+        os.close(fd)  # i.e. unlocked
+
+
+def host_slots_free(weight: int) -> bool:
+    """Whether `weight` slots of this host are free right now, as always without limit."""
+    capacity = slots_settings.host_capacity
+    if weight <= 0 or capacity is None:
+        return True
+    fds = _try_lock_host_slots(slots_settings.lock_dir, min(weight, capacity), capacity)
+    _unlock_host_slots(fds)
+    return bool(fds)
+
+
+@asynccontextmanager
+async def _host_slots(weight: int, capacity: int) -> AsyncIterator[None]:
+    lock_dir = slots_settings.lock_dir
+    while not (fds := _try_lock_host_slots(lock_dir, weight, capacity)):
+        await asyncio.sleep(slots_settings.poll_interval_s)
+    try:
+        yield
+    finally:
+        _unlock_host_slots(fds)
+
+
+async def _renew_cluster_slots(slots_id: int) -> None:
+    while True:
+        await asyncio.sleep(slots_settings.lease_s / 3)
+        async with async_session() as session:
+            await rw.renew_asr_slots(session, slots_id, slots_settings.lease_s)
+
+
+@asynccontextmanager
+async def _cluster_slots(weight: int, capacity: int) -> AsyncIterator[None]:
+    host = socket.gethostname()
+    while True:
+        async with async_session() as session:
+            slots_id = await rw.acquire_asr_slots(
+                session, host, weight, capacity, slots_settings.lease_s
+            )
+        if slots_id is not None:
+            break
+        await asyncio.sleep(slots_settings.poll_interval_s)
+    renewal = asyncio.create_task(_renew_cluster_slots(slots_id))
+    try:
+        yield
+    finally:
+        renewal.cancel()
+        async with async_session() as session:
+            await rw.release_asr_slots(session, slots_id)
+
+
+@asynccontextmanager
+async def transcription_slots(weight: int) -> AsyncIterator[None]:
+    """
+    Wait for `weight` slots on this host, then in the cluster, and hold them
+    until exiting the context, whatever happens in it.
+    A transcription weighing more than a capacity takes all of it.
+    """
+    host_capacity = slots_settings.host_capacity
+    cluster_capacity = slots_settings.cluster_capacity
+    if weight <= 0 or (host_capacity is None and cluster_capacity is None):
+        yield
+        return
+    await logger.adebug("Waiting for transcription slots", weight=weight)
+    async with (
+        _host_slots(min(weight, host_capacity), host_capacity)
+        if host_capacity
+        else nullcontext()
+    ), (
+        _cluster_slots(min(weight, cluster_capacity), cluster_capacity)
+        if cluster_capacity
+        else nullcontext()
+    ):
+        yield
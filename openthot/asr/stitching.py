@@ -0,0 +1,235 @@
+"""
+Stitch the transcripts of consecutive chunks of an audio file back into
+the transcript of the whole file, as if it had been transcribed at once.
+
+Chunks but the first start a little before their cut, overlapping the end of the
+previous chunk (see `openthot.audio.chunking`). Segments are taken from the chunk
+holding most of them, i.e. those of a chunk mostly in its overlap are left to the
+previous one, and the speakers of both chunks are matched in their overlap.
+"""
+from typing import Sequence, TypeVar
+
+from openthot.models.transcript.whisper import WhisperTranscript
+from openthot.models.transcript.whisperx import WhisperXTranscript, WhisperXWord
+
+# Whisper's `seek` counts mel spectrogram frames, i.e. 10ms each
+WHISPER_FRAMES_PER_SECOND = 100
+
+_T = TypeVar("_T", WhisperTranscript, WhisperXTranscript)
+
+
+def _shift(time: float | None, offset: float) -> float | None:
+    return None if time is None else time + offset
+
+
+def _in_overlap(start: float, end: float, overlap: float) -> bool:
+    """Whether a segment of a chunk is mostly in its `overlap`, i.e. left to the previous one."""
+    return (start + end) / 2 < overlap
+
+
+def stitch_whisper(
+    parts: Sequence[tuple[float, float, WhisperTranscript]]
+) -> WhisperTranscript:
+    """
+    Stitch Whisper transcripts, given with the offset (in s) of their chunk, and
+    how long its start overlaps the previous chunk.
+    """
+    segments = []
+    texts = []
+    for offset, overlap, transcript in parts:
+        kept = [
+            segment
+            for segment in transcript.segments
+            if not _in_overlap(segment.start, segment.end, overlap)
+        ]
+        texts.append(
+            transcript.text
+            if len(kept) == len(transcript.segments)
+            else "".join(segment.text for segment in kept)
+        )
+        seek_offset = round(offset * WHISPER_FRAMES_PER_SECOND)
+        for segment in kept:
+            segments.append(
+                segment.copy(
+                    update={
+                        "id": len(segments),
+                        "seek": segment.seek + seek_offset,
+                        "start": segment.start + offset,
+                        "end": segment.end + offset,
+                        "words": [
+                            word.copy(
+                                update={
+                                    "start": word.start + offset,
+                                    "end": word.end + offset,
+                                }
+                            )
+                            for word in segment.words
+                        ],
+                    }
+                )
+            )
+    return WhisperTranscript(
+        language=parts[0][2].language,
+        text="".join(texts),
+        segments=segments,
+    )
+
+
+def _shift_whisperx_word(word: WhisperXWord, offset: float) -> WhisperXWord:
+    return word.copy(
+        update={"start": _shift(word.start, offset), "end": _shift(word.end, offset)}
+    )
+
+
+def _relabel_whisperx_word(word: WhisperXWord, labels: dict[str, str]) -> WhisperXWord:
+    if word.speaker is None:
+        return word
+    return word.copy(update={"speaker": labels[word.speaker]})
+
+
+def _speaker_overlaps(
+    previous: tuple[float, WhisperXTranscript],
+    current: tuple[float, float, WhisperXTranscript],
+) -> dict[tuple[str, str], float]:
+    """
+    How long each speaker of a chunk talks at the same time as each speaker of the
+    previous chunk in their overlap, by (previous speaker, speaker).
+    """
+    previous_offset, previous_transcript = previous
+    offset, overlap, transcript = current
+    durations: dict[tuple[str, str], float] = {}
+    turns = [
+        (segment.speaker, segment.start + offset, min(segment.end, overlap) + offset)
+        for segment in transcript.segments
+        if segment.speaker is not None and segment.start < overlap
+    ]
+    for before in previous_transcript.segments:
+        if before.speaker is None or before.end + previous_offset <= offset:
+            continue
+        for speaker, start, end in turns:
+            shared = min(end, before.end + previous_offset) - max(
+                start, before.start + previous_offset
+            )
+            if shared > 0:
+                key = (before.speaker, speaker)
+                durations[key] = durations.get(key, 0.0) + shared
+    return durations
+
+
+def reconcile_speakers(
+    parts: Sequence[tuple[float, float, WhisperXTranscript]],
+) -> list[WhisperXTranscript]:
+    """
+    Relabel the speakers of consecutive chunks, which are diarized independently
+    (i.e. `SPEAKER_00` of a chunk has nothing to do with `SPEAKER_00` of the next),
+    given with the offset (in s) of their chunk, and how long its start overlaps the
+    previous chunk. Speakers of a chunk take the labels of the speakers of the
+    previous chunk they talk at the same time as the most in their overlap, one to
+    one. Others (e.g. without overlap) get labels of their own, in order of
+    appearance: the same person may then have several labels, which users can give
+    the same name (see `InterviewSpeakers`).
+    """
+    count = 0  # labels given so far
+    relabeled: list[WhisperXTranscript] = []
+    for i, (offset, overlap, transcript) in enumerate(parts):
+        labels: dict[str, str] = {}
+        if i and overlap > 0:
+            durations = _speaker_overlaps(
+                (parts[i - 1][0], relabeled[-1]), (offset, overlap, transcript)
+            )
+            for (label, speaker), _ in sorted(
+                durations.items(), key=lambda item: item[1], reverse=True
+            ):
+                if speaker not in labels and label not in labels.values():
+                    labels[speaker] = label
+        speakers = [
+            word.speaker
+            for segment in transcript.segments
+            for word in [segment, *segment.words]
+            if word.speaker is not None
+        ]
+        for speaker in dict.fromkeys(
+            speakers + [w.speaker for w in transcript.word_segments if w.speaker]
+        ):
+            if speaker not in labels:
+                labels[speaker] = f"SPEAKER_{count:02d}"
+                count += 1
+        relabeled.append(
+            WhisperXTranscript(
+                segments=[
+                    segment.copy(
+                        update={
+                            "speaker": segment.speaker and labels[segment.speaker],
+                            "words": [
+                                _relabel_whisperx_word(word, labels)
+                                for word in segment.words
+                            ],
+                        }
+                    )
+                    for segment in transcript.segments
+                ],
+                word_segments=[
+                    _relabel_whisperx_word(word, labels)
+                    for word in transcript.word_segments
+                ],
+            )
+        )
+    return relabeled
+
+
+def _kept_words(words: list[WhisperXWord], overlap: float) -> list[WhisperXWord]:
+    """Words of a chunk not left to the previous one, those without times following the previous word."""
+    kept = []
+    keep = overlap <= 0
+    for word in words:
+        if word.start is not None and word.end is not None:
+            keep = not _in_overlap(word.start, word.end, overlap)
+        if keep:
+            kept.append(word)
+    return kept
+
+
+def stitch_whisperx(
+    parts: Sequence[tuple[float, float, WhisperXTranscript]]
+) -> WhisperXTranscript:
+    """
+    Stitch WhisperX transcripts, given with the offset (in s) of their chunk, and
+    how long its start overlaps the previous chunk, reconciling their speakers.
+    """
+    parts = [
+        (offset, overlap, transcript)
+        for (offset, overlap, _), transcript in zip(parts, reconcile_speakers(parts))
+    ]
+    return WhisperXTranscript(
+        segments=[
+            segment.copy(
+                update={
+                    "start": segment.start + offset,
+                    "end": segment.end + offset,
+                    "words": [
+                        _shift_whisperx_word(word, offset) for word in segment.words
+                    ],
+                }
+            )
+            for offset, overlap, transcript in parts
+            for segment in transcript.segments
+            if not _in_overlap(segment.start, segment.end, overlap)
+        ],
+        word_segments=[
+            _shift_whisperx_word(word, offset)
+            for offset, overlap, transcript in parts
+            for word in _kept_words(transcript.word_segments, overlap)
+        ],
+    )
+
+
+def stitch_transcripts(parts: Sequence[tuple[float, float, _T]]) -> _T:
+    """
+    Stitch transcripts (all of the same engine), given with the offset of their
+    chunk, and how long its start overlaps the previous chunk.
+    """
+    if all(isinstance(transcript, WhisperTranscript) for *_, transcript in parts):
+        return stitch_whisper(parts)  # type: ignore
+    if all(isinstance(transcript, WhisperXTranscript) for *_, transcript in parts):
+        return stitch_whisperx(parts)  # type: ignore
+    raise TypeError("Only Whisper or WhisperX transcripts can be stitched together")
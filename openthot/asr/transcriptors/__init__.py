@@ -2,6 +2,9 @@ from abc import abstractclassmethod
 
 from pydantic import FilePath
 
+from openthot.asr.progress import ProgressCallback, SegmentsCallback, parse_segment_line
+from openthot.config import AsrEngineSettings, get_settings
+from openthot.models.transcript.openthot import PartialSegment
 from openthot.models.transcript.whisper import WhisperTranscript
 from openthot.models.transcript.whisperx import WhisperXTranscript
 from openthot.models.transcript.wordcab import WordcabTranscript
@@ -9,12 +12,51 @@ from openthot.models.transcript.wordcab import WordcabTranscript
 
 class Transcriptor:
     _audio_file_path: FilePath
+    _asr_settings: AsrEngineSettings
+    _on_progress: ProgressCallback | None
+    _on_segments: SegmentsCallback | None
     _success: bool
     _transcript_duration: float
     _transcript: WhisperTranscript | WhisperXTranscript | WordcabTranscript
 
-    def __init__(self, audio_file_path: FilePath) -> None:
+    def __init__(
+        self,
+        audio_file_path: FilePath,
+        on_progress: ProgressCallback | None = None,
+        on_segments: SegmentsCallback | None = None,
+        asr_settings: AsrEngineSettings | None = None,
+    ) -> None:
         self._audio_file_path = audio_file_path
+        self._on_progress = on_progress
+        self._on_segments = on_segments
+        self._asr_settings = asr_settings or self.default_settings()
+
+    @classmethod
+    def default_settings(cls) -> AsrEngineSettings:
+        """Settings of the engine, unless others are given (see `openthot.asr.registry`)."""
+        return get_settings().asr
+
+    async def _report_progress(self, position_s: float) -> None:
+        if self._on_progress:
+            await self._on_progress(position_s)
+
+    async def _report_segments(self, segments: list[PartialSegment]) -> None:
+        if self._on_segments and segments:
+            await self._on_segments(segments)
+
+    async def _on_transcribed_segment(self, segment: PartialSegment) -> None:
+        """Report a segment (and so the progress) as soon as an ASR engine transcribes it."""
+        await self._report_segments([segment])
+        await self._report_progress(segment.end)
+
+    @property
+    def _reporting(self) -> bool:
+        return self._on_progress is not None or self._on_segments is not None
+
+    async def _on_output_line(self, line: str) -> None:
+        """Report the segments (and so the progress) printed by an ASR engine's command line."""
+        if segment := parse_segment_line(line):
+            await self._on_transcribed_segment(segment)
 
     @property
     def success(self):
@@ -28,6 +70,25 @@ class Transcriptor:
     def transcript(self):
         return self._transcript
 
+    @classmethod
+    async def run_batch(
+        cls,
+        audio_file_paths: list[FilePath],
+        asr_settings: AsrEngineSettings | None = None,
+    ) -> list["Transcriptor"]:
+        """
+        Transcribe several audio files, returning a transcriptor for each.
+        They are transcribed one after the other by default, i.e. by the same
+        warm model when it runs in process.
+        """
+        transcriptors = [
+            cls(audio_file_path=path, asr_settings=asr_settings)
+            for path in audio_file_paths
+        ]
+        for tscr in transcriptors:
+            await tscr.run_transcription()
+        return transcriptors
+
     @abstractclassmethod
     async def run_transcription(
         self,
@@ -0,0 +1,168 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Type
+
+import structlog
+from pydantic import FilePath
+
+from openthot import object_storage
+from openthot.asr import model_server
+from openthot.asr.progress import ProgressCallback, SegmentsCallback
+from openthot.asr.slots import model_weight, transcription_slots
+from openthot.asr.stitching import stitch_transcripts
+from openthot.asr.transcriptors import Transcriptor
+from openthot.audio.chunking import AudioChunk, split_audio
+from openthot.config import AsrEngineSettings, get_settings
+from openthot.models.transcript.utils import partial_segments
+from openthot.models.transcript.whisper import WhisperTranscript
+from openthot.models.transcript.whisperx import WhisperXTranscript
+
+logger = structlog.get_logger(__file__)
+chunking_settings = get_settings().asr_chunking
+
+
+def _init_chunk_worker(threads: int, asr_settings: AsrEngineSettings) -> None:
+    # Pool processes share the CPUs rather than each trying to use all of them,
+    # which must be set before `torch` is imported, i.e. before models are loaded
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    if model_server.in_process_enabled(asr_settings):
+        model_server.load_models(asr_settings)
+
+
+# Pools of the worker process, by engine settings, shared by its transcriptions
+_chunk_pools: dict[str, Executor] = {}
+
+
+def transcribe_chunk(
+    transcriptor_class: Type[Transcriptor],
+    audio_file_path: Path,
+    asr_settings: AsrEngineSettings,
+) -> WhisperTranscript | WhisperXTranscript | None:
+    """Transcribe a chunk, from a pool process. Returns `None` on failure."""
+    tscr = transcriptor_class(
+        audio_file_path=audio_file_path, asr_settings=asr_settings
+    )
+    asyncio.run(tscr.run_transcription())
+    return tscr.transcript if tscr.success else None
+
+
+class ChunkedTranscriptor(Transcriptor):
+    """
+    Transcribe a long audio file in chunks split at pauses in speech, each chunk being
+    transcribed in parallel by a pool of processes running `transcriptor_class`.
+    Each process of the pool loads its own model: there is one pool of
+    `max_workers` processes per engine and worker process, whatever the number of
+    transcriptions, and each chunk takes the slots of its model while transcribed
+    (see `openthot.asr.slots`).
+    """
+
+    _transcriptor_class: Type[Transcriptor]
+
+    def __init__(
+        self,
+        audio_file_path: FilePath,
+        transcriptor_class: Type[Transcriptor],
+        on_progress: ProgressCallback | None = None,
+        on_segments: SegmentsCallback | None = None,
+        asr_settings: AsrEngineSettings | None = None,
+    ) -> None:
+        super().__init__(
+            audio_file_path,
+            on_progress,
+            on_segments,
+            asr_settings or transcriptor_class.default_settings(),
+        )
+        self._transcriptor_class = transcriptor_class
+
+    def _chunk_pool(self) -> Executor:
+        key = self._asr_settings.json()
+        if (pool := _chunk_pools.get(key)) is None:
+            workers = chunking_settings.max_workers
+            pool = _chunk_pools[key] = ProcessPoolExecutor(
+                max_workers=workers,
+                # Forking would copy the event loop, threads and models of this process
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_chunk_worker,
+                initargs=(max(1, (os.cpu_count() or 1) // workers), self._asr_settings),
+            )
+        return pool
+
+    async def _run_whole(self) -> None:
+        tscr = self._transcriptor_class(
+            audio_file_path=self._audio_file_path,
+            on_progress=self._on_progress,
+            on_segments=self._on_segments,
+            asr_settings=self._asr_settings,
+        )
+        await tscr.run_transcription()
+        self._success = tscr.success
+        if self.success:
+            self._transcript_duration = tscr.transcript_duration
+            self._transcript = tscr.transcript
+
+    async def run_transcription(
+        self,
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        start_time = time.perf_counter()
+        with object_storage.scratch_directory() as chunks_dir:
+            chunks = await loop.run_in_executor(
+                None,
+                split_audio,
+                self._audio_file_path,
+                chunks_dir,
+                chunking_settings.chunk_duration_s,
+            )
+            if len(chunks) == 1:
+                await self._run_whole()
+                return
+
+            await logger.ainfo(
+                "Transcribing audio in chunks",
+                audio_file_path=self._audio_file_path,
+                chunks=len(chunks),
+                workers=chunking_settings.max_workers,
+            )
+            pool = self._chunk_pool()
+            weight = model_weight(self._asr_settings)
+            transcribed_s = 0.0
+
+            async def _transcribe(chunk: AudioChunk):
+                nonlocal transcribed_s
+                async with transcription_slots(weight):
+                    transcript = await loop.run_in_executor(
+                        pool,
+                        transcribe_chunk,
+                        self._transcriptor_class,
+                        chunk.path,
+                        self._asr_settings,
+                    )
+                transcribed_s += chunk.duration - chunk.overlap
+                if transcript is not None:
+                    await self._report_segments(
+                        partial_segments(transcript, chunk.offset, chunk.overlap)
+                    )
+                await self._report_progress(transcribed_s)
+                return transcript
+
+            transcripts = await asyncio.gather(*map(_transcribe, chunks))
+
+        self._success = all(transcript is not None for transcript in transcripts)
+        if not self.success:
+            await logger.aerror(
+                "Could not transcribe some chunks",
+                audio_file_path=self._audio_file_path,
+                failed_chunks=[i for i, t in enumerate(transcripts) if t is None],
+            )
+            return
+        self._transcript = stitch_transcripts(
+            [
+                (chunk.offset, chunk.overlap, t)
+                for chunk, t in zip(chunks, transcripts)
+            ]  # type: ignore
+        )
+        self._transcript_duration = time.perf_counter() - start_time
@@ -0,0 +1,110 @@
+import json
+from abc import abstractclassmethod
+from pathlib import Path
+from typing import Any
+
+from pydantic import FilePath
+
+from openthot import object_storage
+from openthot.asr import model_server
+from openthot.asr.transcriptors import Transcriptor
+from openthot.asr.utils import AsyncProcRunner
+from openthot.config import AsrEngineSettings
+from openthot.models.transcript.whisper import WhisperTranscript
+from openthot.models.transcript.whisperx import WhisperXTranscript
+
+
+class CliTranscriptor(Transcriptor):
+    """
+    A local ASR engine, run in process when it can (see `model_server`),
+    by its command line otherwise.
+    """
+
+    @abstractclassmethod
+    def _proc_call(
+        cls,
+        audio_file_paths: list[FilePath],
+        output_dir: str,
+        asr_settings: AsrEngineSettings,
+    ) -> list[str]:
+        """Command line transcribing some files, writing their outputs to `output_dir`."""
+        pass
+
+    @abstractclassmethod
+    def _parse_output(
+        cls, output: dict[str, Any]
+    ) -> WhisperTranscript | WhisperXTranscript:
+        """Transcript of a JSON output of the engine (by its command line or not)."""
+        pass
+
+    async def run_transcription(
+        self,
+    ) -> None:
+        if model_server.in_process_enabled(self._asr_settings):
+            if result := await model_server.run_transcription(
+                self._audio_file_path,
+                self._asr_settings,
+                self._on_transcribed_segment if self._reporting else None,
+            ):
+                output, self._transcript_duration = result
+                self._success = True
+                self._transcript = self._parse_output(output)
+                return
+        await self._run_cli()
+
+    def _read_cli_output(self, proc_runner: AsyncProcRunner, output_dir: Path) -> None:
+        json_output_file = (
+            output_dir / Path(self._audio_file_path).with_suffix(".json").name
+        )
+        # Within a batch, the command line goes on after a file it failed on
+        self._success = proc_runner.return_code == 0 and json_output_file.exists()
+        if not self.success:
+            return
+
+        self._transcript_duration = proc_runner.duration
+        with open(json_output_file, "r") as json_file:
+            json_output = json.load(json_file)
+
+        self._transcript = self._parse_output(json_output)
+
+    async def _run_cli(
+        self,
+    ) -> None:
+        # The command line writes its outputs next to its input, which may be shared
+        # (e.g. the normalized audio of the object storage): it runs on a link to it
+        with object_storage.scratch_directory() as output_dir:
+            audio_file_path = output_dir / Path(self._audio_file_path).name
+            audio_file_path.symlink_to(Path(self._audio_file_path).resolve())
+            proc_runner = AsyncProcRunner(
+                self._proc_call([audio_file_path], str(output_dir), self._asr_settings),
+                on_line=self._on_output_line,
+            )
+            await proc_runner.run()
+            self._read_cli_output(proc_runner, output_dir)
+
+    @classmethod
+    async def run_batch(
+        cls,
+        audio_file_paths: list[FilePath],
+        asr_settings: AsrEngineSettings | None = None,
+    ) -> list[Transcriptor]:
+        """
+        Transcribe several audio files in a single run of the command line, unless
+        the model runs in process. The files must be in the same directory, with
+        different names.
+        """
+        asr_settings = asr_settings or cls.default_settings()
+        if model_server.in_process_enabled(asr_settings):
+            return await super().run_batch(audio_file_paths, asr_settings)
+        output_dir = Path(audio_file_paths[0]).parent.resolve()
+        proc_runner = AsyncProcRunner(
+            cls._proc_call(audio_file_paths, str(output_dir), asr_settings)
+        )
+        await proc_runner.run()
+        transcriptors = [
+            cls(audio_file_path=path, asr_settings=asr_settings)
+            for path in audio_file_paths
+        ]
+        for tscr in transcriptors:
+            tscr._read_cli_output(proc_runner, output_dir)
+        return transcriptors
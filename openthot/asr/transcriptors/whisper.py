@@ -1,28 +1,32 @@
-import json
-from pathlib import Path
+from typing import Any
 
 import structlog
+from pydantic import FilePath
 
-from openthot.asr.transcriptors import Transcriptor
-from openthot.asr.utils import AsyncProcRunner
-from openthot.config import WhisperSettings, get_settings
+from openthot.asr.transcriptors.cli import CliTranscriptor
+from openthot.config import AsrEngineSettings, WhisperSettings, get_settings
 from openthot.models.transcript.whisper import WhisperTranscript
 
 logger = structlog.get_logger(__file__)
 asr_settings = get_settings().asr
 
 
-class Whisper(Transcriptor):
-    async def run_transcription(
-        self,
-    ) -> None:
+class Whisper(CliTranscriptor):
+    @classmethod
+    def default_settings(cls) -> AsrEngineSettings:
+        return asr_settings
+
+    @classmethod
+    def _proc_call(
+        cls,
+        audio_file_paths: list[FilePath],
+        output_dir: str,
+        asr_settings: AsrEngineSettings,
+    ) -> list[str]:
         assert isinstance(asr_settings, WhisperSettings)
-        output_dir = str(
-            Path(self._audio_file_path).resolve().parent
-        )  # os.path.dirname(os.path.abspath(audio_file_path)),
-        proc_call = [
+        return [
             "whisper",
-            self._audio_file_path,
+            *audio_file_paths,
             "--language",
             "fr",
             "--model",
@@ -33,15 +37,6 @@ class Whisper(Transcriptor):
             "True",
         ]
 
-        proc_runner = AsyncProcRunner(proc_call)
-        await proc_runner.run()
-        self._success = proc_runner.return_code == 0
-        if not self.success:
-            return
-
-        self._transcript_duration = proc_runner.duration
-        json_output_file = Path(self._audio_file_path).with_suffix(".json")
-        with open(json_output_file, "r") as json_file:
-            json_output = json.load(json_file)
-
-        self._transcript = WhisperTranscript.parse_obj(json_output)
+    @classmethod
+    def _parse_output(cls, output: dict[str, Any]) -> WhisperTranscript:
+        return WhisperTranscript.parse_obj(output)
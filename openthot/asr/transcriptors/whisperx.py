@@ -1,29 +1,32 @@
-import json
-from pathlib import Path
+from typing import Any
 
 import structlog
+from pydantic import FilePath
 
-from openthot.asr.transcriptors import Transcriptor
-from openthot.asr.utils import AsyncProcRunner
-from openthot.config import WhisperXSettings, get_settings
+from openthot.asr.transcriptors.cli import CliTranscriptor
+from openthot.config import AsrEngineSettings, WhisperXSettings, get_settings
 from openthot.models.transcript.whisperx import WhisperXTranscript
 
 logger = structlog.get_logger(__file__)
 asr_settings = get_settings().asr
 
 
-class WhisperX(Transcriptor):
-    async def run_transcription(
-        self,
-    ) -> None:
-        assert isinstance(asr_settings, WhisperXSettings)
-        output_dir = str(
-            Path(self._audio_file_path).resolve().parent
-        )  # os.path.dirname(os.path.abspath(audio_file_path)),
+class WhisperX(CliTranscriptor):
+    @classmethod
+    def default_settings(cls) -> AsrEngineSettings:
+        return asr_settings
 
-        proc_call = [
+    @classmethod
+    def _proc_call(
+        cls,
+        audio_file_paths: list[FilePath],
+        output_dir: str,
+        asr_settings: AsrEngineSettings,
+    ) -> list[str]:
+        assert isinstance(asr_settings, WhisperXSettings)
+        return [
             "whisperx",
-            self._audio_file_path,
+            *audio_file_paths,
             "--language",
             "fr",
             "--model",
@@ -37,15 +40,6 @@ class WhisperX(Transcriptor):
             asr_settings.hf_token,
         ]
 
-        proc_runner = AsyncProcRunner(proc_call)
-        await proc_runner.run()
-        self._success = proc_runner.return_code == 0
-        if not self.success:
-            return
-
-        self._transcript_duration = proc_runner.duration
-        json_output_file = Path(self._audio_file_path).with_suffix(".json")
-        with open(json_output_file, "r") as json_file:
-            json_output = json.load(json_file)
-
-        self._transcript = WhisperXTranscript.parse_obj(json_output)
+    @classmethod
+    def _parse_output(cls, output: dict[str, Any]) -> WhisperXTranscript:
+        return WhisperXTranscript.parse_obj(output)
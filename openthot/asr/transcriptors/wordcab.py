@@ -1,51 +1,177 @@
+import asyncio
+import random
+import time
+import weakref
+from pathlib import Path
+
 import httpx
 import structlog
 
+from openthot.asr.endpoints import Endpoint, EndpointPool
 from openthot.asr.transcriptors import Transcriptor
-from openthot.config import WordcabSettings, get_settings
+from openthot.config import AsrEngineSettings, WordcabSettings, get_settings
 from openthot.models.transcript.wordcab import WordcabTranscript
 
 logger = structlog.get_logger(__file__)
 asr_settings = get_settings().asr
 
+# use `data` instead of `json` as the endpoint expects form data
+FORM_DATA = {
+    "alignment": True,
+    "diarization": True,
+    "dual_channel": False,
+    "source_lang": "fr",
+    "timestamps": "s",
+    "use_batch": None,
+    "word_timestamps": True,
+}
+RETRIED_ERRORS = (httpx.NetworkError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+
+# A client (i.e. a connection pool) is bound to the event loop it is used in,
+# which lasts as long as the worker thread (see `openthot.tasks.task_event_loop`),
+# whereas the load and health of servers are shared by the whole process.
+# Each engine (see `openthot.asr.registry`) has its own, by servers, and another one
+# for its health probes.
+_clients: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[tuple[str, ...], httpx.AsyncClient]
+] = weakref.WeakKeyDictionary()
+_probe_clients: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[tuple[str, ...], httpx.AsyncClient]
+] = weakref.WeakKeyDictionary()
+_endpoint_pools: dict[tuple[str, ...], EndpointPool] = {}
+
+
+def get_client(asr_settings: WordcabSettings) -> httpx.AsyncClient:
+    """The client shared by the Wordcab requests of the running event loop to some servers."""
+    clients = _clients.setdefault(asyncio.get_running_loop(), {})
+    if (client := clients.get(key := tuple(asr_settings.urls))) is None:
+        client = clients[key] = httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                asr_settings.read_timeout_s,
+                connect=asr_settings.connect_timeout_s,
+                # Waiting for a connection is waiting for a request in flight to end
+                pool=None,
+            ),
+            limits=httpx.Limits(
+                max_connections=asr_settings.max_concurrent_requests,
+                max_keepalive_connections=asr_settings.max_concurrent_requests,
+            ),
+        )
+    return client
+
+
+def get_probe_client(asr_settings: WordcabSettings) -> httpx.AsyncClient:
+    """
+    The client of the health probes of the running event loop to some servers.
+    Probes have their own connections, one per server, so that they never wait
+    for those of transcriptions (and then time out, whatever the servers' health).
+    """
+    clients = _probe_clients.setdefault(asyncio.get_running_loop(), {})
+    if (client := clients.get(key := tuple(asr_settings.urls))) is None:
+        client = clients[key] = httpx.AsyncClient(
+            timeout=asr_settings.connect_timeout_s,
+            limits=httpx.Limits(
+                max_connections=len(asr_settings.urls),
+                max_keepalive_connections=len(asr_settings.urls),
+            ),
+        )
+    return client
+
+
+def get_endpoint_pool(asr_settings: WordcabSettings) -> EndpointPool:
+    """Some servers of this worker process, along with their load and health."""
+    if (pool := _endpoint_pools.get(key := tuple(asr_settings.urls))) is None:
+        pool = _endpoint_pools[key] = EndpointPool(
+            asr_settings.urls,
+            health_path=asr_settings.health_path,
+            health_check_interval_s=asr_settings.health_check_interval_s,
+            ejection_s=asr_settings.ejection_s,
+            probe_timeout_s=asr_settings.connect_timeout_s,
+        )
+    return pool
+
+
+def retry_delay(retry: int, backoff_s: float) -> float:
+    """Exponential backoff with full jitter, so that workers do not retry in sync."""
+    return random.uniform(0, backoff_s * 2**retry)
+
 
 class Wordcab(Transcriptor):
+    @classmethod
+    def default_settings(cls) -> AsrEngineSettings:
+        return asr_settings
+
+    async def _post_audio(self) -> httpx.Response:
+        """
+        Post the audio file, retrying on connection errors and server errors,
+        each time on another server if there is one.
+        The last response is returned whatever its status.
+        """
+        asr_settings = self._asr_settings
+        assert isinstance(asr_settings, WordcabSettings)
+        client = get_client(asr_settings)
+        pool = get_endpoint_pool(asr_settings)
+        await pool.check_health(get_probe_client(asr_settings))
+        failed: list[Endpoint] = []
+        retry = 0
+        while True:
+            endpoint = pool.choose(exclude=failed)
+            try:
+                # The file is read chunk by chunk as the request body is sent,
+                # and opened again for each attempt
+                with open(self._audio_file_path, "rb") as f, pool.using(endpoint):
+                    r = await client.post(
+                        f"{endpoint.url}/audio",
+                        files={"file": (Path(self._audio_file_path).name, f)},
+                        data=FORM_DATA,  # type: ignore
+                    )
+            except RETRIED_ERRORS as e:
+                pool.eject(endpoint)
+                if retry >= asr_settings.max_retries:
+                    raise
+                await logger.awarning(
+                    "Could not reach Wordcab",
+                    url=endpoint.url,
+                    exception=repr(e),
+                    retry=retry,
+                )
+            else:
+                if r.status_code < 500:
+                    return r
+                pool.eject(endpoint)
+                if retry >= asr_settings.max_retries:
+                    return r
+                await logger.awarning(
+                    "Wordcab server error",
+                    url=endpoint.url,
+                    status_code=r.status_code,
+                    retry=retry,
+                )
+            failed.append(endpoint)
+            await asyncio.sleep(retry_delay(retry, asr_settings.retry_backoff_s))
+            retry += 1
+
     async def run_transcription(
         self,
     ) -> None:
-        assert isinstance(asr_settings, WordcabSettings)
-        with open(self._audio_file_path, "rb") as f:
-            files = {"file": (self._audio_file_path, f.read())}
-        async with httpx.AsyncClient(base_url=asr_settings.url) as client:
-            r = await client.post(
-                "/audio",
-                files=files,  # type: ignore
-                data={  # use `data` instead of `json` as the endpoint expects form data
-                    "alignment": True,
-                    "diarization": True,
-                    "dual_channel": False,
-                    "source_lang": "fr",
-                    "timestamps": "s",
-                    "use_batch": None,
-                    "word_timestamps": True,
-                },
-                timeout=None,
-            )
+        start_time = time.perf_counter()
+        r = await self._post_audio()
         self._success = r.status_code == 200
         if not self.success:
-            await logger.aexception(
+            await logger.aerror(
                 "Coud not get transcription",
-                http_return_json=r.json(),
+                http_status_code=r.status_code,
                 http_return_text=r.text,
             )
             return
 
-        await logger.debug(
+        await logger.adebug(
             "Transcription succeeded. Now gathering json output.",
         )
-        self._transcript_duration = r.elapsed.seconds
+        # Including retries, it is how long the transcription took to get
+        self._transcript_duration = time.perf_counter() - start_time
         json_output = r.json()
-        await logger.debug(
+        await logger.adebug(
             "Parsing output json.",
         )
         self._transcript = WordcabTranscript.parse_obj(json_output)
@@ -1,5 +1,9 @@
 import asyncio
+import codecs
+import re
 import time
+from collections import deque
+from typing import Awaitable, Callable
 
 import structlog
 
@@ -7,16 +11,56 @@ from openthot.exceptions import MissingASR
 
 logger = structlog.get_logger(__file__)
 
+# Last lines of each output kept in memory, whatever the duration of the process
+OUTPUT_BUFFER_LINES = 200
+READ_SIZE = 64 * 1024
+# Progress bars (e.g. tqdm) rewrite their line with `\r`, so that is an end of line too
+LINE_END = re.compile(r"\r\n|\r|\n")
+
 
 class AsyncProcRunner:
     _proc_call: list[str]
+    _on_line: Callable[[str], Awaitable[None]] | None
     duration: float
     return_code: int | None
     stderr: str | None
     stdout: str | None
 
-    def __init__(self, proc_call: list[str]) -> None:
+    def __init__(
+        self,
+        proc_call: list[str],
+        on_line: Callable[[str], Awaitable[None]] | None = None,
+    ) -> None:
+        """
+        Args:
+            proc_call (list[str]): The command line to run.
+            on_line (Callable[[str], Awaitable[None]] | None): Called with each
+                line of the outputs (stdout and stderr) as soon as it is written.
+        """
         self._proc_call = [str(pc) for pc in proc_call]
+        self._on_line = on_line
+
+    async def _read_lines(self, stream: asyncio.StreamReader, lines: deque[str]):
+        # Reads may end in the middle of a character, as well as of a line
+        decoder = codecs.getincrementaldecoder("utf8")(errors="replace")
+        pending = ""
+        while True:
+            data = await stream.read(READ_SIZE)
+            *complete, pending = LINE_END.split(
+                pending + decoder.decode(data, not data)
+            )
+            # The last line may not end, nor may some that are way too long
+            if len(pending) > READ_SIZE or not data:
+                complete.append(pending)
+                pending = ""
+            for line in complete:
+                if not line:
+                    continue
+                lines.append(line)
+                if self._on_line:
+                    await self._on_line(line)
+            if not data:
+                return
 
     async def run(self):
         await logger.adebug(
@@ -26,22 +70,30 @@ class AsyncProcRunner:
         start_time = time.perf_counter()
         try:
             proc = await asyncio.create_subprocess_exec(
-                *self._proc_call, stdout=asyncio.subprocess.PIPE
+                *self._proc_call,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
             )
         except FileNotFoundError:
             raise MissingASR(asr_bin_name=self._proc_call[0])
-        proc_out, proc_err = await proc.communicate()
+        stdout_lines: deque[str] = deque(maxlen=OUTPUT_BUFFER_LINES)
+        stderr_lines: deque[str] = deque(maxlen=OUTPUT_BUFFER_LINES)
+        await asyncio.gather(
+            self._read_lines(proc.stdout, stdout_lines),  # type: ignore
+            self._read_lines(proc.stderr, stderr_lines),  # type: ignore
+        )
+        await proc.wait()
 
         # Parse outputs
-        self.stdout = str(proc_out, "utf8") if proc_out else None
-        self.stderr = str(proc_err, "utf8") if proc_err else None
+        self.stdout = "\n".join(stdout_lines) if stdout_lines else None
+        self.stderr = "\n".join(stderr_lines) if stderr_lines else None
         self.duration = time.perf_counter() - start_time
         self.return_code = proc.returncode
         if proc.returncode != 0:
             logger.error(
                 f"`{self._proc_call[0]}` failed",
                 proc_call=" ".join(self._proc_call),
-                stderr=proc_err,
+                stderr=self.stderr,
             )
         await logger.adebug(
             f"`{self._proc_call[0]}` done in {self.duration}s",
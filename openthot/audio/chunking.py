@@ -0,0 +1,164 @@
+"""
+Split long audio files at pauses in speech, so that their chunks can be
+transcribed in parallel without cutting words in half.
+
+Pauses are found by a light, energy-based voice activity detection: the loudness
+of the signal is measured over short frames, and each chunk ends in the quietest
+stretch found shortly before it would exceed the requested duration. Each chunk
+but the first also starts a little before its cut, so that consecutive chunks
+overlap: this is how their transcripts are matched (e.g. their speakers, see
+`openthot.asr.stitching`).
+"""
+from pathlib import Path
+
+import numpy as np
+import soundfile
+from pydantic import BaseModel
+
+from openthot.audio.decode import DecodedAudio
+
+FRAME_DURATION_S = 0.03
+# Pauses are looked for over that long, rather than in single (and noisy) frames
+PAUSE_DURATION_S = 0.3
+# Cuts are looked for in the end of chunks, at most over that long
+MAX_SEARCH_DURATION_S = 30.0
+# Chunks start that long before their cut
+OVERLAP_DURATION_S = 10.0
+
+
+class AudioChunk(BaseModel):
+    index: int
+    path: Path
+    offset: float  # where it starts in the whole audio file (s)
+    duration: float  # (s)
+    overlap: float = 0.0  # how long its start is also in the previous chunk (s)
+
+
+def frame_energies(audio: DecodedAudio, frame_length: int) -> tuple[np.ndarray, int]:
+    """
+    Root mean square of the signal over successive frames of `frame_length` samples.
+
+    Returns:
+        tuple[np.ndarray, int]: Energy of each frame, and the number of samples.
+    """
+    energies = []
+    rest = np.empty(0, dtype=np.float32)
+    samples_count = 0
+    for block in audio:
+        samples_count += len(block)
+        buffer = np.concatenate([rest, block])
+        used = len(buffer) // frame_length * frame_length
+        frames = buffer[:used].reshape(-1, frame_length)
+        energies.append(np.sqrt(np.mean(np.square(frames), axis=1)))
+        rest = buffer[used:]
+    if len(rest):
+        energies.append(np.sqrt(np.mean(np.square(rest), keepdims=True)))
+    if not energies:
+        return np.empty(0, dtype=np.float32), 0
+    return np.concatenate(energies), samples_count
+
+
+def split_points(
+    energies: np.ndarray, chunk_frames: int, search_frames: int, pause_frames: int
+) -> list[int]:
+    """
+    Frames at which to cut a signal, given the energy of its frames, so that chunks
+    are at most `chunk_frames` long, and end in the quietest `pause_frames` of their
+    last `search_frames`.
+    """
+    search_frames = max(1, min(search_frames, chunk_frames - 1))
+    pause_frames = max(1, min(pause_frames, search_frames))
+    smoothed = np.convolve(energies, np.ones(pause_frames) / pause_frames, mode="same")
+    cuts: list[int] = []
+    start = 0
+    while len(energies) - start > chunk_frames:
+        end = start + chunk_frames
+        search_start = end - search_frames
+        start = search_start + int(np.argmin(smoothed[search_start:end]))
+        cuts.append(start)
+    return cuts
+
+
+def split_audio(
+    path: str | Path,
+    output_dir: str | Path,
+    chunk_duration_s: float,
+    overlap_s: float = OVERLAP_DURATION_S,
+) -> list[AudioChunk]:
+    """
+    Split an audio file at pauses in speech into mono FLAC chunks cut at most
+    `chunk_duration_s` apart, written to `output_dir`, each of them but the first
+    starting `overlap_s` (at most a quarter of `chunk_duration_s`) before its cut.
+    Short enough files are not split, their only chunk being the file itself.
+    CPU bound, and blocking.
+    """
+    audio = DecodedAudio(path)
+    sample_rate = audio.sample_rate
+    frame_length = max(1, round(sample_rate * FRAME_DURATION_S))
+    energies, samples_count = frame_energies(audio, frame_length)
+    overlap_frames = int(min(overlap_s, chunk_duration_s / 4) / FRAME_DURATION_S)
+    cuts = [
+        cut * frame_length
+        for cut in split_points(
+            energies,
+            chunk_frames=max(2, int(chunk_duration_s / FRAME_DURATION_S)),
+            search_frames=int(
+                min(MAX_SEARCH_DURATION_S, chunk_duration_s / 4) / FRAME_DURATION_S
+            ),
+            pause_frames=int(PAUSE_DURATION_S / FRAME_DURATION_S),
+        )
+    ]
+    if not cuts:
+        return [
+            AudioChunk(
+                index=0,
+                path=Path(path),
+                offset=0.0,
+                duration=samples_count / sample_rate,
+            )
+        ]
+
+    # Samples of each chunk: from a little before its cut, to the next cut
+    overlap = overlap_frames * frame_length
+    ranges = [
+        (max(0, start - overlap), end)
+        for start, end in zip([0, *cuts], [*cuts, samples_count])
+    ]
+    chunks = [
+        AudioChunk(
+            index=i,
+            path=Path(output_dir, f"chunk-{i:05d}.flac"),
+            offset=start / sample_rate,
+            duration=(end - start) / sample_rate,
+            overlap=(cut - start) / sample_rate,
+        )
+        for i, ((start, end), cut) in enumerate(zip(ranges, [0, *cuts]))
+    ]
+    # Second decoding pass, dispatching samples to the chunks they belong to (two
+    # of them in overlaps), each chunk file being open while its samples come
+    position = 0
+    chunk_files: dict[int, soundfile.SoundFile] = {}
+    try:
+        for block in audio:
+            block_end = position + len(block)
+            for index, (start, end) in enumerate(ranges):
+                if start >= block_end or end <= position:
+                    continue
+                if index not in chunk_files:
+                    chunk_files[index] = soundfile.SoundFile(
+                        str(chunks[index].path),
+                        "w",
+                        samplerate=sample_rate,
+                        channels=1,
+                        format="FLAC",
+                        subtype="PCM_16",
+                    )
+                first, last = max(0, start - position), end - position
+                chunk_files[index].write(np.clip(block[first:last], -1.0, 1.0))
+                if end <= block_end:
+                    chunk_files.pop(index).close()
+            position = block_end
+    finally:
+        for chunk_file in chunk_files.values():
+            chunk_file.close()
+    return chunks
@@ -0,0 +1,60 @@
+"""
+Decode audio files into mono float32 samples, block by block,
+so that memory usage does not depend on the duration of the audio.
+"""
+from pathlib import Path
+from typing import Iterator
+
+import audioread
+import numpy as np
+import soundfile
+import structlog
+
+logger = structlog.get_logger(__file__)
+
+# Duration of the blocks yielded while decoding
+BLOCK_DURATION_S = 10
+
+
+class DecodedAudio:
+    """
+    An audio file being decoded.
+    Iterating over it yields blocks of mono samples in [-1, 1], at `sample_rate`.
+    """
+
+    path: Path
+    sample_rate: int
+    channels: int
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        try:
+            info = soundfile.info(str(self.path))
+            self.sample_rate, self.channels = info.samplerate, info.channels
+            self._decoder = "soundfile"
+        except soundfile.LibsndfileError:
+            # Formats libsndfile does not know (e.g. m4a) go through ffmpeg & co.
+            with audioread.audio_open(str(self.path)) as f:
+                self.sample_rate, self.channels = f.samplerate, f.channels
+            self._decoder = "audioread"
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        if self._decoder == "soundfile":
+            return self._iter_soundfile()
+        return self._iter_audioread()
+
+    def _iter_soundfile(self) -> Iterator[np.ndarray]:
+        for block in soundfile.blocks(
+            str(self.path),
+            blocksize=self.sample_rate * BLOCK_DURATION_S,
+            dtype="float32",
+            always_2d=True,
+        ):
+            yield block.mean(axis=1, dtype=np.float32)
+
+    def _iter_audioread(self) -> Iterator[np.ndarray]:
+        with audioread.audio_open(str(self.path)) as f:
+            for buffer in f:
+                # Interleaved signed 16-bit samples
+                block = np.frombuffer(buffer, dtype="<i2").reshape(-1, self.channels)
+                yield block.mean(axis=1, dtype=np.float32) / 32768
@@ -0,0 +1,102 @@
+"""
+Everything that requires decoding an audio file is done here, in a single
+decoding pass, once per audio content: the normalized audio that ASR engines
+work on, and the waveform peaks that the player draws.
+Results are stored next to the audio file, so that retries, re-transcriptions
+and other interviews with the same audio do not decode it again.
+"""
+import asyncio
+import os
+from pathlib import Path
+
+import structlog
+
+from openthot import object_storage
+from openthot.audio.decode import DecodedAudio
+from openthot.audio.normalize import NormalizedAudioWriter
+from openthot.audio.waveform import (
+    PeaksAccumulator,
+    WaveformPeaks,
+    store_waveform,
+    waveform_location,
+)
+
+logger = structlog.get_logger(__file__)
+
+
+def decode_once(
+    path: str | Path, normalized_path: Path | None, with_waveform: bool
+) -> WaveformPeaks | None:
+    """
+    Decode an audio file, writing its normalized version to `normalized_path` (if any)
+    and computing its peaks (if `with_waveform`) along the way. CPU bound, and blocking.
+    """
+    audio = DecodedAudio(path)
+    peaks = PeaksAccumulator(audio.sample_rate) if with_waveform else None
+    writer = (
+        NormalizedAudioWriter(normalized_path, audio.sample_rate)
+        if normalized_path
+        else None
+    )
+    try:
+        for block in audio:
+            if peaks:
+                peaks.feed(block)
+            if writer:
+                writer.feed(block)
+    finally:
+        if writer:
+            writer.close()
+    return peaks.result() if peaks else None
+
+
+def normalized_audio_location(audio_sha256: str) -> str:
+    return object_storage.derived_location(
+        audio_sha256, object_storage.NORMALIZED_SUFFIX
+    )
+
+
+async def ingest_audio(audio_location: str, audio_sha256: str) -> str:
+    """
+    Make sure the normalized audio and the waveform peaks of an audio file are stored,
+    decoding it only if one of them is missing.
+
+    Returns:
+        str: The location of the normalized audio.
+    """
+    normalized_location = normalized_audio_location(audio_sha256)
+    needs_normalized = await object_storage.stat_audio_file(normalized_location) is None
+    needs_waveform = (
+        await object_storage.stat_audio_file(waveform_location(audio_sha256)) is None
+    )
+    if not needs_normalized and not needs_waveform:
+        return normalized_location
+
+    await logger.ainfo(
+        "Decoding audio file",
+        audio_location=audio_location,
+        normalized=needs_normalized,
+        waveform=needs_waveform,
+    )
+    staged_location = (
+        await object_storage.create_audio_file(
+            f"{audio_sha256}{object_storage.NORMALIZED_SUFFIX}"
+        )
+        if needs_normalized
+        else None
+    )
+    try:
+        async with object_storage.local_audio_file(audio_location) as path:
+            peaks = await asyncio.get_running_loop().run_in_executor(
+                None, decode_once, path, staged_location, needs_waveform
+            )
+        if peaks:
+            await store_waveform(audio_sha256, peaks)
+        if staged_location:
+            await object_storage.store_derived_file(
+                audio_sha256, object_storage.NORMALIZED_SUFFIX, staged_location
+            )
+    finally:
+        if staged_location and os.path.exists(staged_location):
+            os.remove(staged_location)
+    return normalized_location
@@ -0,0 +1,58 @@
+"""
+Normalized audio, i.e. what every ASR engine ends up working on:
+16 kHz mono, stored as FLAC (lossless, and about half the size of PCM).
+Producing it once per audio file spares each transcription (and each retry)
+from decoding and resampling the original upload again.
+"""
+from pathlib import Path
+
+import numpy as np
+import soundfile
+import soxr
+
+from openthot.audio.decode import DecodedAudio
+
+NORMALIZED_SAMPLE_RATE = 16000
+
+
+class NormalizedAudioWriter:
+    """Resample a signal as it is being decoded, block by block, and write it as FLAC."""
+
+    def __init__(self, path: str | Path, sample_rate: int) -> None:
+        self._resampler = soxr.ResampleStream(
+            sample_rate, NORMALIZED_SAMPLE_RATE, 1, dtype="float32"
+        )
+        self._file = soundfile.SoundFile(
+            str(path),
+            "w",
+            samplerate=NORMALIZED_SAMPLE_RATE,
+            channels=1,
+            format="FLAC",
+            subtype="PCM_16",
+        )
+
+    def _write(self, samples: np.ndarray) -> None:
+        # Resampling may slightly overshoot, which 16-bit PCM cannot hold
+        self._file.write(np.clip(samples, -1.0, 1.0))
+
+    def feed(self, samples: np.ndarray) -> None:
+        self._write(self._resampler.resample_chunk(samples))
+
+    def close(self) -> None:
+        self._write(
+            self._resampler.resample_chunk(np.empty(0, dtype=np.float32), last=True)
+        )
+        self._file.close()
+
+
+def load_normalized_samples(path: str | Path) -> np.ndarray:
+    """
+    All the samples of an audio file, as ASR models take them: 16 kHz mono float32.
+    Normalized audio only needs to be read, anything else is resampled. Blocking.
+    """
+    audio = DecodedAudio(path)
+    blocks = list(audio)
+    samples = np.concatenate(blocks) if blocks else np.empty(0, dtype=np.float32)
+    if audio.sample_rate != NORMALIZED_SAMPLE_RATE:
+        samples = soxr.resample(samples, audio.sample_rate, NORMALIZED_SAMPLE_RATE)
+    return samples.astype(np.float32, copy=False)
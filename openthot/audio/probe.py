@@ -0,0 +1,412 @@
+"""
+Read the duration, sample rate and channels count of an audio file.
+
+Most containers tell their duration in their headers, so we first try to
+read it from there, which only costs a few small reads whatever the size
+of the file. Decoding the audio is the last resort, and happens in a thread
+pool so that it never blocks the event loop.
+"""
+import asyncio
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO
+
+import audioread
+import soundfile
+import structlog
+from pydantic import BaseModel
+
+logger = structlog.get_logger(__file__)
+
+# Decoding is costly: keep a bounded number of them running at the same time.
+_decoder_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="audio-probe")
+
+
+class AudioInfo(BaseModel):
+    duration: float
+    sample_rate: int | None = None
+    channels: int | None = None
+    container: str
+
+
+#
+# WAV / RIFF
+#
+def _probe_wav(f: BinaryIO, file_size: int) -> AudioInfo | None:
+    riff = f.read(12)
+    if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+        return None
+    channels = sample_rate = byte_rate = None
+    while chunk_header := f.read(8):
+        if len(chunk_header) < 8:
+            return None
+        chunk_id, chunk_size = struct.unpack("<4sI", chunk_header)
+        if chunk_id == b"fmt ":
+            fmt = f.read(chunk_size + (chunk_size & 1))
+            _, channels, sample_rate, byte_rate = struct.unpack("<HHII", fmt[:12])
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None
+            data_size = chunk_size
+            remaining = file_size - f.tell()
+            if chunk_size == 0xFFFFFFFF or chunk_size > remaining:
+                # Streamed or truncated file: header size is not reliable
+                data_size = remaining
+            return AudioInfo(
+                duration=data_size / byte_rate,
+                sample_rate=sample_rate,
+                channels=channels,
+                container="wav",
+            )
+        else:
+            f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+    return None
+
+
+#
+# MP3
+#
+_MPEG_BITRATES = {  # kbps, indexed by (is MPEG-1, layer)
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MPEG_SAMPLE_RATES = {  # indexed by version bits
+    3: (44100, 48000, 32000),  # MPEG-1
+    2: (22050, 24000, 16000),  # MPEG-2
+    0: (11025, 12000, 8000),  # MPEG-2.5
+}
+
+
+class _MpegFrame(BaseModel):
+    mpeg1: bool
+    layer: int
+    bitrate: int  # bps
+    sample_rate: int
+    channels: int
+    samples: int
+    length: int
+
+
+def _parse_mpeg_frame_header(data: bytes, offset: int = 0) -> _MpegFrame | None:
+    header = data[offset:][:4]
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = (header[1] >> 3) & 0x03
+    layer = 4 - ((header[1] >> 1) & 0x03)
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 0x03
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = _MPEG_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = _MPEG_SAMPLE_RATES[version][sample_rate_index]
+    padding = (header[2] >> 1) & 0x01
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if mpeg1 or layer == 2 else 576
+        length = samples // 8 * bitrate // sample_rate + padding
+    return _MpegFrame(
+        mpeg1=mpeg1,
+        layer=layer,
+        bitrate=bitrate,
+        sample_rate=sample_rate,
+        channels=1 if header[3] >> 6 == 3 else 2,
+        samples=samples,
+        length=length,
+    )
+
+
+def _probe_mp3(f: BinaryIO, file_size: int) -> AudioInfo | None:
+    head = f.read(10)
+    start = 0
+    has_id3 = head[:3] == b"ID3" and len(head) == 10
+    if has_id3:
+        # Skip ID3v2 tag, whose size is a "syncsafe" integer
+        tag_size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+        start = 10 + tag_size + (10 if head[5] & 0x10 else 0)
+    f.seek(start)
+    buffer = f.read(64 * 1024)
+
+    # Find the first frame whose following frame is valid too, to avoid false syncs
+    frame = None
+    position = 0
+    while (position := buffer.find(b"\xff", position)) != -1:
+        frame = _parse_mpeg_frame_header(buffer, position)
+        if frame is not None:
+            following_position = position + frame.length
+            if following_position + 4 > len(buffer) or _parse_mpeg_frame_header(
+                buffer, following_position
+            ):
+                break
+        frame = None
+        position += 1
+    if frame is None or (position != 0 and not has_id3):
+        # Looking further than the start of the file is only worth it after a tag
+        return None
+    frame_data = buffer[position:][: frame.length]
+
+    # VBR files tell their number of frames in a Xing/Info or VBRI header
+    frames_count = None
+    encoder_delay = 0
+    if frame.mpeg1:
+        side_info_size = 17 if frame.channels == 1 else 32
+    else:
+        side_info_size = 9 if frame.channels == 1 else 17
+    xing_offset = 4 + side_info_size
+    xing_tag, flags = struct.unpack_from(">4sI", frame_data, xing_offset)
+    if xing_tag in (b"Xing", b"Info"):
+        offset = xing_offset + 8
+        if flags & 0x01:
+            (frames_count,) = struct.unpack_from(">I", frame_data, offset)
+        offset += sum(
+            size for bit, size in ((1, 4), (2, 4), (4, 100), (8, 4)) if flags & bit
+        )
+        (encoder_tag,) = struct.unpack_from(">4s", frame_data, offset)
+        if encoder_tag in (b"LAME", b"Lavc", b"Lavf"):
+            # Gapless info: samples added by the encoder at the start and end of the stream
+            (delay_padding,) = struct.unpack_from(">I", frame_data, offset + 20)
+            delay_padding &= 0xFFFFFF  # 12 bits of delay, 12 bits of padding
+            encoder_delay = (delay_padding >> 12) + (delay_padding & 0xFFF)
+    elif frame_data[36:40] == b"VBRI":
+        (frames_count,) = struct.unpack_from(">I", frame_data, 50)
+
+    if frames_count:
+        samples = frames_count * frame.samples - encoder_delay
+        duration = max(samples, 0) / frame.sample_rate
+    else:
+        # Constant bitrate: duration is proportional to the size of the stream
+        f.seek(-128, os.SEEK_END)
+        id3v1_size = 128 if file_size >= 128 and f.read(3) == b"TAG" else 0
+        stream_size = file_size - start - position - id3v1_size
+        duration = stream_size * 8 / frame.bitrate
+    return AudioInfo(
+        duration=duration,
+        sample_rate=frame.sample_rate,
+        channels=frame.channels,
+        container="mp3",
+    )
+
+
+#
+# MP4 / M4A / MOV
+#
+_MP4_CONTAINER_BOXES = (b"moov", b"trak", b"mdia", b"minf", b"stbl")
+
+
+def _iter_mp4_boxes(f: BinaryIO, start: int, end: int):
+    """Yields (type, payload start, payload end) of the boxes in [start, end)."""
+    position = start
+    while position + 8 <= end:
+        f.seek(position)
+        size, box_type = struct.unpack(">I4s", f.read(8))
+        header_size = 8
+        if size == 1:
+            (size,) = struct.unpack(">Q", f.read(8))
+            header_size = 16
+        elif size == 0:
+            size = end - position
+        if size < header_size:
+            return
+        yield box_type, position + header_size, min(position + size, end)
+        position += size
+
+
+def _probe_mp4(f: BinaryIO, file_size: int) -> AudioInfo | None:
+    f.seek(0)
+    head = f.read(8)
+    if head[4:8] != b"ftyp":
+        return None
+    duration = sample_rate = channels = None
+    audio_track_duration = None
+
+    def walk(start: int, end: int, in_sound_track: bool = False):
+        nonlocal duration, sample_rate, channels, audio_track_duration
+        for box_type, payload_start, payload_end in _iter_mp4_boxes(f, start, end):
+            if box_type == b"trak":
+                # Only the sound track is relevant
+                if _mp4_track_is_sound(f, payload_start, payload_end):
+                    walk(payload_start, payload_end, in_sound_track=True)
+            elif box_type in _MP4_CONTAINER_BOXES:
+                walk(payload_start, payload_end, in_sound_track)
+            elif box_type == b"mvhd":
+                duration = _parse_mp4_duration(f, payload_start)
+            elif box_type == b"mdhd" and in_sound_track:
+                audio_track_duration = _parse_mp4_duration(f, payload_start)
+            elif box_type == b"stsd" and in_sound_track:
+                # first sample entry: size(4) format(4) reserved(6) index(2)
+                # then version(2) revision(2) vendor(4) channels(2) sample size(2)
+                # compression id(2) packet size(2) sample rate (16.16 fixed point)
+                f.seek(payload_start + 8)
+                entry = f.read(36)
+                if len(entry) == 36:
+                    (channels,) = struct.unpack(">H", entry[24:26])
+                    sample_rate = struct.unpack(">I", entry[32:36])[0] >> 16
+
+    walk(0, file_size)
+    duration = audio_track_duration or duration
+    if duration is None:
+        return None
+    return AudioInfo(
+        duration=duration,
+        sample_rate=sample_rate or None,
+        channels=channels or None,
+        container="mp4",
+    )
+
+
+def _parse_mp4_duration(f: BinaryIO, payload_start: int) -> float | None:
+    """Duration of a `mvhd` or `mdhd` box, both starting with the same fields."""
+    f.seek(payload_start)
+    version = f.read(4)[0]
+    if version == 1:
+        _, _, timescale, duration = struct.unpack(">QQIQ", f.read(28))
+    else:
+        _, _, timescale, duration = struct.unpack(">IIII", f.read(16))
+    return duration / timescale if timescale else None
+
+
+def _mp4_track_is_sound(f: BinaryIO, start: int, end: int) -> bool:
+    for box_type, payload_start, payload_end in _iter_mp4_boxes(f, start, end):
+        if box_type == b"mdia":
+            for sub_type, sub_start, _ in _iter_mp4_boxes(
+                f, payload_start, payload_end
+            ):
+                if sub_type == b"hdlr":
+                    # version/flags(4) pre_defined(4) handler_type(4)
+                    f.seek(sub_start + 8)
+                    return f.read(4) == b"soun"
+    return False
+
+
+#
+# Ogg (Vorbis, Opus)
+#
+_OGG_TAIL_SIZE = 64 * 1024
+
+
+def _probe_ogg(f: BinaryIO, file_size: int) -> AudioInfo | None:
+    f.seek(0)
+    page = f.read(512)
+    if page[:4] != b"OggS" or len(page) < 28:
+        return None
+    (serial,) = struct.unpack("<I", page[14:18])
+    segments_count = page[26]
+    packet = page[27:][segments_count:]
+    pre_skip = 0
+    if packet[:7] == b"\x01vorbis":
+        channels = packet[11]
+        (sample_rate,) = struct.unpack("<I", packet[12:16])
+        granule_rate = sample_rate
+    elif packet[:8] == b"OpusHead":
+        channels = packet[9]
+        (pre_skip, sample_rate) = struct.unpack("<HI", packet[10:16])
+        granule_rate = 48000  # Opus granule positions are always at 48kHz
+    else:
+        return None
+
+    # Last page of the stream tells the position of its last sample
+    tail_size = min(_OGG_TAIL_SIZE, file_size)
+    f.seek(file_size - tail_size)
+    tail = f.read(tail_size)
+    position = len(tail)
+    while (position := tail.rfind(b"OggS", 0, position)) != -1:
+        if position + 18 > len(tail):
+            continue
+        granule, page_serial = struct.unpack_from("<6xqI", tail, position)
+        if page_serial == serial and granule >= 0:
+            return AudioInfo(
+                duration=max(granule - pre_skip, 0) / granule_rate,
+                sample_rate=sample_rate,
+                channels=channels,
+                container="ogg",
+            )
+    return None
+
+
+#
+# FLAC
+#
+def _probe_flac(f: BinaryIO, file_size: int) -> AudioInfo | None:
+    f.seek(0)
+    head = f.read(42)
+    # "fLaC" then STREAMINFO block, which is always the first one
+    if len(head) < 42 or head[:4] != b"fLaC" or head[4] & 0x7F != 0:
+        return None
+    (info,) = struct.unpack(">Q", head[18:26])
+    sample_rate = info >> 44
+    channels = ((info >> 41) & 0x07) + 1
+    total_samples = info & 0xFFFFFFFFF
+    if not sample_rate or not total_samples:
+        return None
+    return AudioInfo(
+        duration=total_samples / sample_rate,
+        sample_rate=sample_rate,
+        channels=channels,
+        container="flac",
+    )
+
+
+_HEADER_PROBES = (_probe_wav, _probe_flac, _probe_ogg, _probe_mp4, _probe_mp3)
+
+
+def probe_audio_header(path: str | Path) -> AudioInfo | None:
+    """
+    Read audio information from the headers of the container, without decoding anything.
+
+    Returns:
+        AudioInfo | None: None if the format is not known or if its headers are not usable.
+    """
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        for header_probe in _HEADER_PROBES:
+            f.seek(0)
+            try:
+                info = header_probe(f, file_size)
+            except (struct.error, IndexError, ValueError, OSError):
+                info = None
+            if info is not None and info.duration > 0:
+                return info
+    return None
+
+
+def probe_audio_decoding(path: str | Path) -> AudioInfo:
+    """
+    Read audio information by handing the file to a decoder.
+    This can be as slow as decoding the whole file: never call it from the event loop.
+    """
+    try:
+        info = soundfile.info(str(path))
+        return AudioInfo(
+            duration=info.duration,
+            sample_rate=info.samplerate,
+            channels=info.channels,
+            container="soundfile",
+        )
+    except soundfile.LibsndfileError:
+        with audioread.audio_open(str(path)) as audio:
+            return AudioInfo(
+                duration=audio.duration,
+                sample_rate=audio.samplerate,
+                channels=audio.channels,
+                container="audioread",
+            )
+
+
+async def probe_audio(path: str | Path) -> AudioInfo:
+    """
+    Read audio information, from the headers of the container if possible,
+    otherwise by decoding the file in a thread pool.
+    """
+    if info := probe_audio_header(path):
+        return info
+    await logger.adebug("No usable audio header, decoding file", path=str(path))
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_decoder_executor, probe_audio_decoding, path)
@@ -0,0 +1,218 @@
+"""
+Waveform peaks, i.e. the min and max of the audio signal over successive
+time windows, which is all a player needs to draw the waveform.
+
+Peaks are computed at several resolutions (in peaks per second), the
+finest being MAX_PEAKS_PER_SECOND, each next one being half the previous.
+They are stored next to the audio file, in a compact binary format:
+
+    header      "<4sBBHd"  magic (b"OTPK"), version, levels count, reserved, duration (s)
+    levels      "<fI"      peaks per second, peaks count          (one per level)
+    peaks       int8       min, max, min, max, ... in [-127, 127] (one array per level)
+
+All integers are little-endian. A single level is served in the same format.
+"""
+import struct
+from pathlib import Path
+from typing import AsyncIterator
+
+import numpy as np
+import structlog
+from pydantic import BaseModel
+
+from openthot import object_storage
+from openthot.audio.decode import DecodedAudio
+
+logger = structlog.get_logger(__file__)
+
+MAX_PEAKS_PER_SECOND = 128
+MIN_PEAKS_PER_SECOND = 1
+
+MAGIC = b"OTPK"
+VERSION = 1
+HEADER = struct.Struct("<4sBBHd")
+LEVEL = struct.Struct("<fI")
+
+
+class WaveformLevel(BaseModel):
+    peaks_per_second: float
+    count: int
+    offset: int  # where its peaks start in the encoded waveform
+
+
+class WaveformPeaks:
+    """Peaks of an audio file, at every resolution."""
+
+    duration: float
+    levels: list[tuple[float, np.ndarray]]  # peaks per second, (count, 2) int8 array
+
+    def __init__(self, duration: float, levels: list[tuple[float, np.ndarray]]):
+        self.duration = duration
+        self.levels = levels
+
+    def encode(self) -> bytes:
+        header = HEADER.pack(MAGIC, VERSION, len(self.levels), 0, self.duration)
+        table = b"".join(LEVEL.pack(pps, len(peaks)) for pps, peaks in self.levels)
+        return header + table + b"".join(peaks.tobytes() for _, peaks in self.levels)
+
+    @classmethod
+    def decode(cls, data: bytes) -> "WaveformPeaks":
+        duration, levels = decode_header(data)
+        return cls(
+            duration,
+            [
+                (
+                    level.peaks_per_second,
+                    np.frombuffer(
+                        data, dtype=np.int8, count=level.count * 2, offset=level.offset
+                    ).reshape(-1, 2),
+                )
+                for level in levels
+            ],
+        )
+
+
+def decode_header(data: bytes) -> tuple[float, list[WaveformLevel]]:
+    """Duration, and levels of an encoded waveform, given (at least) its first bytes."""
+    magic, version, levels_count, _, duration = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a waveform")
+    offset = HEADER.size + LEVEL.size * levels_count
+    levels = []
+    for i in range(levels_count):
+        pps, count = LEVEL.unpack_from(data, HEADER.size + LEVEL.size * i)
+        levels.append(WaveformLevel(peaks_per_second=pps, count=count, offset=offset))
+        offset += count * 2
+    return duration, levels
+
+
+def _quantize(samples: np.ndarray) -> np.ndarray:
+    return np.clip(np.round(samples * 127), -127, 127).astype(np.int8)
+
+
+class PeaksAccumulator:
+    """
+    Compute the finest peaks of a signal as it is being decoded, block by block.
+    The `k`-th peak covers samples `[round(k * spp), round((k + 1) * spp))`,
+    where `spp` is the (not necessarily integer) number of samples per peak.
+    """
+
+    def __init__(self, sample_rate: int) -> None:
+        self.sample_rate = sample_rate
+        self._samples_per_peak = sample_rate / MAX_PEAKS_PER_SECOND
+        self._buffer = np.empty(0, dtype=np.float32)
+        self._offset = 0  # index of the first sample of `_buffer` in the whole signal
+        self._count = 0  # number of peaks computed so far
+        self._peaks: list[np.ndarray] = []
+
+    def _bounds(self, first: int, last: int) -> np.ndarray:
+        return np.round(np.arange(first, last + 1) * self._samples_per_peak).astype(
+            np.int64
+        )
+
+    def _reduce(self, samples: np.ndarray, starts: np.ndarray) -> None:
+        mins = np.minimum.reduceat(samples, starts)
+        maxs = np.maximum.reduceat(samples, starts)
+        self._peaks.append(_quantize(np.stack([mins, maxs], axis=1)))
+
+    def feed(self, samples: np.ndarray) -> None:
+        buffer = np.concatenate([self._buffer, samples])
+        end = self._offset + len(buffer)
+        count = int(end // self._samples_per_peak)
+        while count > self._count and self._bounds(count, count)[0] > end:
+            count -= 1
+        if count > self._count:
+            bounds = self._bounds(self._count, count) - self._offset
+            consumed = int(bounds[-1])
+            self._reduce(buffer[:consumed], bounds[:-1])
+            buffer = buffer[consumed:]
+            self._offset += consumed
+            self._count = count
+        self._buffer = buffer
+
+    def result(self) -> WaveformPeaks:
+        duration = (self._offset + len(self._buffer)) / self.sample_rate
+        if len(self._buffer):
+            self._reduce(self._buffer, np.zeros(1, dtype=np.int64))
+            self._buffer = self._buffer[:0]
+        peaks = (
+            np.concatenate(self._peaks)
+            if self._peaks
+            else np.empty((0, 2), dtype=np.int8)
+        )
+        levels = [(float(MAX_PEAKS_PER_SECOND), peaks)]
+        while levels[-1][0] / 2 >= MIN_PEAKS_PER_SECOND and len(levels[-1][1]) > 1:
+            finer = levels[-1][1]
+            starts = np.arange(0, len(finer), 2)
+            coarser = np.stack(
+                [
+                    np.minimum.reduceat(finer[:, 0], starts),
+                    np.maximum.reduceat(finer[:, 1], starts),
+                ],
+                axis=1,
+            )
+            levels.append((levels[-1][0] / 2, coarser))
+        return WaveformPeaks(duration, levels)
+
+
+def compute_waveform(path: str | Path) -> WaveformPeaks:
+    """Decode an audio file to compute its peaks. CPU bound, and blocking."""
+    audio = DecodedAudio(path)
+    accumulator = PeaksAccumulator(audio.sample_rate)
+    for block in audio:
+        accumulator.feed(block)
+    return accumulator.result()
+
+
+def waveform_location(audio_sha256: str) -> str:
+    return object_storage.derived_location(audio_sha256, object_storage.WAVEFORM_SUFFIX)
+
+
+async def store_waveform(audio_sha256: str, peaks: WaveformPeaks) -> str:
+    return await object_storage.get_storage_backend().put_bytes(
+        object_storage.content_key(audio_sha256, object_storage.WAVEFORM_SUFFIX),
+        peaks.encode(),
+    )
+
+
+async def read_waveform_level(
+    audio_sha256: str, peaks_per_second: float
+) -> tuple[int, AsyncIterator[bytes]] | None:
+    """
+    Stream a single level of the stored peaks of an audio file, encoded as a waveform:
+    the coarsest one with at least `peaks_per_second`, or else the finest one.
+    Only that level is read from the object storage.
+
+    Returns:
+        tuple[int, AsyncIterator[bytes]] | None: Length and content of the encoded level,
+            or `None` if no peaks were stored for this audio file.
+    """
+    location = waveform_location(audio_sha256)
+    if await object_storage.stat_audio_file(location) is None:
+        return None
+    # Levels are halved until 1 peak per second, so their table is always small
+    max_levels = int(np.log2(MAX_PEAKS_PER_SECOND / MIN_PEAKS_PER_SECOND)) + 1
+    head = b"".join(
+        [
+            chunk
+            async for chunk in object_storage.read_audio_file(
+                location, 0, HEADER.size + LEVEL.size * max_levels
+            )
+        ]
+    )
+    duration, levels = decode_header(head)
+    candidates = [lvl for lvl in levels if lvl.peaks_per_second >= peaks_per_second]
+    level = candidates[-1] if candidates else levels[0]
+    header = HEADER.pack(MAGIC, VERSION, 1, 0, duration) + LEVEL.pack(
+        level.peaks_per_second, level.count
+    )
+
+    async def content() -> AsyncIterator[bytes]:
+        yield header
+        if level.count:
+            async for chunk in object_storage.read_audio_file(
+                location, level.offset, level.offset + level.count * 2
+            ):
+                yield chunk
+
+    return len(header) + level.count * 2, content()
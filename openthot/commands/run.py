@@ -6,6 +6,8 @@ from typing import Optional
 
 import typer
 
+from openthot.tasks.scheduling import QueueClass
+
 run = typer.Typer(help="Run a service.")
 
 
@@ -82,6 +84,12 @@ def worker(
     log_level: LogLevel = typer.Option(
         LogLevel.info, help="Logging level", case_sensitive=False
     ),
+    queue: list[QueueClass] = typer.Option(
+        list(QueueClass),
+        help="Queue(s) of transcriptions to process, by duration of their audio, "
+        + "or refinements of drafts (all of them by default).",
+        case_sensitive=False,
+    ),
     gid: Optional[int] = typer.Option(
         None, help="Unix group to use when starting the worker"
     ),
@@ -98,6 +106,7 @@ def worker(
         f"--concurrency={concurrency}",
         f"--max-tasks-per-child={max_tasks_per_child}",
         f"--loglevel={log_level.value}",
+        f"--queues={','.join(q.queue for q in queue)}",
     ]
 
     if gid is not None:
@@ -1,11 +1,28 @@
+import importlib.util
+import tempfile
 from enum import Enum
 from functools import lru_cache
+from pathlib import Path
 from typing import Literal
 
 import structlog
-from pydantic import AnyHttpUrl, BaseModel, BaseSettings, Extra, Field
+from pydantic import (
+    AnyHttpUrl,
+    BaseModel,
+    BaseSettings,
+    Extra,
+    Field,
+    confloat,
+    conint,
+    root_validator,
+    validator,
+)
 
 from openthot.models.transcript import TranscriptorSource
+from openthot.models.transcript.encoding import (
+    TranscriptCompression,
+    TranscriptEncoding,
+)
 
 logger = structlog.get_logger(__file__)
 
@@ -16,6 +33,14 @@ class AsrComputeType(str, Enum):
     float32 = "float32"
 
 
+class AsrEngineMode(str, Enum):
+    # Models are loaded once per worker process, and kept warm between transcriptions.
+    # Every process holds the models of all the in-process engines, slots or not.
+    in_process = "in_process"
+    # Each transcription spawns the engine's CLI, which loads the model again
+    subprocess = "subprocess"
+
+
 class AsrModelSize(str, Enum):
     tiny = "tiny"
     small = "small"
@@ -37,6 +62,7 @@ class WhisperSettings(BaseSettings):
 
     engine: Literal[TranscriptorSource.whisper]
     model_size: AsrModelSize
+    mode: AsrEngineMode = AsrEngineMode.in_process
 
 
 class WhisperXSettings(BaseSettings):
@@ -46,30 +72,210 @@ class WhisperXSettings(BaseSettings):
     model_size: AsrModelSize
     compute_type: AsrComputeType
     hf_token: str
+    mode: AsrEngineMode = AsrEngineMode.in_process
 
 
 class WordcabSettings(BaseSettings):
     """Settings that are specific to Wordcab"""
 
     engine: Literal[TranscriptorSource.wordcab]
-    url: AnyHttpUrl
+    # One server, and/or several among which requests are balanced
+    url: AnyHttpUrl | None = None
+    urls: list[AnyHttpUrl] = []
+    # Probed at most every `health_check_interval_s`, from the root of each server
+    health_path: str = "/healthz"
+    health_check_interval_s: confloat(gt=0.0) = 30.0  # type: ignore
+    # How long a failing server is left out
+    ejection_s: confloat(ge=0.0) = 60.0  # type: ignore
+    connect_timeout_s: confloat(gt=0.0) = 10.0  # type: ignore
+    # The whole transcription runs while the request is pending
+    read_timeout_s: confloat(gt=0.0) = 3600.0  # type: ignore
+    # Retries on connection errors and 5xx, waiting up to `retry_backoff_s * 2**retry`
+    max_retries: conint(ge=0, le=10) = 3  # type: ignore
+    retry_backoff_s: confloat(ge=0.0) = 1.0  # type: ignore
+    # Requests in flight at once, per worker process
+    max_concurrent_requests: conint(gt=0) = 4  # type: ignore
+
+    @validator("urls", always=True)
+    def include_url(cls, v, values):
+        urls = ([values["url"]] if values.get("url") else []) + v
+        if not urls:
+            raise ValueError("`url` or `urls` is required")
+        return urls
+
+
+AsrEngineSettings = WhisperSettings | WhisperXSettings | WordcabSettings
+# Name of the engine of the `asr` settings, among those of `asr_engines`
+DEFAULT_ASR_ENGINE = "default"
+
+
+class ChunkingSettings(BaseModel):
+    """
+    Settings of the transcription of long audio files in chunks, split at pauses
+    in speech and transcribed in parallel (Whisper and WhisperX only)
+    """
+
+    enabled: bool = False
+    chunk_duration_s: confloat(gt=0.0) = 600.0  # type: ignore
+    # Processes transcribing chunks, per engine and worker process (e.g. per Celery
+    # `--concurrency`), each of them loading its own model
+    max_workers: conint(gt=0) = 2  # type: ignore
+    # Spread chunks across Celery workers (of any node) rather than local processes
+    distributed: bool = False
+
+
+class S3StorageSettings(BaseModel):
+    """
+    Settings of an S3-compatible object storage (AWS, MinIO, Ceph, ...).
+    When set, audio files are stored there instead of `object_storage_path`,
+    which is still used for uploads in progress and temporary copies.
+    """
+
+    endpoint_url: AnyHttpUrl
+    bucket: str
+    access_key_id: str
+    secret_access_key: str
+    region: str = "us-east-1"
+    prefix: str = ""
+
+
+class AsrSlotsSettings(BaseModel):
+    """
+    Limits of the transcriptions running at once, in slots: each one takes as many
+    as its model weighs (see `openthot.asr.slots.model_weight`). No limit by default.
+    """
+
+    # Slots of the workers of a host, which share `lock_dir`
+    host_capacity: conint(gt=0) | None = None  # type: ignore
+    lock_dir: Path = Path(tempfile.gettempdir()) / "openthot-asr-slots"
+    # Slots of all the workers sharing the database
+    cluster_capacity: conint(gt=0) | None = None  # type: ignore
+    # Slots of a worker that died without releasing them are freed after `lease_s`
+    lease_s: confloat(gt=0.0) = 300.0  # type: ignore
+    poll_interval_s: confloat(gt=0.0) = 2.0  # type: ignore
+
+
+class BatchingSettings(BaseModel):
+    """
+    Settings of the transcription of short interviews (see `SchedulingSettings`)
+    in batches, i.e. in a single run of the ASR engine
+    """
+
+    enabled: bool = False
+    max_size: conint(ge=2, le=64) = 8  # type: ignore
+    # How long a batch may wait for more interviews, while others keep being queued
+    max_wait_s: confloat(ge=0.0) = 5.0  # type: ignore
+
+
+class SchedulingSettings(BaseModel):
+    """
+    Settings of the scheduling of transcriptions: they are routed to a queue
+    by duration (see `openthot.tasks.scheduling`), and users get a fair share.
+    """
+
+    # Audio up to `short_max_duration_s` goes to the short queue, from
+    # `long_min_duration_s` to the long one, and in between to the medium one
+    short_max_duration_s: confloat(gt=0.0) = 600.0  # type: ignore
+    long_min_duration_s: confloat(gt=0.0) = 3600.0  # type: ignore
+    # Beyond it, transcriptions of a user wait for their others to be done
+    max_in_flight_per_user: conint(gt=0) | None = None  # type: ignore
+    defer_countdown_s: confloat(gt=0.0) = 30.0  # type: ignore
+    # After so many deferrals, a transcription runs anyway
+    max_deferrals: conint(ge=0) = 20  # type: ignore
+    # Transcriptions of a worker that died stop counting after `lease_s`
+    lease_s: confloat(gt=0.0) = 300.0  # type: ignore
+
+
+class RoutingSettings(BaseModel):
+    """
+    Policy choosing the ASR engine of the interviews that do not request one
+    (see `openthot.asr.registry.choose_engine`), by name. The default engine
+    is used when none is set.
+    """
+
+    # Engines of short and long audio files (see `SchedulingSettings`)
+    short_engine: str | None = None
+    long_engine: str | None = None
+    # Engine of the transcriptions that would wait for the slots of their host
+    # (see `AsrSlotsSettings.host_capacity`), e.g. a remote one
+    overflow_engine: str | None = None
+
+
+class TwoPassSettings(BaseModel):
+    """
+    Settings of two-pass transcriptions: a draft is first transcribed by a fast engine
+    and shown, then replaced by the transcript of the engine of the interview, which
+    another task transcribes later on (see `openthot.asr.process.process_audio`).
+    Disabled unless `draft_engine` is set.
+    """
+
+    # Engine of drafts, by name (see `Settings.asr_engines`), e.g. a tiny model
+    draft_engine: str | None = None
+    # Shorter audio files are transcribed once, as their draft would hardly come sooner
+    min_duration_s: confloat(ge=0.0) = 600.0  # type: ignore
+
+
+class TranscriptStorageSettings(BaseModel):
+    """
+    Settings of the storage of normalized transcripts in the database
+    (see `openthot.models.transcript.encoding`). Changing them only applies to
+    the transcripts stored afterwards, the others being read as they were stored.
+    """
+
+    encoding: TranscriptEncoding = TranscriptEncoding.binary
+    compression: TranscriptCompression = TranscriptCompression.none
+
+    @validator("compression")
+    def check_compression(cls, v):
+        if v == TranscriptCompression.zstd and not importlib.util.find_spec(
+            "zstandard"
+        ):
+            raise ValueError("`zstd` compression requires the `zstandard` package")
+        return v
 
 
 class Settings(BaseSettings):
     app_name: str = "OpenThot"
-    asr: WhisperSettings | WhisperXSettings | WordcabSettings = Field(
-        ..., discriminator="engine"
-    )
+    asr: AsrEngineSettings = Field(..., discriminator="engine")
+    # Other engines, by name, that interviews can request or be routed to
+    asr_engines: dict[str, AsrEngineSettings] = {}
+    asr_routing: RoutingSettings = RoutingSettings()
+    asr_two_pass: TwoPassSettings = TwoPassSettings()
+    asr_chunking: ChunkingSettings = ChunkingSettings()
+    asr_slots: AsrSlotsSettings = AsrSlotsSettings()
+    asr_scheduling: SchedulingSettings = SchedulingSettings()
+    asr_batching: BatchingSettings = BatchingSettings()
     celery: Celery
     database_url: str
     users_token_root_secret: str
     object_storage_path: str
+    object_storage_s3: S3StorageSettings | None = None
+    transcript_storage: TranscriptStorageSettings = TranscriptStorageSettings()
 
     class Config:
         env_file = ".env", ".env.prod", "secrets.env"
         env_nested_delimiter = "__"
         extra = Extra.forbid
 
+    @root_validator(skip_on_failure=True)
+    def check_asr_engine_names(cls, values):
+        if DEFAULT_ASR_ENGINE in values["asr_engines"]:
+            raise ValueError(f"`{DEFAULT_ASR_ENGINE}` is the engine of `asr`")
+        names = {DEFAULT_ASR_ENGINE, *values["asr_engines"]}
+        for field, name in values["asr_routing"]:
+            if name is not None and name not in names:
+                raise ValueError(f"`asr_routing.{field}`: unknown engine {name}")
+        draft_engine = values["asr_two_pass"].draft_engine
+        if draft_engine is not None and draft_engine not in names:
+            raise ValueError(
+                f"`asr_two_pass.draft_engine`: unknown engine {draft_engine}"
+            )
+        return values
+
+    def named_asr_engines(self) -> dict[str, AsrEngineSettings]:
+        """Settings of all the ASR engines, by name."""
+        return {DEFAULT_ASR_ENGINE: self.asr, **self.asr_engines}
+
 
 @lru_cache()
 def get_settings():
@@ -1,22 +1,41 @@
 import json
 from collections.abc import Sequence
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import structlog
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy import select
+from sqlalchemy import Row, delete, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
 
-from openthot.db.schemas import SqlaInterview, SqlaUserBase
+from openthot import object_storage
+from openthot.config import get_settings
+from openthot.db.schemas import (
+    SqlaAsrSlots,
+    SqlaAudioFile,
+    SqlaInterview,
+    SqlaPartialSegment,
+    SqlaTranscriptionLease,
+    SqlaTranscriptionProgress,
+    SqlaUpload,
+    SqlaUserBase,
+)
 from openthot.models.interview import (
     DBInputInterviewCreate,
     DBInputInterviewUpdate,
     InterviewId,
     InterviewSpeakers,
+    InterviewStatus,
 )
+from openthot.models.transcript import TranscriptorSource
+from openthot.models.transcript.encoding import encode_transcript
+from openthot.models.transcript.openthot import PartialSegment
+from openthot.models.upload import DBInputUploadCreate
 from openthot.models.users import UserId
 
 logger = structlog.get_logger(__file__)
+storage_settings = get_settings().transcript_storage
 
 
 async def create_interview(
@@ -28,6 +47,9 @@ async def create_interview(
     db_interview.audio_location = str(db_interview.audio_location)
     db_interview.creator_id = user.id
     session.add(db_interview)
+    await _add_audio_references(
+        session, db_interview.audio_location, 1, db_interview.audio_sha256
+    )
     await session.commit()
     await session.refresh(db_interview)
     return db_interview
@@ -39,16 +61,247 @@ async def delete_interview(
     interview = await get_interview(session, user, interview_id)
     if interview is None:
         return False
+    await clear_partial_segments(session, interview_id)
     await session.delete(interview)
+    await _add_audio_references(session, interview.audio_location, -1)
     await session.commit()
+    await _remove_unreferenced_audio_file(
+        session, interview.audio_location, interview.audio_sha256
+    )
     return True
 
 
+async def _add_audio_references(
+    session: AsyncSession,
+    audio_location: str,
+    count: int,
+    audio_sha256: str | None = None,
+) -> None:
+    """Count references to an audio file (or drop them), within the transaction."""
+    if count > 0:
+        insert = (
+            postgresql.insert
+            if session.bind.dialect.name == "postgresql"
+            else sqlite.insert
+        )
+        await session.execute(
+            insert(SqlaAudioFile)
+            .values(location=audio_location, sha256=audio_sha256, reference_count=0)
+            .on_conflict_do_nothing()
+        )
+    # i.e. atomically, whatever the references taken or dropped meanwhile
+    await session.execute(
+        update(SqlaAudioFile)
+        .where(SqlaAudioFile.location == audio_location)
+        .values(reference_count=SqlaAudioFile.reference_count + count)
+    )
+
+
+async def _remove_unreferenced_audio_file(
+    session: AsyncSession, audio_location: str, audio_sha256: str | None
+) -> bool:
+    """
+    Remove an audio file (and files computed from it, unless other audio files have
+    the same content) from the object storage if its committed references are all
+    dropped. Its row stays locked meanwhile,
+    so that no one can take a reference to it (e.g. upload the same audio) until
+    it is removed.
+    """
+    unreferenced = await session.execute(
+        delete(SqlaAudioFile).where(
+            SqlaAudioFile.location == audio_location,
+            SqlaAudioFile.reference_count <= 0,
+        )
+    )
+    if unreferenced.rowcount != 1:
+        await session.commit()
+        return False
+    try:
+        if audio_sha256 and not await _audio_content_referenced(session, audio_sha256):
+            await object_storage.delete_derived_files(audio_sha256)
+        removed = await object_storage.delete_audio_file(audio_location)
+    except BaseException:
+        await session.rollback()
+        raise
+    await session.commit()
+    return removed
+
+
+async def _audio_content_referenced(session: AsyncSession, audio_sha256: str) -> bool:
+    """
+    Whether other audio files have this content, e.g. stored before their content
+    address was their location, and so share the files computed from it.
+    """
+    return bool(
+        await session.scalar(
+            select(func.count())
+            .select_from(SqlaAudioFile)
+            .where(SqlaAudioFile.sha256 == audio_sha256)
+        )
+        or await session.scalar(
+            select(func.count())
+            .select_from(SqlaInterview)
+            .where(SqlaInterview.audio_sha256 == audio_sha256)
+        )
+    )
+
+
+async def reference_audio_file(
+    session: AsyncSession, audio_location: str, audio_sha256: str | None = None
+) -> None:
+    """
+    Take a reference to an audio file, e.g. before storing an upload under
+    the location of the same audio, so that it is not removed meanwhile
+    (see `release_audio_file`). Interviews take their own.
+    """
+    await _add_audio_references(session, audio_location, 1, audio_sha256)
+    await session.commit()
+
+
+async def release_audio_file(
+    session: AsyncSession, audio_location: str, audio_sha256: str | None = None
+) -> bool:
+    """
+    Drop a reference taken by `reference_audio_file`, and remove the audio file from
+    the object storage if no one else relies on it, as the same audio file is shared
+    by all interviews with the same content.
+    """
+    await _add_audio_references(session, audio_location, -1)
+    await session.commit()
+    return await _remove_unreferenced_audio_file(session, audio_location, audio_sha256)
+
+
+async def _lock_admission(session: AsyncSession, pool: str):
+    """
+    Serialize the admissions to `pool` until the end of the transaction, so that
+    each of them counts all those before. Postgres takes a transaction-level
+    advisory lock, while SQLite serializes writing transactions anyway (admissions
+    write first).
+    """
+    if session.bind.dialect.name == "postgresql":
+        await session.execute(select(func.pg_advisory_xact_lock(func.hashtext(pool))))
+
+
+async def acquire_transcription_lease(
+    session: AsyncSession,
+    user_id: UserId,
+    interview_id: InterviewId,
+    max_in_flight: int,
+    lease_s: float,
+) -> int | None:
+    """
+    Count the transcription of an interview in the running ones of its user,
+    if they are fewer than `max_in_flight` (not counting any other lease of the very
+    same interview, e.g. of a previous attempt). Requests of a user are served one
+    at a time, as for `acquire_asr_slots`.
+
+    Returns:
+        int | None: The id of the lease, to renew and release it, or `None`.
+    """
+    now = datetime.utcnow()
+    await _lock_admission(session, f"{SqlaTranscriptionLease.__tablename__}:{user_id}")
+    await session.execute(
+        delete(SqlaTranscriptionLease).where(
+            (SqlaTranscriptionLease.expires_ts <= now)
+            | (SqlaTranscriptionLease.interview_id == interview_id)
+        )
+    )
+    lease = SqlaTranscriptionLease(
+        interview_id=interview_id,
+        user_id=user_id,
+        expires_ts=now + timedelta(seconds=lease_s),
+    )
+    session.add(lease)
+    await session.flush()
+    in_flight = await session.scalar(
+        select(func.count())
+        .select_from(SqlaTranscriptionLease)
+        .where(SqlaTranscriptionLease.user_id == user_id)
+    )
+    if in_flight > max_in_flight:
+        await release_transcription_lease(session, lease.id)
+        return None
+    await session.commit()
+    return lease.id
+
+
+async def renew_transcription_lease(
+    session: AsyncSession, lease_id: int, lease_s: float
+):
+    await session.execute(
+        update(SqlaTranscriptionLease)
+        .where(SqlaTranscriptionLease.id == lease_id)
+        .values(expires_ts=datetime.utcnow() + timedelta(seconds=lease_s))
+    )
+    await session.commit()
+
+
+async def release_transcription_lease(session: AsyncSession, lease_id: int):
+    await session.execute(
+        delete(SqlaTranscriptionLease).where(SqlaTranscriptionLease.id == lease_id)
+    )
+    await session.commit()
+
+
+async def get_pending_interview_ids(
+    session: AsyncSession,
+    max_audio_duration: float,
+    limit: int,
+    exclude: InterviewId | None = None,
+    asr_engine: str | None = None,
+) -> Sequence[InterviewId]:
+    """
+    Interviews (of any user) not transcribed yet, the first uploaded first,
+    among those requesting `asr_engine` (or none).
+    """
+    return (
+        await session.scalars(
+            select(SqlaInterview.id)
+            .where(
+                SqlaInterview.status == InterviewStatus.uploaded,
+                SqlaInterview.audio_duration <= max_audio_duration,
+                SqlaInterview.id != exclude,
+                SqlaInterview.asr_engine.is_(None)
+                if asr_engine is None
+                else SqlaInterview.asr_engine == asr_engine,
+            )
+            .order_by(SqlaInterview.upload_ts, SqlaInterview.id)
+            .limit(limit)
+        )
+    ).all()
+
+
+async def claim_interview(
+    session: AsyncSession, interview_id: InterviewId
+) -> SqlaInterview | None:
+    """
+    Mark an interview not transcribed yet as processing, unless someone else
+    did first (e.g. another batch of transcriptions).
+    """
+    claimed = await session.execute(
+        update(SqlaInterview)
+        .where(
+            SqlaInterview.id == interview_id,
+            SqlaInterview.status == InterviewStatus.uploaded,
+        )
+        .values(status=InterviewStatus.processing)
+    )
+    await session.commit()
+    if claimed.rowcount != 1:
+        return None
+    return await session.get(SqlaInterview, interview_id, populate_existing=True)
+
+
 async def get_interview(
     session: AsyncSession,
     user: SqlaUserBase | UserId,
     interview_id: InterviewId,
+    with_raw: bool = True,
 ) -> SqlaInterview | None:
+    """
+    Without `with_raw`, the (possibly large) raw transcript is not loaded
+    unless refreshed, e.g. when it is not normalized.
+    """
     creator_id = None
     if isinstance(user, UserId):
         creator_id = user
@@ -58,12 +311,86 @@ async def get_interview(
         raise TypeError(f"`user` is type {type(user)}")
     interview = await session.scalar(
         select(SqlaInterview)
+        .options(*([] if with_raw else [defer(SqlaInterview.transcript_raw)]))
         .where(SqlaInterview.id == interview_id)
         .where(SqlaInterview.creator_id == creator_id)
     )
     return interview
 
 
+async def get_interview_by_id(
+    session: AsyncSession, interview_id: InterviewId
+) -> SqlaInterview | None:
+    """An interview whatever its creator, e.g. for tasks handling several users."""
+    return await session.get(SqlaInterview, interview_id)
+
+
+async def get_interview_audio(
+    session: AsyncSession,
+    user: SqlaUserBase,
+    interview_id: InterviewId,
+) -> Row[tuple[str, str | None]] | None:
+    """
+    Where the audio of an interview is stored, and its content hash.
+    Only these columns are loaded, not e.g. the (possibly large) transcript.
+    """
+    return (
+        await session.execute(
+            select(SqlaInterview.audio_location, SqlaInterview.audio_sha256)
+            .where(SqlaInterview.id == interview_id)
+            .where(SqlaInterview.creator_id == user.id)
+        )
+    ).one_or_none()
+
+
+async def get_interview_transcript(
+    session: AsyncSession,
+    user: SqlaUserBase,
+    interview_id: InterviewId,
+) -> Row[tuple[InterviewStatus, bytes | None, bool, datetime | None]] | None:
+    """
+    Status of an interview, its normalized transcript, whether that is a draft,
+    and when it was stored. Only these columns are loaded, not e.g. the raw transcript.
+    """
+    return (
+        await session.execute(
+            select(
+                SqlaInterview.status,
+                SqlaInterview.transcript,
+                SqlaInterview.transcript_draft,
+                SqlaInterview.transcript_ts,
+            )
+            .where(SqlaInterview.id == interview_id)
+            .where(SqlaInterview.creator_id == user.id)
+        )
+    ).one_or_none()
+
+
+async def get_reusable_transcript_interview(
+    session: AsyncSession,
+    interview: SqlaInterview,
+    transcript_source: TranscriptorSource,
+    transcript_model: str | None,
+) -> SqlaInterview | None:
+    """
+    Look for another interview (whatever its creator) with the very same
+    audio content, that was already transcripted by the same engine and model.
+    """
+    if not interview.audio_sha256:
+        return None
+    return await session.scalar(
+        select(SqlaInterview)
+        .where(SqlaInterview.audio_sha256 == interview.audio_sha256)
+        .where(SqlaInterview.id != interview.id)
+        .where(SqlaInterview.status == InterviewStatus.transcripted)
+        .where(SqlaInterview.transcript_source == transcript_source)
+        .where(SqlaInterview.transcript_model == transcript_model)
+        .where(SqlaInterview.transcript_raw.is_not(None))
+        .order_by(SqlaInterview.transcript_ts.desc())
+        .limit(1)
+    )
+
+
 async def get_interviews(
     session: AsyncSession,
     user: SqlaUserBase,
@@ -77,7 +404,7 @@ async def get_interviews(
         select_stm = [
             getattr(SqlaInterview, col.key)
             for col in SqlaInterview.__table__.columns
-            if col.key != "transcript_raw"
+            if col.key not in ("transcript_raw", "transcript")
         ]
 
         statement = select(*select_stm).where(SqlaInterview.creator == user)
@@ -90,7 +417,8 @@ async def update_interview(
     interview_db: SqlaInterview,
     interview_upd: DBInputInterviewUpdate,
 ):
-    target_data = jsonable_encoder(interview_db)
+    # i.e. not `jsonable_encoder(interview_db)`, which cannot encode binary columns
+    target_data = [column.key for column in SqlaInterview.__table__.columns]
     update_data = interview_upd.dict(exclude_unset=True)
     for field in target_data:
         if field in update_data:
@@ -98,7 +426,9 @@ async def update_interview(
                 w = f"Received {field} to be set to {update_data[field]}, but will be overwritten."
                 logger.warn(
                     w,
-                    interview_db=jsonable_encoder(interview_db),
+                    interview_db=jsonable_encoder(
+                        interview_db, exclude={"transcript", "transcript_raw"}
+                    ),
                     interview_upd=update_data,
                 )
             elif field == "audio_location":
@@ -120,6 +450,19 @@ async def update_interview(
 
             elif field == "transcript_raw":
                 setattr(interview_db, field, json.dumps(update_data[field]))
+            elif field == "transcript":
+                transcript = interview_upd.transcript
+                setattr(
+                    interview_db,
+                    field,
+                    encode_transcript(
+                        transcript,
+                        storage_settings.encoding,
+                        storage_settings.compression,
+                    )
+                    if transcript is not None
+                    else None,
+                )
             else:
                 setattr(interview_db, field, update_data[field])
     interview_db.update_ts = datetime.utcnow()
@@ -127,3 +470,159 @@ async def update_interview(
     await session.commit()
     await session.refresh(interview_db)
     return interview_db
+
+
+async def start_transcription_progress(
+    session: AsyncSession, interview_id: InterviewId
+):
+    """
+    (Re)start tracking the progress of the transcription of an interview,
+    dropping the partial transcript of any previous attempt.
+    """
+    now = datetime.utcnow()
+    await session.execute(
+        delete(SqlaPartialSegment).where(
+            SqlaPartialSegment.interview_id == interview_id
+        )
+    )
+    progress = await session.get(SqlaTranscriptionProgress, interview_id)
+    if progress is None:
+        progress = SqlaTranscriptionProgress(interview_id=interview_id)
+        session.add(progress)
+    progress.fraction = 0.0
+    progress.start_ts = now
+    progress.update_ts = now
+    await session.commit()
+
+
+async def update_transcription_progress(
+    session: AsyncSession,
+    interview_id: InterviewId,
+    fraction: float,
+    segments: Sequence[PartialSegment] = (),
+):
+    """Update the progress of a transcription, appending its latest segments."""
+    await session.execute(
+        update(SqlaTranscriptionProgress)
+        .where(SqlaTranscriptionProgress.interview_id == interview_id)
+        .values(fraction=fraction, update_ts=datetime.utcnow())
+    )
+    await add_partial_segments(session, interview_id, segments)
+
+
+async def add_partial_segments(
+    session: AsyncSession, interview_id: InterviewId, segments: Sequence[PartialSegment]
+):
+    session.add_all(
+        SqlaPartialSegment(interview_id=interview_id, **segment.dict())
+        for segment in segments
+    )
+    await session.commit()
+
+
+async def get_partial_segments(
+    session: AsyncSession, interview_id: InterviewId
+) -> Sequence[SqlaPartialSegment]:
+    """Segments of a transcript still running, in the order of the audio."""
+    return (
+        await session.scalars(
+            select(SqlaPartialSegment)
+            .where(SqlaPartialSegment.interview_id == interview_id)
+            .order_by(SqlaPartialSegment.start, SqlaPartialSegment.id)
+        )
+    ).all()
+
+
+async def clear_partial_segments(session: AsyncSession, interview_id: InterviewId):
+    """Drop the partial transcript of an interview, e.g. once the whole one is stored."""
+    await session.execute(
+        delete(SqlaPartialSegment).where(
+            SqlaPartialSegment.interview_id == interview_id
+        )
+    )
+    await session.commit()
+
+
+async def create_upload(
+    session: AsyncSession,
+    user: SqlaUserBase,
+    upload: DBInputUploadCreate,
+) -> SqlaUpload:
+    db_upload = SqlaUpload(**upload.dict(), offset=0)
+    db_upload.location = str(db_upload.location)
+    db_upload.creator_id = user.id
+    session.add(db_upload)
+    await session.commit()
+    await session.refresh(db_upload)
+    return db_upload
+
+
+async def get_upload(
+    session: AsyncSession,
+    user: SqlaUserBase,
+    upload_id: str,
+) -> SqlaUpload | None:
+    return await session.scalar(
+        select(SqlaUpload)
+        .where(SqlaUpload.id == upload_id)
+        .where(SqlaUpload.creator_id == user.id)
+    )
+
+
+async def update_upload_offset(
+    session: AsyncSession,
+    upload_db: SqlaUpload,
+    offset: int,
+) -> SqlaUpload:
+    upload_db.offset = offset
+    upload_db.update_ts = datetime.utcnow()
+    session.add(upload_db)
+    await session.commit()
+    await session.refresh(upload_db)
+    return upload_db
+
+
+async def delete_upload(session: AsyncSession, upload_db: SqlaUpload):
+    await session.delete(upload_db)
+    await session.commit()
+
+
+async def acquire_asr_slots(
+    session: AsyncSession, host: str, weight: int, capacity: int, lease_s: float
+) -> int | None:
+    """
+    Take `weight` slots of the cluster, if they are free.
+    Requests are served one at a time: slots are taken if those of the requests
+    before (including this one) fit in `capacity`, otherwise the request is withdrawn.
+
+    Returns:
+        int | None: The id of the slots, to renew and release them, or `None`.
+    """
+    now = datetime.utcnow()
+    await _lock_admission(session, SqlaAsrSlots.__tablename__)
+    await session.execute(delete(SqlaAsrSlots).where(SqlaAsrSlots.expires_ts <= now))
+    slots = SqlaAsrSlots(
+        host=host, weight=weight, expires_ts=now + timedelta(seconds=lease_s)
+    )
+    session.add(slots)
+    await session.flush()
+    taken = await session.scalar(select(func.sum(SqlaAsrSlots.weight)))
+    if taken > capacity:
+        await release_asr_slots(session, slots.id)
+        return None
+    await session.commit()
+    return slots.id
+
+
+async def renew_asr_slots(session: AsyncSession, slots_id: int, lease_s: float):
+    await session.execute(
+        update(SqlaAsrSlots)
+        .where(SqlaAsrSlots.id == slots_id)
+        .values(expires_ts=datetime.utcnow() + timedelta(seconds=lease_s))
+    )
+    await session.commit()
+
+
+async def release_asr_slots(session: AsyncSession, slots_id: int):
+    await session.execute(delete(SqlaAsrSlots).where(SqlaAsrSlots.id == slots_id))
+    await session.commit()
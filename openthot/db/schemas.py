@@ -2,7 +2,20 @@ import datetime
 import uuid
 
 from fastapi_users_db_sqlalchemy.generics import GUID
-from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String, Text, func
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    false,
+    func,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from openthot.db.database import SqlaBase, SqlaUserBase
@@ -21,6 +34,7 @@ class SqlaInterview(SqlaBase):
     audio_duration: Mapped[float] = mapped_column(
         Float, nullable=False, server_default="0.0"
     )
+    audio_sha256: Mapped[str] = mapped_column(String, nullable=True, index=True)
     creator_id: Mapped[uuid.UUID] = mapped_column(
         GUID, ForeignKey("user.id", ondelete="cascade"), nullable=False
     )  # creator_id = Column(uuid.UUID, ForeignKey("users.id"))
@@ -29,10 +43,19 @@ class SqlaInterview(SqlaBase):
     status: Mapped[InterviewStatus] = mapped_column(
         String, nullable=False, default=InterviewStatus.uploaded
     )
+    # Engine requested for its transcription, by name (see `openthot.asr.registry`)
+    asr_engine: Mapped[str] = mapped_column(String, nullable=True)
     transcript_source: Mapped[
         WhisperTranscript | WhisperXTranscript | WordcabTranscript
     ] = mapped_column(String, nullable=True)
+    transcript_model: Mapped[str] = mapped_column(String, nullable=True)
+    # Whether `transcript_raw` is a draft, to be replaced (see `TwoPassSettings`)
+    transcript_draft: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=False, server_default=false()
+    )
     transcript_raw: Mapped[str] = mapped_column(Text, nullable=True)
+    # `transcript_raw` normalized, encoded (see `openthot.models.transcript.encoding`)
+    transcript: Mapped[bytes] = mapped_column(LargeBinary, nullable=True)
     transcript_duration_s: Mapped[int] = mapped_column(Integer, nullable=True)
     transcript_ts: Mapped[datetime.datetime] = mapped_column(
         DateTime(timezone=True), nullable=True
@@ -50,6 +73,126 @@ class SqlaInterview(SqlaBase):
     speakers: Mapped[InterviewSpeakers] = mapped_column(
         String, nullable=True, default=None
     )
+    progress: Mapped["SqlaTranscriptionProgress | None"] = relationship(
+        "SqlaTranscriptionProgress", lazy="joined", cascade="all, delete-orphan"
+    )
+
+
+class SqlaTranscriptionProgress(SqlaBase):
+    """
+    Progress of a running transcription, kept apart from the interview
+    so that frequent updates do not rewrite it.
+    """
+
+    __tablename__ = "transcription_progress"
+
+    interview_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("interviews.id", ondelete="cascade"), primary_key=True
+    )
+    fraction: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    start_ts: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+    update_ts: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+
+
+class SqlaPartialSegment(SqlaBase):
+    """
+    A segment of a transcript still running, appended as the ASR engine produces it.
+    Segments of an interview are removed once its whole transcript is stored.
+    """
+
+    __tablename__ = "partial_segments"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    interview_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("interviews.id", ondelete="cascade"),
+        nullable=False,
+        index=True,
+    )
+    start: Mapped[float] = mapped_column(Float, nullable=False)
+    end: Mapped[float] = mapped_column(Float, nullable=False)
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+
+
+class SqlaAsrSlots(SqlaBase):
+    """
+    Slots of the cluster taken by a running transcription, until `expires_ts`
+    unless renewed (i.e. its worker did not die).
+    """
+
+    __tablename__ = "asr_slots"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    host: Mapped[str] = mapped_column(String, nullable=False)
+    weight: Mapped[int] = mapped_column(Integer, nullable=False)
+    expires_ts: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+
+
+class SqlaAudioFile(SqlaBase):
+    """
+    Number of references to an audio file of the object storage, shared by all the
+    interviews with the same audio (and by uploads being turned into interviews).
+    The file is removed along with this row, once no reference is left.
+    """
+
+    __tablename__ = "audio_files"
+
+    location: Mapped[str] = mapped_column(String, primary_key=True)
+    # Files computed from it are shared by all the audio files with the same content
+    sha256: Mapped[str] = mapped_column(String, nullable=True, index=True)
+    reference_count: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class SqlaTranscriptionLease(SqlaBase):
+    """
+    A transcription of an interview running for its user, until `expires_ts` unless
+    renewed (i.e. its worker did not die), counted in the fair share of the user.
+    """
+
+    __tablename__ = "transcription_leases"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    interview_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("interviews.id", ondelete="cascade"), nullable=False
+    )
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        GUID, ForeignKey("user.id", ondelete="cascade"), nullable=False, index=True
+    )
+    expires_ts: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+
+
+class SqlaUpload(SqlaBase):
+    """A resumable upload, not yet turned into an interview."""
+
+    __tablename__ = "uploads"
+
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    creator_id: Mapped[uuid.UUID] = mapped_column(
+        GUID, ForeignKey("user.id", ondelete="cascade"), nullable=False
+    )
+    filename: Mapped[str] = mapped_column(String, nullable=False)
+    name: Mapped[str] = mapped_column(String, nullable=True)
+    asr_engine: Mapped[str] = mapped_column(String, nullable=True)
+    location: Mapped[str] = mapped_column(String, nullable=False)
+    offset: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    create_ts: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+    update_ts: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
 
 
 class SqlaUser(SqlaUserBase):
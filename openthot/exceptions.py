@@ -32,6 +32,59 @@ APIAudiofileMalformed = RichHTTPException(
         hint="Has it a valid extension (mp3, mp4, wav, ...) ?",
     ),
 )
+APIRangeNotSatisfiable = RichHTTPException(
+    status_code=416,
+    model=ExceptionModel(
+        description="Requested range not satisfiable",
+        hint="Ranges must start before the end of the file, whose size is in `Content-Range`.",
+    ),
+)
+APIWaveformNotFound = RichHTTPException(
+    status_code=404,
+    model=ExceptionModel(
+        description="Waveform not found",
+        hint="It is computed when the interview is processed: try again later.",
+    ),
+)
+APITranscriptNotFound = RichHTTPException(
+    status_code=404,
+    model=ExceptionModel(
+        description="Transcript not found",
+        hint="It is available once the interview is being processed: try again later.",
+    ),
+)
+APIUploadNotFound = RichHTTPException(
+    status_code=404, model=ExceptionModel(description="Upload not found")
+)
+APIUploadOffsetMismatch = RichHTTPException(
+    status_code=409,
+    model=ExceptionModel(
+        description="Chunk does not start at the current offset of the upload",
+        hint="Get the upload to know its current offset, then resume from there.",
+    ),
+)
+APIUploadBusy = RichHTTPException(
+    status_code=409,
+    model=ExceptionModel(
+        description="Upload is being appended to by another request",
+        hint="Wait for it to end, get the upload to know its current offset, then resume from there.",
+    ),
+)
+APIUploadIncomplete = RichHTTPException(
+    status_code=409,
+    model=ExceptionModel(
+        description="Upload is not complete",
+        hint="Get the upload to know its current offset, then resume from there.",
+    ),
+)
+
+APIAsrEngineNotFound = RichHTTPException(
+    status_code=400,  # 422 is already "reserved"
+    model=ExceptionModel(
+        description="ASR engine not found",
+        hint="Leave `asr_engine` unset to let the engine be chosen for you.",
+    ),
+)
 
 
 class BaseInternalError(Exception):
@@ -42,6 +95,28 @@ class BaseInternalError(Exception):
         super().__init__(message)
 
 
+class UnsupportedAudioFile(BaseInternalError):
+    def __init__(self, filename: str | None) -> None:
+        super().__init__(f"`{filename}` does not look like a supported audio file.")
+
+
+class AudioFileBusy(BaseInternalError):
+    def __init__(self, location: str) -> None:
+        super().__init__(f"`{location}` is locked by someone else.")
+
+
+class ObjectStorageError(BaseInternalError):
+    def __init__(self, location: str, status_code: int, detail: str) -> None:
+        super().__init__(
+            f"Object storage failed on `{location}` ({status_code}): {detail}"
+        )
+
+
+class ChunkTranscriptionError(BaseInternalError):
+    def __init__(self, location: str) -> None:
+        super().__init__(f"Could not transcribe audio chunk `{location}`.")
+
+
 class MissingASR(BaseInternalError):
     def __init__(self, asr_bin_name: str) -> None:
         super().__init__(
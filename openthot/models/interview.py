@@ -1,13 +1,20 @@
 import json
 from datetime import datetime
 from enum import Enum
-from typing import TypeAlias
-
-from pydantic import BaseModel, FilePath, confloat, conint, validator
-
-from openthot.models.transcript import TranscriptorSource
-from openthot.models.transcript.openthot import OpenthotTranscript
-from openthot.models.transcript.utils import wc2ott, wt2ott, wtx2ott
+from typing import Any, TypeAlias
+
+from pydantic import BaseModel, confloat, conint, validator
+from pydantic.utils import GetterDict
+
+from openthot.models.transcript import LanguageType, TranscriptorSource
+from openthot.models.transcript.columnar import ColumnarTranscript
+from openthot.models.transcript.encoding import decode_transcript
+from openthot.models.transcript.openthot import (
+    OpenthotSegment,
+    OpenthotTranscript,
+    PartialSegment,
+)
+from openthot.models.transcript.utils import partial2ott, raw2ott
 from openthot.models.transcript.whisper import WhisperTranscript
 from openthot.models.transcript.whisperx import WhisperXTranscript
 from openthot.models.transcript.wordcab import WordcabTranscript
@@ -55,18 +62,22 @@ class APIInputInterviewCreate(BaseModel):
     Properties to receive on Interview creation.
     Actual binary audio file in not handled in body but in
     form data, therefore it is not present in this class.
+    `asr_engine` is left to the routing policy if not set.
     """
 
     name: str | None = None
+    asr_engine: str | None = None
 
 
 class APIInputInterviewUpdate(BaseModel):
     """
     Properties to receive on Interview update.
+    A null `asr_engine` leaves it to the routing policy.
     """
 
     name: str | None = None
     speakers: InterviewSpeakers | None = None
+    asr_engine: str | None = None
 
     @validator("name")
     def load_name(cls, v):
@@ -75,6 +86,36 @@ class APIInputInterviewUpdate(BaseModel):
         return v
 
 
+class DBOutputProgress(BaseModel):
+    """
+    Progress of a running transcription, as stored
+    """
+
+    fraction: confloat(ge=0.0, le=1.0)  # type: ignore
+    start_ts: datetime
+    update_ts: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class APIOutputProgress(BaseModel):
+    """
+    Progress of a running transcription, to return to client
+    """
+
+    percent: confloat(ge=0.0, le=100.0)  # type: ignore
+    eta: datetime | None = None  # estimated completion time
+
+    @classmethod
+    def from_db(cls, progress: DBOutputProgress) -> "APIOutputProgress":
+        eta = None
+        if progress.fraction > 0:
+            elapsed = progress.update_ts - progress.start_ts
+            eta = progress.start_ts + elapsed / progress.fraction
+        return cls(percent=round(progress.fraction * 100, 1), eta=eta)
+
+
 class APIOutputInterview(BaseModel):
     """
     Properties to return to client.
@@ -88,47 +129,121 @@ class APIOutputInterview(BaseModel):
     name: str
     speakers: InterviewSpeakers | None = None
     status: InterviewStatus
+    asr_engine: str | None = None
+    progress: APIOutputProgress | None = None
     transcript: OpenthotTranscript | None = None
+    # Whether `transcript` is only the part transcribed so far, without words nor speakers
+    transcript_partial: bool = False
+    # Whether `transcript` is a draft, to be replaced by a more accurate one
+    transcript_draft: bool = False
     transcript_source: TranscriptorSource | None = None
     transcript_duration_s: int | None = None
     transcript_ts: datetime | None = None
     update_ts: datetime
     upload_ts: datetime
 
+    @validator("progress", pre=True)
+    def load_progress(cls, v, values):
+        if isinstance(v, DBOutputProgress):
+            # Only meaningful while the transcription is running
+            if values.get("status") != InterviewStatus.processing:
+                return None
+            return APIOutputProgress.from_db(v)
+        return v
+
     @classmethod
-    def from_orm(cls, obj):  # obj is an sqla schema object
+    def from_orm(
+        cls, obj, partial_segments: list[PartialSegment] | None = None
+    ):  # obj is an sqla schema object
         """
         We first need to parse the db schema object through
-        a `DBOutputInterview`, then we can parse it to read
-        `transcript_raw` et set `transcript`.
+        a `DBServedInterview`, which reads the `transcript` normalized
+        when it was stored. Rows stored before it was (if any) only
+        have `transcript_raw`, which is then normalized on the fly.
         As `speakers` depends in `transcript`, its value
         is also set in this function afterwards.
+        Until `transcript_raw` is stored, `transcript` is made of
+        the `partial_segments` transcribed so far, if any.
         """
-        db = DBOutputInterview.from_orm(obj)
+        db = DBServedInterview.from_orm(obj)
         r = super().from_orm(db)
-        if tr := db.transcript_raw:
-            # Set transcript
-            if isinstance(tr, WhisperTranscript):
-                r.transcript = wt2ott(tr)
-            elif isinstance(tr, WhisperXTranscript):
-                r.transcript = wtx2ott(tr)
-            elif isinstance(tr, WordcabTranscript):
-                r.transcript = wc2ott(tr)
-
-            # Set speakers
-            speakers = set()
-            if r.transcript:
-                speakers = r.transcript.speakers
-            assigned_speakers = r.speakers if r.speakers else {}
-            speakers_default = {s: s for s in speakers}
-            returned_speakers = speakers_default | assigned_speakers
-            r.speakers = returned_speakers if returned_speakers else None
+        if r.transcript is None and db.transcript_raw:
+            r.transcript = raw2ott(db.transcript_raw)
+        if r.transcript is None and partial_segments:
+            r.transcript = partial2ott(partial_segments)
+            r.transcript_partial = True
+        if r.transcript is not None and not r.transcript_partial:
+            r.set_speakers(r.transcript.speakers)
         return r
 
+    @classmethod
+    def envelope_from_orm(
+        cls, obj, transcript: ColumnarTranscript
+    ) -> "APIOutputInterview":  # obj is an sqla schema object
+        """
+        All but the `transcript`, stored in `obj` and decoded as `transcript`,
+        which is sent apart (see `openthot.api.json_stream`).
+        """
+        r = super().from_orm(DBEnvelopeInterview.from_orm(obj))
+        r.set_speakers(transcript.listed_speakers)
+        return r
+
+    def set_speakers(self, speakers: set[str]) -> None:
+        """Speakers of the transcript, by the names assigned to them if any."""
+        assigned_speakers = self.speakers if self.speakers else {}
+        speakers_default = {s: s for s in speakers}
+        returned_speakers = speakers_default | assigned_speakers
+        self.speakers = returned_speakers if returned_speakers else None
+
     class Config:
         orm_mode = True
 
 
+class APIOutputTranscriptPage(BaseModel):
+    """
+    Segments of the transcript of an interview within a time window,
+    a page at a time, to return to client.
+    """
+
+    language: LanguageType | None = None  # type: ignore
+    segments: list[OpenthotSegment]
+    # See `APIOutputInterview`
+    transcript_partial: bool = False
+    transcript_draft: bool = False
+    # Cursor of the next page, if any
+    next_cursor: int | None = None
+
+    @classmethod
+    def from_columnar(
+        cls,
+        ct: ColumnarTranscript,
+        start: float | None,
+        end: float | None,
+        cursor: int,
+        limit: int,
+        **kwargs,
+    ) -> "APIOutputTranscriptPage":
+        """
+        Page of the segments of `ct` overlapping from `start` to `end`, starting
+        from the one at `cursor`. Only these segments are turned into objects.
+        """
+        window = ct.segments_between(start, end)
+        segments = []
+        next_cursor = None
+        for i in range(max(window.start, cursor), window.stop):
+            if len(segments) == limit:
+                next_cursor = i
+                break
+            if start is None or ct.segment_ends[i] > start:
+                segments.append(ct.segment(i))
+        return cls(
+            language=ct.language,
+            segments=segments,
+            next_cursor=next_cursor,
+            **kwargs,
+        )
+
+
 class DBInputInterviewCreate(BaseModel):
     """
     Class to represent an input (create or update) for db.
@@ -137,8 +252,15 @@ class DBInputInterviewCreate(BaseModel):
 
     name: str
     audio_filename: str
-    audio_location: FilePath
+    audio_location: str
     audio_duration: confloat(gt=0.0)  # type: ignore
+    audio_sha256: str | None = None
+    asr_engine: str | None = None
+
+    @validator("audio_location", pre=True)
+    def dump_audio_location(cls, v):
+        # A path, or the URI of a remote object (e.g. `s3://bucket/key`)
+        return str(v)
 
 
 class DBInputInterviewUpdate(BaseModel):
@@ -149,18 +271,26 @@ class DBInputInterviewUpdate(BaseModel):
     """
 
     audio_filename: str | None = None
-    audio_location: FilePath | None = None
+    audio_location: str | None = None
     id: InterviewId | None = None
     name: str | None = None
     speakers: InterviewSpeakers | None = None
     status: InterviewStatus | None = None
+    asr_engine: str | None = None
     transcript_source: TranscriptorSource | None = None
+    transcript_model: str | None = None
+    transcript_draft: bool | None = None
+    # Normalized from `transcript_raw`, once and for all reads
+    transcript: OpenthotTranscript | ColumnarTranscript | None = None
     transcript_raw: WhisperTranscript | WhisperXTranscript | WordcabTranscript | None = (
         None
     )
     transcript_duration_s: int | None = None
     transcript_ts: datetime | None = None
 
+    class Config:
+        arbitrary_types_allowed = True
+
 
 class DBOutputInterview(BaseModel):
     """
@@ -168,14 +298,20 @@ class DBOutputInterview(BaseModel):
     """
 
     audio_filename: str
-    audio_location: FilePath
+    audio_location: str
     audio_duration: confloat(gt=0.0)  # type: ignore
+    audio_sha256: str | None = None
     creator_id: UserId
     id: InterviewId
     name: str
     speakers: InterviewSpeakers | None = None
     status: InterviewStatus
+    asr_engine: str | None = None
+    progress: DBOutputProgress | None = None
     transcript_source: TranscriptorSource | None = None
+    transcript_model: str | None = None
+    transcript_draft: bool = False
+    transcript: OpenthotTranscript | None = None
     transcript_raw: WhisperTranscript | WhisperXTranscript | WordcabTranscript | None = (
         None
     )
@@ -191,6 +327,14 @@ class DBOutputInterview(BaseModel):
         else:
             return json.loads(v)
 
+    @validator("transcript", pre=True)
+    def load_transcript(cls, v):
+        if not v:
+            return None
+        elif isinstance(v, (bytes, str)):
+            return decode_transcript(v).to_ott()
+        return v
+
     @validator("transcript_raw", pre=True)
     def load_transcript_raw(cls, v, values):
         if not v:
@@ -212,3 +356,39 @@ class DBOutputInterview(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class _ServedGetterDict(GetterDict):
+    def get(self, key: Any, default: Any = None) -> Any:
+        # No need to parse `transcript_raw` once normalized into `transcript`
+        if key == "transcript_raw" and getattr(self._obj, "transcript", None):
+            return None
+        return super().get(key, default)
+
+
+class _EnvelopeGetterDict(GetterDict):
+    def get(self, key: Any, default: Any = None) -> Any:
+        # Neither is read, `transcript_raw` being possibly not even loaded
+        if key in ("transcript", "transcript_raw"):
+            return None
+        return super().get(key, default)
+
+
+class DBServedInterview(DBOutputInterview):
+    """
+    Properties of DB read to be served to client,
+    i.e. without `transcript_raw` when `transcript` is stored.
+    """
+
+    class Config:
+        getter_dict = _ServedGetterDict
+
+
+class DBEnvelopeInterview(DBOutputInterview):
+    """
+    Properties of DB read to be served to client,
+    without any transcript, sent apart.
+    """
+
+    class Config:
+        getter_dict = _EnvelopeGetterDict
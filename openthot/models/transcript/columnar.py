@@ -0,0 +1,202 @@
+"""
+Columnar representation of an `OpenthotTranscript`, for long transcripts.
+
+Rather than a pydantic object per word, words are spread over parallel typed arrays
+(start, end, probability), and their text over a single buffer sliced by offsets.
+Segments are delimited by offsets into the words, and their speakers are indexes
+into a table of the speakers, each of them stored once.
+Segments being in the order of the audio, those within a time window are found by
+binary search, without going through the others.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+
+from openthot.models.transcript.openthot import (
+    OpenthotSegment,
+    OpenthotTranscript,
+    OpenthotWord,
+)
+
+
+class ColumnarTranscript:
+    """
+    A transcript, built by adding its segments, each followed by its words.
+    It converts back and forth with `OpenthotTranscript`, exactly.
+    """
+
+    __slots__ = (
+        "language",
+        "text",
+        "speakers",
+        "speakers_listed",
+        "_speaker_indexes",
+        "segment_ids",
+        "segment_starts",
+        "segment_ends",
+        "segment_ends_max",
+        "segment_speakers",
+        "segment_texts",
+        "segment_word_offsets",
+        "word_starts",
+        "word_ends",
+        "word_probabilities",
+        "word_text_offsets",
+        "_word_texts",
+    )
+
+    def __init__(self, language: str | None = None, text: str = "") -> None:
+        self.language = language
+        self.text = text
+        # Table of the speakers, and whether each is in `OpenthotTranscript.speakers`
+        self.speakers: list[str] = []
+        self.speakers_listed = bytearray()
+        self._speaker_indexes: dict[str, int] = {}
+        self.segment_ids = array("q")
+        self.segment_starts = array("d")
+        self.segment_ends = array("d")
+        # Latest end of the segments so far, as segments may overlap: sorted
+        self.segment_ends_max = array("d")
+        # Index of the speaker of each segment in `speakers`, -1 if none
+        self.segment_speakers = array("q")
+        # Only partial transcripts have texts for their segments, having no words
+        self.segment_texts: list[str | None] = []
+        # Words of segment `i` are those from `segment_word_offsets[i]`
+        # to `segment_word_offsets[i + 1]` (excluded)
+        self.segment_word_offsets = array("q", [0])
+        self.word_starts = array("d")
+        self.word_ends = array("d")
+        self.word_probabilities = array("d")
+        # Text of word `i` is `words_text[word_text_offsets[i]:word_text_offsets[i + 1]]`
+        self.word_text_offsets = array("q", [0])
+        self._word_texts: list[str] = []
+
+    @property
+    def segment_count(self) -> int:
+        return len(self.segment_ids)
+
+    @property
+    def word_count(self) -> int:
+        return len(self.word_starts)
+
+    @property
+    def words_text(self) -> str:
+        """Buffer of the texts of all the words, one after the other."""
+        if len(self._word_texts) != 1:
+            # Joined once for all, until words are added
+            self._word_texts = ["".join(self._word_texts)]
+        return self._word_texts[0]
+
+    @property
+    def listed_speakers(self) -> set[str]:
+        """Speakers of `OpenthotTranscript.speakers`."""
+        return {
+            speaker
+            for speaker, listed in zip(self.speakers, self.speakers_listed)
+            if listed
+        }
+
+    def add_speaker(self, speaker: str, listed: bool = True) -> int:
+        """Index of `speaker` in the table, added to it if needed."""
+        index = self._speaker_indexes.get(speaker)
+        if index is None:
+            index = self._speaker_indexes[speaker] = len(self.speakers)
+            self.speakers.append(speaker)
+            self.speakers_listed.append(listed)
+        elif listed:
+            self.speakers_listed[index] = True
+        return index
+
+    def add_segment(
+        self,
+        id: int,
+        start: float,
+        end: float,
+        speaker: str | None = None,
+        text: str | None = None,
+    ) -> None:
+        """Add a segment, to which the words added next belong."""
+        self.segment_ids.append(id)
+        self.segment_starts.append(start)
+        self.segment_ends.append(end)
+        self.segment_ends_max.append(
+            max(self.segment_ends_max[-1], end) if self.segment_ends_max else end
+        )
+        self.segment_speakers.append(
+            -1 if speaker is None else self.add_speaker(speaker, listed=False)
+        )
+        self.segment_texts.append(text)
+        self.segment_word_offsets.append(self.segment_word_offsets[-1])
+
+    def add_word(self, word: str, start: float, end: float, probability: float) -> None:
+        """Add a word to the last segment."""
+        self.word_starts.append(start)
+        self.word_ends.append(end)
+        self.word_probabilities.append(probability)
+        self.word_text_offsets.append(self.word_text_offsets[-1] + len(word))
+        self._word_texts.append(word)
+        self.segment_word_offsets[-1] += 1
+
+    def word(self, index: int) -> str:
+        start, end = self.word_text_offsets[index], self.word_text_offsets[index + 1]
+        return self.words_text[start:end]
+
+    def segment_speaker(self, index: int) -> str | None:
+        speaker = self.segment_speakers[index]
+        return None if speaker < 0 else self.speakers[speaker]
+
+    def segments_between(self, start: float | None, end: float | None) -> range:
+        """
+        Indexes of the segments that may overlap from `start` to `end` (s), either
+        being none for no bound. Segments within it overlapping ones which end
+        sooner may also be in, their end having to be checked.
+        """
+        first = 0 if start is None else bisect_right(self.segment_ends_max, start)
+        last = (
+            self.segment_count
+            if end is None
+            else bisect_left(self.segment_starts, end, lo=first)
+        )
+        return range(first, max(first, last))
+
+    def segment(self, index: int) -> OpenthotSegment:
+        # Values were validated when added, no need to do it again word by word
+        words = [
+            OpenthotWord.construct(
+                word=self.word(j),
+                start=self.word_starts[j],
+                probability=self.word_probabilities[j],
+                end=self.word_ends[j],
+            )
+            for j in range(
+                self.segment_word_offsets[index], self.segment_word_offsets[index + 1]
+            )
+        ]
+        return OpenthotSegment.construct(
+            id=self.segment_ids[index],
+            start=self.segment_starts[index],
+            end=self.segment_ends[index],
+            words=words,
+            speaker=self.segment_speaker(index),
+            text=self.segment_texts[index],
+        )
+
+    @classmethod
+    def from_ott(cls, ott: OpenthotTranscript) -> "ColumnarTranscript":
+        ct = cls(language=ott.language, text=ott.text)
+        for speaker in sorted(ott.speakers):
+            ct.add_speaker(speaker)
+        for segment in ott.segments:
+            ct.add_segment(
+                segment.id, segment.start, segment.end, segment.speaker, segment.text
+            )
+            for word in segment.words:
+                ct.add_word(word.word, word.start, word.end, word.probability)
+        return ct
+
+    def to_ott(self) -> OpenthotTranscript:
+        return OpenthotTranscript.construct(
+            language=self.language,
+            text=self.text,
+            segments=[self.segment(i) for i in range(self.segment_count)],
+            speakers=self.listed_speakers,
+        )
@@ -0,0 +1,233 @@
+"""
+Encoding of normalized transcripts, as stored in the database.
+
+An encoded transcript starts with a header (8 bytes) telling how it was encoded,
+so that transcripts stored with other settings (see `TranscriptStorageSettings`)
+are still read:
+
+    magic `OTTB` | version | payload (JSON or columns) | compression | reserved
+
+The JSON payload is the `OpenthotTranscript` as is. The columns payload is made of
+the columns of a `ColumnarTranscript`, little-endian:
+
+    segment, word and speaker counts          3 × int64
+    language, text                            strings
+    speakers, then whether each is listed     strings, bytes
+    whether segments have texts, then these   byte, strings if so
+    text of the words                         string
+    segment ids, starts, ends                 int64, float64, float64 arrays
+    segment latest ends, speakers             float64, int64 arrays
+    segment word offsets                      int64 array
+    word starts, ends, probabilities          float64 arrays
+    word text offsets                         int64 array
+
+Strings are prefixed by their length in bytes (int64, -1 for none), and arrays
+are aligned on 8 bytes. Arrays are decoded as views of the encoded bytes, rather
+than as numbers, let alone as objects per word.
+"""
+import struct
+import sys
+import zlib
+from array import array
+from enum import Enum
+from typing import Any, Iterable
+
+from openthot.models.transcript.columnar import ColumnarTranscript
+from openthot.models.transcript.openthot import OpenthotTranscript
+
+MAGIC = b"OTTB"
+VERSION = 1
+_HEADER = struct.Struct("<4sBBBx")
+_INT = struct.Struct("<q")
+
+
+class TranscriptEncoding(str, Enum):
+    json = "json"
+    binary = "binary"
+
+
+class TranscriptCompression(str, Enum):
+    none = "none"
+    zlib = "zlib"
+    # Requires the `zstandard` package
+    zstd = "zstd"
+
+
+_PAYLOADS = {TranscriptEncoding.json: 0, TranscriptEncoding.binary: 1}
+_COMPRESSIONS = {
+    TranscriptCompression.none: 0,
+    TranscriptCompression.zlib: 1,
+    TranscriptCompression.zstd: 2,
+}
+
+
+class TranscriptDecodingError(ValueError):
+    pass
+
+
+def _compress(payload: bytes, compression: TranscriptCompression) -> bytes:
+    if compression == TranscriptCompression.zlib:
+        return zlib.compress(payload)
+    if compression == TranscriptCompression.zstd:
+        import zstandard
+
+        return zstandard.ZstdCompressor().compress(payload)
+    return payload
+
+
+def _decompress(payload: memoryview, compression: TranscriptCompression) -> bytes:
+    if compression == TranscriptCompression.zlib:
+        return zlib.decompress(payload)
+    if compression == TranscriptCompression.zstd:
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return bytes(payload)
+
+
+def _write_str(buffer: bytearray, s: str | None) -> None:
+    if s is None:
+        buffer += _INT.pack(-1)
+        return
+    encoded = s.encode()
+    buffer += _INT.pack(len(encoded))
+    buffer += encoded
+
+
+def _write_array(buffer: bytearray, typecode: str, values: Iterable[Any]) -> None:
+    buffer += bytes(-len(buffer) % 8)
+    column = array(typecode, values)
+    if sys.byteorder == "big":
+        column.byteswap()
+    buffer += column.tobytes()
+
+
+def _encode_columns(ct: ColumnarTranscript) -> bytes:
+    buffer = bytearray()
+    for count in (ct.segment_count, ct.word_count, len(ct.speakers)):
+        buffer += _INT.pack(count)
+    _write_str(buffer, ct.language)
+    _write_str(buffer, ct.text)
+    for speaker in ct.speakers:
+        _write_str(buffer, speaker)
+    buffer += ct.speakers_listed
+    with_texts = any(text is not None for text in ct.segment_texts)
+    buffer.append(with_texts)
+    if with_texts:
+        for text in ct.segment_texts:
+            _write_str(buffer, text)
+    _write_str(buffer, ct.words_text)
+    _write_array(buffer, "q", ct.segment_ids)
+    _write_array(buffer, "d", ct.segment_starts)
+    _write_array(buffer, "d", ct.segment_ends)
+    _write_array(buffer, "d", ct.segment_ends_max)
+    _write_array(buffer, "q", ct.segment_speakers)
+    _write_array(buffer, "q", ct.segment_word_offsets)
+    _write_array(buffer, "d", ct.word_starts)
+    _write_array(buffer, "d", ct.word_ends)
+    _write_array(buffer, "d", ct.word_probabilities)
+    _write_array(buffer, "q", ct.word_text_offsets)
+    return bytes(buffer)
+
+
+class _Reader:
+    def __init__(self, data: memoryview) -> None:
+        self.data = data
+        self.position = 0
+
+    def read_int(self) -> int:
+        (value,) = _INT.unpack_from(self.data, self.position)
+        self.position += _INT.size
+        return value
+
+    def read_bytes(self, size: int) -> memoryview:
+        start, end = self.position, self.position + size
+        if end > len(self.data):
+            raise TranscriptDecodingError("Truncated transcript")
+        self.position = end
+        return self.data[start:end]
+
+    def read_str(self) -> str | None:
+        size = self.read_int()
+        return None if size < 0 else str(self.read_bytes(size), "utf-8")
+
+    def read_array(self, typecode: str, count: int) -> memoryview | array:
+        self.position += -self.position % 8
+        view = self.read_bytes(count * 8)
+        if sys.byteorder == "little":
+            return view.cast(typecode)
+        column = array(typecode, view.tobytes())
+        column.byteswap()
+        return column
+
+
+def _decode_columns(data: memoryview) -> ColumnarTranscript:
+    reader = _Reader(data)
+    segment_count, word_count, speaker_count = (reader.read_int() for _ in range(3))
+    ct = ColumnarTranscript(language=reader.read_str(), text=reader.read_str() or "")
+    ct.speakers = [reader.read_str() or "" for _ in range(speaker_count)]
+    ct.speakers_listed = bytearray(reader.read_bytes(speaker_count))
+    ct._speaker_indexes = {speaker: i for i, speaker in enumerate(ct.speakers)}
+    with_texts = reader.read_bytes(1)[0]
+    ct.segment_texts = [
+        reader.read_str() if with_texts else None for _ in range(segment_count)
+    ]
+    ct._word_texts = [reader.read_str() or ""]
+    ct.segment_ids = reader.read_array("q", segment_count)
+    ct.segment_starts = reader.read_array("d", segment_count)
+    ct.segment_ends = reader.read_array("d", segment_count)
+    ct.segment_ends_max = reader.read_array("d", segment_count)
+    ct.segment_speakers = reader.read_array("q", segment_count)
+    ct.segment_word_offsets = reader.read_array("q", segment_count + 1)
+    ct.word_starts = reader.read_array("d", word_count)
+    ct.word_ends = reader.read_array("d", word_count)
+    ct.word_probabilities = reader.read_array("d", word_count)
+    ct.word_text_offsets = reader.read_array("q", word_count + 1)
+    return ct
+
+
+def encode_transcript(
+    transcript: OpenthotTranscript | ColumnarTranscript,
+    encoding: TranscriptEncoding = TranscriptEncoding.binary,
+    compression: TranscriptCompression = TranscriptCompression.none,
+) -> bytes:
+    if encoding == TranscriptEncoding.json:
+        if isinstance(transcript, ColumnarTranscript):
+            transcript = transcript.to_ott()
+        payload = transcript.json().encode()
+    else:
+        if isinstance(transcript, OpenthotTranscript):
+            transcript = ColumnarTranscript.from_ott(transcript)
+        payload = _encode_columns(transcript)
+    header = _HEADER.pack(
+        MAGIC, VERSION, _PAYLOADS[encoding], _COMPRESSIONS[compression]
+    )
+    return header + _compress(payload, compression)
+
+
+def decode_transcript(data: bytes | str) -> ColumnarTranscript:
+    """
+    Decode a transcript however it was encoded. Its arrays are read-only views
+    of `data`, unless it was compressed.
+    """
+    if isinstance(data, str) or not data.startswith(MAGIC):
+        # Stored as JSON, without header
+        return ColumnarTranscript.from_ott(OpenthotTranscript.parse_raw(data))
+    view = memoryview(data)
+    _, version, payload_id, compression_id = _HEADER.unpack_from(view)
+    try:
+        encoding = {v: k for k, v in _PAYLOADS.items()}[payload_id]
+        compression = {v: k for k, v in _COMPRESSIONS.items()}[compression_id]
+    except KeyError:
+        raise TranscriptDecodingError(
+            f"Unknown transcript encoding ({payload_id}, {compression_id})"
+        )
+    if version != VERSION:
+        raise TranscriptDecodingError(f"Unknown transcript version {version}")
+    header_size = _HEADER.size
+    payload = view[header_size:]
+    if compression != TranscriptCompression.none:
+        payload = memoryview(_decompress(payload, compression))
+    if encoding == TranscriptEncoding.json:
+        return ColumnarTranscript.from_ott(OpenthotTranscript.parse_raw(bytes(payload)))
+    return _decode_columns(payload)
@@ -1,3 +1,5 @@
+from typing import Any
+
 from pydantic import BaseModel
 
 from . import LanguageType, ProbabilityType
@@ -22,6 +24,14 @@ class OpenthotSegment(BaseModel):
     end: float
     words: list[OpenthotWord]
     speaker: str | None = None
+    text: str | None = None  # only for partial transcripts, that have no words yet
+
+    def dict(self, **kwargs) -> dict[str, Any]:
+        # Segments of full transcripts are exported without `text`, rather than null
+        d = super().dict(**kwargs)
+        if d.get("text", "") is None:
+            del d["text"]
+        return d
 
 
 class OpenthotTranscript(BaseModel):
@@ -29,3 +39,17 @@ class OpenthotTranscript(BaseModel):
     text: str
     segments: list[OpenthotSegment]
     speakers: set[str]
+
+
+class PartialSegment(BaseModel):
+    """
+    A segment of a transcript still running, as ASR engines print them,
+    i.e. without words nor speaker.
+    """
+
+    start: float
+    end: float
+    text: str
+
+    class Config:
+        orm_mode = True
@@ -1,78 +1,127 @@
+from openthot.models.transcript.columnar import ColumnarTranscript
 from openthot.models.transcript.openthot import (
     OpenthotSegment,
     OpenthotTranscript,
-    OpenthotWord,
+    PartialSegment,
 )
 from openthot.models.transcript.whisper import WhisperTranscript
 from openthot.models.transcript.whisperx import WhisperXTranscript, WhisperXWord
 from openthot.models.transcript.wordcab import WordcabTranscript, WordcabWord
 
+# Transcripts of the engines are first converted into columnar ones (`*2ct`),
+# which are then turned into `OpenthotTranscript` if needed (`*2ott`)
 
-def wt2ott(wt: WhisperTranscript) -> OpenthotTranscript:
-    ott = OpenthotTranscript(
-        language=wt.language, text=wt.text, segments=[], speakers=set()
-    )
+
+def wt2ct(wt: WhisperTranscript) -> ColumnarTranscript:
+    ct = ColumnarTranscript(language=wt.language, text=wt.text)
     for wt_seg in wt.segments:
-        otts = OpenthotSegment(
-            id=wt_seg.id, start=wt_seg.start, end=wt_seg.end, words=[]
-        )
+        ct.add_segment(wt_seg.id, wt_seg.start, wt_seg.end)
         for wt_word in wt_seg.words:
-            ottw = OpenthotWord(**wt_word.dict())
-            otts.words.append(ottw)
-        ott.segments.append(otts)
-    return ott
+            ct.add_word(wt_word.word, wt_word.start, wt_word.end, wt_word.probability)
+    return ct
 
 
-def wtx2ott(wxt: WhisperXTranscript) -> OpenthotTranscript:
-    ott = OpenthotTranscript(language=None, text="", segments=[], speakers=set())
-    prev_word = WhisperXWord(
-        word="", start=0.0, end=0.0, score=1.0, speaker=None
-    ).dict()
+def _add_filled_words(
+    ct: ColumnarTranscript,
+    words: list[WhisperXWord] | list[WordcabWord],
+    prev: tuple[float, float, float],
+) -> tuple[float, float, float]:
+    """
+    Add `words` to the last segment, filling their none fields with those of
+    the previous word (`prev` start, end and score). Returns those of the last one.
+    """
+    start, end, score = prev
+    for word in words:
+        start = start if word.start is None else word.start
+        end = end if word.end is None else word.end
+        score = score if word.score is None else word.score
+        ct.add_word(word.word, start, end, score)
+    return start, end, score
+
+
+def wtx2ct(wxt: WhisperXTranscript) -> ColumnarTranscript:
+    ct = ColumnarTranscript(language=None, text="")
+    prev = (0.0, 0.0, 1.0)
     for i, wxt_seg in enumerate(wxt.segments):
         if wxt_seg.speaker:
-            ott.speakers.add(wxt_seg.speaker)
-        otts = OpenthotSegment(
-            id=i,
-            start=wxt_seg.start,
-            end=wxt_seg.end,
-            words=[],
-            speaker=wxt_seg.speaker,
-        )
-        for wxt_word in wxt_seg.words:
-            # fill none fields with previous word fields
-            w_dict = prev_word | wxt_word.dict(exclude_none=True)
-            ottw = OpenthotWord(**w_dict, probability=w_dict["score"])
-            prev_word = w_dict
-            otts.words.append(ottw)
-        ott.segments.append(otts)
-    return ott
+            ct.add_speaker(wxt_seg.speaker)
+        ct.add_segment(i, wxt_seg.start, wxt_seg.end, wxt_seg.speaker)
+        prev = _add_filled_words(ct, wxt_seg.words, prev)
+    return ct
 
 
-def wc2ott(wc: WordcabTranscript) -> OpenthotTranscript:
-    ott = OpenthotTranscript(
-        language=wc.source_lang, text="", segments=[], speakers=set()
-    )
-    prev_word = WordcabWord(
-        word="",
-        start=0.0,
-        end=0.0,
-        score=1.0,
-    ).dict()
+def wc2ct(wc: WordcabTranscript) -> ColumnarTranscript:
+    ct = ColumnarTranscript(language=wc.source_lang, text="")
+    prev = (0.0, 0.0, 1.0)
     for i, wc_utt in enumerate(wc.utterances):
+        speaker = None
         if wc_utt.speaker is not None:
-            ott.speakers.add(f"SPEAKER_{wc_utt.speaker}")
-        otts = OpenthotSegment(
-            id=i,
-            start=wc_utt.start,
-            end=wc_utt.end,
-            words=[],
-            speaker=f"SPEAKER_{wc_utt.speaker}" if wc_utt.speaker is not None else None,
+            speaker = f"SPEAKER_{wc_utt.speaker}"
+            ct.add_speaker(speaker)
+        ct.add_segment(i, wc_utt.start, wc_utt.end, speaker)
+        prev = _add_filled_words(ct, wc_utt.words, prev)
+    return ct
+
+
+def raw2ct(
+    transcript: WhisperTranscript | WhisperXTranscript | WordcabTranscript,
+) -> ColumnarTranscript:
+    """Normalize the raw transcript of any engine, into a columnar one."""
+    if isinstance(transcript, WhisperTranscript):
+        return wt2ct(transcript)
+    if isinstance(transcript, WhisperXTranscript):
+        return wtx2ct(transcript)
+    return wc2ct(transcript)
+
+
+def wt2ott(wt: WhisperTranscript) -> OpenthotTranscript:
+    return wt2ct(wt).to_ott()
+
+
+def wtx2ott(wxt: WhisperXTranscript) -> OpenthotTranscript:
+    return wtx2ct(wxt).to_ott()
+
+
+def wc2ott(wc: WordcabTranscript) -> OpenthotTranscript:
+    return wc2ct(wc).to_ott()
+
+
+def raw2ott(
+    transcript: WhisperTranscript | WhisperXTranscript | WordcabTranscript,
+) -> OpenthotTranscript:
+    """Normalize the raw transcript of any engine."""
+    return raw2ct(transcript).to_ott()
+
+
+def partial2ott(segments: list[PartialSegment]) -> OpenthotTranscript:
+    texts = [segment.text.strip() for segment in segments]
+    return OpenthotTranscript(
+        language=None,
+        text=" ".join(texts),
+        segments=[
+            OpenthotSegment(
+                id=i, start=segment.start, end=segment.end, words=[], text=text
+            )
+            for i, (segment, text) in enumerate(zip(segments, texts))
+        ],
+        speakers=set(),
+    )
+
+
+def partial_segments(
+    transcript: WhisperTranscript | WhisperXTranscript,
+    offset: float = 0.0,
+    overlap: float = 0.0,
+) -> list[PartialSegment]:
+    """
+    Segments of a transcript (e.g. of a chunk starting at `offset`) as partial ones,
+    but those mostly in the `overlap` of its chunk with the previous one, which are
+    the previous chunk's (see `openthot.asr.stitching`).
+    """
+    return [
+        PartialSegment(
+            start=segment.start + offset, end=segment.end + offset, text=segment.text
         )
-        for wc_word in wc_utt.words:
-            # fill none fields with previous word fields
-            w_dict = prev_word | wc_word.dict(exclude_none=True)
-            ottw = OpenthotWord(**w_dict, probability=w_dict["score"])
-            prev_word = w_dict
-            otts.words.append(ottw)
-        ott.segments.append(otts)
-    return ott
+        for segment in transcript.segments
+        if (segment.start + segment.end) / 2 >= overlap
+    ]
@@ -0,0 +1,45 @@
+from typing import TypeAlias
+
+from pydantic import BaseModel, FilePath, conint, constr
+
+UploadId: TypeAlias = constr(min_length=32, max_length=32)  # type: ignore
+
+
+class APIInputUploadCreate(BaseModel):
+    """
+    Properties to receive when starting a resumable upload.
+    `size` is optional, but when provided the upload cannot
+    be finalized until exactly that many bytes were received.
+    """
+
+    filename: constr(min_length=1, max_length=255)  # type: ignore
+    name: str | None = None
+    size: conint(gt=0, lt=pow(2, 63)) | None = None  # type: ignore
+    asr_engine: str | None = None
+
+
+class APIOutputUpload(BaseModel):
+    """
+    Properties to return to client.
+    `offset` is the number of bytes received so far, i.e.
+    where the next chunk is expected to start.
+    """
+
+    id: UploadId
+    filename: str
+    name: str | None = None
+    offset: int
+    size: int | None = None
+    asr_engine: str | None = None
+
+    class Config:
+        orm_mode = True
+
+
+class DBInputUploadCreate(BaseModel):
+    id: UploadId
+    filename: str
+    name: str | None = None
+    location: FilePath
+    size: int | None = None
+    asr_engine: str | None = None
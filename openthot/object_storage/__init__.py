@@ -0,0 +1,372 @@
+"""
+Where audio files are stored, whatever the actual storage backend.
+
+Incoming files are first written to a local staging area (below `object_storage_path`),
+where they are hashed, then stored under their content hash by the configured backend:
+the local filesystem, or an S3-compatible service if `object_storage_s3` is set.
+Stored files are then only read through the backend, as streams.
+"""
+import fcntl
+import hashlib
+import os
+import re
+import secrets
+import tempfile
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import AsyncIterable, AsyncIterator, Iterator
+
+import aiofiles
+import structlog
+from fastapi import UploadFile
+from pydantic import BaseModel
+
+from openthot.config import get_settings
+from openthot.exceptions import AudioFileBusy, UnsupportedAudioFile
+from openthot.object_storage.base import ObjectStat, StorageBackend
+from openthot.object_storage.local import LocalStorageBackend
+from openthot.object_storage.s3 import S3StorageBackend
+
+logger = structlog.get_logger(__file__)
+
+# Size of the buffer used to copy uploads to the object storage.
+# This is the maximum amount of audio held in memory per upload.
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Number of bytes needed to recognize an audio file.
+SNIFF_SIZE = 16
+# Where files are written before we know their content hash.
+STAGING_DIR = "staging"
+# Where files of remote backends are copied when a local file is required.
+CACHE_DIR = "cache"
+# Files computed from an audio file, stored next to it under its content hash
+WAVEFORM_SUFFIX = ".peaks"
+NORMALIZED_SUFFIX = ".16k.flac"
+DERIVED_SUFFIXES = (WAVEFORM_SUFFIX, NORMALIZED_SUFFIX)
+
+
+class StoredAudioFile(BaseModel):
+    """What we know about an audio file once it has been written to the object storage."""
+
+    location: str
+    sha256: str
+    size: int
+
+
+class StagedAudioFile(BaseModel):
+    """An audio file fully written to the staging area, and hashed."""
+
+    path: Path
+    sha256: str
+    size: int
+    suffix: str
+
+    @property
+    def location(self) -> str:
+        """Where it is to be stored, i.e. its content address."""
+        return get_storage_backend().location(content_key(self.sha256, self.suffix))
+
+
+def sniff_audio_suffix(head: bytes) -> str | None:
+    """
+    Tells which file extension matches the first bytes of a file,
+    if they match the signature of a container/codec that ASR
+    engines (i.e. ffmpeg) can decode.
+    """
+    if len(head) < 12:
+        return None
+    if head[:4] == b"RIFF" and head[8:12] in (b"WAVE", b"AVI "):
+        return ".wav" if head[8:12] == b"WAVE" else ".avi"
+    if head[:3] == b"ID3" or (head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        # mp3 (with or without id3v2 tag), or raw mpeg/aac frames
+        return ".aac" if head[0] == 0xFF and head[1] & 0x06 == 0 else ".mp3"
+    if head[4:8] == b"ftyp":  # mp4, m4a, mov, 3gp
+        return ".m4a"
+    if head[:4] == b"FORM" and head[8:12] in (b"AIFF", b"AIFC"):
+        return ".aiff"
+    return {
+        b"OggS": ".ogg",
+        b"fLaC": ".flac",
+        b"caff": ".caf",
+        b"#!AM": ".amr",
+        b"\x1a\x45\xdf\xa3": ".webm",
+        b"\x30\x26\xb2\x75": ".wma",
+    }.get(head[:4])
+
+
+def looks_like_audio(head: bytes) -> bool:
+    return sniff_audio_suffix(head) is not None
+
+
+def _storage_root() -> Path:
+    return Path(get_settings().object_storage_path)
+
+
+def get_storage_backend(location: str | Path | None = None) -> StorageBackend:
+    """
+    The backend holding the object at `location`,
+    or the one new objects are stored to if no location is given.
+    """
+    s3_settings = get_settings().object_storage_s3
+    if location is None and s3_settings is not None:
+        return S3StorageBackend(s3_settings)
+    if location is not None and str(location).startswith("s3://"):
+        if s3_settings is None:
+            raise ValueError(f"No S3 object storage is configured for `{location}`")
+        return S3StorageBackend(s3_settings)
+    return LocalStorageBackend(_storage_root())
+
+
+def _new_staging_location(filename: str | None) -> Path:
+    random_str = secrets.token_hex(16)
+    # Client-provided filename must not be able to escape the object storage
+    safe_filename = re.sub(r"[^\w.-]", "_", Path(str(filename)).name)[-128:]
+    return Path(_storage_root(), STAGING_DIR, f"{random_str}-{safe_filename}")
+
+
+def content_key(sha256: str, suffix: str) -> str:
+    """Key under which an audio file is stored, given its content."""
+    return f"{sha256[:2]}/{sha256}{suffix}"
+
+
+def derived_location(sha256: str, suffix: str) -> str:
+    """Location of a file computed from the audio file with this content hash."""
+    return get_storage_backend().location(content_key(sha256, suffix))
+
+
+async def store_derived_file(sha256: str, suffix: str, path: Path) -> str:
+    """Store a local file computed from the audio file with this content hash."""
+    return await get_storage_backend().put_file(content_key(sha256, suffix), path)
+
+
+async def delete_derived_files(sha256: str) -> None:
+    """Remove all files computed from the audio file with this content hash."""
+    backend = get_storage_backend()
+    for suffix in DERIVED_SUFFIXES:
+        location = backend.location(content_key(sha256, suffix))
+        if await backend.stat(location) is not None:
+            await backend.delete(location)
+
+
+async def _commit_staged_file(staged_location: Path, sha256: str, suffix: str) -> str:
+    """
+    Store a fully written file of the staging area under its content address.
+    If the same content is already stored, the staged copy is dropped.
+    """
+    backend = get_storage_backend()
+    key = content_key(sha256, suffix)
+    location = backend.location(key)
+    if await backend.stat(location) is not None:
+        os.remove(staged_location)
+        return location
+    try:
+        return await backend.put_file(key, staged_location)
+    except BaseException:
+        if os.path.exists(staged_location):
+            os.remove(staged_location)
+        raise
+
+
+async def store_staged_audio_file(staged: StagedAudioFile) -> StoredAudioFile:
+    """
+    Store an audio file of the staging area under its content address, so that
+    the same audio uploaded twice is stored once.
+    """
+    location = await _commit_staged_file(staged.path, staged.sha256, staged.suffix)
+    return StoredAudioFile(location=location, sha256=staged.sha256, size=staged.size)
+
+
+async def stage_audio_file(audio_file: UploadFile) -> StagedAudioFile:
+    """
+    Copy an uploaded audio file to the staging area, chunk by chunk,
+    so that memory usage does not depend on the size of the upload,
+    hashing it along the way.
+
+    Raises:
+        UnsupportedAudioFile: if the beginning of the file does not look like audio.
+    """
+    staged_location = _new_staging_location(audio_file.filename)
+
+    chunk = await audio_file.read(UPLOAD_CHUNK_SIZE)
+    suffix = sniff_audio_suffix(chunk)
+    if suffix is None:
+        raise UnsupportedAudioFile(filename=audio_file.filename)
+
+    await logger.adebug(
+        "Intending to write audio file",
+        staged_location=staged_location,
+    )
+    os.makedirs(staged_location.parent, exist_ok=True)
+    sha256 = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(staged_location, "wb") as persistent_file:
+            while chunk:
+                sha256.update(chunk)
+                size += len(chunk)
+                await persistent_file.write(chunk)
+                chunk = await audio_file.read(UPLOAD_CHUNK_SIZE)
+    except BaseException:
+        # Do not leave truncated files behind (e.g. client disconnected)
+        if os.path.exists(staged_location):
+            os.remove(staged_location)
+        raise
+    return StagedAudioFile(
+        path=staged_location, sha256=sha256.hexdigest(), size=size, suffix=suffix
+    )
+
+
+async def save_audio_file(audio_file: UploadFile) -> StoredAudioFile:
+    """
+    Copy an uploaded audio file to the object storage, under its content hash.
+
+    Raises:
+        UnsupportedAudioFile: if the beginning of the file does not look like audio.
+    """
+    return await store_staged_audio_file(await stage_audio_file(audio_file))
+
+
+async def create_audio_file(filename: str) -> Path:
+    """
+    Create an empty audio file in the staging area of the object storage,
+    to be filled by `append_audio_chunks`, then hashed by `hash_staged_audio_file`
+    and stored by `store_staged_audio_file`.
+    """
+    staged_location = _new_staging_location(filename)
+    os.makedirs(staged_location.parent, exist_ok=True)
+    async with aiofiles.open(staged_location, "xb"):
+        pass
+    return staged_location
+
+
+def get_audio_file_size(location: str | Path) -> int:
+    return os.path.getsize(location)
+
+
+@contextmanager
+def locked_audio_file(location: str | Path) -> Iterator[None]:
+    """
+    Hold an exclusive lock on an audio file of the staging area, e.g. while appending
+    to it, so that requests on it (from any process of the host) are serialized.
+    The lock is released on exit, or if the process dies.
+
+    Raises:
+        AudioFileBusy: if the lock is already held.
+        FileNotFoundError: if the file is no longer there, e.g. finalized or removed
+            by the request holding the lock before.
+    """
+    fd = os.open(location, os.O_RDONLY)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError as e:
+            raise AudioFileBusy(str(location)) from e
+        if not os.path.samestat(os.fstat(fd), os.stat(location)):
+            raise FileNotFoundError(str(location))
+        yield
+    finally:
+        os.close(fd)
+
+
+async def append_audio_chunks(
+    location: str | Path, chunks: AsyncIterable[bytes]
+) -> int:
+    """
+    Append incoming chunks to an audio file of the object storage,
+    writing each of them as soon as it is received.
+    If the file is still empty, its first bytes are checked to look like audio.
+
+    Returns:
+        int: The new size of the file.
+
+    Raises:
+        UnsupportedAudioFile: if the beginning of the file does not look like audio.
+    """
+    head = b"" if get_audio_file_size(location) == 0 else None
+    async with aiofiles.open(location, "ab") as persistent_file:
+        async for chunk in chunks:
+            if head is not None:
+                # Keep the very first bytes until there is enough of them to be sniffed
+                head += chunk
+                if len(head) < SNIFF_SIZE:
+                    continue
+                if not looks_like_audio(head):
+                    raise UnsupportedAudioFile(filename=Path(location).name)
+                chunk, head = head, None
+            await persistent_file.write(chunk)
+        if head:
+            # Whole upload so far is smaller than what we need to sniff it
+            if not looks_like_audio(head):
+                raise UnsupportedAudioFile(filename=Path(location).name)
+            await persistent_file.write(head)
+    return get_audio_file_size(location)
+
+
+async def hash_staged_audio_file(staged_location: str | Path) -> StagedAudioFile:
+    """
+    Hash a fully written audio file of the staging area, reading it chunk by chunk.
+
+    Raises:
+        UnsupportedAudioFile: if the beginning of the file does not look like audio.
+    """
+    sha256 = hashlib.sha256()
+    size = 0
+    suffix = None
+    async with aiofiles.open(staged_location, "rb") as persistent_file:
+        while chunk := await persistent_file.read(UPLOAD_CHUNK_SIZE):
+            if size == 0:
+                suffix = sniff_audio_suffix(chunk)
+            sha256.update(chunk)
+            size += len(chunk)
+    if suffix is None:
+        raise UnsupportedAudioFile(filename=Path(staged_location).name)
+    return StagedAudioFile(
+        path=Path(staged_location), sha256=sha256.hexdigest(), size=size, suffix=suffix
+    )
+
+
+async def stat_audio_file(location: str | Path) -> ObjectStat | None:
+    """Size of a stored audio file, or `None` if it does not exist."""
+    return await get_storage_backend(location).stat(str(location))
+
+
+def read_audio_file(
+    location: str | Path, start: int = 0, end: int | None = None
+) -> AsyncIterator[bytes]:
+    """Stream a stored audio file, or only its bytes in `[start, end)`."""
+    return get_storage_backend(location).get(str(location), start, end)
+
+
+@contextmanager
+def scratch_directory() -> Iterator[Path]:
+    """A temporary local directory, removed on exit along with its content."""
+    cache_dir = Path(_storage_root(), CACHE_DIR)
+    os.makedirs(cache_dir, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=cache_dir) as tmp_dir:
+        yield Path(tmp_dir)
+
+
+@asynccontextmanager
+async def local_audio_file(location: str | Path) -> AsyncIterator[Path]:
+    """
+    A local path to a stored audio file, for tools that can only read files
+    (e.g. ASR command lines).
+    Files of remote backends are streamed to a temporary directory, which is
+    removed on exit along with anything written next to the copy.
+    """
+    if isinstance(get_storage_backend(location), LocalStorageBackend):
+        yield Path(location)
+        return
+    with scratch_directory() as tmp_dir:
+        local_location = Path(tmp_dir, Path(str(location)).name)
+        async with aiofiles.open(local_location, "wb") as local_file:
+            async for chunk in read_audio_file(location):
+                await local_file.write(chunk)
+        yield local_location
+
+
+async def delete_audio_file(location: str | Path) -> bool:
+    """
+    Remove an audio file from the object storage.
+    Files outside of the object storage (e.g. legacy or test locations) are left untouched.
+    """
+    return await get_storage_backend(location).delete(str(location))
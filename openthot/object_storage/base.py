@@ -0,0 +1,62 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import AsyncIterator
+
+from pydantic import BaseModel
+
+# Size of the chunks yielded when streaming an object out of a backend.
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+class ObjectStat(BaseModel):
+    """What a backend knows about a stored object, without reading it."""
+
+    location: str
+    size: int
+
+
+class StorageBackend(ABC):
+    """
+    Where audio files (and anything derived from them) are persisted.
+
+    Objects are addressed by a `key`, relative to the root of the backend,
+    e.g. `ab/abcdef….mp3`. Once stored, an object is referred to by its
+    `location`, which is what ends up in the database and is enough to know
+    which backend holds it, e.g. a path or an `s3://bucket/key` URI.
+    """
+
+    @abstractmethod
+    def location(self, key: str) -> str:
+        """Location of the object stored under `key`."""
+
+    @abstractmethod
+    def owns(self, location: str) -> bool:
+        """Whether `location` designates an object managed by this backend."""
+
+    @abstractmethod
+    async def put_file(self, key: str, path: Path) -> str:
+        """
+        Store a local file under `key`, and return its location.
+        The local file is consumed: it is moved or removed once stored.
+        """
+
+    @abstractmethod
+    async def put_bytes(self, key: str, data: bytes) -> str:
+        """Store a small object under `key`, and return its location."""
+
+    @abstractmethod
+    def get(
+        self, location: str, start: int = 0, end: int | None = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream an object chunk by chunk.
+        With `start` and/or `end`, only the bytes in `[start, end)` are read.
+        """
+
+    @abstractmethod
+    async def stat(self, location: str) -> ObjectStat | None:
+        """Size of an object, or `None` if there is no such object."""
+
+    @abstractmethod
+    async def delete(self, location: str) -> bool:
+        """Remove an object. Returns whether there was one to remove."""
@@ -0,0 +1,83 @@
+import os
+from pathlib import Path
+from typing import AsyncIterator
+
+import aiofiles
+import aiofiles.os
+import structlog
+
+from openthot.object_storage.base import READ_CHUNK_SIZE, ObjectStat, StorageBackend
+
+logger = structlog.get_logger(__file__)
+
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Objects are files below a local directory, and their location is their path.
+    Only works if the API and the workers share that directory.
+    """
+
+    root: Path
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+
+    def location(self, key: str) -> str:
+        return str(Path(self.root, key))
+
+    def owns(self, location: str) -> bool:
+        return Path(location).resolve().is_relative_to(self.root.resolve())
+
+    async def put_file(self, key: str, path: Path) -> str:
+        location = self.location(key)
+        os.makedirs(Path(location).parent, exist_ok=True)
+        await aiofiles.os.replace(path, location)
+        return location
+
+    async def put_bytes(self, key: str, data: bytes) -> str:
+        location = self.location(key)
+        os.makedirs(Path(location).parent, exist_ok=True)
+        # Write aside then rename, so that readers never see a partial object
+        async with aiofiles.open(f"{location}.part", "wb") as f:
+            await f.write(data)
+        await aiofiles.os.replace(f"{location}.part", location)
+        return location
+
+    async def get(
+        self, location: str, start: int = 0, end: int | None = None
+    ) -> AsyncIterator[bytes]:
+        async with aiofiles.open(location, "rb") as f:
+            await f.seek(start)
+            remaining = None if end is None else end - start
+            while remaining is None or remaining > 0:
+                size = (
+                    READ_CHUNK_SIZE
+                    if remaining is None
+                    else min(READ_CHUNK_SIZE, remaining)
+                )
+                chunk = await f.read(size)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    async def stat(self, location: str) -> ObjectStat | None:
+        try:
+            stat = await aiofiles.os.stat(location)
+        except FileNotFoundError:
+            return None
+        return ObjectStat(location=location, size=stat.st_size)
+
+    async def delete(self, location: str) -> bool:
+        if not self.owns(location):
+            # e.g. legacy or test locations
+            await logger.awarning(
+                "Not deleting object outside of storage", location=location
+            )
+            return False
+        try:
+            await aiofiles.os.remove(location)
+        except FileNotFoundError:
+            return False
+        return True
@@ -0,0 +1,307 @@
+"""
+S3-compatible storage backend, speaking the S3 REST API through httpx.
+Requests are signed with AWS Signature Version 4, so that it works with AWS
+as well as with self-hosted implementations (MinIO, Ceph, Garage, ...).
+Buckets are addressed path-style, i.e. `{endpoint_url}/{bucket}/{key}`.
+"""
+import hashlib
+import hmac
+import os
+import xml.etree.ElementTree as ET
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator
+from urllib.parse import quote
+
+import aiofiles
+import httpx
+import structlog
+
+from openthot.config import S3StorageSettings
+from openthot.exceptions import ObjectStorageError
+from openthot.object_storage.base import READ_CHUNK_SIZE, ObjectStat, StorageBackend
+
+logger = structlog.get_logger(__file__)
+
+EMPTY_PAYLOAD_SHA256 = hashlib.sha256(b"").hexdigest()
+# Streamed bodies are not hashed beforehand, as it would mean reading them twice
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+# Files larger than this are sent in several parts, each part in a request of its own.
+# S3 requires parts of at least 5MiB (but the last one), and at most 10,000 parts.
+MULTIPART_THRESHOLD = 64 * 1024 * 1024
+MULTIPART_PART_SIZE = 16 * 1024 * 1024
+
+
+def _uri_encode(value: str, safe: str = "-_.~") -> str:
+    return quote(value, safe=safe)
+
+
+def _hmac_sha256(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode(), hashlib.sha256).digest()
+
+
+def sign_request(
+    method: str,
+    url: httpx.URL,
+    headers: dict[str, str],
+    payload_sha256: str,
+    access_key_id: str,
+    secret_access_key: str,
+    region: str,
+    now: datetime | None = None,
+    service: str = "s3",
+) -> dict[str, str]:
+    """
+    Sign a request with AWS Signature Version 4.
+    `headers` are the headers to sign besides `host` and `x-amz-*` ones,
+    and `url` must already be percent-encoded the way it will be sent.
+
+    Returns:
+        dict[str, str]: The headers to add to the request.
+    """
+    amz_date = (now or datetime.now(timezone.utc)).strftime("%Y%m%dT%H%M%SZ")
+    scope = f"{amz_date[:8]}/{region}/{service}/aws4_request"
+    signed = {k.lower(): " ".join(v.split()) for k, v in headers.items()}
+    signed |= {
+        "host": url.netloc.decode(),
+        "x-amz-content-sha256": payload_sha256,
+        "x-amz-date": amz_date,
+    }
+    signed_headers = ";".join(sorted(signed))
+    canonical_query = "&".join(
+        f"{_uri_encode(k)}={_uri_encode(v)}"
+        for k, v in sorted(url.params.multi_items())
+    )
+    canonical_request = "\n".join(
+        [
+            method,
+            url.raw_path.split(b"?")[0].decode(),
+            canonical_query,
+            *(f"{k}:{signed[k]}" for k in sorted(signed)),
+            "",
+            signed_headers,
+            payload_sha256,
+        ]
+    )
+    string_to_sign = "\n".join(
+        [
+            "AWS4-HMAC-SHA256",
+            amz_date,
+            scope,
+            hashlib.sha256(canonical_request.encode()).hexdigest(),
+        ]
+    )
+    signing_key = f"AWS4{secret_access_key}".encode()
+    for part in scope.split("/"):
+        signing_key = _hmac_sha256(signing_key, part)
+    signature = hmac.new(
+        signing_key, string_to_sign.encode(), hashlib.sha256
+    ).hexdigest()
+    return {
+        "x-amz-content-sha256": payload_sha256,
+        "x-amz-date": amz_date,
+        "authorization": (
+            f"AWS4-HMAC-SHA256 Credential={access_key_id}/{scope}, "
+            f"SignedHeaders={signed_headers}, Signature={signature}"
+        ),
+    }
+
+
+async def _read_file_part(path: Path, start: int, size: int) -> AsyncIterator[bytes]:
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        while size > 0:
+            chunk = await f.read(min(READ_CHUNK_SIZE, size))
+            if not chunk:
+                break
+            size -= len(chunk)
+            yield chunk
+
+
+class S3StorageBackend(StorageBackend):
+    """Objects are stored in a bucket of an S3-compatible service."""
+
+    settings: S3StorageSettings
+
+    def __init__(
+        self,
+        settings: S3StorageSettings,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.settings = settings
+        self._transport = transport
+
+    def location(self, key: str) -> str:
+        return f"s3://{self.settings.bucket}/{self.settings.prefix}{key}"
+
+    def owns(self, location: str) -> bool:
+        return location.startswith(self.location(""))
+
+    def _url(self, location: str) -> str:
+        object_name = location.removeprefix(f"s3://{self.settings.bucket}/")
+        endpoint_url = str(self.settings.endpoint_url).rstrip("/")
+        return f"{endpoint_url}/{self.settings.bucket}/{_uri_encode(object_name, safe='-_.~/')}"
+
+    @asynccontextmanager
+    async def _client(self) -> AsyncIterator[httpx.AsyncClient]:
+        async with httpx.AsyncClient(
+            transport=self._transport, timeout=httpx.Timeout(60, connect=10)
+        ) as client:
+            yield client
+
+    async def _send(
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        location: str,
+        params: dict[str, str | int] | None = None,
+        headers: dict[str, str] | None = None,
+        content: bytes | AsyncIterator[bytes] | None = None,
+        payload_sha256: str = EMPTY_PAYLOAD_SHA256,
+        stream: bool = False,
+    ) -> httpx.Response:
+        request = client.build_request(
+            method, self._url(location), params=params, headers=headers, content=content
+        )
+        request.headers.update(
+            sign_request(
+                method,
+                request.url,
+                # Signing `range` too ensures a proxy cannot alter it
+                {k: v for k, v in (headers or {}).items() if k.lower() == "range"},
+                payload_sha256,
+                access_key_id=self.settings.access_key_id,
+                secret_access_key=self.settings.secret_access_key,
+                region=self.settings.region,
+            )
+        )
+        return await client.send(request, stream=stream)
+
+    @staticmethod
+    def _raise_for_status(response: httpx.Response, location: str) -> None:
+        if response.status_code == 404:
+            raise FileNotFoundError(location)
+        if response.is_error:
+            raise ObjectStorageError(location, response.status_code, response.text)
+
+    async def put_file(self, key: str, path: Path) -> str:
+        location = self.location(key)
+        size = os.path.getsize(path)
+        async with self._client() as client:
+            if size <= MULTIPART_THRESHOLD:
+                response = await self._send(
+                    client,
+                    "PUT",
+                    location,
+                    headers={"content-length": str(size)},
+                    content=_read_file_part(path, 0, size),
+                    payload_sha256=UNSIGNED_PAYLOAD,
+                )
+                self._raise_for_status(response, location)
+            else:
+                await self._put_multipart(client, location, path, size)
+        os.remove(path)
+        return location
+
+    async def _put_multipart(
+        self, client: httpx.AsyncClient, location: str, path: Path, size: int
+    ) -> None:
+        response = await self._send(client, "POST", location, params={"uploads": ""})
+        self._raise_for_status(response, location)
+        upload_id = ET.fromstring(response.content).findtext("{*}UploadId")
+        if not upload_id:
+            raise ObjectStorageError(location, response.status_code, response.text)
+        try:
+            etags = []
+            for part_number, start in enumerate(
+                range(0, size, MULTIPART_PART_SIZE), start=1
+            ):
+                part_size = min(MULTIPART_PART_SIZE, size - start)
+                response = await self._send(
+                    client,
+                    "PUT",
+                    location,
+                    params={"partNumber": part_number, "uploadId": upload_id},
+                    headers={"content-length": str(part_size)},
+                    content=_read_file_part(path, start, part_size),
+                    payload_sha256=UNSIGNED_PAYLOAD,
+                )
+                self._raise_for_status(response, location)
+                etags.append(response.headers["etag"])
+            body = "".join(
+                f"<Part><PartNumber>{n}</PartNumber><ETag>{etag}</ETag></Part>"
+                for n, etag in enumerate(etags, start=1)
+            )
+            payload = (
+                f"<CompleteMultipartUpload>{body}</CompleteMultipartUpload>".encode()
+            )
+            response = await self._send(
+                client,
+                "POST",
+                location,
+                params={"uploadId": upload_id},
+                content=payload,
+                payload_sha256=hashlib.sha256(payload).hexdigest(),
+            )
+            self._raise_for_status(response, location)
+            # S3 may report a failure with a 200 status, once the upload is done
+            if ET.fromstring(response.content).tag.endswith("Error"):
+                raise ObjectStorageError(location, response.status_code, response.text)
+        except BaseException:
+            await logger.awarning("Aborting multipart upload", location=location)
+            await self._send(client, "DELETE", location, params={"uploadId": upload_id})
+            raise
+
+    async def put_bytes(self, key: str, data: bytes) -> str:
+        location = self.location(key)
+        async with self._client() as client:
+            response = await self._send(
+                client,
+                "PUT",
+                location,
+                content=data,
+                payload_sha256=hashlib.sha256(data).hexdigest(),
+            )
+        self._raise_for_status(response, location)
+        return location
+
+    async def get(
+        self, location: str, start: int = 0, end: int | None = None
+    ) -> AsyncIterator[bytes]:
+        if end is not None and end <= start:
+            return
+        headers = {}
+        if start or end is not None:
+            headers["range"] = f"bytes={start}-{'' if end is None else end - 1}"
+        async with self._client() as client:
+            response = await self._send(
+                client, "GET", location, headers=headers, stream=True
+            )
+            try:
+                if response.status_code == 416:  # range starts after the end
+                    return
+                self._raise_for_status(response, location)
+                async for chunk in response.aiter_bytes(READ_CHUNK_SIZE):
+                    yield chunk
+            finally:
+                await response.aclose()
+
+    async def stat(self, location: str) -> ObjectStat | None:
+        async with self._client() as client:
+            response = await self._send(client, "HEAD", location)
+        if response.status_code == 404:
+            return None
+        self._raise_for_status(response, location)
+        return ObjectStat(
+            location=location, size=int(response.headers["content-length"])
+        )
+
+    async def delete(self, location: str) -> bool:
+        if not self.owns(location) or await self.stat(location) is None:
+            await logger.awarning("Not deleting missing object", location=location)
+            return False
+        async with self._client() as client:
+            response = await self._send(client, "DELETE", location)
+        self._raise_for_status(response, location)
+        return True
@@ -1,3 +1,5 @@
+import asyncio
+import threading
 from functools import wraps
 from typing import Any, Callable, Coroutine, ParamSpec, TypeVar
 
@@ -7,10 +9,25 @@ from celery import Celery, Task
 _P = ParamSpec("_P")
 _R = TypeVar("_R")
 
+_local = threading.local()
+
+
+def task_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    The event loop running the tasks of the current worker thread.
+    It is kept for the lifetime of the thread, so that resources bound to it
+    (e.g. pooled HTTP connections) are reused from one task to the next.
+    """
+    loop = getattr(_local, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = _local.loop = asyncio.new_event_loop()
+    return loop
+
 
 def async_task(app: Celery, *args: Any, **kwargs: Any):
     """Decorator that allow to declare async functions as tasks,
     hence allowing usage of async functions, e.g. async interface for DB.
+    Tasks of a worker thread all run in the same event loop (see `task_event_loop`).
     Thanks to : https://stackoverflow.com/a/75437648
     Another interesting approach : https://stackoverflow.com/a/66318397"""
 
@@ -20,6 +37,11 @@ def async_task(app: Celery, *args: Any, **kwargs: Any):
         @app.task(*args, **kwargs)
         @wraps(func)
         def _decorated(*args: _P.args, **kwargs: _P.kwargs) -> _R:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return task_event_loop().run_until_complete(func(*args, **kwargs))
+            # Called from async code (e.g. eager task), which has its own loop
             return sync_call(*args, **kwargs)
 
         return _decorated  # type: ignore
@@ -0,0 +1,97 @@
+"""
+Scheduling of transcriptions, so that long audio files do not hold up short ones.
+
+Tasks are routed to a queue by the duration of their audio, each queue being
+consumed by its own workers (see `openthot run worker --queue`). Refinements of
+draft transcripts (see `TwoPassSettings`) have a queue of their own, which fewer
+workers may consume, as users already have a transcript meanwhile. On top of that,
+a user may only have a few transcriptions running at once: the others are deferred,
+letting the transcriptions of other users go first. Running transcriptions are
+leases in the database, renewed while they run, so that those of dead workers
+stop counting once expired.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from enum import Enum
+from typing import Any, AsyncIterator
+
+from openthot.config import get_settings
+from openthot.db import rw
+from openthot.db.database import async_session
+from openthot.models.interview import InterviewId
+from openthot.models.users import UserId
+
+scheduling_settings = get_settings().asr_scheduling
+chunking_settings = get_settings().asr_chunking
+
+
+class QueueClass(str, Enum):
+    short = "short"
+    medium = "medium"
+    long = "long"
+    refine = "refine"
+
+    @property
+    def queue(self) -> str:
+        return f"asr_{self.value}"
+
+
+def queue_class(audio_duration: float | None) -> QueueClass:
+    """Queue of the transcription of audio lasting `audio_duration` (s), if known."""
+    if audio_duration is None:
+        return QueueClass.medium
+    if audio_duration <= scheduling_settings.short_max_duration_s:
+        return QueueClass.short
+    if audio_duration >= scheduling_settings.long_min_duration_s:
+        return QueueClass.long
+    return QueueClass.medium
+
+
+def route_task(
+    name: str, args: tuple, kwargs: dict, options: dict, task=None, **kw: Any
+) -> dict[str, str]:
+    """Celery router (see `task_routes`) of the tasks of `openthot.tasks.tasks`."""
+    if kwargs.get("refining"):
+        return {"queue": QueueClass.refine.queue}
+    if name.endswith(".transcribe_chunk_task"):
+        audio_duration = chunking_settings.chunk_duration_s
+    elif name.endswith((".merge_chunks_task", ".fail_chunks_task")):
+        audio_duration = 0.0  # i.e. no transcription
+    else:
+        audio_duration = kwargs.get("audio_duration")
+    return {"queue": queue_class(audio_duration).queue}
+
+
+async def _renew_lease(lease_id: int) -> None:
+    while True:
+        await asyncio.sleep(scheduling_settings.lease_s / 3)
+        async with async_session() as session:
+            await rw.renew_transcription_lease(
+                session, lease_id, scheduling_settings.lease_s
+            )
+
+
+@asynccontextmanager
+async def fair_share(user_id: UserId, interview_id: InterviewId) -> AsyncIterator[bool]:
+    """
+    Whether the transcription of an interview fits in the fair share of its user,
+    as always without limit. If so, it counts as running until exiting the context.
+    """
+    max_in_flight = scheduling_settings.max_in_flight_per_user
+    if max_in_flight is None:
+        yield True
+        return
+    async with async_session() as session:
+        lease_id = await rw.acquire_transcription_lease(
+            session, user_id, interview_id, max_in_flight, scheduling_settings.lease_s
+        )
+    if lease_id is None:
+        yield False
+        return
+    renewal = asyncio.create_task(_renew_lease(lease_id))
+    try:
+        yield True
+    finally:
+        renewal.cancel()
+        async with async_session() as session:
+            await rw.release_transcription_lease(session, lease_id)
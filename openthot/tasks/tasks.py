@@ -1,43 +1,76 @@
 import contextlib
-from typing import Type
+import time
+from functools import partial
 
 import structlog
-from celery import Celery
-from pydantic import FilePath
-
-from openthot.asr.process import process_audio
-from openthot.asr.transcriptors import Transcriptor
-from openthot.asr.transcriptors.whisper import Whisper
-from openthot.asr.transcriptors.whisperx import WhisperX
-from openthot.asr.transcriptors.wordcab import Wordcab
+from celery import Celery, chord
+from celery.signals import worker_process_init
+
+from openthot.asr import distributed, model_server, registry
+from openthot.asr.distributed import StoredChunk
+from openthot.asr.process import (
+    fail_chunked_transcription,
+    finish_chunked_transcription,
+    process_audio,
+    process_audio_batch,
+)
 from openthot.config import get_settings
+from openthot.db import rw
 from openthot.db.database import get_db
-from openthot.models.interview import InterviewId, TranscriptorSource
+from openthot.db.schemas import SqlaInterview
+from openthot.models.interview import InterviewId
 from openthot.models.users import UserId
-from openthot.tasks import async_task
+from openthot.tasks import async_task, scheduling
 
 logger = structlog.get_logger(__file__)
 
 celery = Celery()
 celery.conf.update(**get_settings().celery.dict())
-transcriptors: dict[TranscriptorSource, Type[Transcriptor]] = {
-    TranscriptorSource.whisper: Whisper,
-    TranscriptorSource.whisperx: WhisperX,
-    TranscriptorSource.wordcab: Wordcab,
-}
-
-transcriptor_source = get_settings().asr.engine
-transcriptor_class = transcriptors[transcriptor_source]
+celery.conf.task_routes = (scheduling.route_task,)
+if warm_engines := registry.warm_engines():
+    # By default, Celery kills worker processes that take more than 4s to start
+    celery.conf.worker_proc_alive_timeout = model_server.LOADING_TIMEOUT_S * len(
+        warm_engines
+    )
+batching_settings = get_settings().asr_batching
+slots_settings = get_settings().asr_slots
 
 get_db_context = contextlib.asynccontextmanager(get_db)
 
 
+@worker_process_init.connect
+def load_asr_models(**kwargs):
+    """
+    Load the models of all the in-process ASR engines once per worker process,
+    so that they are warm side by side for its tasks.
+    Slots only limit the transcriptions running at once: these models take memory
+    in every process, whether it gets slots or not.
+    """
+    engines = registry.warm_engines()
+    weight = sum(engine.weight for engine in engines)
+    if (
+        slots_settings.host_capacity is not None
+        and weight > slots_settings.host_capacity
+    ):
+        logger.warning(
+            "Models of a worker process weigh more than the slots of the host",
+            weight=weight,
+            host_capacity=slots_settings.host_capacity,
+        )
+    for engine in engines:
+        model_server.load_models(engine.settings)
+
+
 @async_task(celery, bind=True)
 async def process_audio_task(
     self,
     user_id: UserId,
     interview_id: InterviewId,
-    audio_location: FilePath,
+    audio_location: str,
+    audio_duration: float | None = None,  # i.e. its queue (see `scheduling`)
+    batchable: bool = True,
+    refining: bool = False,  # i.e. the refine queue (see `scheduling`)
+    deferrals: int = 0,  # i.e. beyond the fair share of the user
 ):
     if not isinstance(user_id, UserId):
         try:
@@ -50,14 +83,147 @@ async def process_audio_task(
                 audio_file_path=audio_location,
             )
             raise Exception from e
+    async with scheduling.fair_share(user_id, interview_id) as admitted:
+        if not admitted:
+            if deferrals < scheduling.scheduling_settings.max_deferrals:
+                await logger.ainfo(
+                    "Deferring transcription, user has enough running",
+                    user_id=user_id,
+                    interview_id=interview_id,
+                    deferrals=deferrals,
+                )
+                # Back to the queue, without counting as a retry
+                self.apply_async(
+                    self.request.args,
+                    self.request.kwargs | {"deferrals": deferrals + 1},
+                    countdown=scheduling.scheduling_settings.defer_countdown_s,
+                )
+                return
+            await logger.awarning(
+                "Transcription deferred too many times, running it anyway",
+                user_id=user_id,
+                interview_id=interview_id,
+            )
+        try:
+            async with get_db_context() as async_session:
+                if (
+                    batchable
+                    and batching_settings.enabled
+                    and scheduling.queue_class(audio_duration)
+                    == scheduling.QueueClass.short
+                ):
+                    await process_audio_batch(
+                        session=async_session,
+                        interview_id=interview_id,
+                        requeue=requeue_alone,
+                    )
+                    return
+                await process_audio(
+                    session=async_session,
+                    user_id=user_id,
+                    interview_id=interview_id,
+                    audio_location=audio_location,
+                    fan_out=partial(fan_out_chunks, user_id, interview_id),
+                    refine=None if refining else refine_later,
+                )
+        except Exception as e:
+            await logger.aexception("Task encountered exception", exception=str(e))
+            self.retry(countdown=1)
+
+
+def requeue_alone(interview: SqlaInterview) -> None:
+    """Transcribe an interview on its own, e.g. after its batch failed on it."""
+    process_audio_task.apply_async(
+        kwargs={
+            "user_id": str(interview.creator_id),
+            "interview_id": interview.id,
+            "audio_location": interview.audio_location,
+            "audio_duration": interview.audio_duration,
+            "batchable": False,
+        }
+    )
+
+
+def refine_later(interview: SqlaInterview) -> None:
+    """Transcribe an interview again with its engine, replacing its draft transcript."""
+    process_audio_task.apply_async(
+        kwargs={
+            "user_id": str(interview.creator_id),
+            "interview_id": interview.id,
+            "audio_location": interview.audio_location,
+            "audio_duration": interview.audio_duration,
+            "batchable": False,
+            "refining": True,
+        }
+    )
+
+
+def fan_out_chunks(
+    user_id: UserId, interview_id: InterviewId, chunks: list[StoredChunk]
+) -> None:
+    """
+    Transcribe stored chunks with as many tasks, and merge their transcripts once done.
+    If any of them (or the merge) fails for good, the transcription is given up.
+    """
+    stored_chunks = [chunk.dict() for chunk in chunks]
+    chord(transcribe_chunk_task.s(chunk) for chunk in stored_chunks)(
+        merge_chunks_task.s(
+            user_id=str(user_id), interview_id=interview_id, started_at=time.time()
+        ).on_error(
+            # i.e. not given the failed task, being immutable
+            fail_chunks_task.si(interview_id=interview_id, chunks=stored_chunks)
+        )
+    )
+
+
+@async_task(celery, bind=True, max_retries=3)
+async def transcribe_chunk_task(self, chunk: dict) -> dict:
+    stored_chunk = StoredChunk.parse_obj(chunk)
     try:
         async with get_db_context() as async_session:
-            await process_audio(
+            await distributed.transcribe_stored_chunk(
+                stored_chunk,
+                registry.get_engine(stored_chunk.asr_engine),
+                on_segments=partial(
+                    rw.add_partial_segments, async_session, stored_chunk.interview_id
+                ),
+            )
+    except Exception as e:
+        await logger.aexception(
+            "Chunk task encountered exception", exception=str(e), chunk=chunk
+        )
+        self.retry(countdown=1)
+    return chunk
+
+
+@async_task(celery, bind=True)
+async def merge_chunks_task(
+    self,
+    chunks: list[dict],
+    user_id: str,
+    interview_id: InterviewId,
+    started_at: float,
+):
+    try:
+        async with get_db_context() as async_session:
+            await finish_chunked_transcription(
                 session=async_session,
-                user_id=user_id,
+                user_id=UserId(user_id),
                 interview_id=interview_id,
-                audio_location=audio_location,
+                chunks=[StoredChunk.parse_obj(chunk) for chunk in chunks],
+                transcript_duration=time.time() - started_at,
             )
     except Exception as e:
-        await logger.aexception("Task encountered exception", exception=str(e))
+        await logger.aexception("Merge task encountered exception", exception=str(e))
         self.retry(countdown=1)
+
+
+@async_task(celery)
+async def fail_chunks_task(*, interview_id: InterviewId, chunks: list[dict]):
+    await logger.aerror("Could not transcribe chunks", interview_id=interview_id)
+    async with get_db_context() as async_session:
+        await fail_chunked_transcription(
+            session=async_session,
+            interview_id=interview_id,
+            chunks=[StoredChunk.parse_obj(chunk) for chunk in chunks],
+        )
@@ -0,0 +1,112 @@
+import importlib.util
+import json
+import math
+from array import array
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from openthot.api.json_stream import stream_interview
+from openthot.db import rw
+from openthot.models.interview import APIOutputInterview, DBInputInterviewUpdate
+from openthot.models.transcript.encoding import decode_transcript
+from openthot.models.transcript.openthot import OpenthotTranscript
+
+
+# Tests that streamed interviews are the same as when encoded as a whole
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "with_orjson",
+    (
+        pytest.param(
+            True,
+            marks=pytest.mark.skipif(
+                not importlib.util.find_spec("orjson"), reason="requires orjson"
+            ),
+        ),
+        False,
+    ),
+)
+async def test_stream_interview(
+    mocker,
+    async_test_session,
+    sqla_interview,
+    ott_simple_example2: OpenthotTranscript,
+    with_orjson: bool,
+):
+    if not with_orjson:
+        mocker.patch("openthot.api.json_stream.orjson", None)
+    mocker.patch("openthot.api.json_stream.BATCH_SIZE", 4)
+    await rw.update_interview(
+        async_test_session,
+        sqla_interview,
+        DBInputInterviewUpdate(
+            transcript=ott_simple_example2, speakers={"SPEAKER_00": "Alice"}
+        ),
+    )
+
+    transcript = decode_transcript(sqla_interview.transcript)
+    chunks = list(
+        stream_interview(
+            APIOutputInterview.envelope_from_orm(sqla_interview, transcript),
+            transcript,
+        )
+    )
+    assert len(chunks) == 2 + (len(ott_simple_example2.segments) + 3) // 4
+    streamed = json.loads(b"".join(chunks))
+    expected = jsonable_encoder(APIOutputInterview.from_orm(sqla_interview))
+    for interview in (streamed, expected):
+        interview["transcript"]["speakers"].sort()
+    assert streamed == expected
+    # Segments of full transcripts have no `text`, rather than a null one
+    assert not any("text" in s for s in streamed["transcript"]["segments"])
+    assert streamed["speakers"] == {"SPEAKER_00": "Alice", "SPEAKER_01": "SPEAKER_01"}
+
+
+# Tests that non-finite floats are streamed as null, rather than failing midway
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "with_orjson",
+    (
+        pytest.param(
+            True,
+            marks=pytest.mark.skipif(
+                not importlib.util.find_spec("orjson"), reason="requires orjson"
+            ),
+        ),
+        False,
+    ),
+)
+async def test_stream_interview_not_finite(
+    mocker,
+    async_test_session,
+    sqla_interview,
+    ott_simple_example2: OpenthotTranscript,
+    with_orjson: bool,
+):
+    if not with_orjson:
+        mocker.patch("openthot.api.json_stream.orjson", None)
+    await rw.update_interview(
+        async_test_session,
+        sqla_interview,
+        DBInputInterviewUpdate(transcript=ott_simple_example2),
+    )
+    transcript = decode_transcript(sqla_interview.transcript)
+    # e.g. scores of words an engine could not align
+    transcript.word_probabilities = array("d", transcript.word_probabilities)
+    transcript.word_probabilities[0] = math.nan
+    transcript.word_ends = array("d", transcript.word_ends)
+    transcript.word_ends[1] = math.inf
+
+    streamed = json.loads(
+        b"".join(
+            stream_interview(
+                APIOutputInterview.envelope_from_orm(sqla_interview, transcript),
+                transcript,
+            )
+        )
+    )
+
+    first, second = streamed["transcript"]["segments"][0]["words"][:2]
+    assert first["probability"] is None
+    assert second["end"] is None
@@ -0,0 +1,80 @@
+import pytest
+
+from openthot.api.ranges import (
+    RangeNotSatisfiable,
+    etag_matches,
+    multipart_byteranges,
+    parse_range_header,
+)
+
+
+@pytest.mark.parametrize(
+    "header,expected",
+    (
+        ("bytes=0-9", [(0, 10)]),
+        ("bytes=90-", [(90, 100)]),
+        ("bytes=-10", [(90, 100)]),
+        ("bytes=-1000", [(0, 100)]),
+        ("bytes=50-1000", [(50, 100)]),
+        ("bytes=0-0,-1", [(0, 1), (99, 100)]),
+        ("bytes= 20-29 , 0-9", [(0, 10), (20, 30)]),
+        ("bytes=0-9,5-14,15-19", [(0, 20)]),  # overlapping and adjacent are coalesced
+        ("bytes=0-9,200-", [(0, 10)]),  # unsatisfiable ones are dropped
+        ("items=0-9", None),
+        ("bytes=9-0", None),
+        ("bytes=a-b", None),
+        ("bytes=-", None),
+        ("bytes=²-", None),
+        (",".join(f"bytes={i * 2}-{i * 2}" for i in range(20)), None),
+    ),
+)
+def test_parse_range_header(header, expected):
+    assert parse_range_header(header, 100) == expected
+
+
+@pytest.mark.parametrize("header", ("bytes=100-", "bytes=-0", "bytes=200-300"))
+def test_parse_range_header_not_satisfiable(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range_header(header, 100)
+
+
+@pytest.mark.parametrize(
+    "header,weak,expected",
+    (
+        ('"abc"', True, True),
+        ('W/"abc"', True, True),
+        ('W/"abc"', False, False),
+        ('"xyz", "abc"', True, True),
+        ("*", True, True),
+        ('"xyz"', True, False),
+        ("Wed, 21 Oct 2015 07:28:00 GMT", False, False),
+    ),
+)
+def test_etag_matches(header, weak, expected):
+    assert etag_matches(header, '"abc"', weak=weak) is expected
+
+
+@pytest.mark.asyncio
+async def test_multipart_byteranges():
+    content = b"0123456789"
+
+    async def read(start, end):
+        yield content[start:end]
+
+    content_type, length, body = multipart_byteranges(
+        read, [(0, 2), (5, 10)], 10, "audio/mpeg"
+    )
+    body = b"".join([chunk async for chunk in body])
+
+    boundary = content_type.removeprefix("multipart/byteranges; boundary=")
+    assert len(body) == length
+    assert (
+        body
+        == (
+            f"--{boundary}\r\nContent-Type: audio/mpeg\r\nContent-Range: bytes 0-1/10\r\n\r\n"
+            f"01\r\n"
+            f"--{boundary}\r\nContent-Type: audio/mpeg\r\nContent-Range: bytes 5-9/10\r\n\r\n"
+            f"56789\r\n"
+            f"--{boundary}--\r\n"
+        ).encode()
+    )
@@ -1,13 +1,28 @@
+import hashlib
+import os
+from datetime import datetime
+from io import BytesIO
+
 import pytest
 import pytest_asyncio
 
+from openthot import object_storage
+from openthot.audio.ingest import ingest_audio
+from openthot.audio.waveform import WaveformPeaks
+from openthot.db import rw
+from openthot.db.schemas import SqlaTranscriptionProgress
+from openthot.models import interview as interview_module
 from openthot.models.interview import (
     APIInputInterviewCreate,
     APIInputInterviewUpdate,
     APIOutputInterview,
+    APIOutputTranscriptPage,
+    DBInputInterviewUpdate,
     InterviewStatus,
 )
-from tests.conftest import V1_PREFIX
+from openthot.models.transcript import TranscriptorSource
+from openthot.models.transcript.openthot import PartialSegment
+from tests.conftest import MP3_FILE_PATH, V1_PREFIX
 
 INTERVIEWS_ENDPOINT = V1_PREFIX + "/interviews"
 
@@ -123,6 +138,8 @@ async def test_create_interview_valid(
     mocker, client, access_token, logged_user, upload_file_mp3
 ):
     mocker.patch("openthot.tasks.tasks.process_audio_task.delay")
+    # i.e. probed before being stored, not read back from the object storage
+    local_audio_file = mocker.spy(object_storage, "local_audio_file")
 
     file = {"audio_file": upload_file_mp3}
     itw = APIInputInterviewCreate(name="Test api itw")
@@ -138,6 +155,272 @@ async def test_create_interview_valid(
     assert returned_itw.name == itw.name
     assert returned_itw.status == InterviewStatus.uploaded
     assert str(returned_itw.creator_id) == str(logged_user.id)
+    assert returned_itw.audio_duration == pytest.approx(2.42, abs=0.01)
+    local_audio_file.assert_not_called()
+
+
+@pytest.mark.asyncio
+@pytest.mark.endpoint
+async def test_create_interview_not_audio(mocker, client, access_token):
+    delay = mocker.patch("openthot.tasks.tasks.process_audio_task.delay")
+
+    file = {"audio_file": BytesIO(b"definitely not some audio" * 100)}
+    response = await client.post(
+        INTERVIEWS_ENDPOINT,
+        headers=bearer_header(access_token),
+        files=file,
+    )
+    assert response.status_code == 400
+    delay.assert_not_called()
+
+
+# Tests that interviews can only request a configured ASR engine
+@pytest.mark.asyncio
+@pytest.mark.endpoint
+async def test_create_interview_asr_engine(
+    mocker, client, access_token, upload_file_mp3
+):
+    delay = mocker.patch("openthot.tasks.tasks.process_audio_task.delay")
+
+    response = await client.post(
+        INTERVIEWS_ENDPOINT,
+        headers=bearer_header(access_token),
+        params={"asr_engine": "unknown"},
+        files={"audio_file": upload_file_mp3},
+    )
+    assert response.status_code == 400
+    delay.assert_not_called()
+
+    response = await client.post(
+        INTERVIEWS_ENDPOINT,
+        headers=bearer_header(access_token),
+        params={"asr_engine": "default"},
+        files={"audio_file": upload_file_mp3},
+    )
+    assert response.status_code == 200
+    assert response.json()["asr_engine"] == "default"
+
+
+#
+# Resumable uploads
+#
+UPLOADS_ENDPOINT = INTERVIEWS_ENDPOINT + "/uploads"
+
+
+@pytest.mark.asyncio
+@pytest.mark.endpoint
+async def test_resumable_upload_unauthorized(client):
+    response = await client.post(UPLOADS_ENDPOINT, json={"filename": "test.mp3"})
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+@pytest.mark.endpoint
+async def test_resumable_upload_valid(
+    mocker, client, access_token, logged_user, upload_file_mp3
+):
+    delay = mocker.patch("openthot.tasks.tasks.process_audio_task.delay")
+    content = upload_file_mp3.getvalue()
+    half = len(content) // 2
+
+    response = await client.post(
+        UPLOADS_ENDPOINT,
+        headers=bearer_header(access_token),
+        json={"filename": "bonjour.mp3", "size": len(content)},
+    )
+    assert response.status_code == 200
+    upload = response.json()
+    assert upload["offset"] == 0
+    upload_endpoint = UPLOADS_ENDPOINT + f"/{upload['id']}"
+
+    for offset, chunk in ((0, content[:half]), (half, content[half:])):
+        response = await client.put(
+            upload_endpoint,
+            headers=bearer_header(access_token),
+            params={"offset": offset},
+            content=chunk,
+        )
+        assert response.status_code == 200
+        assert response.json()["offset"] == offset + len(chunk)
+
+    response = await client.get(upload_endpoint, headers=bearer_header(access_token))
+    assert response.status_code == 200
+    assert response.json()["offset"] == len(content)
+
+    response = await client.post(
+        upload_endpoint + "/finalize", headers=bearer_header(access_token)
+    )
+    assert response.status_code == 200
+    returned_itw = APIOutputInterview(**response.json())
+    assert returned_itw.name == "bonjour"
+    assert returned_itw.audio_filename == "bonjour.mp3"
+    assert returned_itw.status == InterviewStatus.uploaded
+    assert str(returned_itw.creator_id) == str(logged_user.id)
+    delay.assert_called_once()
+
+    # Upload is gone once turned into an interview
+    response = await client.get(upload_endpoint, headers=bearer_header(access_token))
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+@pytest.mark.endpoint
+async def test_resumable_upload_offset_mismatch(client, access_token, upload_file_mp3):
+    content = upload_file_mp3.getvalue()
+    response = await client.post(
+        UPLOADS_ENDPOINT,
+        headers=bearer_header(access_token),
+        json={"filename": "bonjour.mp3"},
+    )
+    upload_endpoint = UPLOADS_ENDPOINT + f"/{response.json()['id']}"
+    await client.put(
+        upload_endpoint,
+        headers=bearer_header(access_token),
+        params={"offset": 0},
+        content=content[:1000],
+    )
+
+    # e.g. the client did not get the response for a chunk that was actually written
+    response = await client.put(
+        upload_endpoint,
+        headers=bearer_header(access_token),
+        params={"offset": 0},
+        content=content[:1000],
+    )
+    assert response.status_code == 409
+    response = await client.get(upload_endpoint, headers=bearer_header(access_token))
+    assert response.json()["offset"] == 1000
+
+
+# Tests that an upload resumes from what was actually written, e.g. by a chunk that
+# failed midway, and that chunks are not appended concurrently
+@pytest.mark.asyncio
+@pytest.mark.endpoint
+async def test_resumable_upload_interrupted(
+    client, access_token, logged_user, async_test_session, upload_file_mp3
+):
+    content = upload_file_mp3.getvalue()
+    response = await client.post(
+        UPLOADS_ENDPOINT,
+        headers=bearer_header(access_token),
+        json={"filename": "bonjour.mp3", "size": len(content)},
+    )
+    upload_id = response.json()["id"]
+    upload_endpoint = UPLOADS_ENDPOINT + f"/{upload_id}"
+    await client.put(
+        upload_endpoint,
+        headers=bearer_header(access_token),
+        params={"offset": 0},
+        content=content[:1000],
+    )
+    location = (
+        await rw.get_upload(async_test_session, logged_user, upload_id)
+    ).location
+    # i.e. the next chunk was partly written when the request dropped
+    with open(location, "ab") as f:
+        f.write(content[1000:1500])
+
+    response = await client.get(upload_endpoint, headers=bearer_header(access_token))
+    assert response.json()["offset"] == 1500
+    with object_storage.locked_audio_file(location):
+        response = await client.put(
+            upload_endpoint,
+            headers=bearer_header(access_token),
+            params={"offset": 1500},
+            content=content[1500:],
+        )
+        assert response.status_code == 409
+    response = await client.put(
+        upload_endpoint,
+        headers=bearer_header(access_token),
+        params={"offset": 1500},
+        content=content[1500:],
+    )
+    assert response.status_code == 200
+    assert response.json()["offset"] == len(content)
+
+
+@pytest.mark.asyncio
+@pytest.mark.endpoint
+async def test_resumable_upload_incomplete(client, access_token, upload_file_mp3):
+    content = upload_file_mp3.getvalue()
+    response = await client.post(
+        UPLOADS_ENDPOINT,
+        headers=bearer_header(access_token),
+        json={"filename": "bonjour.mp3", "size": len(content)},
+    )
+    upload_endpoint = UPLOADS_ENDPOINT + f"/{response.json()['id']}"
+    await client.put(
+        upload_endpoint,
+        headers=bearer_header(access_token),
+        params={"offset": 0},
+        content=content[:1000],
+    )
+    response = await client.post(
+        upload_endpoint + "/finalize", headers=bearer_header(access_token)
+    )
+    assert response.status_code == 409
+
+
+# Tests that an upload finalized or deleted by another request is not found
+@pytest.mark.asyncio
+@pytest.mark.endpoint
+async def test_resumable_upload_gone(
+    client, access_token, logged_user, async_test_session, upload_file_mp3
+):
+    content = upload_file_mp3.getvalue()
+    response = await client.post(
+        UPLOADS_ENDPOINT,
+        headers=bearer_header(access_token),
+        json={"filename": "bonjour.mp3", "size": len(content)},
+    )
+    upload_id = response.json()["id"]
+    upload_endpoint = UPLOADS_ENDPOINT + f"/{upload_id}"
+    await client.put(
+        upload_endpoint,
+        headers=bearer_header(access_token),
+        params={"offset": 0},
+        content=content[:1000],
+    )
+    location = (
+        await rw.get_upload(async_test_session, logged_user, upload_id)
+    ).location
+    os.remove(location)
+
+    response = await client.get(upload_endpoint, headers=bearer_header(access_token))
+    assert response.status_code == 404
+    response = await client.put(
+        upload_endpoint,
+        headers=bearer_header(access_token),
+        params={"offset": 1000},
+        content=content[1000:],
+    )
+    assert response.status_code == 404
+    response = await client.post(
+        upload_endpoint + "/finalize", headers=bearer_header(access_token)
+    )
+    assert response.status_code == 404
+    assert not os.path.exists(location)
+
+
+@pytest.mark.asyncio
+@pytest.mark.endpoint
+async def test_resumable_upload_not_audio(client, access_token):
+    response = await client.post(
+        UPLOADS_ENDPOINT,
+        headers=bearer_header(access_token),
+        json={"filename": "notes.txt"},
+    )
+    upload_endpoint = UPLOADS_ENDPOINT + f"/{response.json()['id']}"
+    response = await client.put(
+        upload_endpoint,
+        headers=bearer_header(access_token),
+        params={"offset": 0},
+        content=b"definitely not some audio" * 100,
+    )
+    assert response.status_code == 400
+    response = await client.get(upload_endpoint, headers=bearer_header(access_token))
+    assert response.json()["offset"] == 0
 
 
 #
@@ -199,6 +482,225 @@ async def test_get_interview_uploaded(client, access_token, api_interviews_uploa
         assert returned_itw.status in InterviewStatus._value2member_map_.keys()
 
 
+@pytest.mark.asyncio
+@pytest.mark.endpoint
+async def test_get_interview_progress(
+    client, access_token, async_test_session, api_interviews_uploaded
+):
+    itw, other_itw = api_interviews_uploaded[:2]
+    interview = await rw.get_interview(async_test_session, itw.creator_id, itw.id)
+    await rw.update_interview(
+        async_test_session,
+        interview,  # type: ignore
+        DBInputInterviewUpdate(status=InterviewStatus.processing),
+    )
+    await rw.start_transcription_progress(async_test_session, itw.id)
+    progress = await async_test_session.get(SqlaTranscriptionProgress, itw.id)
+    progress.fraction = 0.25
+    progress.start_ts = datetime(2026, 1, 1, 12, 0)
+    progress.update_ts = datetime(2026, 1, 1, 12, 10)
+    await async_test_session.commit()
+    await async_test_session.refresh(interview)
+
+    response = await client.get(
+        INTERVIEWS_ENDPOINT + f"/{itw.id}", headers=bearer_header(access_token)
+    )
+
+    assert response.status_code == 200
+    returned_itw = APIOutputInterview(**response.json())
+    assert returned_itw.status == InterviewStatus.processing
+    assert returned_itw.progress is not None
+    assert returned_itw.progress.percent == 25.0
+    assert returned_itw.progress.eta == datetime(2026, 1, 1, 12, 40)
+
+    response = await client.get(
+        INTERVIEWS_ENDPOINT + f"/{other_itw.id}", headers=bearer_header(access_token)
+    )
+    assert response.json().get("progress") is None
+
+
+# Tests that the segments transcribed so far are returned as a partial transcript
+@pytest.mark.asyncio
+@pytest.mark.endpoint
+async def test_get_interview_partial_transcript(
+    client, access_token, async_test_session, api_interviews_uploaded
+):
+    itw = api_interviews_uploaded[0]
+    interview = await rw.get_interview(async_test_session, itw.creator_id, itw.id)
+    await rw.update_interview(
+        async_test_session,
+        interview,  # type: ignore
+        DBInputInterviewUpdate(status=InterviewStatus.processing),
+    )
+    await rw.start_transcription_progress(async_test_session, itw.id)
+    await rw.update_transcription_progress(
+        async_test_session,
+        itw.id,
+        0.5,
+        [
+            PartialSegment(start=2.0, end=3.5, text=" ça va ?"),
+            PartialSegment(start=0.0, end=2.0, text=" Bonjour,"),
+        ],
+    )
+
+    response = await client.get(
+        INTERVIEWS_ENDPOINT + f"/{itw.id}", headers=bearer_header(access_token)
+    )
+
+    assert response.status_code == 200
+    returned_itw = APIOutputInterview(**response.json())
+    assert returned_itw.transcript_partial
+    assert returned_itw.transcript is not None
+    assert returned_itw.transcript.text == "Bonjour, ça va ?"
+    assert [s.end for s in returned_itw.transcript.segments] == [2.0, 3.5]
+    assert [s["text"] for s in response.json()["transcript"]["segments"]] == [
+        "Bonjour,",
+        "ça va ?",
+    ]
+
+
+# Tests that the transcript normalized when stored is served as is
+@pytest.mark.asyncio
+@pytest.mark.endpoint
+async def test_get_interview_transcript(
+    mocker,
+    client,
+    access_token,
+    async_test_session,
+    api_interviews_uploaded,
+    whisperx_output_example2,
+    ott_simple_example2,
+):
+    itw, legacy_itw = api_interviews_uploaded[:2]
+    for i, transcript in ((itw, ott_simple_example2), (legacy_itw, None)):
+        interview = await rw.get_interview(async_test_session, i.creator_id, i.id)
+        update = DBInputInterviewUpdate(
+            status=InterviewStatus.transcripted,
+            transcript_source=TranscriptorSource.whisperx,
+            transcript_raw=whisperx_output_example2,
+        )
+        if transcript is not None:
+            update.transcript = transcript
+        await rw.update_interview(async_test_session, interview, update)  # type: ignore
+    raw2ott = mocker.patch(
+        "openthot.models.interview.raw2ott", wraps=interview_module.raw2ott
+    )
+
+    response = await client.get(
+        INTERVIEWS_ENDPOINT + f"/{itw.id}", headers=bearer_header(access_token)
+    )
+    assert response.status_code == 200
+    returned_itw = APIOutputInterview(**response.json())
+    assert returned_itw.transcript == ott_simple_example2
+    assert returned_itw.speakers == {s: s for s in ott_simple_example2.speakers}
+    raw2ott.assert_not_called()
+
+    # Transcripts stored before being normalized are normalized on the fly
+    response = await client.get(
+        INTERVIEWS_ENDPOINT + f"/{legacy_itw.id}", headers=bearer_header(access_token)
+    )
+    assert response.status_code == 200
+    assert APIOutputInterview(**response.json()).transcript == ott_simple_example2
+    raw2ott.assert_called_once()
+
+
+# Tests that segments are returned within a time window, a page at a time
+@pytest.mark.asyncio
+@pytest.mark.endpoint
+async def test_get_interview_transcript_window(
+    client,
+    access_token,
+    async_test_session,
+    api_interviews_uploaded,
+    ott_simple_example2,
+):
+    itw = api_interviews_uploaded[0]
+    endpoint = INTERVIEWS_ENDPOINT + f"/{itw.id}/transcript"
+    response = await client.get(endpoint, headers=bearer_header(access_token))
+    assert response.status_code == 404
+
+    interview = await rw.get_interview(async_test_session, itw.creator_id, itw.id)
+    await rw.update_interview(
+        async_test_session,
+        interview,  # type: ignore
+        DBInputInterviewUpdate(
+            status=InterviewStatus.transcripted,
+            transcript=ott_simple_example2,
+            transcript_ts=datetime.utcnow(),
+        ),
+    )
+    segments = ott_simple_example2.segments
+    start, end = segments[1].end - 0.1, segments[3].start + 0.1
+    response = await client.get(
+        endpoint,
+        params={"start": start, "end": end},
+        headers=bearer_header(access_token),
+    )
+    assert response.status_code == 200
+    page = APIOutputTranscriptPage(**response.json())
+    assert page.segments == segments[1:4]
+    assert page.next_cursor is None
+    assert not page.transcript_partial
+
+    # Pages follow each other, up to the whole transcript
+    returned, cursor = [], 0
+    while cursor is not None:
+        response = await client.get(
+            endpoint,
+            params={"cursor": cursor, "limit": 2},
+            headers=bearer_header(access_token),
+        )
+        page = APIOutputTranscriptPage(**response.json())
+        assert len(page.segments) <= 2
+        returned += page.segments
+        cursor = page.next_cursor
+    assert returned == segments
+
+    # Unchanged transcripts are not returned again
+    response = await client.get(
+        endpoint,
+        headers=bearer_header(access_token)
+        | {"If-None-Match": response.headers["ETag"]},
+    )
+    assert response.status_code == 304
+
+
+# Tests that the segments transcribed so far are returned while transcribing
+@pytest.mark.asyncio
+@pytest.mark.endpoint
+async def test_get_interview_transcript_partial(
+    client, access_token, async_test_session, api_interviews_uploaded
+):
+    itw = api_interviews_uploaded[0]
+    interview = await rw.get_interview(async_test_session, itw.creator_id, itw.id)
+    await rw.update_interview(
+        async_test_session,
+        interview,  # type: ignore
+        DBInputInterviewUpdate(status=InterviewStatus.processing),
+    )
+    await rw.start_transcription_progress(async_test_session, itw.id)
+    await rw.update_transcription_progress(
+        async_test_session,
+        itw.id,
+        0.5,
+        [
+            PartialSegment(start=0.0, end=2.0, text=" Bonjour,"),
+            PartialSegment(start=2.0, end=3.5, text=" ça va ?"),
+        ],
+    )
+
+    response = await client.get(
+        INTERVIEWS_ENDPOINT + f"/{itw.id}/transcript",
+        params={"start": 2.5},
+        headers=bearer_header(access_token),
+    )
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "no-store"
+    page = APIOutputTranscriptPage(**response.json())
+    assert page.transcript_partial
+    assert [s.text for s in page.segments] == ["ça va ?"]
+
+
 @pytest.mark.asyncio
 @pytest.mark.endpoint
 async def test_get_interview_inexistent(client, access_token):
@@ -209,6 +711,124 @@ async def test_get_interview_inexistent(client, access_token):
     assert response.status_code == 404
 
 
+@pytest.mark.asyncio
+@pytest.mark.endpoint
+async def test_get_interview_audio(
+    client, access_token, api_interviews_uploaded, upload_file_mp3
+):
+    response = await client.get(
+        INTERVIEWS_ENDPOINT + f"/{api_interviews_uploaded[0].id}/audio",
+        headers=bearer_header(access_token),
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "audio/mpeg"
+    assert response.headers["content-length"] == str(len(upload_file_mp3.getvalue()))
+    assert response.content == upload_file_mp3.getvalue()
+    assert response.headers["accept-ranges"] == "bytes"
+    sha256 = hashlib.sha256(upload_file_mp3.getvalue()).hexdigest()
+    assert response.headers["etag"] == f'"{sha256}"'
+
+
+@pytest.mark.asyncio
+@pytest.mark.endpoint
+async def test_get_interview_audio_range(
+    client, access_token, api_interviews_uploaded, upload_file_mp3
+):
+    content = upload_file_mp3.getvalue()
+    endpoint = INTERVIEWS_ENDPOINT + f"/{api_interviews_uploaded[0].id}/audio"
+    headers = bearer_header(access_token)
+
+    response = await client.get(endpoint, headers=headers | {"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 100-199/{len(content)}"
+    assert response.content == content[100:200]
+
+    response = await client.get(endpoint, headers=headers | {"Range": "bytes=-10"})
+    assert response.status_code == 206
+    assert response.content == content[-10:]
+
+    response = await client.get(
+        endpoint, headers=headers | {"Range": f"bytes={len(content)}-"}
+    )
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(content)}"
+
+
+@pytest.mark.asyncio
+@pytest.mark.endpoint
+async def test_get_interview_audio_multi_range(
+    client, access_token, api_interviews_uploaded, upload_file_mp3
+):
+    content = upload_file_mp3.getvalue()
+    response = await client.get(
+        INTERVIEWS_ENDPOINT + f"/{api_interviews_uploaded[0].id}/audio",
+        headers=bearer_header(access_token) | {"Range": "bytes=0-9,1000-1009"},
+    )
+    assert response.status_code == 206
+    content_type, _, boundary = response.headers["content-type"].partition(
+        "; boundary="
+    )
+    assert content_type == "multipart/byteranges"
+    assert int(response.headers["content-length"]) == len(response.content)
+    parts = response.content.split(f"--{boundary}".encode())
+    assert parts[0] == b"" and parts[-1] == b"--\r\n"
+    assert [p.partition(b"\r\n\r\n")[2] for p in parts[1:-1]] == [
+        content[:10] + b"\r\n",
+        content[1000:1010] + b"\r\n",
+    ]
+    assert b"Content-Range: bytes 1000-1009/" in parts[2]
+
+
+@pytest.mark.asyncio
+@pytest.mark.endpoint
+async def test_get_interview_audio_conditional(
+    client, access_token, api_interviews_uploaded
+):
+    endpoint = INTERVIEWS_ENDPOINT + f"/{api_interviews_uploaded[0].id}/audio"
+    headers = bearer_header(access_token)
+    etag = (await client.get(endpoint, headers=headers)).headers["etag"]
+
+    response = await client.get(endpoint, headers=headers | {"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+    # Same version of the file: the range applies
+    response = await client.get(
+        endpoint, headers=headers | {"Range": "bytes=0-9", "If-Range": etag}
+    )
+    assert response.status_code == 206
+    # Another version: the whole file is sent
+    response = await client.get(
+        endpoint, headers=headers | {"Range": "bytes=0-9", "If-Range": '"other"'}
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+@pytest.mark.endpoint
+async def test_get_interview_waveform(
+    client, access_token, api_interviews_uploaded, upload_file_mp3
+):
+    endpoint = INTERVIEWS_ENDPOINT + f"/{api_interviews_uploaded[0].id}/waveform"
+    sha256 = hashlib.sha256(upload_file_mp3.getvalue()).hexdigest()
+    await object_storage.delete_derived_files(sha256)
+
+    # Not computed yet, as processing is mocked
+    response = await client.get(endpoint, headers=bearer_header(access_token))
+    assert response.status_code == 404
+
+    await ingest_audio(str(MP3_FILE_PATH), sha256)
+    response = await client.get(
+        endpoint, headers=bearer_header(access_token), params={"resolution": 10}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/octet-stream"
+    waveform = WaveformPeaks.decode(response.content)
+    assert waveform.duration == pytest.approx(2.422, abs=1e-3)
+    assert [(pps, len(peaks)) for pps, peaks in waveform.levels] == [(16, 39)]
+
+
 #
 # Update
 #
@@ -237,6 +857,23 @@ async def test_update_interview_valid(client, access_token, api_interviews_uploa
         assert returned_itw.update_ts > itw.update_ts
 
 
+# Tests that the ASR engine of an interview can be set, and left to routing again
+@pytest.mark.asyncio
+@pytest.mark.endpoint
+async def test_update_interview_asr_engine(
+    client, access_token, api_interviews_uploaded
+):
+    endpoint = INTERVIEWS_ENDPOINT + f"/{api_interviews_uploaded[0].id}"
+    for asr_engine, status_code in (("default", 200), ("unknown", 400), (None, 200)):
+        response = await client.patch(
+            endpoint,
+            headers=bearer_header(access_token),
+            json={"asr_engine": asr_engine},
+        )
+        assert response.status_code == status_code
+    assert response.json()["asr_engine"] is None
+
+
 @pytest.mark.asyncio
 @pytest.mark.endpoint
 async def test_update_interview_speakers_valid(
@@ -0,0 +1,260 @@
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+import soundfile
+
+from openthot.asr.stitching import reconcile_speakers, stitch_transcripts
+from openthot.asr.transcriptors import Transcriptor
+from openthot.asr.transcriptors.chunked import ChunkedTranscriptor
+from openthot.models.transcript.whisper import WhisperTranscript
+from openthot.models.transcript.whisperx import (
+    WhisperXSegment,
+    WhisperXTranscript,
+    WhisperXWord,
+)
+
+
+def test_stitch_whisper(whisper_output_example1: WhisperTranscript):
+    stitched = stitch_transcripts(
+        [(0.0, 0.0, whisper_output_example1), (60.0, 0.0, whisper_output_example1)]
+    )
+
+    count = len(whisper_output_example1.segments)
+    assert [segment.id for segment in stitched.segments] == list(range(2 * count))
+    assert stitched.text == whisper_output_example1.text * 2
+    for first, second in zip(stitched.segments, stitched.segments[count:]):
+        assert second.start == pytest.approx(first.start + 60)
+        assert second.end == pytest.approx(first.end + 60)
+        assert second.seek == first.seek + 6000
+        assert second.words[0].start == pytest.approx(first.words[0].start + 60)
+    assert stitched.segments[:count] == whisper_output_example1.segments
+
+
+def test_stitch_whisperx(whisperx_output_example2: WhisperXTranscript):
+    stitched = stitch_transcripts(
+        [(0.0, 0.0, whisperx_output_example2), (30.5, 0.0, whisperx_output_example2)]
+    )
+
+    count = len(whisperx_output_example2.segments)
+    assert len(stitched.segments) == 2 * count
+    assert stitched.segments[count].start == pytest.approx(
+        whisperx_output_example2.segments[0].start + 30.5
+    )
+    words = whisperx_output_example2.word_segments
+    shifted = stitched.word_segments[len(words) :][0]  # noqa: E203
+    assert shifted.word == words[0].word
+    assert shifted.end == pytest.approx(words[0].end + 30.5)
+
+
+def diarized(*speakers: str) -> WhisperXTranscript:
+    words = [
+        WhisperXWord(word=f"w{i}", start=i, end=i + 1, score=0.9, speaker=speaker)
+        for i, speaker in enumerate(speakers)
+    ]
+    return WhisperXTranscript(
+        segments=[
+            WhisperXSegment(
+                start=word.start,
+                end=word.end,
+                text=word.word,
+                speaker=word.speaker,
+                words=[word],
+            )
+            for word in words
+        ],
+        word_segments=words,
+    )
+
+
+def test_reconcile_speakers():
+    # Speakers of each chunk are labelled independently, by their own diarization
+    chunks = reconcile_speakers(
+        [
+            (0.0, 0.0, diarized("SPEAKER_01", "SPEAKER_00", "SPEAKER_01")),
+            (3.0, 0.0, diarized("SPEAKER_00", "SPEAKER_01")),
+            (5.0, 0.0, diarized("SPEAKER_01", "SPEAKER_02", "SPEAKER_00")),
+        ]
+    )
+
+    # Without overlap, nothing tells who is who from a chunk to another
+    assert [[s.speaker for s in chunk.segments] for chunk in chunks] == [
+        ["SPEAKER_00", "SPEAKER_01", "SPEAKER_00"],
+        ["SPEAKER_02", "SPEAKER_03"],
+        ["SPEAKER_04", "SPEAKER_05", "SPEAKER_06"],
+    ]
+    for chunk in chunks:
+        assert [w.speaker for w in chunk.word_segments] == [
+            s.speaker for s in chunk.segments
+        ]
+        assert all(s.words[0].speaker == s.speaker for s in chunk.segments)
+
+
+def test_reconcile_speakers_overlap():
+    # The second chunk starts 2s before the end of the first, where the second
+    # speaker of the first chunk (its first speaker) talks
+    first = diarized("SPEAKER_00", "SPEAKER_01", "SPEAKER_01", "SPEAKER_01")
+    second = diarized("SPEAKER_00", "SPEAKER_00", "SPEAKER_01", "SPEAKER_00")
+    chunks = reconcile_speakers([(0.0, 0.0, first), (2.0, 2.0, second)])
+
+    # They keep one label, while the new speaker gets its own
+    assert [s.speaker for s in chunks[1].segments] == [
+        "SPEAKER_01",
+        "SPEAKER_01",
+        "SPEAKER_02",
+        "SPEAKER_01",
+    ]
+
+    stitched = stitch_transcripts([(0.0, 0.0, first), (2.0, 2.0, second)])
+    # Segments in the overlap are the first chunk's, not repeated
+    assert [(s.start, s.speaker) for s in stitched.segments] == [
+        (0, "SPEAKER_00"),
+        (1, "SPEAKER_01"),
+        (2, "SPEAKER_01"),
+        (3, "SPEAKER_01"),
+        (4, "SPEAKER_02"),
+        (5, "SPEAKER_01"),
+    ]
+    assert [w.start for w in stitched.word_segments] == [0, 1, 2, 3, 4, 5]
+
+
+def test_stitch_whisper_overlap(whisper_output_example1: WhisperTranscript):
+    segments = whisper_output_example1.segments
+    overlap = (segments[0].start + segments[0].end) / 2 + 0.01
+    stitched = stitch_transcripts(
+        [(0.0, 0.0, whisper_output_example1), (60.0, overlap, whisper_output_example1)]
+    )
+
+    # The first segment of the second chunk is mostly in its overlap
+    assert len(stitched.segments) == 2 * len(segments) - 1
+    assert stitched.segments[len(segments)].text == segments[1].text
+    assert stitched.text == whisper_output_example1.text + "".join(
+        segment.text for segment in segments[1:]
+    )
+
+
+class FakeTranscriptor(Transcriptor):
+    """Transcribes any chunk as one segment."""
+
+    async def run_transcription(self) -> None:
+        samples, sample_rate = soundfile.read(self._audio_file_path)
+        self._success = True
+        self._transcript_duration = 1.0
+        self._transcript = WhisperTranscript(
+            language="fr",
+            text=f" {len(samples) / sample_rate:.1f}s",
+            segments=[
+                dict(
+                    id=0,
+                    seek=0,
+                    start=0.0,
+                    end=len(samples) / sample_rate,
+                    text=f" {len(samples) / sample_rate:.1f}s",
+                    tokens=[],
+                    temperature=0.0,
+                    avg_logprob=-0.1,
+                    compression_ratio=1.0,
+                    no_speech_prob=0.0,
+                    words=[],
+                )
+            ],
+        )
+
+
+class FailingTranscriptor(FakeTranscriptor):
+    """Fails on the second chunk."""
+
+    async def run_transcription(self) -> None:
+        await super().run_transcription()
+        self._success = not str(self._audio_file_path).endswith("chunk-00001.flac")
+
+
+@pytest.fixture(scope="function")
+def long_audio(tmp_path):
+    rng = np.random.default_rng(0)
+    samples = (rng.random(16000 * 10) - 0.5).astype(np.float32)
+    samples[16000 * 4 : 16000 * 5] = 0  # noqa: E203
+    path = tmp_path / "long.flac"
+    soundfile.write(path, samples, 16000, format="FLAC", subtype="PCM_16")
+    return path
+
+
+class TestChunkedTranscriptor:
+    # Tests that chunks are transcribed in parallel, then stitched together
+    @pytest.mark.asyncio
+    async def test_transcription(self, mocker, local_object_storage, long_audio):
+        mocker.patch(
+            "openthot.asr.transcriptors.chunked.chunking_settings.chunk_duration_s", 6
+        )
+        pool = mocker.patch.object(
+            ChunkedTranscriptor, "_chunk_pool", side_effect=ThreadPoolExecutor
+        )
+        slots = mocker.patch(
+            "openthot.asr.transcriptors.chunked.transcription_slots",
+            side_effect=lambda weight: contextlib.nullcontext(),
+        )
+
+        on_segments = mocker.AsyncMock()
+
+        tscr = ChunkedTranscriptor(
+            long_audio, FakeTranscriptor, on_segments=on_segments
+        )
+        await tscr.run_transcription()
+
+        assert tscr.success
+        pool.assert_called_once_with()
+        # i.e. each chunk takes the slots of its model, rather than the whole pool
+        assert slots.call_count == 2
+        # Segments of each chunk are reported as soon as it is transcribed
+        reported = sorted(
+            (segment.start, segment.end)
+            for call in on_segments.await_args_list
+            for segment in call.args[0]
+        )
+        assert reported == [(s.start, s.end) for s in tscr.transcript.segments]
+        first, second = tscr.transcript.segments
+        assert (first.id, second.id) == (0, 1)
+        assert 4 <= first.end <= 5
+        # The second chunk starts a quarter of the chunk duration before its cut
+        assert second.start == pytest.approx(first.end - 1.5)
+        assert second.end == pytest.approx(10)
+        # Chunks are removed once transcribed
+        assert not list((local_object_storage.object_storage_path / "cache").iterdir())
+
+    # Tests that the transcription fails if any of its chunks does
+    @pytest.mark.asyncio
+    async def test_failed_chunk(self, mocker, local_object_storage, long_audio):
+        mocker.patch(
+            "openthot.asr.transcriptors.chunked.chunking_settings.chunk_duration_s", 6
+        )
+        mocker.patch.object(
+            ChunkedTranscriptor, "_chunk_pool", side_effect=ThreadPoolExecutor
+        )
+
+        tscr = ChunkedTranscriptor(long_audio, FailingTranscriptor)
+        await tscr.run_transcription()
+
+        assert not tscr.success
+
+    # Tests that short audio files are transcribed at once, without any pool
+    @pytest.mark.asyncio
+    async def test_short_audio(self, mocker, local_object_storage, long_audio):
+        pool = mocker.patch.object(ChunkedTranscriptor, "_chunk_pool")
+
+        tscr = ChunkedTranscriptor(long_audio, FakeTranscriptor)
+        await tscr.run_transcription()
+
+        assert tscr.success
+        assert len(tscr.transcript.segments) == 1
+        pool.assert_not_called()
+
+    # Tests that transcriptions of the same engine share their pool
+    def test_shared_pool(self, mocker, long_audio):
+        mocker.patch.dict("openthot.asr.transcriptors.chunked._chunk_pools", clear=True)
+        pools = [
+            ChunkedTranscriptor(long_audio, FakeTranscriptor)._chunk_pool()
+            for _ in range(2)
+        ]
+        assert pools[0] is pools[1]
+        pools[0].shutdown()
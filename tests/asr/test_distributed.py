@@ -0,0 +1,192 @@
+import numpy as np
+import pytest
+import soundfile
+
+from openthot import object_storage
+from openthot.asr import distributed
+from openthot.asr.process import (
+    fail_chunked_transcription,
+    finish_chunked_transcription,
+    process_audio,
+)
+from openthot.db import rw
+from openthot.db.schemas import SqlaInterview
+from openthot.exceptions import ChunkTranscriptionError
+from openthot.models.interview import (
+    DBInputInterviewUpdate,
+    DBOutputInterview,
+    InterviewStatus,
+)
+from openthot.models.transcript.openthot import PartialSegment
+from openthot.models.transcript.whisper import WhisperTranscript
+from openthot.tasks import tasks
+from tests.conftest import MP3_FILE_PATH, use_asr_engine
+
+
+@pytest.fixture(scope="function")
+def long_audio(tmp_path):
+    rng = np.random.default_rng(0)
+    samples = (rng.random(16000 * 10) - 0.5).astype(np.float32)
+    path = tmp_path / "long.flac"
+    soundfile.write(path, samples, 16000, format="FLAC", subtype="PCM_16")
+    return path
+
+
+@pytest.fixture(scope="function")
+def transcriptor_class(mocker, whisper_output_example1: WhisperTranscript):
+    mock_transcriptor = mocker.AsyncMock()
+    mock_transcriptor.success = True
+    mock_transcriptor.transcript = whisper_output_example1
+    return mocker.MagicMock(return_value=mock_transcriptor)
+
+
+@pytest.mark.asyncio
+async def test_store_chunks(local_object_storage, long_audio):
+    chunks = await distributed.store_chunks(1, long_audio, chunk_duration_s=4)
+
+    assert chunks is not None
+    assert [chunk.index for chunk in chunks] == [0, 1, 2]
+    assert chunks[0].offset == 0
+    for chunk in chunks:
+        assert await object_storage.stat_audio_file(chunk.location) is not None
+        assert chunk.transcript_location.endswith(f"chunks/1/{chunk.index:05d}.json")
+    assert await distributed.store_chunks(1, MP3_FILE_PATH, chunk_duration_s=4) is None
+
+
+# Tests that chunk transcripts are stored, and chunks are never transcribed twice
+@pytest.mark.asyncio
+async def test_transcribe_stored_chunk(
+    mocker,
+    local_object_storage,
+    long_audio,
+    transcriptor_class,
+    whisper_output_example1,
+):
+    chunks = await distributed.store_chunks(1, long_audio, chunk_duration_s=4)
+    assert chunks is not None
+
+    engine = use_asr_engine(mocker, transcriptor_class)
+    on_segments = mocker.AsyncMock()
+    for _ in range(2):  # e.g. the task is redelivered
+        await distributed.transcribe_stored_chunk(chunks[1], engine, on_segments)
+
+    assert transcriptor_class.call_count == 1
+    (segments,) = on_segments.await_args.args
+    assert (
+        segments[0].start
+        == chunks[1].offset + whisper_output_example1.segments[0].start
+    )
+    stored = b"".join(
+        [c async for c in object_storage.read_audio_file(chunks[1].transcript_location)]
+    )
+    assert WhisperTranscript.parse_raw(stored) == whisper_output_example1
+
+
+@pytest.mark.asyncio
+async def test_transcribe_stored_chunk_failure(
+    mocker, local_object_storage, long_audio, transcriptor_class
+):
+    chunks = await distributed.store_chunks(1, long_audio, chunk_duration_s=4)
+    assert chunks is not None
+    transcriptor_class.return_value.success = False
+
+    with pytest.raises(ChunkTranscriptionError):
+        await distributed.transcribe_stored_chunk(
+            chunks[0], use_asr_engine(mocker, transcriptor_class)
+        )
+
+    assert await object_storage.stat_audio_file(chunks[0].transcript_location) is None
+
+
+# Tests that long interviews are handed over to chunk tasks, and updated once merged
+@pytest.mark.asyncio
+async def test_distributed_transcription(
+    mocker,
+    local_object_storage,
+    async_test_session,
+    sqla_interview: SqlaInterview,
+    long_audio,
+    transcriptor_class,
+    whisper_output_example1,
+):
+    mocker.patch("openthot.asr.process.chunked_transcription", True)
+    mocker.patch("openthot.asr.process.chunking_settings.distributed", True)
+    mocker.patch("openthot.asr.process.chunking_settings.chunk_duration_s", 4)
+    engine = use_asr_engine(mocker, transcriptor_class)
+    fan_out = mocker.MagicMock()
+
+    await process_audio(
+        session=async_test_session,
+        user_id=sqla_interview.creator_id,
+        interview_id=sqla_interview.id,  # type: ignore
+        audio_location=str(long_audio),
+        fan_out=fan_out,
+    )
+
+    transcriptor_class.assert_not_called()
+    assert sqla_interview.status == InterviewStatus.processing
+    (chunks,) = fan_out.call_args.args
+    assert len(chunks) == 3
+    for chunk in chunks:
+        await distributed.transcribe_stored_chunk(chunk, engine)
+
+    await finish_chunked_transcription(
+        session=async_test_session,
+        user_id=sqla_interview.creator_id,
+        interview_id=sqla_interview.id,  # type: ignore
+        chunks=chunks,
+        transcript_duration=12.3,
+    )
+
+    interview = await rw.get_interview(
+        async_test_session,
+        user=sqla_interview.creator_id,  # type: ignore
+        interview_id=sqla_interview.id,  # type: ignore
+    )
+    assert interview is not None
+    interview = DBOutputInterview.from_orm(interview)
+    assert interview.status == InterviewStatus.transcripted
+    assert interview.transcript_duration_s == 13
+    segments = interview.transcript_raw.segments  # type: ignore
+    count = len(whisper_output_example1.segments)
+    assert len(segments) == 3 * count
+    assert segments[count].start == pytest.approx(
+        chunks[1].offset + whisper_output_example1.segments[0].start
+    )
+    for chunk in chunks:
+        assert await object_storage.stat_audio_file(chunk.location) is None
+        assert await object_storage.stat_audio_file(chunk.transcript_location) is None
+
+
+# Tests that interviews are left to be transcribed again once a chunk failed for good
+@pytest.mark.asyncio
+async def test_distributed_transcription_failure(
+    mocker, local_object_storage, async_test_session, sqla_interview, long_audio
+):
+    chunks = await distributed.store_chunks(
+        sqla_interview.id, long_audio, chunk_duration_s=4
+    )
+    assert chunks is not None
+    chord = mocker.patch("openthot.tasks.tasks.chord")
+    tasks.fan_out_chunks(sqla_interview.creator_id, sqla_interview.id, chunks)
+    (merge,) = chord.return_value.call_args.args
+    (errback,) = merge.options["link_error"]
+    assert errback["task"] == tasks.fail_chunks_task.name
+    assert errback["kwargs"]["chunks"] == [chunk.dict() for chunk in chunks]
+
+    await rw.update_interview(
+        async_test_session,
+        sqla_interview,
+        DBInputInterviewUpdate(status=InterviewStatus.processing),
+    )
+    await rw.add_partial_segments(
+        async_test_session,
+        sqla_interview.id,
+        [PartialSegment(start=0.0, end=1.0, text=" Bonjour")],
+    )
+    await fail_chunked_transcription(async_test_session, sqla_interview.id, chunks)
+
+    assert sqla_interview.status == InterviewStatus.uploaded
+    assert not await rw.get_partial_segments(async_test_session, sqla_interview.id)
+    for chunk in chunks:
+        assert await object_storage.stat_audio_file(chunk.location) is None
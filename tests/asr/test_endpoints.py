@@ -0,0 +1,94 @@
+import httpx
+import pytest
+from pydantic import ValidationError
+
+from openthot.asr.endpoints import EndpointPool
+from openthot.config import WordcabSettings
+from openthot.models.transcript import TranscriptorSource
+
+
+def endpoint_pool(ejection_s: float = 60.0) -> EndpointPool:
+    return EndpointPool(
+        [f"http://gpu{i}.test/api/v1" for i in range(3)],
+        health_path="/healthz",
+        health_check_interval_s=3600,
+        ejection_s=ejection_s,
+        probe_timeout_s=1,
+    )
+
+
+# Tests that the least loaded server is chosen, then the fastest one
+def test_choose():
+    pool = endpoint_pool()
+    gpu0, gpu1, gpu2 = pool.endpoints
+    gpu0.record_latency(0.5)
+    gpu1.record_latency(0.1)
+
+    assert pool.choose() is gpu1
+    with pool.using(gpu1):
+        assert pool.choose() is gpu0
+        assert pool.choose(exclude=[gpu0]) is gpu2
+    assert gpu1.in_flight == 0
+
+
+# Tests that ejected servers are left out, unless all of them are
+def test_eject():
+    pool = endpoint_pool()
+    gpu0, gpu1, gpu2 = pool.endpoints
+    pool.eject(gpu0)
+    pool.eject(gpu1)
+
+    assert pool.choose() is gpu2
+    assert pool.choose(exclude=[gpu2]) is gpu2
+    pool.eject(gpu2)
+    assert pool.choose() is gpu0
+
+    pool = endpoint_pool(ejection_s=0)
+    pool.eject(pool.endpoints[0])
+    assert pool.choose() is pool.endpoints[0]
+
+
+# Tests that servers are probed from their root, at most once per interval
+@pytest.mark.asyncio
+async def test_check_health():
+    probed = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        probed.append(str(request.url))
+        return httpx.Response(503 if request.url.host == "gpu1.test" else 200)
+
+    pool = endpoint_pool()
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        await pool.check_health(client)
+        await pool.check_health(client)
+
+    assert sorted(probed) == [f"http://gpu{i}.test/healthz" for i in range(3)]
+    gpu0, gpu1, gpu2 = pool.endpoints
+    assert gpu0.available and gpu0.latency_s is not None
+    assert not gpu1.available and gpu1.latency_s is None
+
+
+# Tests that a probe that could not even be sent does not eject its server
+@pytest.mark.asyncio
+async def test_check_health_pool_timeout():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "gpu1.test":
+            raise httpx.PoolTimeout("No connection available")
+        return httpx.Response(200)
+
+    pool = endpoint_pool()
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        await pool.check_health(client)
+
+    assert all(endpoint.available for endpoint in pool.endpoints)
+
+
+def test_settings_urls():
+    settings = WordcabSettings(
+        engine=TranscriptorSource.wordcab,
+        url="http://gpu0.test/api/v1",
+        urls=["http://gpu1.test/api/v1"],
+    )
+    assert settings.urls == ["http://gpu0.test/api/v1", "http://gpu1.test/api/v1"]
+    with pytest.raises(ValidationError):
+        WordcabSettings(engine=TranscriptorSource.wordcab)
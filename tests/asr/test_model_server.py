@@ -0,0 +1,334 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from openthot.asr import model_server
+from openthot.asr.progress import ProgressReporter
+from openthot.asr.registry import AsrEngine
+from openthot.asr.transcriptors.whisper import Whisper
+from openthot.asr.transcriptors.whisperx import WhisperX
+from openthot.config import (
+    AsrComputeType,
+    AsrEngineMode,
+    AsrModelSize,
+    WhisperSettings,
+    WhisperXSettings,
+)
+from openthot.db import rw
+from openthot.db.schemas import SqlaInterview
+from openthot.models.transcript import TranscriptorSource
+from openthot.tasks import tasks
+from tests.conftest import MP3_FILE_PATH
+
+
+@pytest.fixture(scope="function")
+def unloaded_models(mocker):
+    mocker.patch.dict(model_server._models, clear=True)
+    mocker.patch.object(model_server, "_unavailable", set())
+
+
+def use_settings(mocker, module: str, settings) -> None:
+    mocker.patch(f"openthot.asr.transcriptors.{module}.asr_settings", settings)
+
+
+@pytest.fixture(scope="function")
+def whisper_settings(mocker):
+    settings = WhisperSettings(
+        engine=TranscriptorSource.whisper,
+        model_size=AsrModelSize.tiny,
+        mode=AsrEngineMode.in_process,
+    )
+    use_settings(mocker, "whisper", settings)
+    return settings
+
+
+class TestWhisperInProcess:
+    # Tests that the model is loaded once, and then transcribes without any CLI
+    @pytest.mark.asyncio
+    async def test_warm_model(
+        self, mocker, unloaded_models, whisper_settings, whisper_output_example1
+    ):
+        model = mocker.MagicMock()
+        model.transcribe.return_value = whisper_output_example1.dict()
+        whisper = SimpleNamespace(load_model=mocker.MagicMock(return_value=model))
+        mocker.patch.dict(sys.modules, {"whisper": whisper})
+        cli = mocker.patch("openthot.asr.transcriptors.cli.AsyncProcRunner")
+
+        for _ in range(2):
+            tscr = Whisper(audio_file_path=MP3_FILE_PATH)
+            await tscr.run_transcription()
+            assert tscr.success
+            assert tscr.transcript == whisper_output_example1
+
+        whisper.load_model.assert_called_once_with("tiny")
+        assert model.transcribe.call_count == 2
+        samples = model.transcribe.call_args.args[0]
+        assert samples.dtype == np.float32
+        assert len(samples) == pytest.approx(2.422 * 16000, rel=1e-3)
+        cli.assert_not_called()
+
+    # Tests that the progress is reported as the model transcribes, as with the CLI
+    @pytest.mark.asyncio
+    async def test_progress(
+        self, mocker, unloaded_models, whisper_settings, whisper_output_example1
+    ):
+        def transcribe(samples, **kwargs):
+            assert kwargs["verbose"] is True
+            for segment in whisper_output_example1.segments:
+                print(f"[00:{segment.start:06.3f} --> 00:{segment.end:06.3f}] text")
+            return whisper_output_example1.dict()
+
+        model = mocker.MagicMock()
+        model.transcribe.side_effect = transcribe
+        whisper = SimpleNamespace(load_model=mocker.MagicMock(return_value=model))
+        mocker.patch.dict(sys.modules, {"whisper": whisper})
+        on_progress = mocker.AsyncMock()
+
+        tscr = Whisper(audio_file_path=MP3_FILE_PATH, on_progress=on_progress)
+        await tscr.run_transcription()
+
+        assert tscr.success
+        assert [call.args[0] for call in on_progress.await_args_list] == [
+            pytest.approx(segment.end) for segment in whisper_output_example1.segments
+        ]
+
+    # Tests that the segments are stored as the model transcribes them
+    @pytest.mark.asyncio
+    async def test_partial_transcript(
+        self,
+        mocker,
+        async_test_session,
+        sqla_interview: SqlaInterview,
+        unloaded_models,
+        whisper_settings,
+        whisper_output_example1,
+    ):
+        segments = whisper_output_example1.segments
+
+        def transcribe(samples, **kwargs):
+            for segment in segments:
+                print(f"[00:{segment.start:06.3f} --> 00:{segment.end:06.3f}] text")
+            return whisper_output_example1.dict()
+
+        model = mocker.MagicMock()
+        model.transcribe.side_effect = transcribe
+        whisper = SimpleNamespace(load_model=mocker.MagicMock(return_value=model))
+        mocker.patch.dict(sys.modules, {"whisper": whisper})
+        reporter = ProgressReporter(
+            async_test_session, sqla_interview.id, audio_duration=100, interval_s=0  # type: ignore
+        )
+        await reporter.start()
+
+        tscr = Whisper(audio_file_path=MP3_FILE_PATH, on_segments=reporter.add_segments)
+        await tscr.run_transcription()
+
+        assert tscr.success
+        assert [
+            (segment.start, segment.end)
+            for segment in await rw.get_partial_segments(async_test_session, sqla_interview.id)  # type: ignore
+        ] == [
+            (pytest.approx(segment.start), pytest.approx(segment.end))
+            for segment in segments
+        ]
+
+    # Tests that the models of several engines are kept warm side by side
+    @pytest.mark.asyncio
+    async def test_engines_side_by_side(
+        self, mocker, unloaded_models, whisper_settings, whisper_output_example1
+    ):
+        models = {}
+
+        def load_model(model_size):
+            models[model_size] = mocker.MagicMock()
+            models[model_size].transcribe.return_value = whisper_output_example1.dict()
+            return models[model_size]
+
+        whisper = SimpleNamespace(load_model=mocker.MagicMock(side_effect=load_model))
+        mocker.patch.dict(sys.modules, {"whisper": whisper})
+        large_settings = whisper_settings.copy(
+            update={"model_size": AsrModelSize.large}
+        )
+
+        for settings in (whisper_settings, large_settings, whisper_settings):
+            tscr = Whisper(audio_file_path=MP3_FILE_PATH, asr_settings=settings)
+            await tscr.run_transcription()
+            assert tscr.success
+
+        assert whisper.load_model.call_count == 2
+        assert models["tiny"].transcribe.call_count == 2
+        assert models["large-v2"].transcribe.call_count == 1
+
+    # Tests that the CLI is used when the engine cannot be imported
+    @pytest.mark.asyncio
+    async def test_cli_fallback(self, mocker, unloaded_models, whisper_settings):
+        mocker.patch.dict(sys.modules, {"whisper": None})
+        run_cli = mocker.patch.object(Whisper, "_run_cli")
+
+        await Whisper(audio_file_path=MP3_FILE_PATH).run_transcription()
+
+        run_cli.assert_awaited_once()
+        assert model_server._unavailable
+
+    # Tests that the CLI is used when asked to, without loading models
+    @pytest.mark.asyncio
+    async def test_subprocess_mode(self, mocker, unloaded_models, whisper_settings):
+        mocker.patch.object(whisper_settings, "mode", AsrEngineMode.subprocess)
+        load_models = mocker.patch.object(model_server, "load_models")
+        run_cli = mocker.patch.object(Whisper, "_run_cli")
+
+        await Whisper(audio_file_path=MP3_FILE_PATH).run_transcription()
+
+        run_cli.assert_awaited_once()
+        load_models.assert_not_called()
+
+    # Tests that the CLI writes its outputs apart from its input, which may be shared
+    # (e.g. the normalized audio), rather than read what earlier runs left next to it
+    @pytest.mark.asyncio
+    async def test_cli_outputs(
+        self,
+        mocker,
+        tmp_path,
+        local_object_storage,
+        whisper_settings,
+        whisper_output_example1,
+    ):
+        mocker.patch.object(whisper_settings, "mode", AsrEngineMode.subprocess)
+        shard = tmp_path / "ab"
+        shard.mkdir()
+        audio_file_path = shard / "abcdef.16k.flac"
+        audio_file_path.write_bytes(b"")
+        (shard / "abcdef.16k.json").write_text("{}")  # i.e. left by an earlier run
+
+        class Runner:
+            return_code = 0
+            duration = 3.0
+
+            def __init__(self, proc_call, on_line):
+                self._proc_call = proc_call
+
+            async def run(self):
+                input_path = Path(self._proc_call[1])
+                output_dir = Path(
+                    self._proc_call[self._proc_call.index("--output_dir") + 1]
+                )
+                assert input_path.resolve() == audio_file_path
+                (output_dir / "abcdef.16k.json").write_text(
+                    whisper_output_example1.json()
+                )
+
+        mocker.patch("openthot.asr.transcriptors.cli.AsyncProcRunner", Runner)
+
+        tscr = Whisper(audio_file_path=audio_file_path)
+        await tscr.run_transcription()
+
+        assert tscr.success and tscr.transcript == whisper_output_example1
+        assert sorted(path.name for path in shard.iterdir()) == [
+            "abcdef.16k.flac",
+            "abcdef.16k.json",
+        ]
+        assert (shard / "abcdef.16k.json").read_text() == "{}"
+
+    # Tests that a batch is transcribed in a single run of the CLI
+    @pytest.mark.asyncio
+    async def test_cli_batch(
+        self, mocker, tmp_path, whisper_settings, whisper_output_example1
+    ):
+        mocker.patch.object(whisper_settings, "mode", AsrEngineMode.subprocess)
+        audio_file_paths = [tmp_path / "1.flac", tmp_path / "2.flac"]
+        proc_calls = []
+
+        class BatchRunner:
+            return_code = 0
+            duration = 3.0
+
+            def __init__(self, proc_call):
+                proc_calls.append(proc_call)
+
+            async def run(self):
+                # i.e. the CLI failed on the second file, and went on
+                (tmp_path / "1.json").write_text(whisper_output_example1.json())
+
+        mocker.patch("openthot.asr.transcriptors.cli.AsyncProcRunner", BatchRunner)
+
+        first, second = await Whisper.run_batch(audio_file_paths)
+
+        (proc_call,) = proc_calls
+        assert proc_call[1:3] == audio_file_paths
+        assert first.success and first.transcript == whisper_output_example1
+        assert not second.success
+
+
+# Tests that worker processes load all the in-process engines, and warn when their
+# models alone outweigh the slots of the host
+def test_load_asr_models(mocker, whisper_settings):
+    engines = [
+        AsrEngine("default", whisper_settings),
+        AsrEngine(
+            "large", whisper_settings.copy(update={"model_size": AsrModelSize.large})
+        ),
+    ]
+    mocker.patch("openthot.tasks.tasks.registry.warm_engines", return_value=engines)
+    mocker.patch("openthot.tasks.tasks.slots_settings.host_capacity", 8)
+    load_models = mocker.patch("openthot.tasks.tasks.model_server.load_models")
+    logger = mocker.patch("openthot.tasks.tasks.logger")
+
+    tasks.load_asr_models()
+
+    assert [c.args[0] for c in load_models.call_args_list] == [
+        engine.settings for engine in engines
+    ]
+    assert logger.warning.call_args.kwargs == {"weight": 11, "host_capacity": 8}
+
+
+# Tests that WhisperX transcribes, aligns and diarizes with models loaded once
+@pytest.mark.asyncio
+async def test_whisperx_in_process(mocker, unloaded_models, whisperx_output_example2):
+    use_settings(
+        mocker,
+        "whisperx",
+        WhisperXSettings(
+            engine=TranscriptorSource.whisperx,
+            model_size=AsrModelSize.tiny,
+            compute_type=AsrComputeType.int8,
+            hf_token="token",
+        ),
+    )
+    model = mocker.MagicMock()
+    model.transcribe.return_value = {
+        "segments": [{"start": 0.0, "end": 1.5, "text": " Bonjour"}],
+        "language": "fr",
+    }
+    diarize = mocker.MagicMock()
+    whisperx = SimpleNamespace(
+        load_model=mocker.MagicMock(return_value=model),
+        load_align_model=mocker.MagicMock(return_value=("align", "metadata")),
+        DiarizationPipeline=mocker.MagicMock(return_value=diarize),
+        align=mocker.MagicMock(return_value={"segments": [], "word_segments": []}),
+        assign_word_speakers=mocker.MagicMock(
+            return_value=whisperx_output_example2.dict()
+        ),
+    )
+    torch = SimpleNamespace(cuda=SimpleNamespace(is_available=lambda: False))
+    mocker.patch.dict(sys.modules, {"whisperx": whisperx, "torch": torch})
+    mocker.patch("openthot.asr.transcriptors.cli.AsyncProcRunner")
+
+    on_progress = mocker.AsyncMock()
+    for _ in range(2):
+        tscr = WhisperX(audio_file_path=MP3_FILE_PATH, on_progress=on_progress)
+        await tscr.run_transcription()
+        assert tscr.success
+        assert tscr.transcript == whisperx_output_example2
+        # i.e. once transcribed, before being aligned and diarized
+        on_progress.assert_awaited_with(1.5)
+
+    whisperx.load_model.assert_called_once_with(
+        "tiny", "cpu", compute_type="int8", language="fr"
+    )
+    whisperx.DiarizationPipeline.assert_called_once_with(
+        use_auth_token="token", device="cpu"
+    )
+    assert whisperx.align.call_args.args[1:3] == ("align", "metadata")
+    assert diarize.call_count == 2
@@ -1,15 +1,35 @@
+import asyncio
+
 import pytest
 
-from openthot.asr.process import process_audio
+from openthot.asr import registry
+from openthot.asr.process import process_audio, process_audio_batch
+from openthot.asr.registry import AsrEngine
+from openthot.audio import ingest
+from openthot.config import (
+    AsrComputeType,
+    AsrModelSize,
+    BatchingSettings,
+    TwoPassSettings,
+    WhisperSettings,
+    WhisperXSettings,
+)
 from openthot.db import rw
 from openthot.db.schemas import SqlaInterview
-from openthot.models.interview import DBOutputInterview, InterviewStatus
+from openthot.models.interview import (
+    DBInputInterviewUpdate,
+    DBOutputInterview,
+    InterviewStatus,
+)
 from openthot.models.transcript import TranscriptorSource
+from openthot.models.transcript.utils import raw2ott
+from openthot.models.transcript.whisper import WhisperTranscript
 from openthot.models.transcript.whisperx import (
     WhisperXSegment,
     WhisperXTranscript,
     WhisperXWord,
 )
+from tests.conftest import use_asr_engine
 
 
 class TestProcessAudio:
@@ -41,11 +61,10 @@ class TestProcessAudio:
         mock_transcriptor.success = True
         mock_transcriptor.transcript_duration = 10.5
         mock_transcriptor.transcript = mock_transcript
-        mocker.patch(
-            "openthot.asr.process.transcriptor_source", TranscriptorSource.whisperx
-        )
-        mocker.patch(
-            "openthot.asr.process.transcriptor_class", return_value=mock_transcriptor
+        use_asr_engine(
+            mocker,
+            mocker.Mock(return_value=mock_transcriptor),
+            TranscriptorSource.whisperx,
         )
         await process_audio(
             session=async_test_session,
@@ -64,6 +83,7 @@ class TestProcessAudio:
         assert interview.transcript_duration_s == 11
         assert interview.transcript_ts is not None
         assert interview.transcript_raw == mock_transcript
+        assert interview.transcript == raw2ott(mock_transcript)
 
     # Tests that an exception is raised when interview is not found
     @pytest.mark.asyncio
@@ -92,9 +112,7 @@ class TestProcessAudio:
     ):
         mock_transcriptor = mocker.Mock()
         mock_transcriptor.success = False
-        mocker.patch(
-            "openthot.asr.process.transcriptor_class", return_value=mock_transcriptor
-        )
+        use_asr_engine(mocker, mocker.Mock(return_value=mock_transcriptor))
         with pytest.raises(Exception):
             await process_audio(
                 session=async_test_session,
@@ -102,3 +120,300 @@ class TestProcessAudio:
                 interview_id=sqla_interview.id,  # type: ignore
                 audio_location=sqla_interview.audio_location,  # type: ignore
             )
+
+    # Tests that the transcript of the same audio is reused instead of transcripting again
+    @pytest.mark.asyncio
+    async def test_transcript_reused(
+        self,
+        mocker,
+        local_object_storage,
+        async_test_session,
+        sqla_interviews: list[SqlaInterview],
+        whisper_output_example1: WhisperTranscript,
+    ):
+        transcripted, pending = sqla_interviews[:2]
+        for itw in (transcripted, pending):
+            itw.audio_sha256 = "same-audio-content"
+        await rw.update_interview(
+            async_test_session,
+            interview_db=transcripted,
+            interview_upd=DBInputInterviewUpdate(
+                status=InterviewStatus.transcripted,
+                transcript_duration_s=42,
+                transcript_raw=whisper_output_example1,
+                transcript_source=TranscriptorSource.whisper,
+                transcript_model="tiny",
+            ),
+        )
+        transcriptor_class = mocker.Mock()
+        use_asr_engine(mocker, transcriptor_class)
+
+        await process_audio(
+            session=async_test_session,
+            user_id=pending.creator_id,
+            interview_id=pending.id,  # type: ignore
+            audio_location=pending.audio_location,  # type: ignore
+        )
+
+        transcriptor_class.assert_not_called()
+        interview = DBOutputInterview.from_orm(pending)
+        assert interview.status == InterviewStatus.transcripted
+        assert interview.transcript_raw == whisper_output_example1
+        assert interview.transcript_model == "tiny"
+
+    # Tests that transcriptors get the normalized audio, decoded once whatever the retries
+    @pytest.mark.asyncio
+    async def test_normalized_audio(
+        self,
+        mocker,
+        local_object_storage,
+        async_test_session,
+        sqla_interview: SqlaInterview,
+    ):
+        sqla_interview.audio_sha256 = "ef" * 32
+        decode_spy = mocker.spy(ingest, "DecodedAudio")
+        mock_transcriptor = mocker.AsyncMock()
+        mock_transcriptor.success = False
+        transcriptor_class = mocker.Mock(return_value=mock_transcriptor)
+        use_asr_engine(mocker, transcriptor_class)
+
+        for _ in range(2):  # i.e. the task is retried
+            with pytest.raises(Exception):
+                await process_audio(
+                    session=async_test_session,
+                    user_id=sqla_interview.creator_id,
+                    interview_id=sqla_interview.id,  # type: ignore
+                    audio_location=sqla_interview.audio_location,  # type: ignore
+                )
+
+        assert decode_spy.call_count == 1
+        assert transcriptor_class.call_count == 2
+        audio_file_path = transcriptor_class.call_args.kwargs["audio_file_path"]
+        assert str(audio_file_path).endswith(f"{'ef' * 32}.16k.flac")
+
+    # Tests that a draft is saved first, then replaced by the refined transcript,
+    # keeping the speakers the user renamed meanwhile
+    @pytest.mark.asyncio
+    async def test_two_pass(
+        self,
+        mocker,
+        async_test_session,
+        sqla_interview: SqlaInterview,
+        whisper_output_example1: WhisperTranscript,
+        whisperx_output_example2: WhisperXTranscript,
+    ):
+        def engine(name: str, settings, transcript):
+            tscr = mocker.AsyncMock(
+                success=True, transcript=transcript, transcript_duration=1.0
+            )
+            return AsrEngine(name, settings, mocker.Mock(return_value=tscr))
+
+        fast = engine(
+            "fast",
+            WhisperSettings(
+                engine=TranscriptorSource.whisper, model_size=AsrModelSize.tiny
+            ),
+            whisper_output_example1,
+        )
+        accurate = engine(
+            "default",
+            WhisperXSettings(
+                engine=TranscriptorSource.whisperx,
+                model_size=AsrModelSize.large,
+                compute_type=AsrComputeType.int8,
+                hf_token="",
+            ),
+            whisperx_output_example2,
+        )
+        mocker.patch(
+            "openthot.asr.registry.get_engines",
+            return_value={"default": accurate, "fast": fast},
+        )
+        mocker.patch(
+            "openthot.asr.process.two_pass_settings",
+            TwoPassSettings(draft_engine="fast", min_duration_s=0),
+        )
+        refine = mocker.Mock()
+
+        await process_audio(
+            session=async_test_session,
+            user_id=sqla_interview.creator_id,
+            interview_id=sqla_interview.id,  # type: ignore
+            audio_location=sqla_interview.audio_location,  # type: ignore
+            refine=refine,
+        )
+
+        draft = DBOutputInterview.from_orm(sqla_interview)
+        assert draft.status == InterviewStatus.transcripted
+        assert draft.transcript_draft and draft.transcript_model == "tiny"
+        assert draft.transcript_raw == whisper_output_example1
+        refine.assert_called_once_with(sqla_interview)
+        accurate.transcriptor_class.assert_not_called()
+
+        await rw.update_interview(
+            async_test_session,
+            interview_db=sqla_interview,
+            interview_upd=DBInputInterviewUpdate(speakers={"SPEAKER_00": "Alice"}),
+        )
+        await process_audio(
+            session=async_test_session,
+            user_id=sqla_interview.creator_id,
+            interview_id=sqla_interview.id,  # type: ignore
+            audio_location=sqla_interview.audio_location,  # type: ignore
+        )
+
+        refined = DBOutputInterview.from_orm(sqla_interview)
+        assert refined.status == InterviewStatus.transcripted
+        assert not refined.transcript_draft
+        assert refined.transcript_model == "large-v2"
+        assert refined.transcript_raw == whisperx_output_example2
+        assert refined.speakers == {"SPEAKER_00": "Alice"}
+        # The draft stays shown while refining, without progress
+        assert accurate.transcriptor_class.call_args.kwargs["on_progress"] is None
+        assert fast.transcriptor_class.call_count == 1
+
+
+class TestProcessAudioBatch:
+    # Tests that pending short interviews are transcribed at once, and that those the
+    # batch failed on are transcribed again alone
+    @pytest.mark.asyncio
+    async def test_batch(
+        self,
+        mocker,
+        local_object_storage,
+        async_test_session,
+        sqla_interviews: list[SqlaInterview],
+        whisper_output_example1: WhisperTranscript,
+    ):
+        mocker.patch(
+            "openthot.asr.process.batching_settings",
+            BatchingSettings(max_size=4, max_wait_s=0),
+        )
+        failing = sqla_interviews[2]
+        batch_paths = []
+
+        async def run_batch(audio_file_paths, asr_settings):
+            batch_paths.extend(audio_file_paths)
+            return [
+                mocker.Mock(
+                    success=path.stem != str(failing.id),
+                    transcript=whisper_output_example1,
+                    transcript_duration=1.0,
+                )
+                for path in audio_file_paths
+            ]
+
+        transcriptor_class = mocker.Mock()
+        transcriptor_class.run_batch.side_effect = run_batch
+        use_asr_engine(mocker, transcriptor_class)
+        choose_engine = mocker.spy(registry, "choose_engine")
+        sqla_interviews[1].audio_duration = 300.0
+        await async_test_session.commit()
+        requeue = mocker.Mock()
+
+        await process_audio_batch(
+            async_test_session, sqla_interviews[5].id, requeue  # type: ignore
+        )
+
+        batch = [sqla_interviews[i] for i in (5, 0, 1, 2)]
+        assert [path.stem for path in batch_paths] == [str(i.id) for i in batch]
+        assert len({path.parent for path in batch_paths}) == 1
+        statuses = [i.status for i in sqla_interviews[:6]]
+        assert statuses == [InterviewStatus.transcripted] * 2 + [
+            InterviewStatus.uploaded
+        ] * 3 + [InterviewStatus.transcripted]
+        requeue.assert_called_once_with(failing)
+        # i.e. an engine for the whole batch, up to its longest interview
+        choose_engine.assert_called_once_with(None, 300.0)
+
+    # Tests that the interviews of a failed batch are not left processing: the task of
+    # the batch is retried for its first one, the others are transcribed alone
+    @pytest.mark.asyncio
+    async def test_batch_failure(
+        self,
+        mocker,
+        local_object_storage,
+        async_test_session,
+        sqla_interviews: list[SqlaInterview],
+    ):
+        mocker.patch(
+            "openthot.asr.process.batching_settings",
+            BatchingSettings(max_size=3, max_wait_s=0),
+        )
+        transcriptor_class = mocker.Mock()
+        transcriptor_class.run_batch = mocker.AsyncMock(
+            side_effect=RuntimeError("CLI crashed")
+        )
+        use_asr_engine(mocker, transcriptor_class)
+        requeue = mocker.Mock()
+
+        with pytest.raises(RuntimeError):
+            await process_audio_batch(
+                async_test_session, sqla_interviews[5].id, requeue  # type: ignore
+            )
+
+        transcriptor_class.run_batch.assert_awaited_once()
+        for interview in sqla_interviews[:6]:
+            await async_test_session.refresh(interview)
+        assert all(
+            interview.status == InterviewStatus.uploaded
+            for interview in sqla_interviews[:6]
+        )
+        assert [call.args[0].id for call in requeue.call_args_list] == [
+            sqla_interviews[0].id,
+            sqla_interviews[1].id,
+        ]
+
+    # Tests that a lone interview is transcribed at once, without waiting for others
+    @pytest.mark.asyncio
+    async def test_lone_interview(
+        self,
+        mocker,
+        local_object_storage,
+        async_test_session,
+        sqla_interview: SqlaInterview,
+        whisper_output_example1: WhisperTranscript,
+    ):
+        mocker.patch(
+            "openthot.asr.process.batching_settings",
+            BatchingSettings(max_wait_s=3600),
+        )
+        transcriptor_class = mocker.Mock()
+        transcriptor_class.run_batch = mocker.AsyncMock(
+            return_value=[
+                mocker.Mock(
+                    success=True,
+                    transcript=whisper_output_example1,
+                    transcript_duration=1.0,
+                )
+            ]
+        )
+        use_asr_engine(mocker, transcriptor_class)
+
+        await asyncio.wait_for(
+            process_audio_batch(
+                async_test_session, sqla_interview.id, mocker.Mock()  # type: ignore
+            ),
+            timeout=10,
+        )
+
+        transcriptor_class.run_batch.assert_awaited_once()
+        assert sqla_interview.status == InterviewStatus.transcripted
+
+    # Tests that an interview taken by another batch is left to it
+    @pytest.mark.asyncio
+    async def test_already_claimed(
+        self, mocker, async_test_session, sqla_interview: SqlaInterview
+    ):
+        mocker.patch(
+            "openthot.asr.process.batching_settings", BatchingSettings(max_wait_s=0)
+        )
+        transcriptor_class = mocker.Mock()
+        use_asr_engine(mocker, transcriptor_class)
+        await rw.claim_interview(async_test_session, sqla_interview.id)  # type: ignore
+
+        await process_audio_batch(
+            async_test_session, sqla_interview.id, mocker.Mock()  # type: ignore
+        )
+
+        transcriptor_class.run_batch.assert_not_called()
@@ -0,0 +1,101 @@
+import pytest
+
+from openthot.asr.progress import ProgressReporter, parse_segment_line
+from openthot.asr.transcriptors.whisper import Whisper
+from openthot.config import AsrEngineMode, AsrModelSize, WhisperSettings
+from openthot.db import rw
+from openthot.db.schemas import SqlaInterview, SqlaTranscriptionProgress
+from openthot.models.transcript import TranscriptorSource
+from openthot.models.transcript.openthot import PartialSegment
+from tests.conftest import MP3_FILE_PATH
+
+
+@pytest.mark.parametrize(
+    "line,expected",
+    (
+        ("[00:12.340 --> 00:15.000]  Bonjour", (12.34, 15.0, "Bonjour")),
+        ("[01:02:03.500 --> 01:02:04.250]  Bonjour", (3723.5, 3724.25, "Bonjour")),
+        ("Transcript: [62.5 --> 64.0]  Bonjour", (62.5, 64.0, "Bonjour")),
+        ("Detected language: French", None),
+        ("[00:12.340 --> 1.2.3]", None),
+    ),
+)
+def test_parse_segment_line(line, expected):
+    segment = parse_segment_line(line)
+    if expected is None:
+        assert segment is None
+    else:
+        assert segment == PartialSegment(
+            start=expected[0], end=expected[1], text=expected[2]
+        )
+
+
+async def stored_fraction(session, interview: SqlaInterview) -> float:
+    progress = await session.get(SqlaTranscriptionProgress, interview.id)
+    await session.refresh(progress)
+    return progress.fraction
+
+
+# Tests that progress is written, but at most every interval
+@pytest.mark.asyncio
+async def test_progress_reporter(async_test_session, sqla_interview: SqlaInterview):
+    reporter = ProgressReporter(
+        async_test_session, sqla_interview.id, audio_duration=100, interval_s=3600  # type: ignore
+    )
+    await reporter.start()
+    await reporter(10)
+    assert await stored_fraction(async_test_session, sqla_interview) == 0.0
+
+    reporter._interval_s = 0
+    await reporter(25)
+    await reporter(20)  # i.e. going backwards
+    await reporter(250)
+    assert await stored_fraction(async_test_session, sqla_interview) == 1.0
+
+    # Segments are written along with the progress, once due
+    reporter._interval_s = 3600
+    segment = PartialSegment(start=0.0, end=2.5, text=" Bonjour")
+    await reporter.add_segments([segment])
+    assert not await rw.get_partial_segments(async_test_session, sqla_interview.id)  # type: ignore
+    reporter._interval_s = 0
+    await reporter.add_segments([])
+    (stored,) = await rw.get_partial_segments(async_test_session, sqla_interview.id)  # type: ignore
+    assert PartialSegment.from_orm(stored) == segment
+
+    # Restarting a transcription restarts its progress, and drops its segments
+    await ProgressReporter(async_test_session, sqla_interview.id, 100).start()  # type: ignore
+    assert await stored_fraction(async_test_session, sqla_interview) == 0.0
+    assert not await rw.get_partial_segments(async_test_session, sqla_interview.id)  # type: ignore
+
+
+# Tests that progress is read from the output of the command line
+@pytest.mark.asyncio
+async def test_whisper_cli_progress(mocker):
+    mocker.patch(
+        "openthot.asr.transcriptors.whisper.asr_settings",
+        WhisperSettings(
+            engine=TranscriptorSource.whisper,
+            model_size=AsrModelSize.tiny,
+            mode=AsrEngineMode.subprocess,
+        ),
+    )
+
+    class FailingRunner:
+        return_code = 1
+
+        def __init__(self, proc_call, on_line):
+            self._on_line = on_line
+
+        async def run(self):
+            for line in ("Detecting language", "[00:00.000 --> 00:01.200]  Bon"):
+                await self._on_line(line)
+            await self._on_line("[00:01.200 --> 00:02.400]  jour")
+
+    mocker.patch("openthot.asr.transcriptors.cli.AsyncProcRunner", FailingRunner)
+    on_progress = mocker.AsyncMock()
+
+    tscr = Whisper(audio_file_path=MP3_FILE_PATH, on_progress=on_progress)
+    await tscr.run_transcription()
+
+    assert not tscr.success
+    assert [c.args for c in on_progress.await_args_list] == [(1.2,), (2.4,)]
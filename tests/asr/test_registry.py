@@ -0,0 +1,92 @@
+import pytest
+from pydantic import ValidationError
+
+from openthot.asr import registry, slots
+from openthot.asr.transcriptors.whisper import Whisper
+from openthot.asr.transcriptors.wordcab import Wordcab
+from openthot.config import (
+    AsrModelSize,
+    AsrSlotsSettings,
+    RoutingSettings,
+    Settings,
+    WhisperSettings,
+    WordcabSettings,
+)
+from openthot.models.transcript import TranscriptorSource
+
+
+def whisper_settings(model_size: AsrModelSize) -> WhisperSettings:
+    return WhisperSettings(engine=TranscriptorSource.whisper, model_size=model_size)
+
+
+@pytest.fixture(scope="function")
+def engines(mocker):
+    mocker.patch.object(registry, "asr_settings", whisper_settings(AsrModelSize.medium))
+    mocker.patch.object(
+        registry,
+        "engine_settings",
+        {
+            "fast": whisper_settings(AsrModelSize.tiny),
+            "accurate": whisper_settings(AsrModelSize.large),
+            "remote": WordcabSettings(
+                engine=TranscriptorSource.wordcab, url="http://gpu.test"
+            ),
+        },
+    )
+    mocker.patch.object(
+        registry,
+        "routing_settings",
+        RoutingSettings(short_engine="fast", long_engine="accurate"),
+    )
+
+
+def test_engines(engines):
+    engines = registry.get_engines()
+
+    assert list(engines) == ["default", "fast", "accurate", "remote"]
+    assert engines["accurate"].transcriptor_class is Whisper
+    assert engines["accurate"].model == "large-v2"
+    assert engines["remote"].transcriptor_class is Wordcab
+    assert engines["remote"].model is None and not engines["remote"].local
+    tscr = engines["fast"].transcriptor(audio_file_path="a.flac")
+    assert tscr._asr_settings.model_size == AsrModelSize.tiny
+
+
+# Tests that interviews are routed by duration, unless they request an engine
+def test_choose_engine(engines):
+    assert registry.choose_engine(None, 60).name == "fast"
+    assert registry.choose_engine(None, 1800).name == "default"
+    assert registry.choose_engine(None, 7200).name == "accurate"
+    assert registry.choose_engine("remote", 60).name == "remote"
+    # e.g. an engine removed from the settings since it was requested
+    assert registry.choose_engine("removed", 60).name == "default"
+
+
+# Tests that transcriptions go to the overflow engine once the host is saturated
+def test_overflow(mocker, tmp_path, engines):
+    mocker.patch.object(registry.routing_settings, "overflow_engine", "remote")
+    mocker.patch(
+        "openthot.asr.slots.slots_settings",
+        AsrSlotsSettings(host_capacity=10, lock_dir=tmp_path),
+    )
+    assert registry.choose_engine(None, 7200).name == "accurate"
+
+    fds = slots._try_lock_host_slots(tmp_path, 5, 10)
+    try:
+        assert registry.choose_engine(None, 60).name == "fast"
+        assert registry.choose_engine(None, 7200).name == "remote"
+        assert registry.choose_engine("accurate", 7200).name == "accurate"
+    finally:
+        slots._unlock_host_slots(fds)
+
+
+def test_settings_engine_names():
+    settings = Settings(
+        asr_engines={"fast": {"engine": "whisper", "model_size": "tiny"}},
+        asr_routing={"short_engine": "fast"},
+    )
+    assert list(settings.named_asr_engines()) == ["default", "fast"]
+    with pytest.raises(ValidationError):
+        Settings(asr_routing={"long_engine": "unknown"})
+    with pytest.raises(ValidationError):
+        Settings(asr_engines={"default": {"engine": "whisper", "model_size": "tiny"}})
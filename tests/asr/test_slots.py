@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from openthot.asr.slots import model_weight, transcription_slots
+from openthot.config import (
+    AsrComputeType,
+    AsrModelSize,
+    AsrSlotsSettings,
+    WhisperSettings,
+    WhisperXSettings,
+    WordcabSettings,
+)
+from openthot.db import rw
+from openthot.db.schemas import SqlaAsrSlots
+from openthot.models.transcript import TranscriptorSource
+
+
+def test_model_weight():
+    assert (
+        model_weight(
+            WhisperXSettings(
+                engine=TranscriptorSource.whisperx,
+                model_size=AsrModelSize.large,
+                compute_type=AsrComputeType.int8,
+                hf_token="",
+            )
+        )
+        == 3
+    )
+    assert (
+        model_weight(
+            WhisperSettings(
+                engine=TranscriptorSource.whisper, model_size=AsrModelSize.tiny
+            )
+        )
+        == 1
+    )
+    assert (
+        model_weight(
+            WordcabSettings(engine=TranscriptorSource.wordcab, url="http://gpu.test")
+        )
+        == 0
+    )
+
+
+def use_slots_settings(mocker, **settings) -> None:
+    mocker.patch(
+        "openthot.asr.slots.slots_settings",
+        AsrSlotsSettings(poll_interval_s=0.01, **settings),
+    )
+
+
+async def assert_waits(weight: int, release: asyncio.Event) -> None:
+    """Check that `weight` slots are only taken once `release` is set."""
+    acquired = asyncio.Event()
+
+    async def transcribe():
+        async with transcription_slots(weight):
+            acquired.set()
+
+    task = asyncio.create_task(transcribe())
+    await asyncio.sleep(0.1)
+    assert not acquired.is_set()
+    release.set()
+    await asyncio.wait_for(task, 1)
+
+
+async def hold_slots(weight: int, release: asyncio.Event) -> None:
+    async with transcription_slots(weight):
+        await release.wait()
+
+
+# Tests that transcriptions wait for the slots of the host to be free
+@pytest.mark.asyncio
+async def test_host_slots(mocker, tmp_path):
+    use_slots_settings(mocker, host_capacity=4, lock_dir=tmp_path)
+    release = asyncio.Event()
+
+    holder = asyncio.create_task(hold_slots(3, release))
+    await asyncio.sleep(0.05)
+    async with transcription_slots(1):  # i.e. fits beside
+        pass
+    await assert_waits(2, release)
+    await holder
+
+    # Too heavy transcriptions take all the slots, and free them whatever happens
+    with pytest.raises(RuntimeError):
+        async with transcription_slots(10):
+            raise RuntimeError
+    async with transcription_slots(4):
+        pass
+
+
+# Tests that transcriptions wait for the slots of the cluster to be free
+@pytest.mark.asyncio
+async def test_cluster_slots(mocker, db_test_engine):
+    use_slots_settings(mocker, cluster_capacity=4)
+    session_maker = async_sessionmaker(db_test_engine, expire_on_commit=False)
+    mocker.patch("openthot.asr.slots.async_session", session_maker)
+    release = asyncio.Event()
+
+    holder = asyncio.create_task(hold_slots(3, release))
+    await asyncio.sleep(0.05)
+    await assert_waits(2, release)
+    await holder
+
+    async with session_maker() as session:
+        assert not (await session.scalars(select(SqlaAsrSlots))).all()
+        # Slots of a dead worker are taken over once their lease expires
+        assert await rw.acquire_asr_slots(session, "dead", 4, 4, lease_s=0) is not None
+        slots_id = await rw.acquire_asr_slots(session, "alive", 4, 4, lease_s=60)
+        assert slots_id is not None
+        assert await rw.acquire_asr_slots(session, "other", 1, 4, lease_s=60) is None
+        await rw.release_asr_slots(session, slots_id)
+
+
+# Tests that concurrent requests never take more slots than the cluster has
+@pytest.mark.asyncio
+async def test_cluster_slots_concurrent(db_test_engine):
+    session_maker = async_sessionmaker(db_test_engine, expire_on_commit=False)
+
+    async def acquire(host: str) -> int | None:
+        async with session_maker() as session:
+            return await rw.acquire_asr_slots(session, host, 1, 4, lease_s=60)
+
+    taken = await asyncio.gather(*(acquire(f"host-{i}") for i in range(10)))
+
+    assert len([slots_id for slots_id in taken if slots_id is not None]) == 4
+    async with session_maker() as session:
+        assert len((await session.scalars(select(SqlaAsrSlots))).all()) == 4
@@ -0,0 +1,41 @@
+import sys
+
+import pytest
+
+from openthot.asr.utils import OUTPUT_BUFFER_LINES, AsyncProcRunner
+
+SCRIPT = """
+import sys
+for i in range(500):
+    print(f"[00:{i // 10:02d}.{i % 10}00 --> 00:{i // 10:02d}.{i % 10}50]  ligne {i}")
+sys.stdout.flush()
+sys.stderr.write("progress 10%\\rprogress 50%\\rprogress 100%\\n")
+sys.stderr.write("déjà fini")
+sys.exit(3)
+"""
+
+
+@pytest.mark.asyncio
+async def test_async_proc_runner_lines():
+    lines = []
+
+    async def on_line(line: str):
+        lines.append(line)
+
+    runner = AsyncProcRunner([sys.executable, "-c", SCRIPT], on_line=on_line)
+    await runner.run()
+
+    assert runner.return_code == 3
+    stdout_lines = [line for line in lines if line.startswith("[")]
+    assert len(stdout_lines) == 500
+    assert stdout_lines[-1] == "[00:49.900 --> 00:49.950]  ligne 499"
+    assert [line for line in lines if not line.startswith("[")] == [
+        "progress 10%",
+        "progress 50%",
+        "progress 100%",
+        "déjà fini",
+    ]
+    # Only the last lines are kept
+    assert runner.stdout is not None
+    assert runner.stdout.splitlines() == stdout_lines[-OUTPUT_BUFFER_LINES:]
+    assert runner.stderr == "progress 10%\nprogress 50%\nprogress 100%\ndéjà fini"
@@ -0,0 +1,177 @@
+import httpx
+import pytest
+
+from openthot.asr.transcriptors import wordcab
+from openthot.asr.transcriptors.wordcab import Wordcab, get_client, get_probe_client
+from openthot.config import WordcabSettings
+from openthot.models.transcript import TranscriptorSource
+from openthot.tasks import task_event_loop
+from tests.conftest import MP3_FILE_PATH
+
+WORDCAB_OUTPUT = {
+    "utterances": [
+        {
+            "start": 0.0,
+            "end": 1.0,
+            "text": "Bonjour",
+            "speaker": 0,
+            "words": [{"start": 0.0, "end": 1.0, "score": 0.9, "word": "Bonjour"}],
+        }
+    ],
+    "alignment": True,
+    "diarization": True,
+    "source_lang": "fr",
+    "timestamps": "s",
+    "use_batch": False,
+    "word_timestamps": True,
+    "dual_channel": False,
+}
+
+
+@pytest.fixture(scope="function")
+def wordcab_settings(mocker):
+    settings = WordcabSettings(
+        engine=TranscriptorSource.wordcab,
+        url="http://wordcab.test/api/v1",
+        max_retries=2,
+        retry_backoff_s=0,
+    )
+    mocker.patch("openthot.asr.transcriptors.wordcab.asr_settings", settings)
+    mocker.patch.object(wordcab, "_clients", wordcab.weakref.WeakKeyDictionary())
+    mocker.patch.object(wordcab, "_probe_clients", wordcab.weakref.WeakKeyDictionary())
+    mocker.patch.object(wordcab, "_endpoint_pools", {})
+    return settings
+
+
+def stub_servers(
+    mocker, responses: dict[str, list], health: dict[str, httpx.Response] = {}
+) -> dict[str, list[httpx.Request]]:
+    """
+    Stub Wordcab servers, by host: each serves its `responses` in turn (or raises
+    them), and its `health` (200 by default) to probes.
+    Returns the transcription requests received by each server.
+    """
+    requests: dict[str, list[httpx.Request]] = {host: [] for host in responses}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        if request.url.path == "/healthz":
+            return health.get(host, httpx.Response(200))
+        request.read()
+        requests[host].append(request)
+        served = responses[host]
+        response = served[min(len(requests[host]), len(served)) - 1]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    for client_getter in ("get_client", "get_probe_client"):
+        mocker.patch(
+            f"openthot.asr.transcriptors.wordcab.{client_getter}",
+            return_value=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+    return requests
+
+
+def mock_server(mocker, responses: list) -> list[httpx.Request]:
+    """A single stub server (see `stub_servers`)."""
+    return stub_servers(mocker, {"wordcab.test": responses})["wordcab.test"]
+
+
+# Tests that server errors are retried, and the file sent again each time
+@pytest.mark.asyncio
+async def test_retry_server_error(mocker, wordcab_settings):
+    requests = mock_server(
+        mocker, [httpx.Response(503), httpx.Response(200, json=WORDCAB_OUTPUT)]
+    )
+
+    tscr = Wordcab(audio_file_path=MP3_FILE_PATH)
+    await tscr.run_transcription()
+
+    assert tscr.success
+    assert tscr.transcript.utterances[0].text == "Bonjour"
+    assert len(requests) == 2
+    assert all(MP3_FILE_PATH.read_bytes() in r.content for r in requests)
+
+
+@pytest.mark.asyncio
+async def test_retries_exhausted(mocker, wordcab_settings):
+    requests = mock_server(mocker, [httpx.Response(500, text="Internal error")])
+
+    tscr = Wordcab(audio_file_path=MP3_FILE_PATH)
+    await tscr.run_transcription()
+
+    assert not tscr.success
+    assert len(requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_connection_error(mocker, wordcab_settings):
+    requests = mock_server(mocker, [httpx.ConnectError("Connection refused")])
+
+    with pytest.raises(httpx.ConnectError):
+        await Wordcab(audio_file_path=MP3_FILE_PATH).run_transcription()
+
+    assert len(requests) == 3
+
+
+# Tests that client errors are not retried
+@pytest.mark.asyncio
+async def test_client_error(mocker, wordcab_settings):
+    requests = mock_server(mocker, [httpx.Response(422, json={"detail": "nope"})])
+
+    tscr = Wordcab(audio_file_path=MP3_FILE_PATH)
+    await tscr.run_transcription()
+
+    assert not tscr.success
+    assert len(requests) == 1
+
+
+# Tests that the tasks of a worker thread share one client, i.e. one connection pool,
+# and another one for health probes
+def test_client_shared_by_tasks(wordcab_settings):
+    async def clients_of_task() -> tuple[httpx.AsyncClient, httpx.AsyncClient]:
+        return get_client(wordcab_settings), get_probe_client(wordcab_settings)
+
+    (first, first_probes), (second, second_probes) = (
+        task_event_loop().run_until_complete(clients_of_task()) for _ in range(2)
+    )
+
+    assert first is second
+    assert first_probes is second_probes and first_probes is not first
+    assert first.timeout.connect == wordcab_settings.connect_timeout_s
+    assert first.timeout.read == wordcab_settings.read_timeout_s
+
+
+@pytest.fixture(scope="function")
+def wordcab_cluster(wordcab_settings):
+    wordcab_settings.urls = [
+        f"http://{host}.test/api/v1" for host in ("gpu1", "gpu2", "gpu3")
+    ]
+    return wordcab_settings
+
+
+# Tests that jobs avoid servers failing their health probe, and that retries
+# fail over to another server
+@pytest.mark.asyncio
+async def test_failover(mocker, wordcab_cluster):
+    requests = stub_servers(
+        mocker,
+        {
+            "gpu1.test": [httpx.Response(200, json=WORDCAB_OUTPUT)],
+            "gpu2.test": [httpx.ConnectError("Connection refused")],
+            "gpu3.test": [httpx.Response(200, json=WORDCAB_OUTPUT)],
+        },
+        health={"gpu1.test": httpx.Response(503)},
+    )
+    pool = wordcab.get_endpoint_pool(wordcab_cluster)
+    gpu1, gpu2, gpu3 = pool.endpoints
+    gpu3.in_flight = 1  # i.e. more loaded than gpu2
+
+    tscr = Wordcab(audio_file_path=MP3_FILE_PATH)
+    await tscr.run_transcription()
+
+    assert tscr.success
+    assert [len(requests[host]) for host in requests] == [0, 1, 1]
+    assert not gpu1.available and not gpu2.available and gpu3.available
+    assert gpu3.in_flight == 1
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+import soundfile
+
+from openthot.audio.chunking import split_audio
+from tests.conftest import MP3_FILE_PATH
+
+SAMPLE_RATE = 16000
+# Speech-like bursts, and the pauses between them (s)
+PAUSES = ((3.0, 3.5), (6.2, 6.6), (9.0, 9.8), (12.5, 13.0))
+DURATION = 15.0
+
+
+@pytest.fixture(scope="function")
+def speech_file(tmp_path):
+    rng = np.random.default_rng(0)
+    samples = (rng.random(int(DURATION * SAMPLE_RATE)) - 0.5).astype(np.float32)
+    for start, end in PAUSES:
+        pause = slice(int(start * SAMPLE_RATE), int(end * SAMPLE_RATE))
+        samples[pause] *= 0.001
+    path = tmp_path / "speech.flac"
+    soundfile.write(path, samples, SAMPLE_RATE, format="FLAC", subtype="PCM_16")
+    return path
+
+
+def test_split_audio_at_pauses(speech_file, tmp_path):
+    chunks = split_audio(speech_file, tmp_path, chunk_duration_s=4.0, overlap_s=0.0)
+
+    assert len(chunks) > 1
+    assert [chunk.index for chunk in chunks] == list(range(len(chunks)))
+    for chunk in chunks:
+        assert chunk.duration <= 4.0
+        assert chunk.overlap == 0.0
+        if chunk.offset:
+            assert any(start <= chunk.offset <= end for start, end in PAUSES)
+    assert sum(chunk.duration for chunk in chunks) == pytest.approx(DURATION)
+    for chunk, following in zip(chunks, chunks[1:]):
+        assert following.offset == pytest.approx(chunk.offset + chunk.duration)
+
+    original, _ = soundfile.read(speech_file, dtype="int16")
+    pieces = [soundfile.read(chunk.path, dtype="int16")[0] for chunk in chunks]
+    assert [len(piece) for piece in pieces] == [
+        round(chunk.duration * SAMPLE_RATE) for chunk in chunks
+    ]
+    assert np.array_equal(np.concatenate(pieces), original)
+
+
+def test_split_audio_overlap(speech_file, tmp_path):
+    chunks = split_audio(speech_file, tmp_path, chunk_duration_s=4.0, overlap_s=1.0)
+
+    assert len(chunks) > 1
+    assert chunks[0].overlap == 0.0
+    for chunk, following in zip(chunks, chunks[1:]):
+        # Chunks but the first start a second before their cut, at a pause
+        assert following.overlap == pytest.approx(1.0, abs=0.03)
+        cut = following.offset + following.overlap
+        assert any(start <= cut <= end for start, end in PAUSES)
+        assert cut == pytest.approx(chunk.offset + chunk.duration)
+    for chunk in chunks:
+        assert chunk.duration - chunk.overlap <= 4.0
+
+    original, _ = soundfile.read(speech_file, dtype="int16")
+    for chunk in chunks:
+        piece, _ = soundfile.read(chunk.path, dtype="int16")
+        start = round(chunk.offset * SAMPLE_RATE)
+        assert np.array_equal(piece, original[start : start + len(piece)])  # noqa: E203
+    assert round((chunks[-1].offset + chunks[-1].duration) * SAMPLE_RATE) == len(
+        original
+    )
+
+
+def test_split_audio_short_file(tmp_path):
+    chunks = split_audio(MP3_FILE_PATH, tmp_path, chunk_duration_s=600)
+
+    assert len(chunks) == 1
+    assert chunks[0].path == MP3_FILE_PATH
+    assert chunks[0].duration == pytest.approx(2.422, abs=1e-3)
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+import soundfile
+
+from openthot import object_storage
+from openthot.audio import ingest
+from openthot.audio.ingest import ingest_audio, normalized_audio_location
+from openthot.audio.normalize import NORMALIZED_SAMPLE_RATE, NormalizedAudioWriter
+from openthot.audio.waveform import read_waveform_level, waveform_location
+from tests.conftest import MP3_FILE_PATH
+
+SHA256 = "cd" * 32
+
+
+@pytest.mark.parametrize("sample_rate", (8000, 16000, 44100, 48000))
+def test_normalized_audio_writer(tmp_path, sample_rate):
+    """Tests that the signal is resampled as a whole, whatever its blocks."""
+    duration = 3
+    t = np.arange(sample_rate * duration) / sample_rate
+    samples = (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+    path = tmp_path / "normalized.flac"
+
+    writer = NormalizedAudioWriter(path, sample_rate)
+    for block in np.array_split(samples, 7):
+        writer.feed(block)
+    writer.close()
+
+    info = soundfile.info(path)
+    assert info.samplerate == NORMALIZED_SAMPLE_RATE
+    assert info.channels == 1
+    assert info.format == "FLAC"
+    assert info.frames == NORMALIZED_SAMPLE_RATE * duration
+    normalized, _ = soundfile.read(path, dtype="float32")
+    expected = 0.5 * np.sin(2 * np.pi * 440 * np.arange(info.frames) / 16000)
+    # Leave out resampling filter edges
+    assert np.abs(normalized - expected)[100:-100].max() < 1e-2
+
+
+@pytest.mark.asyncio
+async def test_ingest_audio(mocker, local_object_storage):
+    """Tests that a single decoding pass produces the normalized audio and the peaks."""
+    decode_spy = mocker.spy(ingest, "DecodedAudio")
+
+    location = await ingest_audio(str(MP3_FILE_PATH), SHA256)
+
+    assert location == normalized_audio_location(SHA256)
+    assert location.endswith(f"{SHA256}.16k.flac")
+    info = soundfile.info(location)
+    assert (info.samplerate, info.channels) == (16000, 1)
+    assert info.duration == pytest.approx(2.422, abs=1e-3)
+    assert await read_waveform_level(SHA256, 1) is not None
+    assert decode_spy.call_count == 1
+    # Nothing left in the staging area
+    assert list((local_object_storage.object_storage_path / "staging").iterdir()) == []
+
+    # Already ingested: no decoding at all
+    assert await ingest_audio(str(MP3_FILE_PATH), SHA256) == location
+    assert decode_spy.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_ingest_audio_missing_waveform(mocker, local_object_storage):
+    """Tests that only what is missing is produced."""
+    await ingest_audio(str(MP3_FILE_PATH), SHA256)
+    await object_storage.get_storage_backend().delete(waveform_location(SHA256))
+    writer_spy = mocker.spy(ingest, "NormalizedAudioWriter")
+
+    await ingest_audio(str(MP3_FILE_PATH), SHA256)
+
+    assert writer_spy.call_count == 0
+    assert await read_waveform_level(SHA256, 1) is not None
+
+
+@pytest.mark.asyncio
+async def test_ingest_audio_not_decodable(local_object_storage, tmp_path):
+    not_audio = tmp_path / "not_audio.mp3"
+    not_audio.write_bytes(b"definitely not some audio" * 100)
+
+    with pytest.raises(Exception):
+        await ingest_audio(str(not_audio), SHA256)
+
+    assert list((tmp_path / "staging").iterdir()) == []
+    assert (
+        await object_storage.stat_audio_file(normalized_audio_location(SHA256)) is None
+    )
@@ -0,0 +1,113 @@
+import struct
+
+import librosa
+import numpy as np
+import pytest
+import soundfile
+
+from openthot.audio import probe
+from openthot.audio.probe import probe_audio, probe_audio_header
+from tests.conftest import MP3_FILE_PATH
+
+SAMPLE_RATE = 16000
+
+
+@pytest.fixture(scope="module")
+def samples() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return (rng.standard_normal((SAMPLE_RATE * 3 + 123, 2)) * 0.1).astype("float32")
+
+
+def mp4_box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def test_probe_mp3_fixture():
+    info = probe_audio_header(MP3_FILE_PATH)
+    assert info is not None
+    assert info.container == "mp3"
+    assert info.duration == pytest.approx(librosa.get_duration(path=MP3_FILE_PATH))
+    assert info.sample_rate == 44100
+    assert info.channels == 2
+
+
+@pytest.mark.parametrize(
+    "format,subtype,container",
+    (
+        ("WAV", "PCM_16", "wav"),
+        ("FLAC", "PCM_16", "flac"),
+        ("OGG", "VORBIS", "ogg"),
+        ("MP3", "MPEG_LAYER_III", "mp3"),
+    ),
+)
+@pytest.mark.parametrize("channels", (1, 2))
+def test_probe_header_matches_decoding(
+    tmp_path, samples, format, subtype, container, channels
+):
+    path = tmp_path / f"audio.{container}"
+    soundfile.write(
+        path, samples[:, :channels], SAMPLE_RATE, format=format, subtype=subtype
+    )
+
+    info = probe_audio_header(path)
+
+    assert info is not None
+    assert info.container == container
+    assert info.duration == pytest.approx(librosa.get_duration(path=path), abs=1e-3)
+    assert info.sample_rate == SAMPLE_RATE
+    assert info.channels == channels
+
+
+def test_probe_mp4(tmp_path):
+    # ftyp, then moov > trak > mdia > (mdhd, hdlr, minf > stbl > stsd > mp4a)
+    mdhd = mp4_box(b"mdhd", struct.pack(">IIIII", 0, 0, 0, 44100, 44100 * 90))
+    hdlr = mp4_box(b"hdlr", struct.pack(">II4s", 0, 0, b"soun") + bytes(12))
+    mp4a = mp4_box(
+        b"mp4a",
+        bytes(6) + struct.pack(">HHHIHHHHI", 1, 0, 0, 0, 2, 16, 0, 0, 44100 << 16),
+    )
+    stsd = mp4_box(b"stsd", struct.pack(">II", 0, 1) + mp4a)
+    minf = mp4_box(b"minf", mp4_box(b"stbl", stsd))
+    trak = mp4_box(b"trak", mp4_box(b"mdia", mdhd + hdlr + minf))
+    mvhd = mp4_box(b"mvhd", struct.pack(">IIIII", 0, 0, 0, 1000, 90001) + bytes(80))
+    path = tmp_path / "audio.m4a"
+    path.write_bytes(
+        mp4_box(b"ftyp", b"M4A " + bytes(4))
+        + mp4_box(b"mdat", bytes(1000))
+        + mp4_box(b"moov", mvhd + trak)
+    )
+
+    info = probe_audio_header(path)
+
+    assert info is not None
+    assert info.container == "mp4"
+    assert info.duration == 90.0
+    assert info.sample_rate == 44100
+    assert info.channels == 2
+
+
+def test_probe_header_unknown(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_bytes(b"Some notes" * 100)
+    assert probe_audio_header(path) is None
+
+
+@pytest.mark.asyncio
+async def test_probe_audio_falls_back_to_decoding(mocker):
+    mocker.patch("openthot.audio.probe.probe_audio_header", return_value=None)
+    decoding = mocker.spy(probe, "probe_audio_decoding")
+
+    info = await probe_audio(MP3_FILE_PATH)
+
+    decoding.assert_called_once()
+    assert info.duration == pytest.approx(librosa.get_duration(path=MP3_FILE_PATH))
+    assert info.sample_rate == 44100
+    assert info.channels == 2
+
+
+@pytest.mark.asyncio
+async def test_probe_audio_not_audio(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_bytes(b"Some notes" * 100)
+    with pytest.raises(Exception):
+        await probe_audio(path)
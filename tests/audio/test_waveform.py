@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from openthot import object_storage
+from openthot.audio import waveform
+from openthot.audio.waveform import (
+    MAX_PEAKS_PER_SECOND,
+    PeaksAccumulator,
+    WaveformPeaks,
+    compute_waveform,
+    read_waveform_level,
+)
+from tests.conftest import MP3_FILE_PATH
+
+SAMPLE_RATE = 44100
+SHA256 = "ab" * 32
+
+
+@pytest.fixture(scope="module")
+def samples() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return (rng.random(SAMPLE_RATE * 7 + 123) * 2 - 1).astype("float32")
+
+
+def naive_peaks(samples: np.ndarray) -> np.ndarray:
+    samples_per_peak = SAMPLE_RATE / MAX_PEAKS_PER_SECOND
+    count = int(np.ceil(len(samples) / samples_per_peak))
+    bounds = np.round(np.arange(count + 1) * samples_per_peak).astype(int)
+    windows = np.split(samples, bounds[1:-1])
+    peaks = np.array([[w.min(), w.max()] for w in windows])
+    return np.round(peaks * 127).astype(np.int8)
+
+
+def test_peaks_accumulator(samples):
+    """Tests that peaks do not depend on how the signal is split into blocks."""
+    rng = np.random.default_rng(1)
+    accumulator = PeaksAccumulator(SAMPLE_RATE)
+    position = 0
+    while position < len(samples):
+        size = int(rng.integers(1, 30000))
+        accumulator.feed(samples[position:][:size])
+        position += size
+
+    result = accumulator.result()
+
+    assert result.duration == pytest.approx(len(samples) / SAMPLE_RATE)
+    finest = result.levels[0][1]
+    assert np.array_equal(finest, naive_peaks(samples))
+    assert [pps for pps, _ in result.levels] == [128, 64, 32, 16, 8, 4, 2, 1]
+    for (_, finer), (_, coarser) in zip(result.levels, result.levels[1:]):
+        assert len(coarser) == (len(finer) + 1) // 2
+        assert coarser[:, 0].min() == finer[:, 0].min()
+        assert coarser[:, 1].max() == finer[:, 1].max()
+
+
+def test_waveform_encoding(samples):
+    accumulator = PeaksAccumulator(SAMPLE_RATE)
+    accumulator.feed(samples)
+    peaks = accumulator.result()
+
+    encoded = peaks.encode()
+    decoded = WaveformPeaks.decode(encoded)
+
+    assert decoded.duration == peaks.duration
+    assert all(
+        pps1 == pps2 and np.array_equal(p1, p2)
+        for (pps1, p1), (pps2, p2) in zip(decoded.levels, peaks.levels)
+    )
+    # i.e. about 2 bytes per peak
+    assert len(encoded) < 2 * 2 * len(peaks.levels[0][1]) + 100
+
+
+def test_compute_waveform_mp3():
+    peaks = compute_waveform(MP3_FILE_PATH)
+
+    assert peaks.duration == pytest.approx(2.422, abs=1e-3)
+    assert len(peaks.levels[0][1]) == int(np.ceil(peaks.duration * 128))
+    assert peaks.levels[0][1].max() > 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "resolution,expected", ((1, 1), (5, 8), (64, 64), (100, 128), (1000, 128))
+)
+async def test_read_waveform_level(
+    mocker, local_object_storage, samples, resolution, expected
+):
+    accumulator = PeaksAccumulator(SAMPLE_RATE)
+    accumulator.feed(samples)
+    peaks = accumulator.result()
+    await waveform.store_waveform(SHA256, peaks)
+    read_spy = mocker.spy(object_storage, "read_audio_file")
+
+    length, content = await read_waveform_level(SHA256, resolution)  # type: ignore
+    data = b"".join([chunk async for chunk in content])
+
+    assert len(data) == length
+    level = WaveformPeaks.decode(data)
+    assert level.duration == peaks.duration
+    assert len(level.levels) == 1
+    pps, level_peaks = level.levels[0]
+    assert pps == expected
+    assert np.array_equal(level_peaks, dict(peaks.levels)[expected])
+    # Header, then the level itself
+    assert read_spy.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_read_waveform_level_missing(local_object_storage):
+    assert await read_waveform_level(SHA256, 1) is None
@@ -19,9 +19,18 @@ from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engin
 
 from openthot.api.main import app
 from openthot.api.v1.routers.auth import get_user_manager
+from openthot.asr.registry import AsrEngine
+from openthot.config import (
+    DEFAULT_ASR_ENGINE,
+    AsrComputeType,
+    AsrModelSize,
+    WhisperSettings,
+    WhisperXSettings,
+)
 from openthot.db.database import SqlaBase, SqlaUserBase, get_db
 from openthot.db.rw import create_interview
 from openthot.models.interview import DBInputInterviewCreate, DBInputInterviewUpdate
+from openthot.models.transcript import TranscriptorSource
 from openthot.models.transcript.openthot import OpenthotTranscript
 from openthot.models.transcript.whisper import WhisperTranscript
 from openthot.models.transcript.whisperx import WhisperXTranscript
@@ -32,6 +41,31 @@ MP3_FILE_PATH = Path("./tests/bonjour.mp3")
 TEST_DB = "./data/test.db"
 
 
+def use_asr_engine(
+    mocker,
+    transcriptor_class,
+    source: TranscriptorSource = TranscriptorSource.whisper,
+    model_size: AsrModelSize = AsrModelSize.tiny,
+) -> AsrEngine:
+    """Make `transcriptor_class` the only (i.e. default) ASR engine."""
+    settings = (
+        WhisperSettings(engine=source, model_size=model_size)
+        if source == TranscriptorSource.whisper
+        else WhisperXSettings(
+            engine=source,
+            model_size=model_size,
+            compute_type=AsrComputeType.int8,
+            hf_token="",
+        )
+    )
+    engine = AsrEngine(DEFAULT_ASR_ENGINE, settings, transcriptor_class)
+    mocker.patch(
+        "openthot.asr.registry.get_engines",
+        return_value={DEFAULT_ASR_ENGINE: engine},
+    )
+    return engine
+
+
 @pytest.fixture(scope="session")
 def celery_config():
     return {
@@ -157,6 +191,15 @@ async def logged_user(client: AsyncClient, access_token) -> UserRead:
     return UserRead(**response.json())
 
 
+@pytest.fixture(scope="function")
+def local_object_storage(mocker, tmp_path):
+    """Settings of an object storage below `tmp_path`, on the local filesystem."""
+    settings = mocker.patch("openthot.object_storage.get_settings").return_value
+    settings.object_storage_path = tmp_path
+    settings.object_storage_s3 = None
+    return settings
+
+
 #
 # DB fillings
 #
@@ -165,7 +208,7 @@ class InterviewUpdateFactory(ModelFactory[DBInputInterviewUpdate]):
     __model__ = DBInputInterviewUpdate
     __random_seed__ = 0
 
-    audio_location = MP3_FILE_PATH
+    audio_location = str(MP3_FILE_PATH)
 
 
 # @pytest_asyncio.fixture(scope="function")
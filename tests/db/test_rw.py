@@ -1,17 +1,41 @@
+import asyncio
 import uuid
+from pathlib import Path
 
 import pytest
 from pydantic import FilePath
 from pyrate_limiter import Iterable
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
 
+from openthot import object_storage
+from openthot.config import TranscriptStorageSettings
 from openthot.db.database import SqlaUserBase
-from openthot.db.rw import create_interview, get_interviews
-from openthot.db.schemas import SqlaInterview
+from openthot.db.rw import (
+    acquire_transcription_lease,
+    create_interview,
+    delete_interview,
+    get_interviews,
+    get_pending_interview_ids,
+    reference_audio_file,
+    release_audio_file,
+    release_transcription_lease,
+    renew_transcription_lease,
+    update_interview,
+)
+from openthot.db.schemas import SqlaInterview, SqlaTranscriptionLease
 from openthot.models.interview import (
     DBInputInterviewCreate,
+    DBInputInterviewUpdate,
     DBOutputInterview,
     InterviewStatus,
 )
+from openthot.models.transcript.encoding import (
+    TranscriptCompression,
+    TranscriptEncoding,
+    encode_transcript,
+)
+from openthot.object_storage import WAVEFORM_SUFFIX
 from tests.conftest import MP3_FILE_PATH
 
 
@@ -29,6 +53,7 @@ async def test_get_interviews(
     for r in result:
         if not with_transcript:
             assert r.transcript_raw is None
+            assert r.transcript is None
         try:
             DBOutputInterview.from_orm(r)
         except Exception as e:
@@ -51,3 +76,154 @@ async def test_create_interview_valid_input(async_test_session):
     assert result.status == InterviewStatus.uploaded
     assert result.creator_id == user.id
     assert result.audio_location == str(audio_location)
+
+
+# Tests that an audio file is removed once no interview, nor upload, references it
+@pytest.mark.asyncio
+async def test_delete_interview_shared_audio(
+    local_object_storage, tmp_path, async_test_session, sqla_user
+):
+    audio_location = tmp_path / "ab" / "abcdef.mp3"
+    audio_location.parent.mkdir()
+    audio_location.write_bytes(MP3_FILE_PATH.read_bytes())
+    interviews = [
+        await create_interview(
+            async_test_session,
+            sqla_user,
+            DBInputInterviewCreate(
+                name=f"{i} test interview",
+                audio_filename="test.mp3",
+                audio_location=audio_location,
+                audio_duration=0.1,
+                audio_sha256="abcdef",
+            ),
+        )
+        for i in range(2)
+    ]
+
+    assert await delete_interview(async_test_session, sqla_user, interviews[0].id)
+    assert audio_location.exists()
+    # e.g. the same audio being uploaded again, until it is an interview
+    await reference_audio_file(async_test_session, str(audio_location))
+    assert await delete_interview(async_test_session, sqla_user, interviews[1].id)
+    assert audio_location.exists()
+    assert await release_audio_file(async_test_session, str(audio_location), "abcdef")
+    assert not audio_location.exists()
+
+
+# Tests that the files computed from an audio file are kept while another audio file
+# has the same content, e.g. stored at a location of its own before content addresses
+@pytest.mark.asyncio
+async def test_delete_interview_same_content(
+    local_object_storage, tmp_path, async_test_session, sqla_user
+):
+    legacy_location = tmp_path / "legacy.mp3"
+    legacy_location.write_bytes(MP3_FILE_PATH.read_bytes())
+    waveform = Path(object_storage.derived_location("abcdef", WAVEFORM_SUFFIX))
+    waveform.parent.mkdir(parents=True)
+    waveform.write_bytes(b"peaks")
+    interviews = [
+        await create_interview(
+            async_test_session,
+            sqla_user,
+            DBInputInterviewCreate(
+                name="test interview",
+                audio_filename="test.mp3",
+                audio_location=location,
+                audio_duration=0.1,
+                audio_sha256="abcdef",
+            ),
+        )
+        for location in (legacy_location, MP3_FILE_PATH)
+    ]
+
+    assert await delete_interview(async_test_session, sqla_user, interviews[0].id)
+    assert not legacy_location.exists()
+    assert waveform.exists()
+
+
+# Tests that running transcriptions of a user are counted, but for those of the same
+# interview (e.g. a previous attempt) and those of dead workers
+@pytest.mark.asyncio
+async def test_transcription_leases(async_test_session, sqla_user, sqla_interviews):
+    first, second, third = (interview.id for interview in sqla_interviews[:3])
+    session = async_test_session
+    assert await acquire_transcription_lease(session, sqla_user.id, first, 2, 60)
+    lease_id = await acquire_transcription_lease(session, sqla_user.id, second, 2, 60)
+    assert lease_id is not None
+    assert not await acquire_transcription_lease(session, sqla_user.id, third, 2, 60)
+    # e.g. retried
+    assert await acquire_transcription_lease(session, sqla_user.id, second, 2, 60)
+    assert await acquire_transcription_lease(session, uuid.uuid4(), third, 2, 60)
+
+    await release_transcription_lease(session, lease_id)
+    lease_id = await acquire_transcription_lease(session, sqla_user.id, second, 2, 0)
+    assert lease_id is not None
+    assert await acquire_transcription_lease(session, sqla_user.id, third, 2, 60)
+    await renew_transcription_lease(session, lease_id, 60)
+
+
+# Tests that concurrent transcriptions of a user never run more than allowed
+@pytest.mark.asyncio
+async def test_transcription_leases_concurrent(db_test_engine):
+    session_maker = async_sessionmaker(db_test_engine, expire_on_commit=False)
+    user_id = uuid.uuid4()
+
+    async def acquire(interview_id: int) -> int | None:
+        async with session_maker() as session:
+            return await acquire_transcription_lease(
+                session, user_id, interview_id, 2, 60
+            )
+
+    leases = await asyncio.gather(*(acquire(i) for i in range(1, 11)))
+
+    assert len([lease_id for lease_id in leases if lease_id is not None]) == 2
+    async with session_maker() as session:
+        assert (
+            await session.scalar(
+                select(func.count()).select_from(SqlaTranscriptionLease)
+            )
+            == 2
+        )
+
+
+# Tests that batches only gather interviews requesting the same ASR engine
+@pytest.mark.asyncio
+async def test_get_pending_interview_ids(async_test_session, sqla_interviews):
+    sqla_interviews[1].asr_engine = "fast"
+    sqla_interviews[2].status = InterviewStatus.processing
+    await async_test_session.commit()
+
+    pending = await get_pending_interview_ids(
+        async_test_session, 1.0, 3, exclude=sqla_interviews[0].id
+    )
+    assert pending == [sqla_interviews[i].id for i in (3, 4, 5)]
+    pending = await get_pending_interview_ids(
+        async_test_session, 1.0, 3, asr_engine="fast"
+    )
+    assert pending == [sqla_interviews[1].id]
+
+
+# Tests that transcripts are stored as set for the deployment, and read whatever
+@pytest.mark.asyncio
+async def test_update_interview_transcript(
+    mocker, async_test_session, sqla_interview, ott_simple_example1
+):
+    for encoding, compression in (
+        (TranscriptEncoding.json, TranscriptCompression.zlib),
+        (TranscriptEncoding.binary, TranscriptCompression.none),
+    ):
+        mocker.patch(
+            "openthot.db.rw.storage_settings",
+            TranscriptStorageSettings(encoding=encoding, compression=compression),
+        )
+        await update_interview(
+            async_test_session,
+            sqla_interview,
+            DBInputInterviewUpdate(transcript=ott_simple_example1),
+        )
+        assert sqla_interview.transcript == encode_transcript(
+            ott_simple_example1, encoding, compression
+        )
+        interview = DBOutputInterview.from_orm(sqla_interview)
+        assert interview.transcript == ott_simple_example1
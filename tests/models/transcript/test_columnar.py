@@ -0,0 +1,73 @@
+import pytest
+
+from openthot.models.transcript.columnar import ColumnarTranscript
+from openthot.models.transcript.openthot import OpenthotTranscript, PartialSegment
+from openthot.models.transcript.utils import partial2ott, wt2ct, wtx2ct
+from openthot.models.transcript.whisper import WhisperTranscript
+from openthot.models.transcript.whisperx import WhisperXTranscript
+
+
+@pytest.mark.parametrize("example", ("ott_simple_example1", "ott_simple_example2"))
+def test_round_trip(request, example: str):
+    ott: OpenthotTranscript = request.getfixturevalue(example)
+    ct = ColumnarTranscript.from_ott(ott)
+    assert ct.segment_count == len(ott.segments)
+    assert ct.word_count == sum(len(s.words) for s in ott.segments)
+    assert ct.to_ott() == ott
+    assert ct.to_ott().json() == ott.json()
+
+
+# Tests that speakers are stored once, whether listed in `speakers` or not
+def test_speakers():
+    ct = ColumnarTranscript()
+    ct.add_segment(0, 0.0, 1.0, speaker="SPEAKER_01")
+    ct.add_word(" Bonjour", 0.0, 0.5, 0.9)
+    ct.add_word(" !", 0.5, 1.0, 0.8)
+    ct.add_segment(1, 1.0, 2.0)
+    ct.add_segment(2, 2.0, 3.0, speaker="SPEAKER_01")
+    assert ct.speakers == ["SPEAKER_01"]
+    assert ct.to_ott().speakers == set()
+    assert ct.add_speaker("SPEAKER_01") == 0
+    assert ct.add_speaker("SPEAKER_00") == 1
+
+    ott = ct.to_ott()
+    assert ott.speakers == {"SPEAKER_00", "SPEAKER_01"}
+    assert [s.speaker for s in ott.segments] == ["SPEAKER_01", None, "SPEAKER_01"]
+    assert [len(s.words) for s in ott.segments] == [2, 0, 0]
+    assert ct.words_text == " Bonjour !"
+    assert ct.word(1) == " !"
+
+
+def test_round_trip_partial():
+    ott = partial2ott(
+        [
+            PartialSegment(start=0.0, end=2.0, text=" Bonjour,"),
+            PartialSegment(start=2.0, end=3.5, text=" ça va ?"),
+        ]
+    )
+    assert ColumnarTranscript.from_ott(ott).to_ott() == ott
+
+
+def test_emitted(
+    whisper_output_example1: WhisperTranscript,
+    whisperx_output_example2: WhisperXTranscript,
+    ott_simple_example1: OpenthotTranscript,
+    ott_simple_example2: OpenthotTranscript,
+):
+    assert wt2ct(whisper_output_example1).to_ott() == ott_simple_example1
+    ct = wtx2ct(whisperx_output_example2)
+    assert ct.to_ott() == ott_simple_example2
+    # i.e. each speaker once, rather than once per segment
+    assert len(ct.speakers) == len(ott_simple_example2.speakers)
+
+
+# Tests that segments within a time window are found, even when some overlap
+def test_segments_between():
+    ct = ColumnarTranscript()
+    for i, (start, end) in enumerate(((0, 2), (1, 10), (3, 4), (5, 6), (11, 12))):
+        ct.add_segment(i, start, end)
+    assert ct.segments_between(None, None) == range(5)
+    assert ct.segments_between(4.5, 5.5) == range(1, 4)  # i.e. (3, 4) to be checked
+    assert ct.segments_between(10, None) == range(4, 5)
+    assert ct.segments_between(None, 3) == range(0, 2)
+    assert ct.segments_between(12, 20) == range(5, 5)
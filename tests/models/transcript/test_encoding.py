@@ -0,0 +1,74 @@
+import importlib.util
+import sys
+
+import pytest
+
+from openthot.models.transcript.columnar import ColumnarTranscript
+from openthot.models.transcript.encoding import (
+    TranscriptCompression,
+    TranscriptDecodingError,
+    TranscriptEncoding,
+    decode_transcript,
+    encode_transcript,
+)
+from openthot.models.transcript.openthot import OpenthotTranscript, PartialSegment
+from openthot.models.transcript.utils import partial2ott
+
+COMPRESSIONS = [
+    TranscriptCompression.none,
+    TranscriptCompression.zlib,
+    pytest.param(
+        TranscriptCompression.zstd,
+        marks=pytest.mark.skipif(
+            not importlib.util.find_spec("zstandard"), reason="requires zstandard"
+        ),
+    ),
+]
+
+
+@pytest.mark.parametrize("encoding", list(TranscriptEncoding))
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+@pytest.mark.parametrize("example", ("ott_simple_example1", "ott_simple_example2"))
+def test_round_trip(request, example: str, encoding, compression):
+    ott: OpenthotTranscript = request.getfixturevalue(example)
+    data = encode_transcript(ott, encoding, compression)
+    assert data.startswith(b"OTTB")
+    assert decode_transcript(data).to_ott() == ott
+    # Whether encoded from its columnar representation or not
+    ct = ColumnarTranscript.from_ott(ott)
+    assert encode_transcript(ct, encoding, compression) == data
+
+
+def test_round_trip_partial():
+    ott = partial2ott(
+        [
+            PartialSegment(start=0.0, end=2.0, text=" Bonjour,"),
+            PartialSegment(start=2.0, end=3.5, text=" ça va ?"),
+        ]
+    )
+    assert decode_transcript(encode_transcript(ott)).to_ott() == ott
+
+
+# Tests that decoded columns are views of the encoded bytes, rather than copies
+@pytest.mark.skipif(sys.byteorder != "little", reason="swapped on big-endian hosts")
+def test_zero_copy(ott_simple_example2: OpenthotTranscript):
+    data = encode_transcript(ott_simple_example2)
+    ct = decode_transcript(data)
+    assert isinstance(ct.word_starts, memoryview)
+    assert ct.word_starts.obj is data
+    assert list(ct.word_starts) == [
+        w.start for s in ott_simple_example2.segments for w in s.words
+    ]
+
+
+def test_decode_json(ott_simple_example1: OpenthotTranscript):
+    # i.e. as stored before being encoded
+    assert decode_transcript(ott_simple_example1.json()).to_ott() == ott_simple_example1
+
+
+def test_decode_invalid(ott_simple_example1: OpenthotTranscript):
+    data = encode_transcript(ott_simple_example1)
+    with pytest.raises(TranscriptDecodingError):
+        decode_transcript(data[:4] + b"\x02" + data[5:])  # i.e. a future version
+    with pytest.raises(TranscriptDecodingError):
+        decode_transcript(data[:-8])
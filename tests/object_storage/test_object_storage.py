@@ -0,0 +1,125 @@
+import hashlib
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+from fastapi import UploadFile
+
+from openthot import object_storage
+from openthot.exceptions import UnsupportedAudioFile
+from openthot.object_storage import save_audio_file
+
+
+@pytest.mark.asyncio
+async def test_save_audio_file_deduplicated(
+    local_object_storage, tmp_path, upload_file_mp3
+):
+    """Tests that the same audio content uploaded twice is stored once."""
+    # Arrange
+    audio_file1 = UploadFile(
+        filename="test_audio.mp3", file=BytesIO(upload_file_mp3.getvalue())
+    )
+    audio_file2 = UploadFile(
+        filename="renamed.mp3", file=BytesIO(upload_file_mp3.getvalue())
+    )
+
+    # Act
+    result1 = await save_audio_file(audio_file1)
+    result2 = await save_audio_file(audio_file2)
+
+    # Assert
+    assert result1 == result2
+    assert Path(result1.location).name == f"{result1.sha256}.mp3"
+    assert list(tmp_path.glob("**/*.mp3")) == [Path(result1.location)]
+
+
+@pytest.mark.asyncio
+async def test_delete_audio_file_outside_storage(local_object_storage, tmp_path):
+    """Tests that files outside of the object storage are never deleted."""
+    local_object_storage.object_storage_path = tmp_path / "storage"
+    outside = tmp_path / "outside.mp3"
+    outside.write_bytes(b"whatever")
+
+    assert await object_storage.delete_audio_file(outside) is False
+    assert outside.exists()
+
+
+@pytest.mark.asyncio
+async def test_save_audio_file_chunked(
+    mocker, local_object_storage, tmp_path, upload_file_mp3
+):
+    """Tests that the file is copied chunk by chunk, and hashed along the way."""
+    content = upload_file_mp3.getvalue()
+    mocker.patch("openthot.object_storage.UPLOAD_CHUNK_SIZE", 1000)
+    audio_file = UploadFile(filename="test_audio.mp3", file=BytesIO(content))
+    read_spy = mocker.spy(audio_file, "read")
+
+    result = await save_audio_file(audio_file)
+
+    assert result.size == len(content)
+    assert result.sha256 == hashlib.sha256(content).hexdigest()
+    assert Path(result.location).read_bytes() == content
+    assert all(c.args == (1000,) for c in read_spy.call_args_list)
+    assert read_spy.call_count == len(content) // 1000 + 2  # + last partial + EOF
+
+
+@pytest.mark.asyncio
+async def test_save_audio_file_not_audio(local_object_storage, tmp_path):
+    """Tests that non-audio files are rejected before anything is written."""
+    audio_file = UploadFile(filename="notes.txt", file=BytesIO(b"Some notes" * 100))
+
+    with pytest.raises(UnsupportedAudioFile):
+        await save_audio_file(audio_file)
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize(
+    "head,expected",
+    (
+        (b"RIFF\x00\x00\x00\x00WAVEfmt ", True),
+        (b"ID3\x04\x00\x00\x00\x00\x00\x00\x00\x00", True),
+        (b"\x00\x00\x00\x20ftypM4A \x00\x00", True),
+        (b"OggS\x00\x02\x00\x00\x00\x00\x00\x00", True),
+        (b"%PDF-1.7\n%\xe2\xe3\xcf\xd3", False),
+        (b"", False),
+    ),
+)
+def test_looks_like_audio(head, expected):
+    assert object_storage.looks_like_audio(head) is expected
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "start,end,expected",
+    ((2, 5, b"234"), (7, None, b"789"), (0, 1, b"0"), (10, None, b""), (5, 5, b"")),
+)
+async def test_read_audio_file_range(
+    mocker, local_object_storage, tmp_path, start, end, expected
+):
+    mocker.patch("openthot.object_storage.local.READ_CHUNK_SIZE", 2)
+    location = tmp_path / "digits"
+    location.write_bytes(b"0123456789")
+
+    chunks = [c async for c in object_storage.read_audio_file(location, start, end)]
+
+    assert b"".join(chunks) == expected
+    assert all(len(c) <= 2 for c in chunks)
+
+
+# Tests that a file finalized (i.e. moved) or removed while it was being locked
+# is not locked, as if it had never been there
+def test_locked_audio_file_gone(mocker, tmp_path):
+    location = tmp_path / "upload"
+    location.write_bytes(b"audio")
+    flock = object_storage.fcntl.flock
+
+    def finalize_then_flock(fd, operation):
+        # i.e. by the request holding the lock until then
+        location.rename(tmp_path / "stored")
+        flock(fd, operation)
+
+    mocker.patch("openthot.object_storage.fcntl.flock", side_effect=finalize_then_flock)
+
+    with pytest.raises(FileNotFoundError):
+        with object_storage.locked_audio_file(location):
+            pass
@@ -0,0 +1,81 @@
+import uuid
+
+import pytest
+
+from openthot.config import SchedulingSettings
+from openthot.tasks import tasks
+from openthot.tasks.scheduling import QueueClass, queue_class, route_task
+
+
+@pytest.mark.parametrize(
+    "audio_duration,expected",
+    (
+        (2.4, QueueClass.short),
+        (600.0, QueueClass.short),
+        (1800.0, QueueClass.medium),
+        (None, QueueClass.medium),
+        (7200.0, QueueClass.long),
+    ),
+)
+def test_queue_class(audio_duration, expected):
+    assert queue_class(audio_duration) == expected
+
+
+def test_route_task(mocker):
+    mocker.patch("openthot.tasks.scheduling.chunking_settings.chunk_duration_s", 1800.0)
+    routes = {
+        name: route_task(name, (), kwargs, {})["queue"]
+        for name, kwargs in (
+            ("openthot.tasks.tasks.process_audio_task", {"audio_duration": 7200.0}),
+            ("openthot.tasks.tasks.transcribe_chunk_task", {}),
+            ("openthot.tasks.tasks.merge_chunks_task", {}),
+        )
+    }
+    assert list(routes.values()) == ["asr_long", "asr_medium", "asr_short"]
+    refinement = {"audio_duration": 60.0, "refining": True}
+    assert route_task(tasks.process_audio_task.name, (), refinement, {}) == {
+        "queue": "asr_refine"
+    }
+
+
+# Tests that transcriptions of a user beyond its fair share are sent back to the queue,
+# until they have been deferred too many times
+@pytest.mark.parametrize(
+    "lease_id,deferrals,deferred", ((1, 0, False), (None, 0, True), (None, 3, False))
+)
+def test_fair_share(mocker, lease_id, deferrals, deferred):
+    mocker.patch(
+        "openthot.tasks.scheduling.scheduling_settings",
+        SchedulingSettings(
+            max_in_flight_per_user=2, defer_countdown_s=10, max_deferrals=3
+        ),
+    )
+    mocker.patch("openthot.tasks.scheduling.async_session")
+    acquire = mocker.patch(
+        "openthot.tasks.scheduling.rw.acquire_transcription_lease",
+        return_value=lease_id,
+    )
+    release = mocker.patch("openthot.tasks.scheduling.rw.release_transcription_lease")
+    process_audio = mocker.patch("openthot.tasks.tasks.process_audio")
+    apply_async = mocker.patch.object(tasks.process_audio_task, "apply_async")
+    kwargs = {
+        "user_id": uuid.uuid4(),
+        "interview_id": 1,
+        "audio_location": "bonjour.mp3",
+        "audio_duration": 2.4,
+        "deferrals": deferrals,
+    }
+
+    tasks.process_audio_task.apply(kwargs=kwargs)
+
+    assert acquire.call_args.args[1:] == (kwargs["user_id"], 1, 2, 300.0)
+    if deferred:
+        process_audio.assert_not_called()
+        apply_async.assert_called_once_with(
+            (), kwargs | {"deferrals": deferrals + 1}, countdown=10
+        )
+    else:
+        process_audio.assert_awaited_once()
+        apply_async.assert_not_called()
+    # i.e. the lease of the transcription, once it ran
+    assert release.called == (lease_id is not None)